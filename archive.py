@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+
+from src.managers.trade_manager import TradeBatchError
+from src.services.trade_archive import ARCHIVE_FORMATS, archive_format_of
+
+# The errors printed for a rejected import; the rest are counted.
+MAX_REPORTED_ERRORS = 20
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import trades into the book, or export it, as a Parquet or Arrow IPC file. The book is "
+                    "the journal at TRADE_JOURNAL_PATH, with the server's other settings; stop the server first."
+    )
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=ARCHIVE_FORMATS, help="defaults to the one the file extension names")
+    args = parser.parse_args()
+
+    if not os.environ.get("TRADE_JOURNAL_PATH"):
+        parser.error("TRADE_JOURNAL_PATH is not set; without a journal the book only lives in the server's memory")
+    try:
+        archive_format = archive_format_of(args.path, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Building the container recovers the book from the journal.
+    from container import trade_manager
+
+    if args.command == "export":
+        trade_manager.export_archive(archive_format, args.path)
+        count = sum(trade_manager.trade_service.get_trade_count(symbol) for symbol in trade_manager.trade_service.get_symbols())
+        print(f"Exported {count} trades to {args.path}")
+        return
+
+    try:
+        count = trade_manager.import_archive(args.path, archive_format)
+    except TradeBatchError as e:
+        for row, messages in sorted(e.errors.items())[:MAX_REPORTED_ERRORS]:
+            print(f"Row {row}: {'; '.join(messages)}", file=sys.stderr)
+        print(f"Import rejected: {e}", file=sys.stderr)
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Import rejected: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Imported {count} trades")
+
+
+if __name__ == "__main__":
+    main()
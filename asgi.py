@@ -0,0 +1,18 @@
+from asgiref.wsgi import WsgiToAsgi
+
+from main import create_app
+from src.controllers.async_pnl_controller import AsyncPnLController
+
+# /pnl and /pnl/<symbol> are served by async handlers that wait for price
+# fetches without holding a worker; the remaining routes run on the Flask app
+# in asgiref's thread pool.
+app = create_app()
+async_pnl_controller = AsyncPnLController(app.extensions["container"].pnl_manager)
+application = async_pnl_controller.mount(WsgiToAsgi(app))
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is not installed; run: pip install uvicorn")
+    uvicorn.run(application, port=8000)
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from generator import generate_trades
+from src.services.portfolio_service import PortfolioService
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService
+from src.services.trade_archive import pa
+from src.managers.trade_manager import TradeManager
+from src.controllers.trade_controller import TradeController
+from src.controllers.serialization import FastJSONProvider
+
+
+def build(store):
+    trade_manager = TradeManager(store(), PortfolioService(), PnLService())
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    TradeController(trade_manager).register_routes(app)
+    return trade_manager, app.test_client()
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import and export: JSON against Parquet and Arrow IPC files")
+    parser.add_argument("--trades", type=int, default=200_000)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if pa is None:
+        sys.exit("pyarrow is not installed")
+
+    source, _ = build(TradeService)
+    source.add_trades(list(generate_trades(args.trades, args.symbols, args.seed)))
+    rows = [
+        {key: row[key] for key in ("symbol", "side", "price", "quantity", "timestamp")}
+        for row in (trade.to_dict() for trade in source.trade_service.get_trades())
+    ]
+    json_body = json.dumps(rows).encode()
+    files = {archive_format: source.export_archive(archive_format) for archive_format in ("parquet", "arrow")}
+
+    print(f"trades={args.trades} symbols={args.symbols}")
+    print(f"{'import':<40} {'store':<9} {'trades/s':>11} {'MB':>7}")
+    for store in (TradeService, ColumnarTradeService):
+        store_name = "list" if store is TradeService else "columnar"
+        _, client = build(store)
+        seconds, response = timed(
+            lambda: client.post('/trades/batch', data=json_body, content_type='application/json')
+        )
+        assert response.status_code == 201, response.data
+        print(f"{'POST /trades/batch (JSON)':<40} {store_name:<9} {args.trades / seconds:>11,.0f} "
+              f"{len(json_body) / 1e6:>7.1f}")
+
+        for archive_format, data in files.items():
+            _, client = build(store)
+            seconds, response = timed(
+                lambda: client.post(f'/trades/import?format={archive_format}', data=data)
+            )
+            assert response.status_code == 201, response.data
+            print(f"{f'POST /trades/import ({archive_format})':<40} {store_name:<9} {args.trades / seconds:>11,.0f} "
+                  f"{len(data) / 1e6:>7.1f}")
+
+    print(f"\n{'export':<40} {'store':<9} {'trades/s':>11}")
+    for store in (TradeService, ColumnarTradeService):
+        store_name = "list" if store is TradeService else "columnar"
+        trade_manager, client = build(store)
+        trade_manager.import_archive(files["arrow"], "arrow")
+        for name, path in (
+            ("GET /trades (JSON)", '/trades'),
+            ("GET /trades/export (parquet)", '/trades/export?format=parquet'),
+            ("GET /trades/export (arrow)", '/trades/export?format=arrow'),
+        ):
+            # Buffered, so a streamed body is read inside the timing.
+            seconds, response = timed(lambda: client.get(path, buffered=True))
+            assert response.status_code == 200, response.data
+            print(f"{name:<40} {store_name:<9} {args.trades / seconds:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
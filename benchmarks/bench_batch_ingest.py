@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from generator import generate_trades
+from src.services.portfolio_service import PortfolioService
+from src.services.trade_service import TradeService
+from src.services.pnl_service import PnLService
+from src.managers.trade_manager import TradeManager
+from src.controllers.trade_controller import TradeController
+from src.controllers.serialization import FastJSONProvider
+
+
+def build_client():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    trade_manager = TradeManager(TradeService(), PortfolioService(), PnLService())
+    TradeController(trade_manager).register_routes(app)
+    return app.test_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare POST /trades with POST /trades/batch")
+    parser.add_argument("--trades", type=int, default=20_000)
+    parser.add_argument("--symbols", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = [
+        {"symbol": trade.symbol, "side": trade.side, "price": trade.price,
+         "quantity": trade.quantity, "timestamp": trade.timestamp}
+        for trade in generate_trades(args.trades, args.symbols)
+    ]
+    single_rows = [{key: row[key] for key in ("symbol", "side", "price", "quantity")} for row in rows]
+
+    client = build_client()
+    started = time.perf_counter()
+    for row in single_rows:
+        client.post('/trades', data=json.dumps(row), content_type='application/json')
+    single_seconds = time.perf_counter() - started
+
+    client = build_client()
+    body = json.dumps(rows)
+    started = time.perf_counter()
+    response = client.post('/trades/batch', data=body, content_type='application/json')
+    json_seconds = time.perf_counter() - started
+    assert response.status_code == 201, response.data
+
+    client = build_client()
+    body = "\n".join(json.dumps(row) for row in rows)
+    started = time.perf_counter()
+    response = client.post('/trades/batch', data=body, content_type='application/x-ndjson')
+    ndjson_seconds = time.perf_counter() - started
+    assert response.status_code == 201, response.data
+
+    print(f"trades={args.trades}")
+    for name, seconds in (
+        ("POST /trades (one per request)", single_seconds),
+        ("POST /trades/batch (JSON array)", json_seconds),
+        ("POST /trades/batch (NDJSON)", ndjson_seconds),
+    ):
+        print(f"{name:<34} {args.trades / seconds:>12,.0f} trades/s")
+
+
+if __name__ == "__main__":
+    main()
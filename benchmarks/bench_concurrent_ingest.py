@@ -0,0 +1,111 @@
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generator import generate_trades
+from src.services.portfolio_service import PortfolioService
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService
+from src.services.lock_service import SymbolLockService
+from src.managers.trade_manager import TradeManager
+
+
+STORES = {"list": TradeService, "columnar": ColumnarTradeService}
+
+
+def split_trades(trades, threads, partition):
+    # "symbol" gives each thread its own symbols; "round-robin" spreads every
+    # symbol over every thread, so writers contend on the same stripes.
+    chunks = [[] for _ in range(threads)]
+    for index, trade in enumerate(trades):
+        if partition == "symbol":
+            chunks[int(trade.symbol[3:]) % threads].append(trade)
+        else:
+            chunks[index % threads].append(trade)
+    return chunks
+
+
+def ingest(trades, threads, partition, store, stripes):
+    manager = TradeManager(
+        STORES[store](), PortfolioService(), PnLService(), lock_service=SymbolLockService(stripes)
+    )
+    rejected = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(position, chunk):
+        barrier.wait()
+        for trade in chunk:
+            try:
+                manager.add_trade(trade)
+            except Exception:
+                # Round-robin can reorder a symbol's trades so a sell lands
+                # before the buys it needs; the portfolio rejects it.
+                rejected[position] += 1
+
+    workers = [
+        threading.Thread(target=worker, args=(position, chunk))
+        for position, chunk in enumerate(split_trades(trades, threads, partition))
+    ]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    seconds = time.perf_counter() - started
+    return manager, seconds, sum(rejected)
+
+
+def matches_serial_replay(manager):
+    # Replaying the accepted trades in timestamp order must land on the same
+    # state, however the threads interleaved them.
+    portfolio_service = PortfolioService()
+    pnl_service = PnLService()
+    for symbol in {trade.symbol for trade in manager.trade_service.get_trades()}:
+        for trade in manager.trade_service.get_trades_by_symbol_and_side(symbol):
+            portfolio_service.apply_trade(trade)
+            pnl_service.add_trade(trade)
+
+    expected, actual = portfolio_service.get_holdings(), manager.portfolio_service.get_holdings()
+    if expected.keys() != actual.keys():
+        return False
+    for symbol, holding in expected.items():
+        for field in ("quantity", "average_price"):
+            if not math.isclose(getattr(holding, field), getattr(actual[symbol], field), rel_tol=1e-9, abs_tol=1e-9):
+                return False
+    return all(
+        math.isclose(pnl_service.get_realized_pnl(symbol), manager.pnl_service.get_realized_pnl(symbol),
+                     rel_tol=1e-9, abs_tol=1e-6)
+        for symbol in pnl_service.get_state()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress TradeManager.add_trade from several threads")
+    parser.add_argument("--trades", type=int, default=200_000)
+    parser.add_argument("--symbols", type=int, default=64)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--partition", choices=("symbol", "round-robin"), default="symbol")
+    parser.add_argument("--store", choices=sorted(STORES), default="list")
+    args = parser.parse_args()
+
+    trades = list(generate_trades(args.trades, args.symbols))
+    print(f"trades={args.trades} symbols={args.symbols} partition={args.partition} store={args.store}")
+    print(f"{'threads':>7} {'locks':>8} {'trades/s':>12} {'rejected':>9} {'replay':>7}")
+    for threads in args.threads:
+        # One stripe is the global-lock baseline.
+        for stripes in (1, 64):
+            manager, seconds, rejected = ingest(trades, threads, args.partition, args.store, stripes)
+            label = "global" if stripes == 1 else f"{stripes} str."
+            verdict = "ok" if matches_serial_replay(manager) else "MISMATCH"
+            print(f"{threads:>7} {label:>8} {args.trades / seconds:>12,.0f} {rejected:>9} {verdict:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.trade import Trade
+from src.services.cost_basis_service import ENGINES, FIFO, LIFO, HIFO
+
+
+def generate_account(buys, sell_every, seed=42):
+    # Many small buys and a large sell every sell_every buys, selling most of
+    # what was bought since the last one. Open lots pile up over the
+    # account's life, the shape that makes list-based matching quadratic.
+    rng = random.Random(seed)
+    bought = 0.0
+    for index in range(buys):
+        quantity = rng.uniform(0.01, 0.1)
+        bought += quantity
+        yield Trade(f"trade_{index}", "BTC", "buy", rng.uniform(90.0, 110.0), quantity, index * 1000)
+        if index % sell_every == sell_every - 1:
+            quantity = bought * rng.uniform(0.5, 0.9)
+            bought = 0.0
+            yield Trade(f"trade_{index}_sell", "BTC", "sell", rng.uniform(90.0, 110.0), quantity, index * 1000 + 1)
+
+
+def naive_match(trades, method):
+    # Lots in a plain list: FIFO pops from the front and HIFO searches for
+    # the highest price, both linear per closed lot.
+    lots, realized_pnl = [], 0.0
+    for trade in trades:
+        if trade.is_buy:
+            lots.append([trade.price, trade.quantity])
+            continue
+        remaining = trade.quantity
+        while remaining > 0 and lots:
+            if method == FIFO:
+                index = 0
+            elif method == LIFO:
+                index = len(lots) - 1
+            else:
+                index = max(range(len(lots)), key=lambda position: lots[position][0])
+            closed = min(lots[index][1], remaining)
+            realized_pnl += (trade.price - lots[index][0]) * closed
+            lots[index][1] -= closed
+            remaining -= closed
+            if lots[index][1] <= 0:
+                lots.pop(index)
+    return realized_pnl
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lot matching cost per cost-basis method")
+    parser.add_argument("--buys", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--sell-every", type=int, default=1000)
+    parser.add_argument("--naive-limit", type=int, default=100_000, help="skip the list matcher above this many buys")
+    args = parser.parse_args()
+
+    print(f"{'buys':>9} {'method':<6} {'engine s':>9} {'list s':>9} {'realized diff':>14}")
+    for buys in args.buys:
+        trades = list(generate_account(buys, args.sell_every))
+        for method in (FIFO, LIFO, HIFO):
+            started = time.perf_counter()
+            engine = ENGINES[method]()
+            for trade in trades:
+                engine.apply_trade(trade)
+            engine_seconds = time.perf_counter() - started
+
+            if buys > args.naive_limit:
+                print(f"{buys:>9,} {method:<6} {engine_seconds:>9.3f} {'skipped':>9}")
+                continue
+            started = time.perf_counter()
+            realized_pnl = naive_match(trades, method)
+            naive_seconds = time.perf_counter() - started
+            print(f"{buys:>9,} {method:<6} {engine_seconds:>9.3f} {naive_seconds:>9.3f} "
+                  f"{abs(realized_pnl - engine.realized_pnl):>14.2e}")
+
+
+if __name__ == "__main__":
+    main()
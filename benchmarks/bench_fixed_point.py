@@ -0,0 +1,177 @@
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generator import generate_prices, generate_trades
+from src.models.trade import Trade
+from src.models.portfolio import Portfolio
+from src.services.fixed_point import FixedPoint
+from src.services.portfolio_service import PortfolioService, FixedPointPortfolioService
+from src.services.pnl_service import PnLService, FixedPointPnLService
+from src.services.price_service import PriceService
+from src.services.price_sources import StaticPriceSource
+from src.services.trade_service import TradeService
+from src.managers.trade_manager import TradeManager
+from src.managers.pnl_manager import PnLManager
+
+
+CENT = Decimal("0.01")
+
+
+class DecimalPortfolioService(PortfolioService):
+    # The straightforward Decimal port, for comparison: trade values parsed
+    # from their shortest repr and weighted average cost in Decimal.
+    def apply_trade(self, trade: Trade):
+        price, quantity = Decimal(repr(trade.price)), Decimal(repr(trade.quantity))
+        holding = self.portfolio.get(trade.symbol)
+        if trade.is_buy:
+            if holding is None:
+                self.portfolio[trade.symbol] = Portfolio(trade.symbol, quantity, price)
+            else:
+                new_quantity = holding.quantity + quantity
+                total_cost = holding.average_price * holding.quantity + price * quantity
+                self.portfolio[trade.symbol] = Portfolio(trade.symbol, new_quantity, total_cost / new_quantity)
+        elif holding is None or quantity > holding.quantity:
+            raise ValueError(f"Cannot sell {trade.quantity} {trade.symbol}")
+        elif quantity == holding.quantity:
+            del self.portfolio[trade.symbol]
+        else:
+            self.portfolio[trade.symbol] = Portfolio(trade.symbol, holding.quantity - quantity, holding.average_price)
+
+
+class DecimalPnLService(PnLService):
+    def add_trade(self, trade: Trade):
+        price, quantity = Decimal(repr(trade.price)), Decimal(repr(trade.quantity))
+        state = self.realized_pnl.get(trade.symbol)
+        if state is None:
+            state = self.realized_pnl[trade.symbol] = {
+                "quantity": Decimal(0), "total_cost": Decimal(0), "realized_pnl": Decimal(0)
+            }
+        if trade.is_buy:
+            state["total_cost"] += price * quantity
+            state["quantity"] += quantity
+        elif state["quantity"] > 0:
+            average_price = state["total_cost"] / state["quantity"]
+            state["realized_pnl"] += (price - average_price) * quantity
+            state["quantity"] -= quantity
+            state["total_cost"] = average_price * state["quantity"]
+        self._touch(trade.symbol)
+
+
+def decimal_summary(portfolio_service, pnl_service, prices):
+    # What PnLManager.get_pnl computes, in Decimal: rows and totals.
+    total_unrealized_pnl = total_realized_pnl = Decimal(0)
+    rows = []
+    for symbol, holding in portfolio_service.get_holdings().items():
+        unrealized_pnl = (Decimal(repr(prices[symbol])) - holding.average_price) * holding.quantity
+        realized_pnl = pnl_service.get_state()[symbol]["realized_pnl"]
+        rows.append((unrealized_pnl.quantize(CENT), realized_pnl.quantize(CENT)))
+        total_unrealized_pnl += unrealized_pnl
+        total_realized_pnl += realized_pnl
+    return rows, total_unrealized_pnl.quantize(CENT), total_realized_pnl.quantize(CENT)
+
+
+def build_services(mode, fixed_point):
+    if mode == "float":
+        return PortfolioService(), PnLService()
+    if mode == "fixed":
+        return FixedPointPortfolioService(fixed_point), FixedPointPnLService(fixed_point)
+    return DecimalPortfolioService(), DecimalPnLService()
+
+
+def round_trips(mode, fixed_point, symbols, lots, seed):
+    # Buys a few lots per symbol, then sells exactly what was bought, as
+    # summed in Decimal. Returns how many symbols fail to close: an oversell
+    # rejection or a leftover crumb of quantity.
+    rng = random.Random(seed)
+    portfolio_service, pnl_service = build_services(mode, fixed_point)
+    failed = 0
+    for symbol_index in range(symbols):
+        symbol = f"SYM{symbol_index}"
+        bought = Decimal(0)
+        for lot in range(lots):
+            quantity = round(rng.uniform(0.01, 10.0), 8)
+            bought += Decimal(repr(quantity))
+            portfolio_service.add_trade(Trade(f"t{symbol_index}_{lot}", symbol, "buy", 1.5, quantity, lot * 1000))
+        try:
+            portfolio_service.add_trade(Trade(f"s{symbol_index}", symbol, "sell", 1.6, float(bought), lots * 1000))
+        except ValueError:
+            failed += 1
+            continue
+        if portfolio_service.get_holding(symbol) is not None:
+            failed += 1
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Float vs fixed-point vs Decimal: ingestion, PnL summaries and exactness")
+    parser.add_argument("--trades", type=int, default=200_000)
+    parser.add_argument("--symbols", type=int, default=1_000)
+    parser.add_argument("--price-decimals", type=int, default=8)
+    parser.add_argument("--quantity-decimals", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20, help="summaries per mode")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    fixed_point = FixedPoint(args.price_decimals, args.quantity_decimals)
+    # Prices and quantities as an exchange would send them, with at most 4
+    # and 8 decimals; the generator's full-precision floats would be
+    # rejected by the fixed-point mode.
+    trades = [
+        Trade(trade.trade_id, trade.symbol, trade.side, round(trade.price, 4), round(trade.quantity, 8), trade.timestamp_ns)
+        for trade in generate_trades(args.trades, args.symbols, args.seed)
+    ]
+    prices = {symbol: round(price, 4) for symbol, price in generate_prices(args.symbols, args.seed).items()}
+
+    print(f"trades={args.trades} symbols={args.symbols} decimals={args.price_decimals}/{args.quantity_decimals}")
+    print(f"{'mode':<8} {'apply trades/s':>15} {'add_trade trades/s':>19} {'summary ms':>11} {'unclosed':>9} "
+          f"{'total off by':>13}")
+    reference = None
+    for mode in ("decimal", "float", "fixed"):
+        portfolio_service, pnl_service = build_services(mode, fixed_point)
+        started = time.perf_counter()
+        for trade in trades:
+            portfolio_service.apply_trade(trade)
+            pnl_service.add_trade(trade)
+        apply_rate = len(trades) / (time.perf_counter() - started)
+
+        portfolio_service, pnl_service = build_services(mode, fixed_point)
+        trade_manager = TradeManager(TradeService(), portfolio_service, pnl_service)
+        started = time.perf_counter()
+        for trade in trades:
+            trade_manager.add_trade(trade)
+        add_rate = len(trades) / (time.perf_counter() - started)
+
+        # A cold summary: every price moves before each read.
+        source = StaticPriceSource(dict(prices))
+        price_service = PriceService(source, ttl=3600)
+        pnl_manager = PnLManager(portfolio_service, price_service, trade_manager.trade_service, pnl_service)
+        summary_seconds = 0.0
+        for _ in range(args.repeat):
+            for symbol in source.prices:
+                source.prices[symbol] = round(source.prices[symbol] * 1.0001, 4)
+            price_service.invalidate()
+            current = price_service.get_prices(list(portfolio_service.get_holdings()))
+            started = time.perf_counter()
+            if mode == "decimal":
+                _, total_unrealized_pnl, total_realized_pnl = decimal_summary(portfolio_service, pnl_service, current)
+            else:
+                summary = pnl_manager.get_pnl()
+                total_unrealized_pnl, total_realized_pnl = summary.total_unrealized_pnl, summary.total_realized_pnl
+            summary_seconds += time.perf_counter() - started
+
+        total = Decimal(repr(float(total_unrealized_pnl))) + Decimal(repr(float(total_realized_pnl)))
+        if mode == "decimal":
+            reference = total
+        unclosed = round_trips(mode, fixed_point, 1_000, 10, args.seed)
+        print(f"{mode:<8} {apply_rate:>15,.0f} {add_rate:>19,.0f} {summary_seconds / args.repeat * 1e3:>11.2f} "
+              f"{unclosed:>9} {abs(total - reference):>13}")
+
+
+if __name__ == "__main__":
+    main()
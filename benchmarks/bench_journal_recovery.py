@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generator import generate_trades
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.portfolio_service import PortfolioService
+from src.services.pnl_service import PnLService
+from src.services.journal_service import TradeJournalService
+from src.services.snapshot_service import SnapshotService
+from src.managers.trade_manager import TradeManager
+
+
+def build_manager(store_class, journal_path, snapshot_every):
+    return TradeManager(
+        store_class(), PortfolioService(), PnLService(),
+        journal_service=TradeJournalService(journal_path, fsync_every=10000),
+        snapshot_service=SnapshotService(f"{journal_path}.snapshot"),
+        snapshot_every=snapshot_every
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure journal write and startup recovery time")
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--symbols", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal_path = os.path.join(directory, "trades.journal")
+        journal = TradeJournalService(journal_path, fsync_every=10000)
+        started = time.perf_counter()
+        for trade in generate_trades(args.trades, args.symbols):
+            journal.append(trade)
+        journal.close()
+        print(f"journal write: {args.trades / (time.perf_counter() - started):,.0f} trades/s "
+              f"({os.path.getsize(journal_path) / args.trades:.0f} bytes/trade)")
+
+        for store_class in (TradeService, ColumnarTradeService):
+            for snapshot_at in (None, args.trades - args.trades // 100):
+                snapshot_path = f"{journal_path}.snapshot"
+                if os.path.exists(snapshot_path):
+                    os.remove(snapshot_path)
+                if snapshot_at is not None:
+                    seeded = build_manager(store_class, journal_path, args.trades)
+                    for index, trade in enumerate(seeded.journal_service.iter_trades()):
+                        if index == snapshot_at:
+                            break
+                        seeded.portfolio_service.apply_trade(trade)
+                        seeded.pnl_service.add_trade(trade)
+                    seeded.snapshot_service.save(
+                        snapshot_at, seeded.portfolio_service.dump_holdings(), seeded.pnl_service.get_state()
+                    )
+                    seeded.journal_service.close()
+
+                manager = build_manager(store_class, journal_path, args.trades)
+                started = time.perf_counter()
+                manager.recover()
+                elapsed = time.perf_counter() - started
+                manager.journal_service.close()
+                label = "full replay" if snapshot_at is None else "snapshot + 1% tail"
+                print(f"recover {store_class.__name__:<22} {label:<20} {elapsed:6.2f}s "
+                      f"({args.trades / elapsed:,.0f} trades/s)")
+
+
+if __name__ == "__main__":
+    main()
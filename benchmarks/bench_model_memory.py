@@ -0,0 +1,99 @@
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.trade import Trade
+from src.models.portfolio import Portfolio
+
+
+class DictTrade:
+    # The Trade model before it was slotted: a per-instance __dict__, a
+    # string side and an ISO string timestamp.
+    def __init__(self, trade_id, symbol, side, price, quantity, timestamp):
+        self.trade_id = trade_id
+        self.symbol = symbol
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.timestamp = timestamp
+
+
+def resident_bytes() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def build(kind: str, count: int, symbol_count: int):
+    symbols = [f"SYM{index}" for index in range(symbol_count)]
+    model = Trade if kind == "slotted" else DictTrade
+    trades = []
+    for index in range(count):
+        seconds, micros = divmod(index, 1_000_000)
+        # Fresh strings per trade, as request parsing produces them.
+        trades.append(model(
+            f"trade_{index}",
+            symbols[index % symbol_count].lower().upper(),
+            "BUY".lower() if index % 3 else "SELL".lower(),
+            100.0 + index % 1000,
+            1.0 + index % 7,
+            f"2024-01-01T{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.{micros:06d}"
+        ))
+    return trades
+
+
+def build_holdings(kind: str, symbol_count: int):
+    symbols = [f"SYM{index}" for index in range(symbol_count)]
+    if kind == "slotted":
+        return {symbol: Portfolio(symbol, 1.0 + index, 100.0 + index) for index, symbol in enumerate(symbols)}
+    return {symbol: {"quantity": 1.0 + index, "average_price": 100.0 + index} for index, symbol in enumerate(symbols)}
+
+
+def child(kind: str, target: str, count: int, symbol_count: int):
+    gc.collect()
+    before = resident_bytes()
+    started = time.perf_counter()
+    data = build(kind, count, symbol_count) if target == "trades" else build_holdings(kind, count)
+    seconds = time.perf_counter() - started
+    gc.collect()
+    print(resident_bytes() - before, seconds, len(data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident memory of trades and holdings per representation")
+    parser.add_argument("--trades", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--holdings", type=int, default=1_000_000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--kinds", nargs="+", default=["dict", "slotted"])
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        kind, target, count = args.child
+        child(kind, target, int(count), args.symbols)
+        return
+
+    # Each measurement runs in a fresh interpreter so earlier runs do not
+    # leave freed-but-resident memory behind.
+    runs = [("trades", count) for count in args.trades] + [("holdings", args.holdings)]
+    print(f"{'what':<9} {'count':>11} {'model':<8} {'MB':>9} {'bytes/item':>11} {'build s':>8}")
+    for target, count in runs:
+        for kind in args.kinds:
+            result = subprocess.run(
+                [sys.executable, __file__, "--symbols", str(args.symbols), "--child", kind, target, str(count)],
+                capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                print(f"{target:<9} {count:>11,} {kind:<8} {'failed (exit ' + str(result.returncode) + ')':>30}")
+                continue
+            size, seconds, _ = result.stdout.split()
+            size = int(size)
+            print(f"{target:<9} {count:>11,} {kind:<8} {size / 1e6:>9.0f} {size / count:>11.0f} {float(seconds):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generator import generate_trades
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.parallel_pnl_service import ParallelPnLService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scale full PnL revaluation over 1..N worker processes")
+    parser.add_argument("--trades", type=int, default=2_000_000)
+    parser.add_argument("--symbols", type=int, default=2_000,
+                        help="trade histories to replay (symbols, or account/symbol pairs)")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    trade_service = ColumnarTradeService()
+    for trade in generate_trades(args.trades, args.symbols):
+        trade_service.add_trade(trade)
+    symbols = trade_service.get_symbols()
+    columns = [trade_service.get_columns(symbol) for symbol in symbols]
+    current_prices = [500.0] * len(symbols)
+
+    print(f"trades={args.trades} histories={len(symbols)} cpus={os.cpu_count()}")
+    print(f"{'workers':>7} {'seconds':>9} {'trades/s':>13} {'speedup':>8}")
+    baseline = None
+    expected = None
+    for workers in args.workers:
+        parallel_pnl_service = ParallelPnLService(workers=workers, min_rows=0)
+        # The first call starts the pool; time the calls after it.
+        result = parallel_pnl_service.revalue(columns, current_prices)
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = parallel_pnl_service.revalue(columns, current_prices)
+            best = min(best, time.perf_counter() - started)
+        parallel_pnl_service.close()
+
+        if expected is None:
+            expected = result[0]
+        assert result[0] == expected, "parallel revaluation diverged from the single-worker result"
+        baseline = baseline or best
+        print(f"{workers:>7} {best:>9.3f} {args.trades / best:>13,.0f} {baseline / best:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
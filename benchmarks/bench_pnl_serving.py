@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.price_sources import DEFAULT_PRICES, StaticPriceSource
+
+
+class SlowPriceSource(StaticPriceSource):
+    # Stands in for a price API with network latency.
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def fetch_prices(self, symbols):
+        time.sleep(self.delay)
+        return super().fetch_prices(symbols)
+
+
+def prepare_container(price_latency, invalidate_every):
+    import container
+
+    if price_latency:
+        container.price_service.source = SlowPriceSource(price_latency)
+    if invalidate_every:
+        # Drop the price cache periodically so requests keep hitting the
+        # slow source instead of being served stale.
+        def invalidate():
+            while True:
+                time.sleep(invalidate_every)
+                container.price_service.invalidate()
+        threading.Thread(target=invalidate, daemon=True).start()
+
+
+def serve_sync(port, price_latency, invalidate_every):
+    prepare_container(price_latency, invalidate_every)
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from main import app
+
+    # The same threaded server app.run() starts, without the request log.
+    WSGIRequestHandler.log_request = lambda *args, **kwargs: None
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def serve_async(port, price_latency, invalidate_every):
+    prepare_container(price_latency, invalidate_every)
+    import uvicorn
+    from asgi import application
+
+    uvicorn.run(application, host="127.0.0.1", port=port, log_level="warning", access_log=False, backlog=4096)
+
+
+SERVERS = {"sync": serve_sync, "async": serve_async}
+
+
+def free_port():
+    with contextlib.closing(socket.socket()) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def http_request(reader, writer, method, path, body=b""):
+    headers = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n"
+    if body:
+        headers += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+    writer.write(headers.encode() + b"\r\n" + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("server closed the connection")
+    status = int(status_line.split()[1])
+    length = 0
+    keep_alive = status_line.startswith(b"HTTP/1.1")
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection":
+            keep_alive = value.strip().lower() != "close"
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def wait_for_server(port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def seed_trades(port, positions):
+    symbols = list(DEFAULT_PRICES)
+    trades = [
+        {"symbol": symbols[index % len(symbols)], "side": "buy",
+         "price": DEFAULT_PRICES[symbols[index % len(symbols)]] * 0.9, "quantity": 1.0}
+        for index in range(positions)
+    ]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    status, _ = await http_request(reader, writer, "POST", "/trades/batch", json.dumps(trades).encode())
+    writer.close()
+    assert status == 201, status
+
+
+async def load(port, path, concurrency, total):
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        connection = None
+        while remaining > 0:
+            remaining -= 1
+            if connection is None:
+                connection = await asyncio.open_connection("127.0.0.1", port)
+            started = time.perf_counter()
+            try:
+                status, keep_alive = await http_request(*connection, "GET", path)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                errors += 1
+                connection[1].close()
+                connection = None
+                continue
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+            if not keep_alive:
+                connection[1].close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests_per_second": len(latencies) / seconds,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "errors": errors,
+    }
+
+
+def run(mode, args, price_latency, concurrency):
+    port = free_port()
+    server = multiprocessing.Process(
+        target=SERVERS[mode], args=(port, price_latency, args.invalidate_every), daemon=True
+    )
+    server.start()
+    try:
+        asyncio.run(wait_for_server(port))
+        asyncio.run(seed_trades(port, args.positions))
+        # Warm up connections and the price cache before measuring.
+        asyncio.run(load(port, args.path, min(concurrency, 16), 200))
+        return asyncio.run(load(port, args.path, concurrency, args.requests))
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test GET /pnl on the sync (Werkzeug) and async (uvicorn) servers")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 128, 512])
+    parser.add_argument("--price-latency", type=float, nargs="+", default=[0.0, 0.05],
+                        help="seconds each fetch from the price source takes")
+    parser.add_argument("--invalidate-every", type=float, default=0.1,
+                        help="seconds between price cache invalidations when the source is slow")
+    parser.add_argument("--positions", type=int, default=7)
+    parser.add_argument("--path", default="/pnl")
+    parser.add_argument("--modes", nargs="+", choices=sorted(SERVERS), default=["sync", "async"])
+    args = parser.parse_args()
+
+    print(f"GET {args.path} requests={args.requests}")
+    print(f"{'mode':<6} {'latency':>8} {'conc.':>6} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for price_latency in args.price_latency:
+        for concurrency in args.concurrency:
+            for mode in args.modes:
+                # Without a slow source there is nothing to invalidate for.
+                if not price_latency:
+                    args_for_run = argparse.Namespace(**{**vars(args), "invalidate_every": 0})
+                else:
+                    args_for_run = args
+                result = run(mode, args_for_run, price_latency, concurrency)
+                print(
+                    f"{mode:<6} {price_latency * 1000:>6.0f}ms {concurrency:>6} "
+                    f"{result['requests_per_second']:>10,.0f} {result['p50_ms']:>9.1f} "
+                    f"{result['p99_ms']:>9.1f} {result['errors']:>7}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generator import generate_prices, generate_trades
+from src.services.portfolio_service import PortfolioService
+from src.services.price_service import PriceService
+from src.services.price_sources import StaticPriceSource
+from src.services.trade_service import TradeService
+from src.services.pnl_service import PnLService
+from src.managers.trade_manager import TradeManager
+from src.managers.pnl_manager import PnLManager
+from src.managers.pnl_stream_manager import PnLStreamManager
+
+
+def build(symbols):
+    price_service = PriceService(StaticPriceSource(generate_prices(symbols)), ttl=3600)
+    trade_manager = TradeManager(TradeService(), PortfolioService(), PnLService())
+    pnl_manager = PnLManager(
+        trade_manager.portfolio_service, price_service, trade_manager.trade_service, trade_manager.pnl_service
+    )
+    return trade_manager, pnl_manager
+
+
+def main():
+    # A book receives trades in bursts. Pushing the whole summary on every
+    # trade (what a client polling GET /pnl per change costs) is compared
+    # with the stream, which revalues the traded symbols once per round.
+    parser = argparse.ArgumentParser(description="PnL push: per-trade summaries vs coalesced stream rounds")
+    parser.add_argument("--trades", type=int, default=20_000)
+    parser.add_argument("--symbols", type=int, default=1_000)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 100, 1_000],
+                        help="stream rounds the trades are spread over")
+    args = parser.parse_args()
+    trades = list(generate_trades(args.trades, args.symbols))
+
+    trade_manager, pnl_manager = build(args.symbols)
+    started = time.perf_counter()
+    sent = 0
+    for trade in trades:
+        trade_manager.add_trade(trade)
+        sent += len(pnl_manager.get_pnl().pnl)
+    seconds = time.perf_counter() - started
+    print(f"trades={args.trades} symbols={args.symbols}")
+    print(f"{'mode':<18} {'seconds':>8} {'recomputed':>11} {'rows sent':>10}")
+    print(f"{'summary per trade':<18} {seconds:>8.2f} {args.trades:>11,} {sent:>10,}")
+
+    for rounds in args.rounds:
+        trade_manager, pnl_manager = build(args.symbols)
+        stream_manager = PnLStreamManager(pnl_manager, interval=0)
+        trade_manager.add_change_listener(stream_manager.mark_changed)
+        subscription = stream_manager.subscribe()
+        subscription.next_update(0)
+        recomputed = sent = 0
+        per_round = -(-len(trades) // rounds)
+        started = time.perf_counter()
+        for offset in range(0, len(trades), per_round):
+            for trade in trades[offset:offset + per_round]:
+                trade_manager.add_trade(trade)
+            recomputed += len({trade.symbol for trade in trades[offset:offset + per_round]})
+            stream_manager.publish()
+            update = subscription.next_update(0)
+            sent += len(update["pnl"]) if update else 0
+        seconds = time.perf_counter() - started
+        print(f"{f'stream, {rounds} rounds':<18} {seconds:>8.2f} {recomputed:>11,} {sent:>10,}")
+
+
+if __name__ == "__main__":
+    main()
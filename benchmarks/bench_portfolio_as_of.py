@@ -0,0 +1,61 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generator import generate_trades
+from src.services.portfolio_service import PortfolioService
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService
+from src.services.checkpoint_service import PortfolioCheckpointService
+from src.managers.trade_manager import TradeManager
+from src.managers.portfolio_manager import PortfolioManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trade checkpoint memory against GET /portfolio?as_of latency")
+    parser.add_argument("--trades", type=int, default=500_000)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--every", type=int, nargs="+", default=[100, 1_000, 10_000, 10**9])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--store", choices=["list", "columnar"], default="list")
+    args = parser.parse_args()
+
+    trades = list(generate_trades(args.trades, args.symbols))
+    rng = random.Random(1)
+    as_of = [trades[rng.randrange(len(trades))].timestamp for _ in range(args.queries)]
+
+    print(f"trades={args.trades} symbols={args.symbols} store={args.store}")
+    print(f"{'every':>10} {'checkpoints':>12} {'memory KB':>10} {'ms/query':>9}")
+    for every in args.every:
+        portfolio_service = PortfolioService()
+        trade_service = ColumnarTradeService() if args.store == "columnar" else TradeService()
+        checkpoint_service = PortfolioCheckpointService(every)
+        trade_manager = TradeManager(trade_service, portfolio_service, PnLService(), checkpoint_service=checkpoint_service)
+        portfolio_manager = PortfolioManager(portfolio_service, trade_service, checkpoint_service)
+
+        # Only the checkpoints are traced, not the book around them.
+        tracemalloc.start()
+        trade_manager.add_trades(trades)
+        checkpoint_memory = sum(
+            stat.size for stat in tracemalloc.take_snapshot().statistics("filename")
+            if stat.traceback[0].filename.endswith("checkpoint_service.py")
+        )
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        for timestamp in as_of:
+            portfolio_manager.get_portfolio(timestamp)
+        per_query = (time.perf_counter() - started) / len(as_of)
+
+        print(f"{every:>10} {checkpoint_service.get_checkpoint_count():>12,} "
+              f"{checkpoint_memory / 1024:>10.0f} {per_query * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
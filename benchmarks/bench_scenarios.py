@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from generator import generate_prices, generate_trades, symbol_names
+from src.services.portfolio_service import PortfolioService
+from src.services.price_service import PriceService
+from src.services.price_sources import StaticPriceSource
+from src.services.trade_service import TradeService
+from src.services.pnl_service import PnLService
+from src.services.pnl_kernel import np, revalue_scenarios, revalue_scenarios_scalar
+from src.managers.trade_manager import TradeManager
+from src.managers.pnl_manager import PnLManager
+from src.controllers.pnl_controller import PnLController
+from src.controllers.serialization import FastJSONProvider
+
+
+def build(symbols, trades):
+    price_service = PriceService(StaticPriceSource(generate_prices(symbols)), ttl=3600)
+    trade_manager = TradeManager(TradeService(), PortfolioService(), PnLService())
+    trade_manager.add_trades(list(generate_trades(trades, symbols)))
+    return PnLManager(
+        trade_manager.portfolio_service, price_service, trade_manager.trade_service, trade_manager.pnl_service
+    )
+
+
+def swap_prices(pnl_manager, symbols, shocks):
+    # The way to do it without the scenario API: set every price and
+    # recompute the summary, once per scenario.
+    source = pnl_manager.price_service.source
+    base = dict(source.prices)
+    totals = []
+    for row in shocks:
+        for symbol, shock in zip(symbols, row):
+            source.prices[symbol] = base[symbol] * (1.0 + shock)
+        pnl_manager.price_service.invalidate()
+        totals.append(pnl_manager.get_pnl().total_unrealized_pnl)
+    source.prices.update(base)
+    pnl_manager.price_service.invalidate()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scenario revaluation: vectorized kernel vs scalar vs swapping prices")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--scenarios", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--swap-limit", type=int, default=100, help="skip the price-swapping loop above this many scenarios")
+    args = parser.parse_args()
+
+    pnl_manager = build(args.symbols, args.symbols * 20)
+    symbols = symbol_names(args.symbols)
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    PnLController(pnl_manager).register_routes(app)
+    client = app.test_client()
+    rng = random.Random(42)
+
+    print(f"symbols={args.symbols} holdings={len(pnl_manager.portfolio_service.get_holdings())}")
+    # array: the kernel on a NumPy matrix. lists: get_scenario_pnl on nested
+    # lists, as parsed from JSON. scalar: the fallback without NumPy. swap:
+    # setting prices and calling get_pnl per scenario. POST: the endpoint,
+    # JSON parsing included.
+    print(f"{'scenarios':>9} {'array ms':>9} {'lists ms':>9} {'scalar ms':>10} {'swap ms':>10} {'POST ms':>9} {'body MB':>8}")
+    for count in args.scenarios:
+        shocks = [[rng.uniform(-0.5, 0.5) for _ in symbols] for _ in range(count)]
+
+        started = time.perf_counter()
+        result = pnl_manager.get_scenario_pnl(symbols, shocks, relative=True)
+        lists_ms = (time.perf_counter() - started) * 1e3
+
+        holdings = pnl_manager.portfolio_service.get_holdings()
+        prices = pnl_manager.price_service.get_prices(symbols)
+        array_ms = float("nan")
+        if np is not None:
+            matrix = np.array(shocks)
+            started = time.perf_counter()
+            revalue_scenarios(
+                [holdings[symbol].quantity for symbol in symbols],
+                [holdings[symbol].average_price for symbol in symbols],
+                matrix, [prices[symbol] for symbol in symbols]
+            )
+            array_ms = (time.perf_counter() - started) * 1e3
+        started = time.perf_counter()
+        scalar = revalue_scenarios_scalar(
+            [holdings[symbol].quantity for symbol in symbols],
+            [holdings[symbol].average_price for symbol in symbols],
+            shocks, [prices[symbol] for symbol in symbols]
+        )[0]
+        scalar_ms = (time.perf_counter() - started) * 1e3
+        assert max(abs(a - b) for a, b in zip(scalar, result.unrealized_pnl)) < 0.02
+
+        swap = "skipped"
+        if count <= args.swap_limit:
+            started = time.perf_counter()
+            totals = swap_prices(pnl_manager, symbols, shocks)
+            swap = f"{(time.perf_counter() - started) * 1e3:.1f}"
+            assert max(abs(a - b) for a, b in zip(totals, result.unrealized_pnl)) < 0.05 * len(symbols)
+
+        body = json.dumps({"symbols": symbols, "shocks": shocks})
+        started = time.perf_counter()
+        response = client.post('/pnl/scenarios', data=body, content_type='application/json')
+        post_ms = (time.perf_counter() - started) * 1e3
+        assert response.status_code == 200, response.data
+
+        print(f"{count:>9,} {array_ms:>9.1f} {lists_ms:>9.1f} {scalar_ms:>10.1f} {swap:>10} {post_ms:>9.1f} "
+              f"{len(body) / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
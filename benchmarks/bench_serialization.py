@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, jsonify
+from generator import generate_trades
+from src.dtos.pnl_dto import CombinedPnLDto, PnLSummaryDto
+from src.controllers.serialization import FastJSONProvider, MSGPACK_MIMETYPE, msgpack, orjson
+
+
+def build_payloads(trade_count, symbol_count):
+    trades = list(generate_trades(trade_count, 50))
+    pnl = [
+        CombinedPnLDto(f"SYM{index}", 1.5, 100.0 + index, 110.0 + index, 15.0, 2.5, 17.5)
+        for index in range(symbol_count)
+    ]
+    summary = PnLSummaryDto(pnl, 15.0 * symbol_count, 2.5 * symbol_count, 17.5 * symbol_count, symbol_count)
+    return {
+        "/trades": lambda dicts: {"trades": [trade.to_dict() for trade in trades] if dicts else trades, "count": len(trades)},
+        "/pnl": lambda dicts: summary.to_dict() if dicts else summary,
+    }
+
+
+def measure(app, build_body, accept, repeat):
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        with app.test_request_context(headers={"Accept": accept}):
+            started = time.perf_counter()
+            size = len(jsonify(build_body()).get_data())
+            best = min(best, time.perf_counter() - started)
+    return size, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response encoding throughput for large payloads")
+    parser.add_argument("--trades", type=int, default=200_000)
+    parser.add_argument("--symbols", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.trades, args.symbols)
+    default_app = Flask("default")
+    fast_app = Flask("fast")
+    fast_app.json = FastJSONProvider(fast_app)
+
+    # The baseline builds a dict per row and encodes with Flask's default
+    # provider; the others hand DTOs and Trade objects to FastJSONProvider.
+    encoders = [("flask json + dicts", default_app, "application/json", True),
+                (f"{'orjson' if orjson else 'stdlib json'}", fast_app, "application/json", False)]
+    if msgpack is not None:
+        encoders.append(("msgpack", fast_app, MSGPACK_MIMETYPE, False))
+
+    print(f"trades={args.trades} pnl symbols={args.symbols}")
+    print(f"{'payload':<8} {'encoder':<20} {'MB':>7} {'seconds':>8} {'MB/s':>8}")
+    for path, build in payloads.items():
+        for name, app, accept, dicts in encoders:
+            size, seconds = measure(app, lambda: build(dicts), accept, args.repeat)
+            print(f"{path:<8} {name:<20} {size / 1e6:>7.1f} {seconds:>8.3f} {size / 1e6 / seconds:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
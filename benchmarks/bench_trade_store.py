@@ -0,0 +1,91 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generator import generate_trades
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService
+from src.services.pnl_kernel import replay_weighted_average_cost
+
+
+def measure_store(store_class, trades):
+    # Time and memory are measured in separate passes since tracemalloc
+    # slows every allocation down.
+    gc.collect()
+    tracemalloc.start()
+    store = store_class()
+    for trade in trades:
+        store.add_trade(trade)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+
+    gc.collect()
+    store = store_class()
+    started = time.perf_counter()
+    for trade in trades:
+        store.add_trade(trade)
+    ingest_seconds = time.perf_counter() - started
+    return store, memory, ingest_seconds
+
+
+def measure_list_rebuild(store):
+    started = time.perf_counter()
+    pnl_service = PnLService()
+    for symbol in store.get_symbols():
+        for trade in store.get_trades_by_symbol_and_side(symbol):
+            pnl_service.add_trade(trade)
+    return time.perf_counter() - started
+
+
+def measure_columnar_rebuild(store):
+    started = time.perf_counter()
+    for symbol in store.get_symbols():
+        replay_weighted_average_cost(*store.get_columns(symbol))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the list and columnar trade stores")
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--symbols", type=int, default=100)
+    args = parser.parse_args()
+
+    # Materialize the inputs first so the measured memory is the store's own.
+    trades = list(generate_trades(args.trades, args.symbols))
+
+    list_store, list_memory, list_ingest = measure_store(TradeService, trades)
+    list_rebuild = measure_list_rebuild(list_store)
+    del list_store
+
+    # The list store shares the generated Trade objects; count them for a fair comparison.
+    gc.collect()
+    tracemalloc.start()
+    copies = list(generate_trades(args.trades, args.symbols))
+    object_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del copies
+
+    columnar_store, columnar_memory, columnar_ingest = measure_store(ColumnarTradeService, trades)
+    columnar_rebuild = measure_columnar_rebuild(columnar_store)
+
+    print(f"trades={args.trades} symbols={args.symbols}")
+    print(f"{'store':<10} {'bytes/trade':>12} {'ingest trades/s':>16} {'pnl rebuild trades/s':>21}")
+    for name, memory, ingest, rebuild in (
+        ("list", list_memory + object_memory, list_ingest, list_rebuild),
+        ("columnar", columnar_memory, columnar_ingest, columnar_rebuild),
+    ):
+        print(
+            f"{name:<10} {memory / args.trades:>12.1f} "
+            f"{args.trades / ingest:>16,.0f} {args.trades / rebuild:>21,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from generator import generate_trades
+from src.services.portfolio_service import PortfolioService
+from src.services.trade_service import TradeService
+from src.services.pnl_service import PnLService
+from src.managers.trade_manager import TradeManager
+from src.controllers.trade_controller import TradeController
+from src.controllers.serialization import FastJSONProvider
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure peak memory of GET /trades per output format")
+    parser.add_argument("--trades", type=int, default=200_000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    trade_service = TradeService()
+    for trade in generate_trades(args.trades, 50):
+        trade_service.add_trade(trade)
+    TradeController(TradeManager(trade_service, PortfolioService(), PnLService())).register_routes(app)
+    client = app.test_client()
+
+    print(f"trades={args.trades}")
+    for query in ("format=json", "format=ndjson", "format=csv"):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.get(f"/trades?{query}", buffered=False)
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{query:<15} {size / 1e6:8.1f} MB body {peak / 1e6:8.1f} MB peak {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generator import generate_prices, generate_trades
+from container import Container
+from main import create_app
+from src.services.price_service import PriceService
+from src.services.price_sources import StaticPriceSource
+
+MODES = ("load per worker", "preload", "preload + gc.freeze")
+
+
+def settings(journal_path, store):
+    # Read-only, the one configuration gunicorn.conf.py runs with several
+    # workers. The journal is built through the trade manager, not the routes.
+    return {"TRADE_JOURNAL_PATH": journal_path, "TRADE_STORE": store, "PNL_WORKERS": "1", "READ_ONLY": "1"}
+
+
+def build_app(journal_path, store, symbols):
+    container = Container(settings(journal_path, store))
+    container.price_service = PriceService(StaticPriceSource(generate_prices(symbols)))
+    return create_app(container)
+
+
+def fork(function, *args) -> int:
+    # Runs function in a child and returns the child's pid. The child never
+    # returns, so a failure is printed here.
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            function(*args)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def smaps(pid):
+    # Rss, Pss and Private_Dirty in MB. Pss splits each shared page between
+    # the processes sharing it, so it is a worker's fair share.
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss", "Private_Dirty"):
+                values[name] = int(rest.split()[0]) / 1024
+    return values
+
+
+def build_journal(journal_path, trades, symbols):
+    container = Container(settings(journal_path, "columnar"))
+    batch = []
+    for trade in generate_trades(trades, symbols):
+        batch.append(trade)
+        if len(batch) == 100_000:
+            container.trade_manager.add_trades(batch)
+            batch = []
+    if batch:
+        container.trade_manager.add_trades(batch)
+    container.close()
+
+
+def serve(client, symbol):
+    # A worker's first requests. The full collection stands in for the ones
+    # a worker runs over its first minutes.
+    for path in ('/pnl', '/portfolio', f'/trades?symbol={symbol}&limit=100', '/pnl'):
+        assert client.get(path).status_code == 200
+    gc.collect()
+
+
+def worker(journal_path, store, symbols, app, forked_at, ready):
+    if app is None:
+        app = build_app(journal_path, store, symbols)
+    else:
+        app.extensions["container"].after_fork()
+    container = app.extensions["container"]
+    cold_start = time.perf_counter() - forked_at
+    serve(app.test_client(), next(iter(container.portfolio_service.get_holdings())))
+    os.write(ready, f"{cold_start}\n".encode())
+    # Stay alive until the master has measured every worker.
+    time.sleep(3600)
+
+
+def run_master(journal_path, store, symbols, mode, workers, report):
+    # One gunicorn-like master: loads the app or not, then forks workers.
+    app = None
+    load_seconds = 0.0
+    if mode != "load per worker":
+        started = time.perf_counter()
+        app = build_app(journal_path, store, symbols)
+        load_seconds = time.perf_counter() - started
+        if mode == "preload + gc.freeze":
+            gc.collect()
+            gc.freeze()
+
+    read, write = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pids.append(fork(worker, journal_path, store, symbols, app, time.perf_counter(), write))
+    os.close(write)
+
+    cold_starts = []
+    with os.fdopen(read) as pipe:
+        for _ in range(workers):
+            cold_starts.append(float(pipe.readline()))
+    memory = [smaps(pid) for pid in pids]
+    master = smaps(os.getpid())
+    for pid in pids:
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+
+    def mean(name):
+        return sum(values[name] for values in memory) / workers
+
+    os.write(report, (
+        f"{store:<9} {mode:<20} {load_seconds:>8.2f} {max(cold_starts):>11.3f} {master['Rss']:>10.0f} "
+        f"{mean('Rss'):>8.0f} {mean('Pss'):>8.0f} {mean('Private_Dirty'):>9.0f} "
+        f"{master['Pss'] + mean('Pss') * workers:>9.0f}\n"
+    ).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold start and per-worker memory, with and without preloading the book")
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    imports = subprocess.run(
+        [sys.executable, "-c", "import time; started = time.perf_counter(); import main; "
+                               "print(time.perf_counter() - started)"],
+        cwd=os.path.join(os.path.dirname(__file__), '..'), capture_output=True, text=True, check=True
+    )
+    print(f"trades={args.trades} symbols={args.symbols} workers={args.workers}; "
+          f"importing the app takes {float(imports.stdout):.2f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal_path = os.path.join(directory, "trades.journal")
+        # In a child, so the masters forked below start clean.
+        os.waitpid(fork(build_journal, journal_path, args.trades, args.symbols), 0)
+
+        print(f"{'store':<9} {'mode':<20} {'load (s)':>8} {'cold start':>11} {'master MB':>10} "
+              f"{'RSS':>8} {'PSS':>8} {'private':>9} {'total PSS':>9}")
+        for store in ("list", "columnar"):
+            for mode in MODES:
+                read, write = os.pipe()
+                pid = fork(run_master, journal_path, store, args.symbols, mode, args.workers, write)
+                os.close(write)
+                with os.fdopen(read) as pipe:
+                    print(pipe.read(), end="", flush=True)
+                os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    main()
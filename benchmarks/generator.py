@@ -0,0 +1,44 @@
+import random
+from typing import Dict, Iterator, List
+
+from src.models.trade import Trade, to_epoch_nanos
+
+
+START_NS = to_epoch_nanos("2024-01-01T00:00:00")
+
+
+def symbol_names(symbol_count: int) -> List[str]:
+    return [f"SYM{index}" for index in range(symbol_count)]
+
+
+def generate_trades(count: int, symbol_count: int, seed: int = 42, sell_ratio: float = 0.4) -> Iterator[Trade]:
+    # count trades spread uniformly over symbol_count symbols, one
+    # microsecond apart, so each symbol's history is about
+    # count / symbol_count long. About sell_ratio of them are sells, each
+    # of 5-50% of the holding, so no sell is ever rejected.
+    rng = random.Random(seed)
+    symbols = symbol_names(symbol_count)
+    holdings = dict.fromkeys(symbols, 0.0)
+    for index in range(count):
+        symbol = rng.choice(symbols)
+        if holdings[symbol] > 1 and rng.random() < sell_ratio:
+            side = "sell"
+            quantity = holdings[symbol] * rng.uniform(0.05, 0.5)
+            holdings[symbol] -= quantity
+        else:
+            side = "buy"
+            quantity = rng.uniform(0.1, 10.0)
+            holdings[symbol] += quantity
+        yield Trade(
+            trade_id=f"trade_{index}",
+            symbol=symbol,
+            side=side,
+            price=rng.uniform(1.0, 1000.0),
+            quantity=quantity,
+            timestamp=START_NS + index * 1000
+        )
+
+
+def generate_prices(symbol_count: int, seed: int = 42) -> Dict[str, float]:
+    rng = random.Random(seed)
+    return {symbol: rng.uniform(1.0, 1000.0) for symbol in symbol_names(symbol_count)}
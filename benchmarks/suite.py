@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from itertools import count
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from generator import generate_prices, generate_trades, symbol_names
+from src.models.trade import Trade
+from src.services.portfolio_service import PortfolioService
+from src.services.price_service import PriceService
+from src.services.price_sources import StaticPriceSource
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService
+from src.services.cost_basis_service import CostBasisService
+from src.managers.trade_manager import TradeManager
+from src.managers.pnl_manager import PnLManager
+from src.controllers.trade_controller import TradeController
+from src.controllers.serialization import FastJSONProvider
+
+
+STORES = {"list": TradeService, "columnar": ColumnarTradeService}
+CASES = {}
+
+
+def case(name):
+    def register(function):
+        CASES[name] = function
+        return function
+    return register
+
+
+class Book:
+    # One book wired like container.py, with a static price for every
+    # generated symbol and the trade routes on a test client.
+    def __init__(self, store: str, symbol_count: int):
+        self.price_source = StaticPriceSource(generate_prices(symbol_count))
+        self.price_service = PriceService(self.price_source, ttl=3600)
+        self.portfolio_service = PortfolioService()
+        self.trade_service = STORES[store]()
+        self.pnl_service = PnLService()
+        self.trade_manager = TradeManager(self.trade_service, self.portfolio_service, self.pnl_service)
+        self.pnl_manager = PnLManager(
+            self.portfolio_service, self.price_service, self.trade_service, self.pnl_service,
+            cost_basis_service=CostBasisService(self.trade_service)
+        )
+        app = Flask(__name__)
+        app.json = FastJSONProvider(app)
+        TradeController(self.trade_manager).register_routes(app)
+        self.client = app.test_client()
+        self.trade_ids = count()
+
+    def reprice(self, symbol=None):
+        # The price moves, so the next read revalues the holding; without a
+        # symbol every price moves.
+        for name in self.price_source.prices if symbol is None else [symbol]:
+            self.price_source.prices[name] *= 1.0001
+        self.price_service.invalidate(symbol)
+
+    def buy(self, symbol):
+        # A small buy after the symbol's latest trade.
+        self.trade_manager.add_trade(Trade(
+            f"bench_{next(self.trade_ids)}", symbol, "buy", 100.0, 0.01,
+            self.trade_service.get_last_trade_timestamp_ns(symbol) + 1000
+        ))
+
+
+def build_book(args, trade_count: int, symbol_count: int) -> Book:
+    book = Book(args.store, symbol_count)
+    trades = list(generate_trades(trade_count, symbol_count, args.seed, args.sell_ratio))
+    for offset in range(0, len(trades), 100_000):
+        book.trade_manager.add_trades(trades[offset:offset + 100_000])
+    return book
+
+
+def timed(function, repeat: int, setup=None):
+    # Per-call latencies in seconds; setup runs before each call, untimed.
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_metrics(prefix: str, samples, unit: str = "us") -> dict:
+    scale = 1e6 if unit == "us" else 1e3
+    return {
+        f"{prefix}p50_{unit}": round(statistics.median(samples) * scale, 3),
+        f"{prefix}p95_{unit}": round(percentile(samples, 0.95) * scale, 3),
+    }
+
+
+@case("add_trade")
+def bench_add_trade(args):
+    trades = list(generate_trades(args.trades, args.symbols, args.seed, args.sell_ratio))
+    book = Book(args.store, args.symbols)
+    samples = []
+    for trade in trades:
+        started = time.perf_counter()
+        book.trade_manager.add_trade(trade)
+        samples.append(time.perf_counter() - started)
+    yield "add_trade", {"trades": args.trades, "symbols": args.symbols}, {
+        "trades_per_s": round(len(trades) / sum(samples)),
+        **latency_metrics("", samples),
+        "p99_us": round(percentile(samples, 0.99) * 1e6, 3),
+    }
+
+
+@case("add_trades_batch")
+def bench_add_trades_batch(args):
+    trades = list(generate_trades(args.trades, args.symbols, args.seed, args.sell_ratio))
+    book = Book(args.store, args.symbols)
+    samples = []
+    for offset in range(0, len(trades), args.batch_size):
+        batch = trades[offset:offset + args.batch_size]
+        started = time.perf_counter()
+        book.trade_manager.add_trades(batch)
+        samples.append(time.perf_counter() - started)
+    yield "add_trades_batch", {"trades": args.trades, "symbols": args.symbols, "batch_size": args.batch_size}, {
+        "trades_per_s": round(len(trades) / sum(samples)),
+        **latency_metrics("batch_", samples, "ms"),
+    }
+
+
+@case("get_pnl")
+def bench_get_pnl(args):
+    # Latency against the number of held symbols. A warm read is served from
+    # the summary cache; a repriced one revalues every holding.
+    for symbol_count in args.book_symbols:
+        book = build_book(args, symbol_count * args.history, symbol_count)
+        pnl_manager = book.pnl_manager
+        pnl_manager.get_pnl()
+        warm = timed(pnl_manager.get_pnl, args.repeat)
+
+        cold = timed(pnl_manager.get_pnl, args.repeat, book.reprice)
+        yield f"get_pnl[symbols={symbol_count}]", {"symbols": symbol_count, "history": args.history}, {
+            **latency_metrics("warm_", warm),
+            **latency_metrics("repriced_", cold),
+        }
+
+
+@case("get_pnl_for_symbol")
+def bench_get_pnl_for_symbol(args):
+    # Latency against the length of the symbol's history, for weighted
+    # average cost (incremental state) and FIFO (lot engine): the first read
+    # of each symbol, a read after a price move and one after a new trade.
+    for history in args.histories:
+        book = build_book(args, args.symbols * history, args.symbols)
+        pnl_manager = book.pnl_manager
+        symbols = symbol_names(args.symbols)
+        metrics = {}
+        for cost_basis in ("wac", "fifo"):
+            started = time.perf_counter()
+            for symbol in symbols:
+                pnl_manager.get_pnl_for_symbol(symbol, cost_basis)
+            metrics[f"{cost_basis}_first_ms"] = round((time.perf_counter() - started) / len(symbols) * 1e3, 3)
+
+            def read():
+                pnl_manager.get_pnl_for_symbol(symbols[0], cost_basis)
+            metrics.update(latency_metrics(
+                f"{cost_basis}_repriced_", timed(read, args.repeat, lambda: book.reprice(symbols[0]))
+            ))
+            metrics.update(latency_metrics(
+                f"{cost_basis}_after_trade_", timed(read, args.repeat, lambda: book.buy(symbols[0]))
+            ))
+        yield f"get_pnl_for_symbol[history={history}]", {"symbols": args.symbols, "history": history}, metrics
+
+
+@case("list_trades")
+def bench_list_trades(args):
+    book = build_book(args, args.trades, args.symbols)
+    metrics = {}
+    for name, path in (("json", "/trades"), ("ndjson", "/trades?format=ndjson")):
+        started = time.perf_counter()
+        size = len(book.client.get(path).get_data())
+        seconds = time.perf_counter() - started
+        metrics[f"{name}_s"] = round(seconds, 4)
+        metrics[f"{name}_mb_per_s"] = round(size / 1e6 / seconds, 1)
+
+    symbol = symbol_names(args.symbols)[0]
+    page = timed(lambda: book.client.get(f"/trades?symbol={symbol}&limit=100").get_data(), args.repeat)
+    metrics.update(latency_metrics("page_", page, "ms"))
+    yield "list_trades", {"trades": args.trades, "symbols": args.symbols}, metrics
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    results = {}
+    for name in args.cases:
+        measured = list(CASES[name](args))
+        for result_name, params, metrics in measured:
+            results[result_name] = {"params": params, "metrics": metrics}
+            print(f"{result_name:<34} " + "  ".join(f"{key}={value}" for key, value in metrics.items()))
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {key: getattr(args, key) for key in (
+            "store", "trades", "symbols", "history", "histories", "book_symbols",
+            "sell_ratio", "batch_size", "repeat", "seed"
+        )},
+        "results": results,
+    }
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_s")
+
+
+def compare(base_path: str, head_path: str, threshold: float) -> int:
+    # Prints every metric both runs have; returns how many moved the wrong
+    # way by more than the threshold.
+    with open(base_path) as base_file, open(head_path) as head_file:
+        base, head = json.load(base_file), json.load(head_file)
+    print(f"base {base.get('commit')}  head {head.get('commit')}")
+    print(f"{'benchmark':<34} {'metric':<22} {'base':>12} {'head':>12} {'change':>8}")
+    regressions = 0
+    for name, result in head["results"].items():
+        base_result = base["results"].get(name)
+        if base_result is None:
+            continue
+        for metric, value in result["metrics"].items():
+            base_value = base_result["metrics"].get(metric)
+            if not base_value:
+                continue
+            change = value / base_value - 1
+            worse = -change if higher_is_better(metric) else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{name:<34} {metric:<22} {base_value:>12} {value:>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion and PnL hot paths; write JSON results")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--store", choices=sorted(STORES), default="list")
+    parser.add_argument("--trades", type=int, default=100_000, help="trades for the ingestion and listing cases")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--history", type=int, default=100, help="trades per symbol for get_pnl")
+    parser.add_argument("--book-symbols", type=int, nargs="+", default=[10, 100, 1_000, 10_000])
+    parser.add_argument("--histories", type=int, nargs="+", default=[100, 1_000, 10_000],
+                        help="trades per symbol for get_pnl_for_symbol")
+    parser.add_argument("--sell-ratio", type=float, default=0.4)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=200, help="samples per latency measurement")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quick", action="store_true", help="small sizes, for a smoke run")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change reported as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    if args.quick:
+        args.trades, args.symbols, args.history = 2_000, 10, 20
+        args.book_symbols, args.histories, args.repeat = [10, 100], [10, 100], 20
+
+    report = run(args)
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
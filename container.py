@@ -1,26 +1,282 @@
-from src.models.trade import Trade
+import atexit
+import os
+import threading
+from functools import cached_property
+from typing import List, Mapping, Optional
 
-from src.services.portfolio_service import PortfolioService
+from src.services.portfolio_service import PortfolioService, FixedPointPortfolioService
 from src.services.price_service import PriceService
 from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService, FixedPointPnLService
+from src.services.fixed_point import FixedPoint
+from src.services.journal_service import TradeJournalService
+from src.services.snapshot_service import SnapshotService
+from src.services.parallel_pnl_service import ParallelPnLService
+from src.services.checkpoint_service import PortfolioCheckpointService
+from src.services.cost_basis_service import CostBasisService, WAC
+from src.services.logging_service import configure_logging, restart_listener
+from src.services.metrics_service import MetricsService, price_cache_collector, trade_count_collector
+from src.services.profiler_service import SamplingProfiler
 
 from src.managers.trade_manager import TradeManager
 from src.managers.portfolio_manager import PortfolioManager
 from src.managers.pnl_manager import PnLManager
+from src.managers.account_manager import AccountManager
+from src.managers.pnl_stream_manager import PnLStreamManager
 
 from src.controllers.trade_controller import TradeController
 from src.controllers.portfolio_controller import PortfolioController
 from src.controllers.pnl_controller import PnLController
+from src.controllers.account_controller import AccountController
+from src.controllers.metrics_controller import MetricsController
+from src.controllers.pnl_stream_controller import PnLStreamController
 
 
-portfolio_service = PortfolioService()
-price_service = PriceService()
-trade_service = TradeService()
+class Container:
+    # The application's wiring. Every component is built on first use from
+    # the settings (the environment by default, under the names below), so a
+    # command that needs only the trade manager builds only that. A
+    # component can be replaced by assigning it before it is first used.
+    def __init__(self, settings: Optional[Mapping[str, str]] = None):
+        self.settings = os.environ if settings is None else settings
 
-trade_manager = TradeManager(trade_service, portfolio_service)
-portfolio_manager = PortfolioManager(portfolio_service)
-pnl_manager = PnLManager(portfolio_service, price_service, trade_service)
+    def setting(self, name: str, default: str) -> str:
+        return self.settings.get(name, default)
 
-trade_controller = TradeController(trade_manager)
-portfolio_controller = PortfolioController(portfolio_manager)
-pnl_controller = PnLController(pnl_manager)
+    @cached_property
+    def read_only(self) -> bool:
+        # READ_ONLY=1 serves the book without the routes that change it, so
+        # several workers can share one preloaded copy (see gunicorn.conf.py).
+        return self.setting("READ_ONLY", "0") == "1"
+
+    @cached_property
+    def log_listener(self):
+        # Log records are written by a listener thread; LOG_LEVEL=DEBUG also
+        # logs every trade.
+        return configure_logging(self.setting("LOG_LEVEL", "INFO"))
+
+    @cached_property
+    def fixed_point(self) -> Optional[FixedPoint]:
+        # ARITHMETIC=fixed keeps holdings and realized PnL as integers scaled
+        # by PRICE_DECIMALS and QUANTITY_DECIMALS; trades with more decimals
+        # are rejected.
+        if self.setting("ARITHMETIC", "float") != "fixed":
+            return None
+        return FixedPoint(
+            price_decimals=int(self.setting("PRICE_DECIMALS", "8")),
+            quantity_decimals=int(self.setting("QUANTITY_DECIMALS", "8"))
+        )
+
+    @cached_property
+    def portfolio_service(self) -> PortfolioService:
+        return PortfolioService() if self.fixed_point is None else FixedPointPortfolioService(self.fixed_point)
+
+    @cached_property
+    def pnl_service(self) -> PnLService:
+        return PnLService() if self.fixed_point is None else FixedPointPnLService(self.fixed_point)
+
+    @cached_property
+    def price_service(self) -> PriceService:
+        return PriceService(
+            ttl=float(self.setting("PRICE_CACHE_TTL", "5")),
+            unknown_ttl=float(self.setting("PRICE_UNKNOWN_TTL", "1"))
+        )
+
+    @cached_property
+    def trade_service_factory(self):
+        # TRADE_STORE=columnar keeps the trade log in typed arrays instead of
+        # Trade objects.
+        return ColumnarTradeService if self.setting("TRADE_STORE", "list") == "columnar" else TradeService
+
+    @cached_property
+    def trade_service(self):
+        return self.trade_service_factory()
+
+    @cached_property
+    def journal_path(self) -> Optional[str]:
+        # TRADE_JOURNAL_PATH makes the book durable: every trade is appended
+        # to a binary journal and holdings are snapshotted next to it.
+        return self.setting("TRADE_JOURNAL_PATH", "") or None
+
+    @cached_property
+    def journal_service(self) -> Optional[TradeJournalService]:
+        return TradeJournalService(self.journal_path) if self.journal_path else None
+
+    @cached_property
+    def snapshot_service(self) -> Optional[SnapshotService]:
+        return SnapshotService(f"{self.journal_path}.snapshot") if self.journal_path else None
+
+    @cached_property
+    def checkpoint_every(self) -> int:
+        # GET /portfolio?as_of=T replays at most PORTFOLIO_CHECKPOINT_EVERY
+        # trades per symbol; a smaller interval answers faster and keeps more
+        # checkpoints.
+        return int(self.setting("PORTFOLIO_CHECKPOINT_EVERY", "1000"))
+
+    @cached_property
+    def checkpoint_service(self) -> PortfolioCheckpointService:
+        return PortfolioCheckpointService(self.checkpoint_every)
+
+    @cached_property
+    def trade_manager(self) -> TradeManager:
+        trade_manager = TradeManager(
+            self.trade_service, self.portfolio_service, self.pnl_service,
+            journal_service=self.journal_service,
+            snapshot_service=self.snapshot_service,
+            snapshot_every=int(self.setting("SNAPSHOT_EVERY", "100000")),
+            checkpoint_service=self.checkpoint_service
+        )
+        # The book is never served before it is recovered.
+        trade_manager.recover()
+        return trade_manager
+
+    @cached_property
+    def cost_basis(self) -> str:
+        # COST_BASIS (wac, fifo, lifo or hifo) is the default method for PnL
+        # and average prices; requests override it with ?cost_basis=.
+        return self.setting("COST_BASIS", WAC)
+
+    @cached_property
+    def cost_basis_service(self) -> CostBasisService:
+        return CostBasisService(self.trade_service)
+
+    @cached_property
+    def portfolio_manager(self) -> PortfolioManager:
+        return PortfolioManager(
+            self.portfolio_service, self.trade_service, self.checkpoint_service, self.cost_basis_service, self.cost_basis
+        )
+
+    @cached_property
+    def parallel_pnl_service(self) -> Optional[ParallelPnLService]:
+        # Full revaluations (GET /pnl?revalue=true, GET /accounts/pnl?revalue=true)
+        # replay trade histories on PNL_WORKERS processes once they reach
+        # PARALLEL_MIN_ROWS trades; the pool starts on first use. With one
+        # worker, the default, they replay inline.
+        workers = int(self.setting("PNL_WORKERS", "1"))
+        return ParallelPnLService(workers=workers) if workers > 1 else None
+
+    @cached_property
+    def pnl_manager(self) -> PnLManager:
+        return PnLManager(
+            self.portfolio_service, self.price_service, self.trade_service, self.pnl_service, self.parallel_pnl_service,
+            cost_basis_service=self.cost_basis_service, cost_basis=self.cost_basis
+        )
+
+    @cached_property
+    def account_manager(self) -> AccountManager:
+        # Per-account books for /accounts/<id>/..., sharded by account id.
+        # The top-level routes keep serving the default book.
+        return AccountManager(
+            self.price_service,
+            shard_count=int(self.setting("ACCOUNT_SHARDS", "16")),
+            trade_service_factory=self.trade_service_factory,
+            parallel_pnl_service=self.parallel_pnl_service,
+            checkpoint_every=self.checkpoint_every,
+            cost_basis=self.cost_basis,
+            fixed_point=self.fixed_point
+        )
+
+    @cached_property
+    def pnl_stream_manager(self) -> PnLStreamManager:
+        # GET /pnl/stream revalues the symbols that traded or repriced at
+        # most once per PNL_STREAM_INTERVAL seconds and pushes the changes.
+        pnl_stream_manager = PnLStreamManager(self.pnl_manager, interval=float(self.setting("PNL_STREAM_INTERVAL", "0.5")))
+        self.trade_manager.add_change_listener(pnl_stream_manager.mark_changed)
+        self.price_service.add_change_listener(pnl_stream_manager.mark_changed)
+        return pnl_stream_manager
+
+    @cached_property
+    def metrics_service(self) -> MetricsService:
+        # GET /metrics: request and call latency histograms, trades per
+        # symbol and price cache statistics.
+        metrics_service = MetricsService()
+        metrics_service.instrument(self.trade_manager, "trade_manager", "add_trade", "add_trades")
+        metrics_service.instrument(self.portfolio_manager, "portfolio_manager", "get_portfolio")
+        metrics_service.instrument(
+            self.pnl_manager, "pnl_manager",
+            "get_pnl_with_version", "get_pnl_for_symbol_with_version", "get_pnl_history", "revalue_pnl",
+            "get_pnl_with_version_async", "get_pnl_for_symbol_with_version_async"
+        )
+        metrics_service.instrument(self.price_service.source, "price_source", "fetch_prices")
+        metrics_service.register_collector(trade_count_collector(self.trade_service))
+        metrics_service.register_collector(price_cache_collector(self.price_service))
+        return metrics_service
+
+    @cached_property
+    def profiler(self) -> Optional[SamplingProfiler]:
+        # PROFILE_REQUESTS=1 lets a request ask for a sampled profile with
+        # ?profile=1.
+        return SamplingProfiler() if self.setting("PROFILE_REQUESTS", "0") == "1" else None
+
+    @cached_property
+    def controllers(self) -> List:
+        # The managers are instrumented before the controllers take them.
+        metrics_service = self.metrics_service
+        return [
+            TradeController(self.trade_manager),
+            PortfolioController(self.portfolio_manager),
+            PnLController(self.pnl_manager),
+            AccountController(self.account_manager),
+            MetricsController(metrics_service, self.profiler),
+            PnLStreamController(self.pnl_stream_manager),
+        ]
+
+    def is_built(self, name: str) -> bool:
+        return name in self.__dict__
+
+    def load(self) -> int:
+        # Builds the state every worker would otherwise build for itself on
+        # its first requests: the book recovered from the journal, a cached
+        # price for each held symbol and, under a lot method, each held
+        # symbol's lot engine. Run before forking, it is loaded once and
+        # shared copy-on-write. Returns the number of trades in the book.
+        self.controllers
+        symbols = list(self.portfolio_service.get_holdings())
+        if symbols:
+            self.price_service.get_prices(symbols)
+        if self.cost_basis != WAC:
+            for symbol in symbols:
+                self.cost_basis_service.get_engine(symbol, self.cost_basis)
+        return sum(self.trade_service.get_trade_count(symbol) for symbol in self.trade_service.get_symbols())
+
+    def after_fork(self):
+        # Threads do not survive a fork: in a worker forked from a loaded
+        # container, the background threads start again when next needed.
+        if self.is_built("log_listener"):
+            self.log_listener = restart_listener(self.log_listener)
+        for name in ("price_service", "pnl_stream_manager", "parallel_pnl_service"):
+            if self.is_built(name) and getattr(self, name) is not None:
+                getattr(self, name).after_fork()
+
+    def close(self):
+        if self.is_built("parallel_pnl_service") and self.parallel_pnl_service is not None:
+            self.parallel_pnl_service.close()
+        if self.is_built("journal_service") and self.journal_service is not None:
+            self.journal_service.close()
+        if self.is_built("log_listener"):
+            self.log_listener.stop()
+
+
+_default_container = None
+_default_lock = threading.Lock()
+
+
+def get_container() -> Container:
+    # The container configured by the environment, with logging started;
+    # main.py, asgi.py and archive.py share it. It is closed at exit.
+    global _default_container
+    with _default_lock:
+        if _default_container is None:
+            _default_container = Container()
+            _default_container.log_listener
+            atexit.register(_default_container.close)
+        return _default_container
+
+
+def __getattr__(name: str):
+    # `from container import trade_manager` and the like build the default
+    # container on first use.
+    if name.startswith("__"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(get_container(), name)
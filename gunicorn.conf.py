@@ -0,0 +1,42 @@
+import gc
+import os
+
+# gunicorn -c gunicorn.conf.py
+#
+# With READ_ONLY=1, the master builds the app and loads the book (the
+# journal at TRADE_JOURNAL_PATH, cached prices, lot engines) once, before
+# forking, so workers start serving at once and share the loaded pages
+# copy-on-write. A book that takes trades is loaded by its one worker
+# instead: a worker gunicorn replaces would otherwise start from the
+# master's copy, without the trades posted since.
+wsgi_app = "main:create_app()"
+preload_app = os.environ.get("READ_ONLY", "0") == "1"
+bind = os.environ.get("BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+threads = int(os.environ.get("THREADS", "8"))
+worker_class = "gthread"
+
+
+def on_starting(server):
+    # Each worker holds its own copy of the book from the fork on: a trade
+    # posted to one is not seen by the others, and several workers appending
+    # to one journal would interleave their records. Only a read-only book,
+    # which refuses the routes that add trades, can run more than one.
+    if server.cfg.workers > 1 and os.environ.get("READ_ONLY", "0") != "1":
+        raise SystemExit(
+            f"{server.cfg.workers} workers would each accept trades into their own copy of the book; "
+            "run one worker (WEB_CONCURRENCY=1) and scale with THREADS, or serve the book with READ_ONLY=1"
+        )
+
+
+def when_ready(server):
+    # Objects the collector has never seen would have their headers written
+    # by each worker's first collection, copying their pages; frozen ones
+    # are left alone.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        server.app.wsgi().extensions["container"].after_fork()
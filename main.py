@@ -1,11 +1,46 @@
-from flask import Flask
-from container import trade_controller, portfolio_controller, pnl_controller
+from typing import Optional
 
-app = Flask(__name__)
+from flask import Flask, jsonify, request
+from src.controllers.serialization import FastJSONProvider
+from src.controllers.account_controller import CREATING_ENDPOINTS
+from container import Container, get_container
+
+
+# The routes that change a book, which a read-only container refuses.
+WRITE_ENDPOINTS = {
+    "add_trade_endpoint", "add_trades_batch_endpoint", "import_trades_endpoint", "create_account_endpoint"
+} | CREATING_ENDPOINTS
+
+
+def create_app(container: Optional[Container] = None) -> Flask:
+    # The app on the given container, or on the one the environment
+    # configures. The book is loaded before the app is returned, so a server
+    # that preloads the app (see gunicorn.conf.py) loads it once, before it
+    # forks its workers.
+    container = container if container is not None else get_container()
+    container.load()
+
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.extensions["container"] = container
+    for controller in container.controllers:
+        controller.register_routes(app)
+
+    if container.read_only:
+        @app.before_request
+        def refuse_writes():
+            if request.endpoint in WRITE_ENDPOINTS:
+                return jsonify({"error": "This server is read-only (READ_ONLY=1)"}), 403
+    return app
+
+
+def __getattr__(name: str):
+    # `from main import app` builds the default app on first use.
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-trade_controller.register_routes(app)
-portfolio_controller.register_routes(app)
-pnl_controller.register_routes(app)
 
 if __name__ == "__main__":
-    app.run(debug=True, port=8000)
\ No newline at end of file
+    create_app().run(debug=True, port=8000)
@@ -0,0 +1,121 @@
+from flask import Blueprint, g, jsonify, request
+from src.managers.account_manager import AccountManager
+from src.managers.trade_manager import TradeManager
+from src.managers.portfolio_manager import PortfolioManager
+from src.managers.pnl_manager import PnLManager
+from src.controllers.trade_controller import TradeController
+from src.controllers.portfolio_controller import PortfolioController
+from src.controllers.pnl_controller import PnLController, parse_flag
+from src.services.cost_basis_service import check_cost_basis
+
+
+class AccountTradeController(TradeController):
+    def __init__(self, account_manager: AccountManager):
+        super().__init__(None)
+        self.account_manager = account_manager
+
+    def get_trade_manager(self, create: bool = False) -> TradeManager:
+        if g.account is None and create:
+            g.account = self.account_manager.get_account(g.account_id, create=True)
+        return g.account.trade_manager
+
+
+class AccountPortfolioController(PortfolioController):
+    def __init__(self):
+        super().__init__(None)
+
+    def get_portfolio_manager(self) -> PortfolioManager:
+        return g.account.portfolio_manager
+
+
+class AccountPnLController(PnLController):
+    def __init__(self):
+        super().__init__(None)
+
+    def get_pnl_manager(self) -> PnLManager:
+        return g.account.pnl_manager
+
+    def _versioned_response(self, cache_key: str, version: str, body):
+        return super()._versioned_response(f"{g.account.account_id}:{cache_key}", version, body)
+
+
+# The routes that add trades; they create an unknown account.
+CREATING_ENDPOINTS = {
+    "accounts.add_trade_endpoint", "accounts.add_trades_batch_endpoint", "accounts.import_trades_endpoint"
+}
+
+
+class AccountController:
+    # Mounts the trade, portfolio and PnL routes under /accounts/<account_id>.
+    # Each request resolves its account once and only touches that account's
+    # book. Adding trades creates the account, once they are valid; every
+    # other route answers 404 for an unknown account.
+    def __init__(self, account_manager: AccountManager):
+        self.account_manager = account_manager
+        self.controllers = [
+            AccountTradeController(account_manager), AccountPortfolioController(), AccountPnLController()
+        ]
+
+    def register_routes(self, app):
+        @app.route('/accounts', methods=['GET'])
+        def get_accounts_endpoint():
+            account_ids = self.account_manager.get_account_ids()
+            return jsonify({"accounts": account_ids, "count": len(account_ids)}), 200
+
+        @app.route('/accounts', methods=['POST'])
+        def create_account_endpoint():
+            try:
+                data = request.get_json(force=True, silent=True)
+                if not isinstance(data, dict) or not isinstance(data.get('account_id'), str) or not data['account_id']:
+                    return jsonify({"error": "Expected a JSON object with an account_id"}), 400
+                cost_basis = data.get('cost_basis')
+                if cost_basis is not None:
+                    try:
+                        cost_basis = check_cost_basis(str(cost_basis))
+                    except ValueError as e:
+                        return jsonify({"error": str(e)}), 400
+
+                try:
+                    account = self.account_manager.create_account(data['account_id'], cost_basis)
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 409
+                return jsonify({"account_id": account.account_id, "cost_basis": account.cost_basis}), 201
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @app.route('/accounts/pnl', methods=['GET'])
+        def get_aggregate_pnl_endpoint():
+            try:
+                revalue = parse_flag('revalue')
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                accounts = request.args.get('accounts')
+                account_ids = [account_id for account_id in accounts.split(',') if account_id] if accounts else None
+                if revalue:
+                    return jsonify(self.account_manager.revalue_aggregate_pnl(account_ids)), 200
+                return jsonify(self.account_manager.get_aggregate_pnl(account_ids)), 200
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 404
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        blueprint = Blueprint('accounts', __name__, url_prefix='/accounts/<account_id>')
+
+        @blueprint.url_value_preprocessor
+        def pull_account_id(endpoint, values):
+            g.account_id = values.pop('account_id')
+
+        @blueprint.before_request
+        def load_account():
+            try:
+                g.account = self.account_manager.get_account(g.account_id)
+            except ValueError as e:
+                if request.endpoint not in CREATING_ENDPOINTS:
+                    return jsonify({"error": str(e)}), 404
+                g.account = None
+
+        for controller in self.controllers:
+            controller.register_routes(blueprint)
+        app.register_blueprint(blueprint)
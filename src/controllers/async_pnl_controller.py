@@ -0,0 +1,127 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from src.managers.pnl_manager import PnLManager
+from src.controllers.serialization import JSON_MIMETYPE, VersionedResponseCache, encode, negotiate_mimetype
+from src.services.cost_basis_service import check_cost_basis
+
+
+# Large bodies go out in chunks so one slow client cannot hold the event loop
+# for the whole write.
+CHUNK_SIZE = 64 * 1024
+
+
+class AsyncPnLController:
+    # Serves GET /pnl and GET /pnl/<symbol> natively over ASGI, mirroring
+    # PnLController (bodies, ETags, status codes). Everything else is passed
+    # to the fallback application, normally the Flask app behind WsgiToAsgi.
+    def __init__(self, pnl_manager: PnLManager):
+        self.pnl_manager = pnl_manager
+        self._response_cache = VersionedResponseCache()
+
+    def mount(self, fallback: Callable) -> Callable:
+        async def application(scope, receive, send):
+            if scope["type"] == "lifespan":
+                await self.__lifespan(receive, send)
+                return
+
+            symbol = self.__match(scope)
+            if symbol is None:
+                await fallback(scope, receive, send)
+            elif symbol == "":
+                await self.get_pnl(scope, send)
+            else:
+                await self.get_pnl_for_symbol(scope, send, symbol)
+
+        return application
+
+    def __match(self, scope) -> Optional[str]:
+        # "" for /pnl, the symbol for /pnl/<symbol>, None for anything else.
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return None
+        path = scope["path"].rstrip("/") if scope["path"] != "/" else "/"
+        if path == "/pnl":
+            # A full revaluation is CPU work for the process pool, not the
+            # event loop; the Flask route serves it.
+            return None if "revalue" in parse_qs(scope.get("query_string", b"").decode("latin-1")) else ""
+        parts = path.split("/")
+        # /pnl/history and /pnl/stream are served by the Flask routes.
+        if len(parts) == 3 and parts[1] == "pnl" and parts[2] and parts[2] not in ("history", "stream"):
+            return parts[2]
+        return None
+
+    async def __lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def get_pnl(self, scope, send):
+        try:
+            cost_basis = self.__cost_basis(scope)
+        except ValueError as e:
+            await self._json_response(scope, send, 400, {"error": str(e)})
+            return
+
+        try:
+            pnl_summary, version = await self.pnl_manager.get_pnl_with_version_async(cost_basis)
+            await self._versioned_response(scope, send, f"/pnl:{cost_basis or ''}", version, pnl_summary)
+        except Exception as e:
+            await self._json_response(scope, send, 500, {"error": str(e)})
+
+    async def get_pnl_for_symbol(self, scope, send, symbol: str):
+        symbol = symbol.upper()
+        try:
+            cost_basis = self.__cost_basis(scope)
+        except ValueError as e:
+            await self._json_response(scope, send, 400, {"error": str(e)})
+            return
+
+        try:
+            pnl_data, version = await self.pnl_manager.get_pnl_for_symbol_with_version_async(symbol, cost_basis)
+            await self._versioned_response(scope, send, f"{symbol}:{cost_basis or ''}", version, pnl_data)
+        except ValueError as e:
+            await self._json_response(scope, send, 404, {"error": str(e)})
+        except Exception as e:
+            await self._json_response(scope, send, 500, {"error": str(e)})
+
+    async def _versioned_response(self, scope, send, cache_key: str, version: str, body):
+        mimetype = negotiate_mimetype(self.__header(scope, b"accept") or "")
+        status, etag, data = self._response_cache.respond(
+            cache_key, version, body, mimetype, self.__header(scope, b"if-none-match")
+        )
+        headers = [(b"etag", f'"{etag}"'.encode()), (b"vary", b"Accept")]
+        if status == 200:
+            headers.insert(0, (b"content-type", mimetype.encode()))
+        await self.__send(scope, send, status, headers, data)
+
+    async def _json_response(self, scope, send, status: int, body: Dict):
+        # Same bytes as jsonify in the Flask routes.
+        await self.__send(scope, send, status, [(b"content-type", JSON_MIMETYPE.encode())], encode(body))
+
+    def __cost_basis(self, scope) -> Optional[str]:
+        values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("cost_basis")
+        return check_cost_basis(values[0]) if values else None
+
+    def __header(self, scope, name: bytes) -> Optional[str]:
+        for header, value in scope["headers"]:
+            if header == name:
+                return value.decode("latin-1")
+        return None
+
+    async def __send(self, scope, send, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        headers = headers + [(b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if scope["method"] == "HEAD" or not body:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        view = memoryview(body)
+        for offset in range(0, len(body), CHUNK_SIZE):
+            chunk = view[offset:offset + CHUNK_SIZE]
+            await send({
+                "type": "http.response.body",
+                "body": bytes(chunk),
+                "more_body": offset + CHUNK_SIZE < len(body),
+            })
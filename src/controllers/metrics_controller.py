@@ -0,0 +1,54 @@
+import time
+from flask import Response, g, jsonify, request
+from typing import Optional
+from src.services.metrics_service import MetricsService, PROMETHEUS_MIMETYPE
+from src.services.profiler_service import SamplingProfiler
+
+
+REQUEST_DURATION = "http_request_duration_seconds"
+
+
+class MetricsController:
+    # Times every request on the app and serves GET /metrics. With a
+    # profiler, a request carrying ?profile=1 is sampled while its handler
+    # runs; the response names the profile in X-Profile-Id and
+    # GET /profiles/<id> returns it.
+    def __init__(self, metrics_service: MetricsService, profiler: Optional[SamplingProfiler] = None):
+        self.metrics_service = metrics_service
+        self.profiler = profiler
+        self.metrics_service.describe(REQUEST_DURATION, "Latency of HTTP requests by route and status")
+
+    def register_routes(self, app):
+        @app.before_request
+        def start_request():
+            g.request_started = time.perf_counter()
+            if self.profiler is not None and request.args.get('profile') == '1':
+                g.profile_session = self.profiler.start()
+
+        @app.after_request
+        def finish_request(response):
+            # Streamed bodies (NDJSON, CSV) are produced after this point, so
+            # for them this is the time to the first byte.
+            session = g.pop('profile_session', None)
+            if session is not None:
+                response.headers['X-Profile-Id'] = self.profiler.stop(session)
+            started = g.pop('request_started', None)
+            if started is not None:
+                self.metrics_service.observe(
+                    REQUEST_DURATION, time.perf_counter() - started,
+                    method=request.method,
+                    route=request.url_rule.rule if request.url_rule is not None else "unmatched",
+                    status=str(response.status_code)
+                )
+            return response
+
+        @app.route('/metrics', methods=['GET'])
+        def get_metrics_endpoint():
+            return Response(self.metrics_service.render(), content_type=PROMETHEUS_MIMETYPE)
+
+        @app.route('/profiles/<profile_id>', methods=['GET'])
+        def get_profile_endpoint(profile_id):
+            profile = self.profiler.get_profile(profile_id) if self.profiler is not None else None
+            if profile is None:
+                return jsonify({"error": f"Profile {profile_id} not found"}), 404
+            return Response(profile, mimetype='text/plain')
@@ -1,25 +1,158 @@
-from flask import jsonify, request
-from src.managers.pnl_manager import PnLManager
+import re
+from datetime import timedelta
+from flask import Response, current_app, jsonify, request, stream_with_context
+from src.managers.pnl_manager import PnLManager, MAX_HISTORY_BUCKETS
+from src.controllers.trade_controller import normalize_timestamp
+from src.controllers.serialization import VersionedResponseCache, dumps_json, negotiate_mimetype
+from src.services.cost_basis_service import check_cost_basis
+
+
+INTERVAL_PATTERN = re.compile(r"^(\d+)([smhd]?)$")
+INTERVAL_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+HISTORY_FORMATS = ("json", "ndjson")
+# A JSON body is built in memory, so it gets a smaller bucket limit than the
+# streamed NDJSON one.
+MAX_JSON_HISTORY_BUCKETS = 10_000
+# Scenarios times symbols per POST /pnl/scenarios request.
+MAX_SCENARIO_CELLS = 10_000_000
+
+
+def parse_interval(value: str) -> timedelta:
+    match = INTERVAL_PATTERN.match(value.strip().lower())
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(f"Interval must be a positive number of seconds or like '15m', '1h', '1d', got '{value}'")
+    return timedelta(seconds=int(match.group(1)) * INTERVAL_UNITS[match.group(2)])
+
+
+def parse_flag(name: str) -> bool:
+    value = request.args.get(name, 'false').lower()
+    if value not in ('true', 'false'):
+        raise ValueError(f"{name} must be true or false, got '{value}'")
+    return value == 'true'
+
+
+def stream_history_ndjson(points):
+    for point in points:
+        yield dumps_json(point) + b"\n"
 
 
 class PnLController:
     def __init__(self, pnl_manager: PnLManager):
         self.pnl_manager = pnl_manager
+        self._response_cache = VersionedResponseCache()
+
+    def get_pnl_manager(self) -> PnLManager:
+        return self.pnl_manager
+
+    def _versioned_response(self, cache_key: str, version: str, body):
+        mimetype = negotiate_mimetype()
+        status, etag, data = self._response_cache.respond(
+            cache_key, version, body, mimetype, request.headers.get('If-None-Match')
+        )
+        response = current_app.response_class(data, status=status, mimetype=None if status == 304 else mimetype)
+        response.set_etag(etag)
+        response.vary.add('Accept')
+        return response
 
     def register_routes(self, app):
+        @app.route('/pnl/history', methods=['GET'])
+        def get_pnl_history_endpoint():
+            try:
+                symbol = request.args.get('symbol')
+                output_format = request.args.get('format', 'json').lower()
+                missing = [name for name in ('from', 'to', 'interval') if not request.args.get(name)]
+                if missing:
+                    return jsonify({"error": f"Missing query parameters: {', '.join(missing)}"}), 400
+                if output_format not in HISTORY_FORMATS:
+                    return jsonify({"error": f"Format must be one of {', '.join(HISTORY_FORMATS)}"}), 400
+
+                try:
+                    start = normalize_timestamp(request.args['from'])
+                    end = normalize_timestamp(request.args['to'])
+                    interval = parse_interval(request.args['interval'])
+                    points = self.get_pnl_manager().get_pnl_history(
+                        symbol.upper() if symbol else None, start, end, interval,
+                        MAX_JSON_HISTORY_BUCKETS if output_format == 'json' else MAX_HISTORY_BUCKETS
+                    )
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+
+                if output_format == 'ndjson':
+                    return Response(stream_with_context(stream_history_ndjson(points)), mimetype='application/x-ndjson')
+                history = list(points)
+                return jsonify({"history": history, "count": len(history)}), 200
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @app.route('/pnl/scenarios', methods=['POST'])
+        def get_scenario_pnl_endpoint():
+            cost_basis = request.args.get('cost_basis')
+            if cost_basis is not None:
+                try:
+                    cost_basis = check_cost_basis(cost_basis)
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+
+            try:
+                body = request.get_json(force=True, silent=True)
+                if not isinstance(body, dict):
+                    return jsonify({"error": "Expected a JSON object"}), 400
+                symbols = body.get('symbols')
+                if not isinstance(symbols, list) or not symbols or not all(isinstance(symbol, str) for symbol in symbols):
+                    return jsonify({"error": "symbols must be a non-empty list of symbols"}), 400
+                if ('prices' in body) == ('shocks' in body):
+                    return jsonify({"error": "Give either prices or shocks, one row per scenario"}), 400
+                relative = 'shocks' in body
+                values = body['shocks' if relative else 'prices']
+                if not isinstance(values, list) or not values:
+                    return jsonify({"error": "Scenarios must be a non-empty list of rows, one per scenario"}), 400
+                if len(values) * len(symbols) > MAX_SCENARIO_CELLS:
+                    return jsonify({"error": f"At most {MAX_SCENARIO_CELLS} scenario values per request"}), 400
+                detail = body.get('detail', False)
+                if not isinstance(detail, bool):
+                    return jsonify({"error": "detail must be true or false"}), 400
+
+                try:
+                    result = self.get_pnl_manager().get_scenario_pnl(
+                        [symbol.upper() for symbol in symbols], values, relative, cost_basis, detail
+                    )
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+                return jsonify(result), 200
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
         @app.route('/pnl', methods=['GET'])
         def get_pnl_endpoint():
+            cost_basis = request.args.get('cost_basis')
+            try:
+                if cost_basis is not None:
+                    cost_basis = check_cost_basis(cost_basis)
+                revalue = parse_flag('revalue')
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
             try:
-                pnl_summary = self.pnl_manager.get_pnl()
-                return jsonify(pnl_summary.to_dict()), 200
+                if revalue:
+                    # Replayed from the trade log every time, so never cached.
+                    return jsonify(self.get_pnl_manager().revalue_pnl(cost_basis)), 200
+                pnl_summary, version = self.get_pnl_manager().get_pnl_with_version(cost_basis)
+                return self._versioned_response(f"/pnl:{cost_basis or ''}", version, pnl_summary)
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
 
         @app.route('/pnl/<symbol>', methods=['GET'])
         def get_pnl_for_symbol_endpoint(symbol):
+            cost_basis = request.args.get('cost_basis')
+            if cost_basis is not None:
+                try:
+                    cost_basis = check_cost_basis(cost_basis)
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+
             try:
-                pnl_data = self.pnl_manager.get_pnl_for_symbol(symbol.upper())
-                return jsonify(pnl_data.to_dict()), 200
+                pnl_data, version = self.get_pnl_manager().get_pnl_for_symbol_with_version(symbol.upper(), cost_basis)
+                return self._versioned_response(f"{symbol.upper()}:{cost_basis or ''}", version, pnl_data)
             except ValueError as e:
                 return jsonify({"error": str(e)}), 404
             except Exception as e:
@@ -0,0 +1,51 @@
+from typing import Optional
+from flask import Response, jsonify, request
+from src.managers.pnl_stream_manager import PnLStreamManager
+from src.controllers.serialization import dumps_json
+
+
+# A comment line at least this often keeps proxies from closing an idle
+# stream.
+HEARTBEAT_SECONDS = 15.0
+
+
+def format_event(event: str, data: bytes, event_id: Optional[int] = None) -> bytes:
+    head = f"event: {event}\n" + (f"id: {event_id}\n" if event_id is not None else "")
+    return head.encode() + b"data: " + data + b"\n\n"
+
+
+class PnLStreamController:
+    def __init__(self, pnl_stream_manager: PnLStreamManager):
+        self.pnl_stream_manager = pnl_stream_manager
+
+    def register_routes(self, app):
+        @app.route('/pnl/stream', methods=['GET'])
+        def stream_pnl_endpoint():
+            symbols = request.args.get('symbols')
+            if symbols:
+                symbols = {symbol.strip().upper() for symbol in symbols.split(',') if symbol.strip()}
+            try:
+                subscription = self.pnl_stream_manager.subscribe(symbols or None)
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+            def events():
+                # The first event is the current state, later ones the
+                # symbols that changed since. The subscription ends when
+                # the client disconnects and the server closes this.
+                try:
+                    while True:
+                        update = subscription.next_update(HEARTBEAT_SECONDS)
+                        if update is None:
+                            yield b": keep-alive\n\n"
+                            continue
+                        event = "snapshot" if subscription.sequence == 1 else "pnl"
+                        yield format_event(event, dumps_json(update), subscription.sequence)
+                finally:
+                    self.pnl_stream_manager.unsubscribe(subscription)
+
+            response = Response(events(), mimetype='text/event-stream')
+            response.headers['Cache-Control'] = 'no-cache'
+            # Stops nginx from buffering the stream.
+            response.headers['X-Accel-Buffering'] = 'no'
+            return response
@@ -1,19 +1,40 @@
-from flask import jsonify
+from flask import jsonify, request
 from src.managers.portfolio_manager import PortfolioManager
+from src.controllers.trade_controller import normalize_timestamp
+from src.services.cost_basis_service import check_cost_basis
 
 
 class PortfolioController:
     def __init__(self, portfolio_manager: PortfolioManager):
         self.portfolio_manager = portfolio_manager
 
+    def get_portfolio_manager(self) -> PortfolioManager:
+        return self.portfolio_manager
+
     def register_routes(self, app):
         @app.route('/portfolio', methods=['GET'])
         def get_portfolio_endpoint():
+            as_of = request.args.get('as_of')
+            if as_of is not None:
+                try:
+                    as_of = normalize_timestamp(as_of)
+                except ValueError:
+                    return jsonify({"error": f"as_of must be an ISO timestamp, got '{as_of}'"}), 400
+            cost_basis = request.args.get('cost_basis')
+            if cost_basis is not None:
+                try:
+                    cost_basis = check_cost_basis(cost_basis)
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+
             try:
-                portfolio_list = self.portfolio_manager.get_portfolio()
-                return jsonify({
+                portfolio_list = self.get_portfolio_manager().get_portfolio(as_of, cost_basis)
+                body = {
                     "portfolio": portfolio_list,
                     "count": len(portfolio_list)
-                }), 200
+                }
+                if as_of is not None:
+                    body["as_of"] = as_of
+                return jsonify(body), 200
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
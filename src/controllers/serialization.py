@@ -0,0 +1,135 @@
+import dataclasses
+import json
+from itertools import islice
+from typing import Any, Dict, Iterator, Optional, Tuple
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/msgpack"
+# Offered in preference order; MessagePack only when msgpack is installed.
+RESPONSE_MIMETYPES = (JSON_MIMETYPE, MSGPACK_MIMETYPE, "application/x-msgpack") if msgpack is not None else (JSON_MIMETYPE,)
+
+if orjson is not None:
+    # Errors for a batch are keyed by row number.
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def to_primitive(value: Any) -> Any:
+    # Called only for what the encoder cannot write itself. orjson writes
+    # dataclass DTOs field by field without it; Trade is not a dataclass and
+    # its "id" key differs from the attribute name.
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps_json(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=to_primitive, option=ORJSON_OPTIONS)
+    return json.dumps(value, default=to_primitive, separators=(",", ":")).encode()
+
+
+def encode(value: Any, mimetype: str = JSON_MIMETYPE) -> bytes:
+    if mimetype == JSON_MIMETYPE:
+        return dumps_json(value)
+    return msgpack.packb(value, default=to_primitive)
+
+
+def stream_listing(name: str, items: Iterator, count: Optional[int], mimetype: str = JSON_MIMETYPE) -> Iterator[bytes]:
+    # {name: [...], "count": n}, written one item at a time so memory stays
+    # flat however long the listing. MessagePack writes the array's length
+    # first, so it needs count and stops after that many items; JSON counts
+    # as it goes.
+    if mimetype == JSON_MIMETYPE:
+        written = 0
+        yield b'{"' + name.encode() + b'":['
+        for item in items:
+            yield (b"," if written else b"") + dumps_json(item)
+            written += 1
+        yield b'],"count":' + str(written).encode() + b"}"
+        return
+
+    packer = msgpack.Packer(default=to_primitive)
+    yield packer.pack_map_header(2) + packer.pack(name) + packer.pack_array_header(count)
+    for item in islice(items, count):
+        yield packer.pack(item)
+    yield packer.pack("count") + packer.pack(count)
+
+
+def negotiate_mimetype(accept: Optional[str] = None) -> str:
+    # JSON unless the client prefers MessagePack. A client that only accepts
+    # MessagePack on a server without msgpack still gets JSON rather than a 406.
+    if accept is None:
+        if not has_request_context():
+            return JSON_MIMETYPE
+        accept_mimetypes = request.accept_mimetypes
+    else:
+        accept_mimetypes = parse_accept_header(accept, MIMEAccept)
+    best = accept_mimetypes.best_match(RESPONSE_MIMETYPES, default=JSON_MIMETYPE)
+    return JSON_MIMETYPE if best == JSON_MIMETYPE else MSGPACK_MIMETYPE
+
+
+class VersionedResponseCache:
+    # Encoded bodies of versioned responses, such as the PnL routes', kept
+    # per cache key and media type while the version holds. A strong ETag
+    # names exact bytes, so each media type gets its own: the version with
+    # the media subtype appended.
+    def __init__(self):
+        self._bodies: Dict[Tuple[str, str], Tuple[str, bytes]] = {}
+
+    def respond(
+        self, cache_key: str, version: str, body: Any, mimetype: str, if_none_match: Optional[str] = None
+    ) -> Tuple[int, str, bytes]:
+        # (status, ETag, body bytes); 304 with no body when if_none_match,
+        # the raw header, names the current tag.
+        etag = f"{version}-{mimetype.rsplit('/', 1)[-1]}"
+        if if_none_match and parse_etags(if_none_match).contains_weak(etag):
+            return 304, etag, b""
+
+        # The DTO is only encoded on a miss.
+        cached = self._bodies.get((cache_key, mimetype))
+        if cached is None or cached[0] != version:
+            cached = (version, encode(body, mimetype))
+            self._bodies[(cache_key, mimetype)] = cached
+        return 200, etag, cached[1]
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Flask JSON provider backed by orjson when it is installed. Responses
+    # from jsonify are negotiated: MessagePack when the Accept header asks
+    # for it, JSON otherwise. DTOs and Trade objects can be passed as is.
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or kwargs:
+            kwargs.setdefault("default", to_primitive)
+            return super().dumps(obj, **kwargs)
+        return dumps_json(obj).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        mimetype = negotiate_mimetype()
+        response = self._app.response_class(encode(obj, mimetype), mimetype=mimetype)
+        response.vary.add("Accept")
+        return response
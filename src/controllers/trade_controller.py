@@ -1,8 +1,16 @@
-from flask import request, jsonify
-from datetime import datetime
+import csv
+import io
+import json
+import time
+from itertools import count, islice
+from flask import Response, request, jsonify, stream_with_context
+from datetime import date, datetime, timedelta
 from marshmallow import Schema, fields, ValidationError
-from src.managers.trade_manager import TradeManager
+from src.managers.trade_manager import TradeManager, TradeBatchError
 from src.models.trade import Trade
+from src.services.journal_service import SYMBOL_BYTES
+from src.services.trade_archive import ARCHIVE_MIMETYPES, ArchiveUnavailableError, check_archive_format, read_trade_columns
+from src.controllers.serialization import JSON_MIMETYPE, dumps_json, negotiate_mimetype, stream_listing
 
 
 def validate_price(value):
@@ -13,24 +21,122 @@ def validate_quantity(value):
     if value <= 0:
         raise ValidationError(f"Quantity must be greater than 0, got {value}")
 
+def validate_symbol(value):
+    # Symbols are stored upper case, in journal records of fixed width.
+    if len(value.upper().encode()) > SYMBOL_BYTES:
+        raise ValidationError(f"Symbol must be at most {SYMBOL_BYTES} bytes, got '{value}'")
+
 def validate_side(value):
     if value.lower() not in ['buy', 'sell']:
         raise ValidationError(f"Side must be 'buy' or 'sell', got '{value}'")
 
 class TradeSchema(Schema):
-    symbol = fields.Str(required=True)
+    symbol = fields.Str(required=True, validate=validate_symbol)
     side = fields.Str(required=True, validate=validate_side)
     price = fields.Float(required=True, validate=validate_price)
     quantity = fields.Float(required=True, validate=validate_quantity)
 
 
+def validate_timestamp(value):
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        raise ValidationError(f"Timestamp must be in ISO format, got '{value}'")
+
+class BatchTradeSchema(TradeSchema):
+    timestamp = fields.Str(validate=validate_timestamp)
+
+
+def normalize_timestamp(value: str) -> str:
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        # Stored timestamps are naive local time, like datetime.now().
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp.isoformat()
+
+
+def normalize_end_timestamp(value: str) -> str:
+    # A date alone ends at the next midnight, exclusive, so it covers the
+    # whole day. Stored timestamps have microsecond resolution, so that is
+    # the inclusive bound one microsecond before it.
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return normalize_timestamp(value)
+    return (datetime.combine(day + timedelta(days=1), datetime.min.time()) - timedelta(microseconds=1)).isoformat()
+
+
+# Trade ids come from one counter for the whole process, so they stay unique
+# across request threads and accounts; next() on a count is atomic under the
+# GIL. Seeding it with the start time in microseconds keeps ids from a
+# restarted process clear of the previous run's.
+_trade_ids = count(time.time_ns() // 1000)
+
+
+def next_trade_id() -> str:
+    return f"trade_{next(_trade_ids)}"
+
+
+TRADE_FIELDS = ["id", "symbol", "side", "price", "quantity", "timestamp"]
+EXPORT_FORMATS = ("json", "ndjson", "csv")
+ARCHIVE_FORMATS_BY_MIMETYPE = {mimetype: archive_format for archive_format, mimetype in ARCHIVE_MIMETYPES.items()}
+
+
+def stream_ndjson(trades):
+    for trade in trades:
+        yield dumps_json(trade) + b"\n"
+
+
+def stream_csv(trades):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=TRADE_FIELDS)
+    writer.writeheader()
+    for trade in trades:
+        writer.writerow(trade.to_dict())
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
 class TradeController:
     def __init__(self, trade_manager: TradeManager):
         self.trade_manager = trade_manager
         self.trade_schema = TradeSchema()
+        self.batch_trade_schema = BatchTradeSchema(many=True)
+
+    def get_trade_manager(self, create: bool = False) -> TradeManager:
+        # Resolved per request so the routes can be mounted per account.
+        # create is set once a request's trades are valid and about to be
+        # added, so the per-account routes may create the account then.
+        return self.trade_manager
 
     def add_trade(self, trade: Trade):
-        self.trade_manager.add_trade(trade)
+        self.get_trade_manager(create=True).add_trade(trade, stamp=True)
+
+    def add_trades(self, trades):
+        self.get_trade_manager(create=True).add_trades(trades)
+
+    def _parse_batch(self):
+        if request.mimetype in ("application/x-ndjson", "application/ndjson"):
+            rows, errors = [], {}
+            for line in request.get_data(as_text=True).splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    errors[len(rows)] = ["Invalid JSON data"]
+                    rows.append({})
+            return rows, errors
+
+        try:
+            rows = request.get_json(force=True)
+        except Exception:
+            return None, {}
+        if not isinstance(rows, list):
+            return None, {}
+        return rows, {}
 
     def register_routes(self, app):
         @app.route('/trades', methods=['POST'])
@@ -45,11 +151,10 @@ class TradeController:
                     return jsonify({"error": "Invalid JSON data"}), 400
                     
                 data = self.trade_schema.load(json_data)
-                trade_id = f"trade_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
                 timestamp = datetime.now().isoformat()
 
                 trade = Trade(
-                    trade_id=trade_id,
+                    trade_id=next_trade_id(),
                     symbol=data['symbol'].upper(),
                     side=data['side'].lower(),
                     price=data['price'],
@@ -61,38 +166,170 @@ class TradeController:
                 
                 return jsonify({
                     "message": "Trade added successfully",
-                    "trade": {
-                        "id": trade.trade_id,
-                        "symbol": trade.symbol,
-                        "side": trade.side,
-                        "price": trade.price,
-                        "quantity": trade.quantity,
-                        "timestamp": trade.timestamp
-                    }
+                    "trade": trade
                 }), 201
                 
             except ValidationError as e:
                 return jsonify({"error": e.messages}), 400
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @app.route('/trades/batch', methods=['POST'])
+        def add_trades_batch_endpoint():
+            try:
+                rows, errors = self._parse_batch()
+                if rows is None:
+                    return jsonify({"error": "Expected a JSON array or NDJSON stream of trades"}), 400
+                if not rows:
+                    return jsonify({"error": "Batch contains no trades"}), 400
+
+                try:
+                    data = self.batch_trade_schema.load(rows)
+                except ValidationError as e:
+                    for index, messages in e.messages.items():
+                        errors.setdefault(index, messages)
+                if errors:
+                    return jsonify({"error": "Batch rejected", "errors": errors}), 400
+
+                now = datetime.now()
+                trades = [
+                    Trade(
+                        trade_id=next_trade_id(),
+                        symbol=row['symbol'].upper(),
+                        side=row['side'].lower(),
+                        price=row['price'],
+                        quantity=row['quantity'],
+                        timestamp=normalize_timestamp(row['timestamp']) if 'timestamp' in row else now.isoformat()
+                    )
+                    for row in data
+                ]
+
+                self.add_trades(trades)
+
+                return jsonify({
+                    "message": "Trades added successfully",
+                    "count": len(trades),
+                    "trade_ids": [trade.trade_id for trade in trades]
+                }), 201
+
+            except TradeBatchError as e:
+                return jsonify({"error": "Batch rejected", "errors": e.errors}), 400
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @app.route('/trades/import', methods=['POST'])
+        def import_trades_endpoint():
+            # The body is a whole Parquet or Arrow IPC file, named by ?format=
+            # or by its Content-Type.
+            try:
+                archive_format = request.args.get('format') or ARCHIVE_FORMATS_BY_MIMETYPE.get(request.mimetype)
+                if archive_format is None:
+                    return jsonify({"error": "Name the file format with ?format=parquet or ?format=arrow"}), 400
+                try:
+                    archive_format = check_archive_format(archive_format)
+                    columns = read_trade_columns(request.get_data(), archive_format)
+                    imported = self.get_trade_manager(create=True).import_columns(columns)
+                except TradeBatchError as e:
+                    return jsonify({"error": "Import rejected", "errors": e.errors}), 400
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+
+                return jsonify({"message": "Trades imported successfully", "count": imported}), 201
+            except ArchiveUnavailableError as e:
+                return jsonify({"error": str(e)}), 501
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @app.route('/trades/export', methods=['GET'])
+        def export_trades_endpoint():
+            try:
+                try:
+                    archive_format = check_archive_format(request.args.get('format', 'parquet'))
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+
+                body = self.get_trade_manager().export_archive(archive_format)
+                response = Response(body, mimetype=ARCHIVE_MIMETYPES[archive_format])
+                response.headers['Content-Disposition'] = f'attachment; filename="trades.{archive_format}"'
+                return response
+            except ArchiveUnavailableError as e:
+                return jsonify({"error": str(e)}), 501
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
 
         @app.route('/trades', methods=['GET'])
         def get_trades_endpoint():
             try:
-                trades = self.trade_manager.trade_service.get_trades()
-                return jsonify({
-                    "trades": [
-                        {
-                            "id": trade.trade_id,
-                            "symbol": trade.symbol,
-                            "side": trade.side,
-                            "price": trade.price,
-                            "quantity": trade.quantity,
-                            "timestamp": trade.timestamp
-                        }
-                        for trade in trades
-                    ],
-                    "count": len(trades)
-                }), 200
+                symbol = request.args.get('symbol')
+                side = request.args.get('side')
+                start = request.args.get('from')
+                end = request.args.get('to')
+                after = request.args.get('after')
+                output_format = request.args.get('format', 'json').lower()
+                limit = request.args.get('limit')
+
+                if output_format not in EXPORT_FORMATS:
+                    return jsonify({"error": f"Format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+                if side is not None and side.lower() not in ('buy', 'sell'):
+                    return jsonify({"error": f"Side must be 'buy' or 'sell', got '{side}'"}), 400
+                bounds = []
+                for value, normalize in ((start, normalize_timestamp), (end, normalize_end_timestamp)):
+                    try:
+                        bounds.append(normalize(value) if value is not None else None)
+                    except ValueError:
+                        return jsonify({"error": f"Timestamp must be in ISO format, got '{value}'"}), 400
+                start, end = bounds
+                if limit is not None:
+                    if not limit.isdigit() or int(limit) == 0:
+                        return jsonify({"error": f"Limit must be a positive integer, got '{limit}'"}), 400
+                    limit = int(limit)
+
+                def list_trades():
+                    return self.get_trade_manager().trade_service.iter_trades(
+                        symbol.upper() if symbol else None, side, start, end, after
+                    )
+
+                try:
+                    trades = list_trades()
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+
+                # A page is bounded by the limit, so it can be read ahead to
+                # find the cursor for the next one.
+                next_cursor = None
+                if limit is not None:
+                    trades = list(islice(trades, limit + 1))
+                    if len(trades) > limit:
+                        trades = trades[:limit]
+                        next_cursor = trades[-1].trade_id
+
+                if output_format == 'json' and limit is not None:
+                    # Trade objects go to the encoder as they are, without a
+                    # dict per trade built up front.
+                    return jsonify({"trades": trades, "count": len(trades), "next_cursor": next_cursor}), 200
+                if output_format == 'json':
+                    # Unpaged, the listing is streamed like NDJSON and CSV. A
+                    # MessagePack body starts with its length, so the trades
+                    # are counted in a first pass; trades are only ever added,
+                    # so the second pass has at least that many.
+                    mimetype = negotiate_mimetype()
+                    count = None if mimetype == JSON_MIMETYPE else sum(1 for _ in trades)
+                    if count is not None:
+                        trades = list_trades()
+                    response = Response(
+                        stream_with_context(stream_listing("trades", trades, count, mimetype)), mimetype=mimetype
+                    )
+                    response.vary.add("Accept")
+                    return response
+
+                if output_format == 'ndjson':
+                    response = Response(stream_with_context(stream_ndjson(trades)), mimetype='application/x-ndjson')
+                else:
+                    response = Response(stream_with_context(stream_csv(trades)), mimetype='text/csv')
+                if next_cursor is not None:
+                    response.headers['X-Next-Cursor'] = next_cursor
+                return response
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 
 @dataclass
@@ -65,3 +65,80 @@ class PnLSummaryDto:
             "total_pnl": self.total_pnl,
             "count": self.count
         }
+
+
+@dataclass
+class AccountPnLDto:
+    account_id: str
+    total_unrealized_pnl: float
+    total_realized_pnl: float
+    total_pnl: float
+    count: int
+
+    def to_dict(self) -> dict:
+        return {
+            "account_id": self.account_id,
+            "total_unrealized_pnl": self.total_unrealized_pnl,
+            "total_realized_pnl": self.total_realized_pnl,
+            "total_pnl": self.total_pnl,
+            "count": self.count
+        }
+
+
+@dataclass
+class AggregatePnLDto:
+    accounts: List[AccountPnLDto]
+    total_unrealized_pnl: float
+    total_realized_pnl: float
+    total_pnl: float
+    count: int
+
+    def to_dict(self) -> dict:
+        return {
+            "accounts": [item.to_dict() for item in self.accounts],
+            "total_unrealized_pnl": self.total_unrealized_pnl,
+            "total_realized_pnl": self.total_realized_pnl,
+            "total_pnl": self.total_pnl,
+            "count": self.count
+        }
+
+
+@dataclass
+class PnLHistoryPointDto:
+    timestamp: str
+    realized_pnl: float
+    unrealized_pnl: float
+    total_pnl: float
+
+    def to_dict(self) -> dict:
+        return {
+            "timestamp": self.timestamp,
+            "realized_pnl": self.realized_pnl,
+            "unrealized_pnl": self.unrealized_pnl,
+            "total_pnl": self.total_pnl
+        }
+
+
+@dataclass
+class ScenarioPnLDto:
+    # Per-scenario values are in request order. symbols are the requested
+    # symbols, the columns of symbol_unrealized_pnl, which is None unless
+    # asked for.
+    symbols: List[str]
+    scenario_count: int
+    current_unrealized_pnl: float
+    total_realized_pnl: float
+    unrealized_pnl: Sequence[float]
+    total_pnl: Sequence[float]
+    symbol_unrealized_pnl: Optional[Sequence[Sequence[float]]] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "symbols": self.symbols,
+            "scenario_count": self.scenario_count,
+            "current_unrealized_pnl": self.current_unrealized_pnl,
+            "total_realized_pnl": self.total_realized_pnl,
+            "unrealized_pnl": self.unrealized_pnl,
+            "total_pnl": self.total_pnl,
+            "symbol_unrealized_pnl": self.symbol_unrealized_pnl
+        }
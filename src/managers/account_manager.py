@@ -0,0 +1,201 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+from zlib import crc32
+from src.services.portfolio_service import PortfolioService, FixedPointPortfolioService
+from src.services.price_service import PriceService
+from src.services.trade_service import TradeService
+from src.services.pnl_service import PnLService, FixedPointPnLService
+from src.services.fixed_point import FixedPoint
+from src.services.lock_service import SymbolLockService
+from src.services.checkpoint_service import PortfolioCheckpointService
+from src.services.parallel_pnl_service import ParallelPnLService
+from src.services.cost_basis_service import CostBasisService, WAC, check_cost_basis
+from src.managers.trade_manager import TradeManager
+from src.managers.portfolio_manager import PortfolioManager
+from src.managers.pnl_manager import PnLManager
+from src.dtos.pnl_dto import AccountPnLDto, AggregatePnLDto
+
+
+class AccountBook:
+    # One account's trades, holdings and PnL, wired like the single-book
+    # container. The price service is shared by every account.
+    def __init__(
+        self, account_id: str, price_service: PriceService,
+        lock_service: SymbolLockService, trade_service_factory: Callable = TradeService,
+        checkpoint_every: int = 1000, cost_basis: str = WAC, fixed_point: Optional[FixedPoint] = None
+    ):
+        self.account_id = account_id
+        if fixed_point is None:
+            self.portfolio_service = PortfolioService()
+            self.pnl_service = PnLService()
+        else:
+            self.portfolio_service = FixedPointPortfolioService(fixed_point)
+            self.pnl_service = FixedPointPnLService(fixed_point)
+        self.trade_service = trade_service_factory()
+        self.checkpoint_service = PortfolioCheckpointService(checkpoint_every)
+        self.cost_basis_service = CostBasisService(self.trade_service)
+        self.cost_basis = check_cost_basis(cost_basis)
+
+        self.trade_manager = TradeManager(
+            self.trade_service, self.portfolio_service, self.pnl_service,
+            lock_service=lock_service, checkpoint_service=self.checkpoint_service
+        )
+        self.portfolio_manager = PortfolioManager(
+            self.portfolio_service, self.trade_service, self.checkpoint_service,
+            self.cost_basis_service, self.cost_basis
+        )
+        self.pnl_manager = PnLManager(
+            self.portfolio_service, price_service, self.trade_service, self.pnl_service,
+            cost_basis_service=self.cost_basis_service, cost_basis=self.cost_basis
+        )
+
+
+class AccountShard:
+    def __init__(self):
+        self.accounts: Dict[str, AccountBook] = {}
+        # Guards account creation; reads go straight to the dict.
+        self.lock = threading.Lock()
+        # Accounts in a shard share one set of stripes rather than each
+        # allocating its own, which adds up over thousands of accounts.
+        self.lock_service = SymbolLockService()
+
+
+class AccountManager:
+    def __init__(
+        self, price_service: PriceService, shard_count: int = 16,
+        trade_service_factory: Callable = TradeService,
+        parallel_pnl_service: Optional[ParallelPnLService] = None, checkpoint_every: int = 1000,
+        cost_basis: str = WAC, fixed_point: Optional[FixedPoint] = None
+    ):
+        self.price_service = price_service
+        self.checkpoint_every = checkpoint_every
+        self.fixed_point = fixed_point
+        # The method for accounts created without one of their own.
+        self.cost_basis = check_cost_basis(cost_basis)
+        self.parallel_pnl_service = parallel_pnl_service
+        self.trade_service_factory = trade_service_factory
+        self.shards: List[AccountShard] = [AccountShard() for _ in range(shard_count)]
+
+    def __shard_index(self, account_id: str) -> int:
+        # crc32 rather than hash() so an account lands on the same shard in
+        # every process.
+        return crc32(account_id.encode()) % len(self.shards)
+
+    def shard_for(self, account_id: str) -> AccountShard:
+        return self.shards[self.__shard_index(account_id)]
+
+    def get_account(self, account_id: str, create: bool = False) -> AccountBook:
+        shard = self.shard_for(account_id)
+        account = shard.accounts.get(account_id)
+        if account is not None:
+            return account
+        if not create:
+            raise ValueError(f"Account {account_id} not found")
+
+        with shard.lock:
+            if account_id not in shard.accounts:
+                shard.accounts[account_id] = self.__new_account(account_id, shard, self.cost_basis)
+            return shard.accounts[account_id]
+
+    def create_account(self, account_id: str, cost_basis: Optional[str] = None) -> AccountBook:
+        shard = self.shard_for(account_id)
+        with shard.lock:
+            if account_id in shard.accounts:
+                raise ValueError(f"Account {account_id} already exists")
+            account = self.__new_account(account_id, shard, self.cost_basis if cost_basis is None else cost_basis)
+            shard.accounts[account_id] = account
+            return account
+
+    def __new_account(self, account_id: str, shard: AccountShard, cost_basis: str) -> AccountBook:
+        return AccountBook(
+            account_id, self.price_service, shard.lock_service, self.trade_service_factory,
+            self.checkpoint_every, cost_basis, self.fixed_point
+        )
+
+    def has_account(self, account_id: str) -> bool:
+        return account_id in self.shard_for(account_id).accounts
+
+    def get_account_ids(self) -> List[str]:
+        return sorted(account_id for shard in self.shards for account_id in list(shard.accounts))
+
+    def __summarize(self, account: AccountBook) -> AccountPnLDto:
+        pnl_summary = account.pnl_manager.get_pnl()
+        return AccountPnLDto(
+            account_id=account.account_id,
+            total_unrealized_pnl=pnl_summary.total_unrealized_pnl,
+            total_realized_pnl=pnl_summary.total_realized_pnl,
+            total_pnl=pnl_summary.total_pnl,
+            count=pnl_summary.count
+        )
+
+    def __accounts(self, account_ids: Optional[Iterable[str]]) -> List[AccountBook]:
+        if account_ids is None:
+            return [account for shard in self.shards for account in list(shard.accounts.values())]
+        return [self.get_account(account_id) for account_id in dict.fromkeys(account_ids)]
+
+    def get_aggregate_pnl(self, account_ids: Optional[Iterable[str]] = None) -> AggregatePnLDto:
+        accounts = self.__accounts(account_ids)
+
+        # One price lookup for every held symbol; each account's PnL then
+        # reads the cache. The summaries come from the incremental state and
+        # are cheap, so they run in a plain loop; replays go through
+        # revalue_aggregate_pnl and the process pool.
+        symbols = {symbol for account in accounts for symbol in account.portfolio_service.get_holdings()}
+        self.price_service.get_prices(list(symbols))
+
+        return self.__aggregate([self.__summarize(account) for account in accounts])
+
+    def revalue_aggregate_pnl(self, account_ids: Optional[Iterable[str]] = None) -> AggregatePnLDto:
+        # End-of-day revaluation: every (account, symbol) history is replayed
+        # from the trade log, spread over the process pool when one is
+        # configured, and reduced per account.
+        accounts = self.__accounts(account_ids)
+        # Only float weighted average cost has a replay kernel; other
+        # accounts are summarized as get_aggregate_pnl does.
+        summaries = [
+            self.__summarize(account) for account in accounts
+            if account.pnl_manager.fixed_point is not None or account.cost_basis != WAC
+        ]
+        accounts = [account for account in accounts if account.pnl_manager.fixed_point is None and account.cost_basis == WAC]
+        groups = [
+            (account, symbol)
+            for account in accounts
+            for symbol in account.portfolio_service.get_holdings()
+        ]
+        prices = self.price_service.get_prices(list({symbol for _, symbol in groups}))
+        parallel_pnl_service = self.parallel_pnl_service or ParallelPnLService(workers=1)
+        results, _, _ = parallel_pnl_service.revalue(
+            [account.trade_service.get_columns(symbol) for account, symbol in groups],
+            [prices[symbol] for _, symbol in groups]
+        )
+
+        totals = {account.account_id: [0.0, 0.0, 0] for account in accounts}
+        for (account, _), (_, _, realized_pnl, unrealized_pnl) in zip(groups, results):
+            account_totals = totals[account.account_id]
+            account_totals[0] += unrealized_pnl
+            account_totals[1] += realized_pnl
+            account_totals[2] += 1
+
+        return self.__aggregate(summaries + [
+            AccountPnLDto(
+                account_id=account_id,
+                total_unrealized_pnl=round(unrealized_pnl, 2),
+                total_realized_pnl=round(realized_pnl, 2),
+                total_pnl=round(unrealized_pnl + realized_pnl, 2),
+                count=count
+            )
+            for account_id, (unrealized_pnl, realized_pnl, count) in totals.items()
+        ])
+
+    def __aggregate(self, summaries: List[AccountPnLDto]) -> AggregatePnLDto:
+        summaries = sorted(summaries, key=lambda item: item.account_id)
+        total_unrealized_pnl = sum(summary.total_unrealized_pnl for summary in summaries)
+        total_realized_pnl = sum(summary.total_realized_pnl for summary in summaries)
+
+        return AggregatePnLDto(
+            accounts=summaries,
+            total_unrealized_pnl=round(total_unrealized_pnl, 2),
+            total_realized_pnl=round(total_realized_pnl, 2),
+            total_pnl=round(total_unrealized_pnl + total_realized_pnl, 2),
+            count=len(summaries)
+        )
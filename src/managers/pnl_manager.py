@@ -1,19 +1,58 @@
+import asyncio
+import heapq
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
 from src.services.portfolio_service import PortfolioService
 from src.services.price_service import PriceService
 from src.services.trade_service import TradeService
+from src.services.pnl_service import PnLService
+from src.services.pnl_kernel import revalue_scenarios
+from src.services.parallel_pnl_service import ParallelPnLService
+from src.services.cost_basis_service import CostBasisService, WAC, check_cost_basis
+from src.models.portfolio import Portfolio, FixedPointHolding
+from src.models.trade import to_epoch_nanos
 from src.dtos.pnl_dto import (
     UnrealizedPnLDto, 
     RealizedPnLDto, 
     CombinedPnLDto, 
-    PnLSummaryDto
+    PnLSummaryDto,
+    PnLHistoryPointDto,
+    ScenarioPnLDto
 )
 
 
+# Upper bound on points per history request; the sweep itself keeps only one
+# state per symbol whatever the bucket count.
+MAX_HISTORY_BUCKETS = 100_000
+
+
 class PnLManager:
-    def __init__(self, portfolio_service: PortfolioService, price_service: PriceService, trade_service: TradeService):
+    def __init__(
+        self, portfolio_service: PortfolioService, price_service: PriceService, trade_service: TradeService,
+        pnl_service: PnLService, parallel_pnl_service: Optional[ParallelPnLService] = None,
+        cost_basis_service: Optional[CostBasisService] = None, cost_basis: str = WAC
+    ):
         self.portfolio_service = portfolio_service
         self.price_service = price_service
         self.trade_service = trade_service
+        self.pnl_service = pnl_service
+        self.parallel_pnl_service = parallel_pnl_service
+        # Weighted average cost comes from the incremental PnL state; the lot
+        # methods from engines built when first asked for.
+        self.cost_basis_service = cost_basis_service if cost_basis_service is not None else CostBasisService(trade_service)
+        self.cost_basis = check_cost_basis(cost_basis)
+        # Set when the holdings and the PnL state are both kept in
+        # fixed-point units; weighted average cost PnL is then computed from
+        # the units and rounded once.
+        self.fixed_point = pnl_service.fixed_point if portfolio_service.fixed_point is not None else None
+        # Versions restart with the process, so cached ETags carry an id
+        # unique to this manager instance.
+        self._instance_id = uuid.uuid4().hex[:8]
+        self._symbol_cache: Dict[Tuple[str, str], tuple] = {}
+        self._summary_cache: Dict[str, tuple] = {}
+        # symbol -> in-flight price fetch task, shared by async callers.
+        self._pending_fetches: Dict[str, asyncio.Future] = {}
 
     def _calculate_unrealized_pnl_for_holding(self, symbol: str, quantity: float, average_price: float, current_price: float) -> UnrealizedPnLDto:
         unrealized_pnl = (current_price - average_price) * quantity
@@ -27,74 +66,46 @@ class PnLManager:
         )
 
     def _calculate_realized_pnl_for_symbol(self, symbol: str) -> RealizedPnLDto:
-        all_trades = self.trade_service.get_trades_by_symbol_and_side(symbol)
-        
-        if not all_trades:
+        if not self.pnl_service.has_symbol(symbol):
             return RealizedPnLDto(
                 symbol=symbol,
                 total_realized_pnl=0.0,
                 note="No trades found for this symbol"
             )
-        
-        sorted_trades = sorted(all_trades, key=lambda t: t.timestamp)
-        
-        total_realized_pnl = 0
-        running_quantity = 0
-        running_total_cost = 0
-        
-        for trade in sorted_trades:
-            if trade.side.lower() == "buy":
-                running_total_cost += trade.price * trade.quantity
-                running_quantity += trade.quantity
-                
-            elif trade.side.lower() == "sell":
-                if running_quantity > 0:
-                    current_avg_price = running_total_cost / running_quantity
-                    trade_pnl = (trade.price - current_avg_price) * trade.quantity
-                    total_realized_pnl += trade_pnl
-                    
-                    running_quantity -= trade.quantity
-                    if running_quantity > 0:
-                        running_total_cost = current_avg_price * running_quantity
-                    else:
-                        running_total_cost = 0
-        
+
         return RealizedPnLDto(
             symbol=symbol,
-            total_realized_pnl=round(total_realized_pnl, 2)
+            total_realized_pnl=round(self.pnl_service.get_realized_pnl(symbol), 2)
         )
 
-    def get_pnl(self) -> PnLSummaryDto:
+    def revalue_pnl(self, cost_basis: Optional[str] = None) -> PnLSummaryDto:
+        # Full revaluation: realized PnL is replayed from the trade log, on
+        # the process pool when one is configured, instead of read from the
+        # incremental state. The replay kernel is float weighted average
+        # cost; the lot methods already replay the log, and fixed-point
+        # state is exact, so those read as get_pnl does.
+        if self.fixed_point is not None or (cost_basis or self.cost_basis) != WAC:
+            return self.get_pnl(cost_basis)
         holdings = self.portfolio_service.get_holdings()
-        pnl_data = []
-        total_unrealized_pnl = 0
-        total_realized_pnl = 0
+        symbols = list(holdings)
+        prices = self.price_service.get_prices(symbols)
+        parallel_pnl_service = self.parallel_pnl_service or ParallelPnLService(workers=1)
+        results, total_unrealized_pnl, total_realized_pnl = parallel_pnl_service.revalue(
+            [self.trade_service.get_columns(symbol) for symbol in symbols],
+            [prices[symbol] for symbol in symbols]
+        )
 
-        for symbol, data in holdings.items():
-            current_price = self.price_service.get_price(symbol)
-            
-            unrealized_result = self._calculate_unrealized_pnl_for_holding(
+        pnl_data = []
+        for symbol, (_, _, realized_pnl, unrealized_pnl) in zip(symbols, results):
+            pnl_data.append(CombinedPnLDto(
                 symbol=symbol,
-                quantity=data["quantity"],
-                average_price=data["average_price"],
-                current_price=current_price
-            )
-            
-            realized_result = self._calculate_realized_pnl_for_symbol(symbol)
-            
-            combined_pnl = CombinedPnLDto(
-                symbol=unrealized_result.symbol,
-                quantity=unrealized_result.quantity,
-                average_price=unrealized_result.average_price,
-                current_price=unrealized_result.current_price,
-                unrealized_pnl=unrealized_result.unrealized_pnl,
-                realized_pnl=realized_result.total_realized_pnl,
-                total_pnl=round(unrealized_result.unrealized_pnl + realized_result.total_realized_pnl, 2)
-            )
-            
-            total_unrealized_pnl += unrealized_result.unrealized_pnl
-            total_realized_pnl += realized_result.total_realized_pnl
-            pnl_data.append(combined_pnl)
+                quantity=holdings[symbol].quantity,
+                average_price=holdings[symbol].average_price,
+                current_price=prices[symbol],
+                unrealized_pnl=unrealized_pnl,
+                realized_pnl=realized_pnl,
+                total_pnl=round(unrealized_pnl + realized_pnl, 2)
+            ))
 
         return PnLSummaryDto(
             pnl=pnl_data,
@@ -104,28 +115,328 @@ class PnLManager:
             count=len(pnl_data)
         )
 
-    def get_pnl_for_symbol(self, symbol: str) -> CombinedPnLDto:
-        try:
-            coin_data = self.portfolio_service.get_coin_data(symbol)
-            current_price = self.price_service.get_price(symbol)
-            
-            unrealized_result = self._calculate_unrealized_pnl_for_holding(
-                symbol=symbol,
-                quantity=coin_data["quantity"],
-                average_price=coin_data["average_price"],
-                current_price=current_price
+    def get_pnl_history(
+        self, symbol: Optional[str], start: str, end: str, interval: timedelta,
+        max_buckets: int = MAX_HISTORY_BUCKETS
+    ) -> Iterator[PnLHistoryPointDto]:
+        # PnL at start, start + interval, ... up to end, from a single sweep
+        # over the timestamp-ordered trades merged with the price history.
+        # Arguments are checked here; the points are produced lazily.
+        start_time = datetime.fromisoformat(start)
+        end_time = datetime.fromisoformat(end)
+        if interval <= timedelta(0):
+            raise ValueError("Interval must be positive")
+        if end_time < start_time:
+            raise ValueError(f"End {end} is before start {start}")
+        bucket_count = (end_time - start_time) // interval + 1
+        if bucket_count > max_buckets:
+            raise ValueError(f"{bucket_count} buckets requested; the limit is {max_buckets}, use a longer interval")
+
+        symbols = [symbol] if symbol is not None else self.trade_service.get_symbols()
+        # The last bucket ends at start + k * interval, which may be before end.
+        last_bucket = (start_time + (bucket_count - 1) * interval).isoformat()
+        trades = heapq.merge(
+            *(self.trade_service.iter_trades(symbol, end=last_bucket) for symbol in symbols),
+            key=lambda trade: trade.timestamp_ns
+        )
+        prices = heapq.merge(*(self.__iter_price_points(symbol, start, last_bucket) for symbol in symbols))
+        return self.__sweep_history(trades, prices, start_time, interval, bucket_count)
+
+    def __iter_price_points(self, symbol: str, start: str, end: str) -> Iterator[Tuple[int, str, float]]:
+        for timestamp_ns, price in self.price_service.iter_price_history(symbol, start, end):
+            yield timestamp_ns, symbol, price
+
+    def __sweep_history(self, trades, prices, start_time: datetime, interval: timedelta, bucket_count: int):
+        # A scratch PnLService applies the trades, so the history follows
+        # exactly the same weighted-average-cost rules as the live state.
+        pnl_service = PnLService()
+        state = pnl_service.get_state()
+        marks: Dict[str, float] = {}
+        last_trade_prices: Dict[str, float] = {}
+        realized_by_symbol: Dict[str, float] = {}
+        unrealized_by_symbol: Dict[str, float] = {}
+        total_realized_pnl = 0.0
+        total_unrealized_pnl = 0.0
+        changed = set()
+
+        trade = next(trades, None)
+        price_point = next(prices, None)
+        for bucket in range(bucket_count):
+            bucket_end = (start_time + bucket * interval).isoformat()
+            bucket_end_ns = to_epoch_nanos(bucket_end)
+            while trade is not None and trade.timestamp_ns <= bucket_end_ns:
+                pnl_service.add_trade(trade)
+                last_trade_prices[trade.symbol] = trade.price
+                changed.add(trade.symbol)
+                trade = next(trades, None)
+            while price_point is not None and price_point[0] <= bucket_end_ns:
+                marks[price_point[1]] = price_point[2]
+                changed.add(price_point[1])
+                price_point = next(prices, None)
+
+            # Only symbols that traded or repriced since the last bucket are
+            # revalued; the rest keep their contribution.
+            for symbol in changed:
+                symbol_state = state.get(symbol)
+                realized_pnl = symbol_state["realized_pnl"] if symbol_state is not None else 0.0
+                total_realized_pnl += realized_pnl - realized_by_symbol.get(symbol, 0.0)
+                realized_by_symbol[symbol] = realized_pnl
+
+                unrealized_pnl = 0.0
+                if symbol_state is not None and symbol_state["quantity"] > 0:
+                    # Before the first price point, the last trade marks the position.
+                    mark = marks.get(symbol, last_trade_prices.get(symbol))
+                    average_price = symbol_state["total_cost"] / symbol_state["quantity"]
+                    unrealized_pnl = (mark - average_price) * symbol_state["quantity"]
+                total_unrealized_pnl += unrealized_pnl - unrealized_by_symbol.get(symbol, 0.0)
+                unrealized_by_symbol[symbol] = unrealized_pnl
+            changed.clear()
+
+            yield PnLHistoryPointDto(
+                timestamp=bucket_end,
+                realized_pnl=round(total_realized_pnl, 2),
+                unrealized_pnl=round(total_unrealized_pnl, 2),
+                total_pnl=round(total_realized_pnl + total_unrealized_pnl, 2)
             )
+
+    def _combine_pnl(self, unrealized_result: UnrealizedPnLDto, realized_result: RealizedPnLDto) -> CombinedPnLDto:
+        return CombinedPnLDto(
+            symbol=unrealized_result.symbol,
+            quantity=unrealized_result.quantity,
+            average_price=unrealized_result.average_price,
+            current_price=unrealized_result.current_price,
+            unrealized_pnl=unrealized_result.unrealized_pnl,
+            realized_pnl=realized_result.total_realized_pnl,
+            total_pnl=round(unrealized_result.unrealized_pnl + realized_result.total_realized_pnl, 2)
+        )
+
+    def _calculate_cost_basis(self, symbol: str, holding: Portfolio, cost_basis: str) -> Tuple[RealizedPnLDto, float]:
+        # Realized PnL and the average price of what is still held.
+        if cost_basis == WAC:
+            return self._calculate_realized_pnl_for_symbol(symbol), holding.average_price
+        engine = self.cost_basis_service.get_engine(symbol, cost_basis)
+        return RealizedPnLDto(symbol=symbol, total_realized_pnl=round(engine.realized_pnl, 2)), engine.average_price
+
+    def __unrealized_pnl_units(self, holding: FixedPointHolding, current_price: float) -> int:
+        price_units = self.fixed_point.price_units(current_price, strict=False)
+        return price_units * holding.quantity_units - holding.cost_units
+
+    def __get_fixed_point_pnl(self, symbol: str, holding: FixedPointHolding, current_price: float) -> CombinedPnLDto:
+        # Each figure is rounded to cents from its exact value, the total
+        # included, rather than summed from rounded parts.
+        fixed_point = self.fixed_point
+        unrealized_pnl = self.__unrealized_pnl_units(holding, current_price)
+        realized_pnl = self.pnl_service.get_realized_pnl_units(symbol)
+        return CombinedPnLDto(
+            symbol=symbol,
+            quantity=holding.quantity,
+            average_price=holding.average_price,
+            current_price=current_price,
+            unrealized_pnl=fixed_point.round_cost(unrealized_pnl),
+            realized_pnl=fixed_point.round_cost(realized_pnl),
+            total_pnl=fixed_point.round_cost(unrealized_pnl + realized_pnl)
+        )
+
+    def _get_combined_pnl(
+        self, symbol: str, holding: Portfolio, current_price: float, cost_basis: str = WAC
+    ) -> Tuple[CombinedPnLDto, str]:
+        # Entries are keyed by the symbol's trade and price versions. A new
+        # trade recomputes everything for the symbol; a price change reuses
+        # the cached cost basis and only redoes the unrealized part.
+        trade_version = self.pnl_service.get_symbol_version(symbol)
+        price_version = self.price_service.get_symbol_version(symbol)
+        cached = self._symbol_cache.get((symbol, cost_basis))
+        version = self.__symbol_version(symbol, cost_basis, trade_version, price_version)
+
+        if cached is not None and cached[0] == trade_version and cached[1] == price_version:
+            return cached[4], version
+
+        if self.fixed_point is not None and cost_basis == WAC:
+            combined_pnl = self.__get_fixed_point_pnl(symbol, holding, current_price)
+            self._symbol_cache[(symbol, cost_basis)] = (trade_version, price_version, None, holding.average_price, combined_pnl)
+            return combined_pnl, version
+
+        if cached is not None and cached[0] == trade_version:
+            realized_result, average_price = cached[2], cached[3]
+        else:
+            realized_result, average_price = self._calculate_cost_basis(symbol, holding, cost_basis)
+
+        unrealized_result = self._calculate_unrealized_pnl_for_holding(
+            symbol=symbol,
+            quantity=holding.quantity,
+            average_price=average_price,
+            current_price=current_price
+        )
+        combined_pnl = self._combine_pnl(unrealized_result, realized_result)
+        self._symbol_cache[(symbol, cost_basis)] = (trade_version, price_version, realized_result, average_price, combined_pnl)
+        return combined_pnl, version
+
+    def __symbol_version(self, symbol: str, cost_basis: str, trade_version: int, price_version: int) -> str:
+        return f"{self._instance_id}-{symbol}-{cost_basis}-{trade_version}-{price_version}"
+
+    def get_pnl(self, cost_basis: Optional[str] = None) -> PnLSummaryDto:
+        return self.get_pnl_with_version(cost_basis)[0]
+
+    def get_pnl_with_version(self, cost_basis: Optional[str] = None) -> Tuple[PnLSummaryDto, str]:
+        cost_basis = self.cost_basis if cost_basis is None else check_cost_basis(cost_basis)
+        holdings = self.portfolio_service.get_holdings()
+        prices = self.price_service.get_prices(list(holdings))
+        return self.__summarize_pnl(holdings, prices, cost_basis)
+
+    async def get_pnl_async(self, cost_basis: Optional[str] = None) -> PnLSummaryDto:
+        return (await self.get_pnl_with_version_async(cost_basis))[0]
+
+    async def get_pnl_with_version_async(self, cost_basis: Optional[str] = None) -> Tuple[PnLSummaryDto, str]:
+        cost_basis = self.cost_basis if cost_basis is None else check_cost_basis(cost_basis)
+        holdings = self.portfolio_service.get_holdings()
+        prices = await self.__get_prices_async(list(holdings))
+        return self.__summarize_pnl(holdings, prices, cost_basis)
+
+    async def __get_prices_async(self, symbols: List[str]) -> Dict[str, float]:
+        # Cached prices are read on the event loop; only a fetch from the
+        # source, which may wait on the network, moves to a worker thread.
+        prices, missing = self.price_service.lookup_prices(symbols)
+        if missing:
+            prices.update(await self.__fetch_prices_async(missing))
+        return prices
+
+    async def __fetch_prices_async(self, symbols: List[str]) -> Dict[str, float]:
+        # Requests missing the same symbols share one fetch instead of each
+        # queueing their own on the small default thread pool.
+        pending = self._pending_fetches
+        to_fetch = [symbol for symbol in symbols if symbol not in pending]
+        if to_fetch:
+            task = asyncio.ensure_future(asyncio.to_thread(self.price_service.fetch_prices, to_fetch))
+            for symbol in to_fetch:
+                pending[symbol] = task
+
+            def forget(finished, to_fetch=to_fetch):
+                for symbol in to_fetch:
+                    if pending.get(symbol) is finished:
+                        del pending[symbol]
+            task.add_done_callback(forget)
+
+        tasks = {id(pending[symbol]): pending[symbol] for symbol in symbols}
+        prices = {}
+        for task in tasks.values():
+            prices.update(await asyncio.shield(task))
+        return prices
+
+    def __summarize_pnl(self, holdings: Dict, prices: Dict[str, float], cost_basis: str) -> Tuple[PnLSummaryDto, str]:
+        summary_version = f"{self._instance_id}-{cost_basis}-{self.pnl_service.version}-{self.price_service.version}"
+        cached = self._summary_cache.get(cost_basis)
+        if cached is not None and cached[0] == summary_version:
+            return cached[1], summary_version
+
+        pnl_data = []
+        total_unrealized_pnl = 0
+        total_realized_pnl = 0
+        fixed_point = self.fixed_point if cost_basis == WAC else None
+
+        for symbol, data in holdings.items():
+            if symbol not in prices:
+                raise KeyError(symbol)
             
-            realized_result = self._calculate_realized_pnl_for_symbol(symbol)
+            combined_pnl, _ = self._get_combined_pnl(symbol, data, prices[symbol], cost_basis)
             
-            return CombinedPnLDto(
-                symbol=unrealized_result.symbol,
-                quantity=unrealized_result.quantity,
-                average_price=unrealized_result.average_price,
-                current_price=unrealized_result.current_price,
-                unrealized_pnl=unrealized_result.unrealized_pnl,
-                realized_pnl=realized_result.total_realized_pnl,
-                total_pnl=round(unrealized_result.unrealized_pnl + realized_result.total_realized_pnl, 2)
+            if fixed_point is not None:
+                # Totals in exact units, rounded once below.
+                total_unrealized_pnl += self.__unrealized_pnl_units(data, prices[symbol])
+                total_realized_pnl += self.pnl_service.get_realized_pnl_units(symbol)
+            else:
+                total_unrealized_pnl += combined_pnl.unrealized_pnl
+                total_realized_pnl += combined_pnl.realized_pnl
+            pnl_data.append(combined_pnl)
+
+        for key in list(self._symbol_cache):
+            if key[0] not in holdings:
+                del self._symbol_cache[key]
+
+        if fixed_point is not None:
+            pnl_summary = PnLSummaryDto(
+                pnl=pnl_data,
+                total_unrealized_pnl=fixed_point.round_cost(total_unrealized_pnl),
+                total_realized_pnl=fixed_point.round_cost(total_realized_pnl),
+                total_pnl=fixed_point.round_cost(total_unrealized_pnl + total_realized_pnl),
+                count=len(pnl_data)
+            )
+        else:
+            pnl_summary = PnLSummaryDto(
+                pnl=pnl_data,
+                total_unrealized_pnl=round(total_unrealized_pnl, 2),
+                total_realized_pnl=round(total_realized_pnl, 2),
+                total_pnl=round(total_unrealized_pnl + total_realized_pnl, 2),
+                count=len(pnl_data)
             )
+        self._summary_cache[cost_basis] = (summary_version, pnl_summary)
+        return pnl_summary, summary_version
+
+    def get_pnl_for_symbol(self, symbol: str, cost_basis: Optional[str] = None) -> CombinedPnLDto:
+        return self.get_pnl_for_symbol_with_version(symbol, cost_basis)[0]
+
+    def get_pnl_for_symbol_with_version(self, symbol: str, cost_basis: Optional[str] = None) -> Tuple[CombinedPnLDto, str]:
+        cost_basis = self.cost_basis if cost_basis is None else check_cost_basis(cost_basis)
+        try:
+            coin_data = self.portfolio_service.get_coin_data(symbol)
+            current_price = self.price_service.get_price(symbol)
+            return self._get_combined_pnl(symbol, coin_data, current_price, cost_basis)
+        except ValueError as e:
+            raise ValueError(f"Cannot calculate PnL: {str(e)}")
+
+    async def get_pnl_for_symbol_async(self, symbol: str, cost_basis: Optional[str] = None) -> CombinedPnLDto:
+        return (await self.get_pnl_for_symbol_with_version_async(symbol, cost_basis))[0]
+
+    async def get_pnl_for_symbol_with_version_async(
+        self, symbol: str, cost_basis: Optional[str] = None
+    ) -> Tuple[CombinedPnLDto, str]:
+        cost_basis = self.cost_basis if cost_basis is None else check_cost_basis(cost_basis)
+        try:
+            coin_data = self.portfolio_service.get_coin_data(symbol)
         except ValueError as e:
-            raise ValueError(f"Cannot calculate PnL: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Cannot calculate PnL: {str(e)}")
+        current_price = (await self.__get_prices_async([symbol]))[symbol]
+        return self._get_combined_pnl(symbol, coin_data, current_price, cost_basis)
+
+    def get_scenario_pnl(
+        self, symbols: List[str], values, relative: bool = False,
+        cost_basis: Optional[str] = None, detail: bool = False
+    ) -> ScenarioPnLDto:
+        # values holds one row per scenario and one column per symbol: prices,
+        # or with relative shocks to the current price. Holdings not named
+        # stay at their current price; named symbols that are not held add
+        # nothing. Realized PnL does not depend on the scenario.
+        cost_basis = self.cost_basis if cost_basis is None else check_cost_basis(cost_basis)
+        if len(set(symbols)) != len(symbols):
+            raise ValueError("Scenario symbols must be unique")
+
+        holdings = self.portfolio_service.get_holdings()
+        prices = self.price_service.get_prices(list(holdings))
+        combined = {}
+        for symbol, holding in holdings.items():
+            if symbol not in prices:
+                raise KeyError(symbol)
+            combined[symbol], _ = self._get_combined_pnl(symbol, holding, prices[symbol], cost_basis)
+
+        quantities, average_prices, base_prices = [], [], []
+        for symbol in symbols:
+            pnl = combined.get(symbol)
+            quantities.append(pnl.quantity if pnl is not None else 0.0)
+            average_prices.append(pnl.average_price if pnl is not None else 0.0)
+            base_prices.append(pnl.current_price if pnl is not None else 0.0)
+        named = set(symbols)
+        unchanged_pnl = sum(pnl.unrealized_pnl for symbol, pnl in combined.items() if symbol not in named)
+        total_realized_pnl = round(sum(pnl.realized_pnl for pnl in combined.values()), 2)
+
+        unrealized_pnl, total_pnl, symbol_unrealized_pnl = revalue_scenarios(
+            quantities, average_prices, values, base_prices if relative else None,
+            unchanged_pnl, total_realized_pnl, detail
+        )
+        return ScenarioPnLDto(
+            symbols=symbols,
+            scenario_count=len(unrealized_pnl),
+            current_unrealized_pnl=round(sum(pnl.unrealized_pnl for pnl in combined.values()), 2),
+            total_realized_pnl=total_realized_pnl,
+            unrealized_pnl=unrealized_pnl,
+            total_pnl=total_pnl,
+            symbol_unrealized_pnl=symbol_unrealized_pnl
+        )
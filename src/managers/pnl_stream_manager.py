@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+from src.managers.pnl_manager import PnLManager
+from src.dtos.pnl_dto import CombinedPnLDto
+
+
+logger = logging.getLogger(__name__)
+
+
+class PnLSubscription:
+    # One stream's pending changes, merged per symbol: however many rounds
+    # pass before the client reads, it gets each symbol's latest PnL once,
+    # so a slow client never builds up a backlog. None marks a symbol that
+    # is no longer held.
+    def __init__(self, symbols: Optional[Set[str]] = None):
+        self.symbols = symbols
+        self.sequence = 0
+        self._pending: Dict[str, Optional[CombinedPnLDto]] = {}
+        self._totals = None
+        self._condition = threading.Condition()
+
+    def offer(self, changes: Dict[str, Optional[CombinedPnLDto]], totals: dict):
+        with self._condition:
+            for symbol, pnl in changes.items():
+                if self.symbols is None or symbol in self.symbols:
+                    self._pending[symbol] = pnl
+            self._totals = totals
+            if self._pending:
+                self._condition.notify()
+
+    def next_update(self, timeout: Optional[float] = None) -> Optional[dict]:
+        # The symbols that changed since the last update and the book's
+        # totals, or None if nothing changed within the timeout.
+        with self._condition:
+            if not self._pending:
+                self._condition.wait(timeout)
+            if not self._pending:
+                return None
+            pending, self._pending = self._pending, {}
+            self.sequence += 1
+            return {
+                "pnl": [pnl for pnl in pending.values() if pnl is not None],
+                "removed": [symbol for symbol, pnl in pending.items() if pnl is None],
+                **self._totals
+            }
+
+
+class PnLStreamManager:
+    # Trades and price changes only mark symbols dirty. Once per interval
+    # the dirty symbols are revalued, one recomputation per symbol however
+    # many trades or ticks hit it, and the ones whose PnL moved are offered
+    # to every subscription.
+    def __init__(self, pnl_manager: PnLManager, interval: float = 0.5):
+        self.pnl_manager = pnl_manager
+        self.interval = interval
+        self._dirty: Set[str] = set()
+        # The last PnL published per held symbol; the totals are summed
+        # from it.
+        self._latest: Dict[str, CombinedPnLDto] = {}
+        self._subscriptions: List[PnLSubscription] = []
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._thread = None
+
+    def mark_changed(self, symbols: Iterable[str]):
+        with self._lock:
+            self._dirty.update(symbols)
+
+    def subscribe(self, symbols: Optional[Set[str]] = None) -> PnLSubscription:
+        # The first update of a new subscription is the whole book (or the
+        # requested symbols); later ones carry changes only.
+        subscription = PnLSubscription(symbols)
+        with self._publish_lock:
+            with self._lock:
+                first = not self._subscriptions
+                self._subscriptions.append(subscription)
+                if first:
+                    # Nothing was tracked while nobody listened.
+                    self._dirty.clear()
+            try:
+                if first:
+                    summary = self.pnl_manager.get_pnl()
+                    self._latest = {pnl.symbol: pnl for pnl in summary.pnl}
+            except Exception:
+                self.unsubscribe(subscription)
+                raise
+            subscription.offer(dict(self._latest), self.__totals())
+
+        with self._lock:
+            if self._thread is None and self.interval > 0:
+                self._thread = threading.Thread(target=self.__run, name="pnl-stream", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: PnLSubscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def after_fork(self):
+        # In a forked worker the publishing thread and the parent's streams
+        # are gone; the first subscription starts over.
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._subscriptions = []
+        self._dirty = set()
+        self._thread = None
+
+    def get_subscription_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def __run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.publish()
+            except Exception as e:
+                # A failed round (a price source error, say) keeps its
+                # symbols dirty for the next one.
+                logger.warning("PnL stream round failed: %s", e)
+
+    def __totals(self) -> dict:
+        total_unrealized_pnl = sum(pnl.unrealized_pnl for pnl in self._latest.values())
+        total_realized_pnl = sum(pnl.realized_pnl for pnl in self._latest.values())
+        return {
+            "total_unrealized_pnl": round(total_unrealized_pnl, 2),
+            "total_realized_pnl": round(total_realized_pnl, 2),
+            "total_pnl": round(total_unrealized_pnl + total_realized_pnl, 2),
+            "count": len(self._latest)
+        }
+
+    def publish(self) -> int:
+        # One round; returns how many symbols' PnL changed.
+        with self._publish_lock:
+            with self._lock:
+                if not self._subscriptions:
+                    return 0
+                dirty, self._dirty = self._dirty, set()
+                subscriptions = list(self._subscriptions)
+
+            # Looking the held prices up schedules a background refetch of
+            # the stale ones; a refetched price that moved marks its symbol
+            # dirty for the next round.
+            holdings = self.pnl_manager.portfolio_service.get_holdings()
+            self.pnl_manager.price_service.lookup_prices(list(holdings))
+
+            changes = {}
+            try:
+                for symbol in list(dirty):
+                    pnl = None
+                    if symbol in holdings:
+                        try:
+                            pnl = self.pnl_manager.get_pnl_for_symbol(symbol)
+                        except ValueError:
+                            # Sold out since the holdings were read.
+                            pass
+                        except KeyError:
+                            # No price for the symbol; GET /pnl fails on it too.
+                            dirty.discard(symbol)
+                            continue
+                    if pnl is None:
+                        if self._latest.pop(symbol, None) is not None:
+                            changes[symbol] = None
+                    elif self._latest.get(symbol) != pnl:
+                        self._latest[symbol] = pnl
+                        changes[symbol] = pnl
+                    dirty.discard(symbol)
+            finally:
+                if dirty:
+                    self.mark_changed(dirty)
+
+            if changes:
+                totals = self.__totals()
+                for subscription in subscriptions:
+                    subscription.offer(changes, totals)
+            return len(changes)
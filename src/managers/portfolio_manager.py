@@ -1,23 +1,79 @@
+from typing import Optional
 from src.services.portfolio_service import PortfolioService
+from src.services.trade_service import TradeService
+from src.services.checkpoint_service import PortfolioCheckpointService
+from src.services.cost_basis_service import CostBasisService, WAC, check_cost_basis
 from src.models.trade import Trade
+from src.models.portfolio import Portfolio
 
 
 class PortfolioManager:
-    def __init__(self, portfolio_service: PortfolioService):
+    def __init__(
+        self, portfolio_service: PortfolioService,
+        trade_service: Optional[TradeService] = None,
+        checkpoint_service: Optional[PortfolioCheckpointService] = None,
+        cost_basis_service: Optional[CostBasisService] = None,
+        cost_basis: str = WAC
+    ):
         self.portfolio_service = portfolio_service
+        self.trade_service = trade_service
+        self.checkpoint_service = checkpoint_service
+        if cost_basis_service is None and trade_service is not None:
+            cost_basis_service = CostBasisService(trade_service)
+        self.cost_basis_service = cost_basis_service
+        self.cost_basis = check_cost_basis(cost_basis)
 
     def add_trade(self, trade: Trade):
         self.portfolio_service.add_trade(trade)
     
-    def get_portfolio(self):
-        holdings = self.portfolio_service.get_holdings()
-        portfolio_list = []
-        
-        for symbol, data in holdings.items():
-            portfolio_list.append({
-                "symbol": symbol,
-                "quantity": data["quantity"],
-                "average_price": data["average_price"]
-            })
-        
-        return portfolio_list
\ No newline at end of file
+    def get_portfolio(self, as_of: Optional[str] = None, cost_basis: Optional[str] = None):
+        cost_basis = self.cost_basis if cost_basis is None else check_cost_basis(cost_basis)
+        if as_of is None:
+            holdings = self.portfolio_service.get_holdings()
+        else:
+            holdings = self.get_holdings_as_of(as_of)
+        if cost_basis != WAC:
+            holdings = self.__apply_cost_basis(holdings, cost_basis, as_of)
+        return [holding.to_dict() for holding in holdings.values()]
+
+    def __apply_cost_basis(self, holdings, cost_basis: str, as_of: Optional[str]):
+        # Quantities do not depend on the method; the average price is that
+        # of the lots still open. Past points in time replay the symbol from
+        # the start, as lots do not fit in a checkpoint.
+        if self.cost_basis_service is None:
+            raise ValueError("Lot cost basis needs the trade log")
+        priced = {}
+        for symbol, holding in holdings.items():
+            if as_of is None:
+                engine = self.cost_basis_service.get_engine(symbol, cost_basis)
+            else:
+                engine = self.cost_basis_service.replay_engine(symbol, cost_basis, as_of)
+            priced[symbol] = Portfolio(symbol, holding.quantity, engine.average_price)
+        return priced
+
+    def get_holdings_as_of(self, timestamp: str):
+        if self.trade_service is None:
+            raise ValueError("Point-in-time holdings need the trade log")
+
+        # Each symbol starts from its nearest checkpoint at or before the
+        # timestamp and replays only the trades after it.
+        replay = self.portfolio_service.empty_copy()
+        checkpoint_holdings = {}
+        positions = {}
+        for symbol in self.trade_service.get_symbols():
+            checkpoint = None
+            if self.checkpoint_service is not None:
+                checkpoint = self.checkpoint_service.find(symbol, timestamp)
+            if checkpoint is None:
+                positions[symbol] = 0
+                continue
+            position, quantity, average_price = checkpoint
+            positions[symbol] = position
+            if quantity > 0:
+                checkpoint_holdings[symbol] = {"quantity": quantity, "average_price": average_price}
+        replay.load_holdings(checkpoint_holdings)
+
+        for symbol, position in positions.items():
+            for trade in self.trade_service.iter_trades_from(symbol, position, end=timestamp):
+                replay.apply_trade(trade)
+        return replay.get_holdings()
@@ -1,25 +1,379 @@
+import logging
+from datetime import datetime
+from itertools import chain
+from math import isclose
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 from src.services.trade_service import TradeService
 from src.services.portfolio_service import PortfolioService
-from src.models.trade import Trade
+from src.services.pnl_service import PnLService
+from src.services.journal_service import TradeJournalService
+from src.services.snapshot_service import SnapshotService
+from src.services.lock_service import SymbolLockService
+from src.services.checkpoint_service import PortfolioCheckpointService
+from src.services.trade_archive import (
+    check_trade_columns, read_trade_columns, rows_by_symbol, sort_trade_columns, write_trade_columns
+)
+from src.models.trade import Trade, from_epoch_nanos, to_epoch_nanos
+from src.models.portfolio import Portfolio
+
+
+logger = logging.getLogger(__name__)
+
+
+class TradeBatchError(ValueError):
+    def __init__(self, errors: Dict[int, List[str]]):
+        super().__init__(f"{len(errors)} trades in the batch were rejected")
+        self.errors = errors
 
 
 class TradeManager:
     def __init__(
         self, trade_service: TradeService, 
-        portfolio_service: PortfolioService
+        portfolio_service: PortfolioService,
+        pnl_service: PnLService,
+        journal_service: Optional[TradeJournalService] = None,
+        snapshot_service: Optional[SnapshotService] = None,
+        snapshot_every: int = 100000,
+        lock_service: Optional[SymbolLockService] = None,
+        checkpoint_service: Optional[PortfolioCheckpointService] = None
     ):
         self.trade_service = trade_service
         self.portfolio_service = portfolio_service
+        self.pnl_service = pnl_service
+        self.journal_service = journal_service
+        self.snapshot_service = snapshot_service
+        self.snapshot_every = snapshot_every
+        self.lock_service = lock_service if lock_service is not None else SymbolLockService()
+        self.checkpoint_service = checkpoint_service
+        # Called with the symbols of every accepted trade or batch, after
+        # the symbol locks are released.
+        self._change_listeners: List[Callable[[List[str]], None]] = []
+
+    def add_change_listener(self, listener: Callable[[List[str]], None]):
+        self._change_listeners.append(listener)
+
+    def __notify(self, symbols: List[str]):
+        for listener in self._change_listeners:
+            listener(symbols)
+
+    def add_trade(self, trade: Trade, stamp: bool = False):
+        # The symbol's lock makes the portfolio update, the trade log and the
+        # PnL state one step; trades on other symbols proceed in parallel.
+        with self.lock_service.lock_for(trade.symbol):
+            latest = self.trade_service.get_last_trade_timestamp_ns(trade.symbol)
+            if stamp:
+                # Server-side timestamps are taken under the lock, so a trade
+                # never lands behind one that won the lock first, even if the
+                # clock steps back.
+                trade.timestamp_ns = max(to_epoch_nanos(datetime.now().isoformat()), latest or 0)
+            backdated = latest is not None and trade.timestamp_ns < latest
+            # A trade the journal cannot hold is rejected before the book
+            # changes, not after it is already in the live state.
+            record = self.journal_service.encode(trade) if self.journal_service is not None else None
+
+            # The portfolio rejects oversells, so it runs first to keep
+            # rejected trades out of the trade log and the realized PnL state.
+            try:
+                if backdated:
+                    holding, pnl_state = self.__replay_backdated(trade)
+                else:
+                    self.portfolio_service.add_trade(trade)
+            except Exception as e:
+                logger.warning("Error adding trade to portfolio: %s", e)
+                raise
+
+            try:
+                self.trade_service.add_trade(trade)
+            except Exception as e:
+                logger.warning("Error adding trade: %s", e)
+                raise
+
+            if backdated:
+                self.portfolio_service.set_holding(trade.symbol, holding)
+                self.pnl_service.restore_symbol_state(trade.symbol, pnl_state)
+            snapshot_due = self.__record_trade(trade, record, apply_pnl=not backdated)
 
-    def add_trade(self, trade: Trade):
-        try:
+        self.__notify([trade.symbol])
+        if snapshot_due:
+            self.save_snapshot()
+
+    def add_trades(self, trades: List[Trade]):
+        # Trades are applied in timestamp order, which is also timestamp order
+        # within each symbol; the sort is stable so rows sharing a timestamp
+        # keep their position in the batch.
+        order = sorted(range(len(trades)), key=lambda index: trades[index].timestamp_ns)
+        ordered_trades = [trades[index] for index in order]
+
+        # Checks and writes happen under every symbol in the batch, so no
+        # other writer can invalidate the checks before the batch is applied.
+        with self.lock_service.lock_symbols(trade.symbol for trade in trades):
+            snapshot_due = self.__add_checked_trades(trades, order, ordered_trades)
+
+        self.__notify(list({trade.symbol: None for trade in trades}))
+        if snapshot_due:
+            self.save_snapshot()
+
+    def __add_checked_trades(self, trades: List[Trade], order: List[int], ordered_trades: List[Trade]) -> bool:
+        errors = {}
+        for position, error in enumerate(self.portfolio_service.check_trades(ordered_trades)):
+            if error is not None:
+                errors[order[position]] = [error]
+
+        latest_timestamps = {}
+        for index, trade in enumerate(trades):
+            if trade.symbol not in latest_timestamps:
+                latest_timestamps[trade.symbol] = self.trade_service.get_last_trade_timestamp_ns(trade.symbol)
+            latest = latest_timestamps[trade.symbol]
+            if latest is not None and trade.timestamp_ns < latest:
+                errors.setdefault(index, []).append(
+                    f"Trade timestamp {trade.timestamp} is before the latest {trade.symbol} trade at {from_epoch_nanos(latest)}"
+                )
+
+        records = [None] * len(trades)
+        if self.journal_service is not None:
+            for index, trade in enumerate(trades):
+                try:
+                    records[index] = self.journal_service.encode(trade)
+                except ValueError as e:
+                    errors.setdefault(index, []).append(str(e))
+
+        if errors:
+            raise TradeBatchError(errors)
+
+        snapshot_due = False
+        for index, trade in zip(order, ordered_trades):
+            self.portfolio_service.apply_trade(trade)
             self.trade_service.add_trade(trade)
-        except Exception as e:
-            print(f"Error adding trade: {e}")
-            raise Exception(f"Error adding trade: {e}")
-
-        try:
-            self.portfolio_service.add_trade(trade)
-        except Exception as e:
-            print(f"Error adding trade to portfolio: {e}")
-            raise Exception(f"Error adding trade to portfolio: {e}")
\ No newline at end of file
+            snapshot_due = self.__record_trade(trade, records[index]) or snapshot_due
+        return snapshot_due
+
+    def import_columns(self, columns: Dict) -> int:
+        # Appends trade columns (see TradeJournalService.read_columns) as one
+        # batch, checked like POST /trades/batch: errors are keyed by row and
+        # nothing is applied unless every row passes. Holdings and realized
+        # PnL are then rebuilt once per symbol from its trade columns, rather
+        # than trade by trade.
+        errors = check_trade_columns(columns)
+        if errors:
+            raise TradeBatchError(errors)
+        order, columns = sort_trade_columns(columns)
+        records = self.journal_service.encode_columns(columns) if self.journal_service is not None else None
+        symbol_rows = rows_by_symbol(columns["symbol"])
+        is_buy = columns["side"] == 1
+        timestamps = columns["timestamp"] * 1000
+
+        with self.lock_service.lock_all():
+            for row in self.trade_service.find_trade_ids(columns["trade_id"]).nonzero()[0].tolist():
+                errors.setdefault(int(order[row]), []).append(
+                    f"Trade id {columns['trade_id'][row].decode()} is already in the book"
+                )
+            for symbol, rows in symbol_rows.items():
+                latest = self.trade_service.get_last_trade_timestamp_ns(symbol)
+                if latest is not None:
+                    for row in rows[timestamps[rows] < latest].tolist():
+                        errors.setdefault(int(order[row]), []).append(
+                            f"Trade timestamp {from_epoch_nanos(int(timestamps[row]))} is before the latest "
+                            f"{symbol} trade at {from_epoch_nanos(latest)}"
+                        )
+                # Only the first rejected sell is reported: the running
+                # quantity after it depends on how it would be fixed.
+                rejected = self.portfolio_service.check_columns(
+                    symbol, is_buy[rows], columns["price"][rows], columns["quantity"][rows]
+                )
+                if rejected is not None:
+                    position, error = rejected
+                    errors.setdefault(int(order[rows[position]]), []).append(error)
+            if errors:
+                raise TradeBatchError(errors)
+
+            # Everything that can reject a row has run above, including the
+            # record encoding, so the writes below do not stop partway. The
+            # journal goes first, as the book is recovered from it.
+            if self.journal_service is not None:
+                self.journal_service.append_columns(columns, records)
+            self.trade_service.extend_from_columns(columns)
+            for symbol in symbol_rows:
+                self.pnl_service.replay_columns(symbol, *self.trade_service.get_columns(symbol))
+                self.portfolio_service.set_holding(symbol, self.pnl_service.get_holding(symbol))
+            self.__rebuild_checkpoints(symbol_rows)
+
+        self.__notify(list(symbol_rows))
+        if self.journal_service is not None and self.snapshot_service is not None:
+            self.save_snapshot()
+        return len(order)
+
+    def import_archive(self, source: Union[str, bytes], archive_format: str) -> int:
+        # A Parquet or Arrow IPC file, from a path or its bytes.
+        return self.import_columns(read_trade_columns(source, archive_format))
+
+    def export_archive(self, archive_format: str, sink: Optional[str] = None) -> Optional[bytes]:
+        # Every trade in log order, written to the path sink or returned as
+        # the file's bytes.
+        return write_trade_columns(self.trade_service.export_columns(), archive_format, sink)
+
+    def __replay_backdated(self, trade: Trade) -> Tuple[Optional[Portfolio], Dict]:
+        # A trade older than the symbol's latest lands mid-history, so the
+        # symbol is replayed in timestamp order with it in place. The trades
+        # after it go through the live rules, so a sell must be covered at
+        # its own point in time, not just by today's holding.
+        position = self.trade_service.get_trade_count(trade.symbol, trade.timestamp_ns)
+        return self.__replay_symbol(
+            trade.symbol, position, chain([trade], self.trade_service.iter_trades_from(trade.symbol, position))
+        )
+
+    def __replay_symbol(
+        self, symbol: str, position: int, trades: Iterable[Trade] = ()
+    ) -> Tuple[Optional[Portfolio], Dict]:
+        # The symbol's first position trades are already known to be valid,
+        # so their state comes from the column replay; trades are applied on
+        # top of it. The scratch services do the live ones' arithmetic.
+        is_buy, prices, quantities = self.trade_service.get_columns(symbol)
+        portfolio_service = self.portfolio_service.empty_copy()
+        pnl_service = self.pnl_service.empty_copy()
+        pnl_service.replay_columns(symbol, is_buy[:position], prices[:position], quantities[:position])
+        portfolio_service.set_holding(symbol, pnl_service.get_holding(symbol))
+        for trade in trades:
+            portfolio_service.apply_trade(trade)
+            pnl_service.add_trade(trade)
+        return portfolio_service.get_holding(symbol), pnl_service.get_symbol_state(symbol)
+
+    def __record_trade(self, trade: Trade, record: Optional[bytes] = None, apply_pnl: bool = True) -> bool:
+        # Returns whether a snapshot is due; the caller takes it once it has
+        # released its symbol locks.
+        if apply_pnl:
+            self.pnl_service.add_trade(trade)
+        if self.checkpoint_service is not None:
+            self.checkpoint_service.record(
+                trade,
+                self.portfolio_service.get_holding(trade.symbol),
+                self.trade_service.get_trade_count(trade.symbol),
+                self.trade_service.get_last_trade_timestamp_ns(trade.symbol)
+            )
+
+        if self.journal_service is None:
+            return False
+        record_count = self.journal_service.append(trade, record)
+        return self.snapshot_service is not None and record_count % self.snapshot_every == 0
+
+    def __rebuild_checkpoints(self, symbols: Iterable[str], verify: bool = False) -> List[str]:
+        # Recovery and imports apply trades without recording them one at a
+        # time, so each symbol's checkpoints are rebuilt in one pass over its
+        # columns, every checkpoint resuming from the one before. With verify,
+        # the pass runs on to the end of the columns and the live state is
+        # checked against it; returns the symbols restored from the replay.
+        restored = []
+        if self.checkpoint_service is None and not verify:
+            return restored
+        every = self.checkpoint_service.every if self.checkpoint_service is not None else 0
+        for symbol in symbols:
+            is_buy, prices, quantities = self.trade_service.get_columns(symbol)
+            pnl_service = self.pnl_service.empty_copy()
+            position = 0
+            if self.checkpoint_service is not None:
+                timestamps = []
+                checkpoints = []
+                for position in range(every, len(prices) + 1, every):
+                    start = position - every
+                    pnl_service.extend_columns(symbol, is_buy[start:position], prices[start:position], quantities[start:position])
+                    holding = pnl_service.get_holding(symbol)
+                    timestamps.append(next(self.trade_service.iter_trades_from(symbol, position - 1)).timestamp_ns)
+                    checkpoints.append((
+                        position, holding.quantity if holding else 0.0, holding.average_price if holding else 0.0
+                    ))
+                self.checkpoint_service.replace(symbol, timestamps, checkpoints)
+                position = len(checkpoints) * every
+            if verify:
+                pnl_service.extend_columns(symbol, is_buy[position:], prices[position:], quantities[position:])
+                if self.__restore_if_changed(symbol, pnl_service):
+                    restored.append(symbol)
+        return restored
+
+    def __restore_if_changed(self, symbol: str, replayed: PnLService) -> bool:
+        # A snapshot is trusted only as far as it agrees with the trade log:
+        # a symbol whose holding or PnL state differs from the replay (a
+        # damaged snapshot, or one written by different code) is restored
+        # from it. Fixed-point states are exact, so their units must match.
+        expected = replayed.get_symbol_state(symbol)
+        replayed_holding = replayed.get_holding(symbol)
+        state = self.pnl_service.get_symbol_state(symbol)
+        holding = self.portfolio_service.get_holding(symbol)
+        if "units" in expected:
+            same = state is not None and state["units"] == expected["units"] and (
+                holding is None and replayed_holding is None
+                or holding is not None and replayed_holding is not None
+                and (holding.quantity_units, holding.cost_units) == (replayed_holding.quantity_units, replayed_holding.cost_units)
+            )
+        else:
+            values = [] if state is None else [
+                (state[key], expected[key]) for key in ("quantity", "total_cost", "realized_pnl")
+            ]
+            if holding is not None and replayed_holding is not None:
+                values += [
+                    (holding.quantity, replayed_holding.quantity),
+                    (holding.average_price, replayed_holding.average_price)
+                ]
+            same = state is not None and (holding is None) == (replayed_holding is None) and all(
+                isclose(value, replayed_value, rel_tol=1e-9, abs_tol=1e-9) for value, replayed_value in values
+            )
+        if same:
+            return False
+        self.portfolio_service.set_holding(symbol, replayed_holding)
+        self.pnl_service.restore_symbol_state(symbol, expected)
+        return True
+
+    def save_snapshot(self):
+        # Every stripe is held so the holdings, the PnL state and the journal
+        # record count describe the same point in the log.
+        with self.lock_service.lock_all():
+            self.journal_service.flush()
+            self.snapshot_service.save(
+                self.journal_service.record_count,
+                self.portfolio_service.dump_holdings(),
+                self.pnl_service.get_state()
+            )
+
+    def recover(self) -> int:
+        if self.journal_service is None:
+            return 0
+
+        snapshot = self.snapshot_service.load() if self.snapshot_service is not None else None
+        if snapshot is not None and snapshot["journal_records"] > self.journal_service.record_count:
+            logger.warning("Ignoring snapshot ahead of the journal (%d records)", snapshot["journal_records"])
+            snapshot = None
+
+        replay_from = 0
+        if snapshot is not None:
+            self.portfolio_service.load_holdings(snapshot["portfolio"])
+            self.pnl_service.load_state(snapshot["realized_pnl"])
+            replay_from = snapshot["journal_records"]
+
+        # The trade log always needs every record; holdings and realized PnL
+        # only need the tail written after the snapshot.
+        self.trade_service.extend_from_journal(self.journal_service)
+        tail_counts = {}
+        for trade in self.journal_service.iter_trades(replay_from):
+            self.portfolio_service.apply_trade(trade)
+            self.pnl_service.add_trade(trade)
+            tail_counts[trade.symbol] = tail_counts.get(trade.symbol, 0) + 1
+
+        # The tail was applied in journal order. Where a symbol's tail is not
+        # also the end of its timestamp index, in the same order, it held a
+        # backdated trade, and the symbol is replayed in timestamp order to
+        # match the live state.
+        for symbol, count in tail_counts.items():
+            position = self.trade_service.get_trade_count(symbol) - count
+            sequences = [trade.sequence for trade in self.trade_service.iter_trades_from(symbol, position)]
+            if sequences[0] < replay_from or any(a > b for a, b in zip(sequences, sequences[1:])):
+                holding, pnl_state = self.__replay_symbol(symbol, self.trade_service.get_trade_count(symbol))
+                self.portfolio_service.set_holding(symbol, holding)
+                self.pnl_service.restore_symbol_state(symbol, pnl_state)
+
+        # The snapshot's state is checked in the same pass that rebuilds the
+        # checkpoints, which replays every symbol anyway.
+        restored = self.__rebuild_checkpoints(self.trade_service.get_symbols(), verify=snapshot is not None)
+        if restored:
+            logger.warning("Restored %s from the journal: the snapshot disagreed with it", ", ".join(restored))
+
+        recovered = self.journal_service.record_count
+        logger.info("Recovered %d trades (%d replayed after snapshot)", recovered, recovered - replay_from)
+        return recovered
@@ -1,3 +1,43 @@
+class Portfolio:
+    # One symbol's holding. Records are replaced rather than mutated, so a
+    # reader never sees a new quantity next to an old average price.
+    __slots__ = ("symbol", "quantity", "average_price")
 
+    def __init__(self, symbol: str, quantity: float, average_price: float) -> None:
+        self.symbol = symbol
+        self.quantity = quantity
+        self.average_price = average_price
 
-class Portfolio:
\ No newline at end of file
+    @property
+    def total_cost(self) -> float:
+        return self.quantity * self.average_price
+
+    def to_dict(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "quantity": self.quantity,
+            "average_price": self.average_price
+        }
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Portfolio):
+            return NotImplemented
+        return (self.symbol, self.quantity, self.average_price) == (other.symbol, other.quantity, other.average_price)
+
+    def __repr__(self) -> str:
+        return f"Portfolio(symbol={self.symbol}, quantity={self.quantity}, average_price={self.average_price})"
+
+
+class FixedPointHolding(Portfolio):
+    # A holding kept in fixed-point units (see FixedPoint). The float fields
+    # are derived from the units once, when the record is built.
+    __slots__ = ("quantity_units", "cost_units")
+
+    def __init__(self, symbol: str, quantity: float, average_price: float, quantity_units: int, cost_units: int) -> None:
+        # Assigned directly rather than through Portfolio.__init__: one is
+        # built per trade.
+        self.symbol = symbol
+        self.quantity = quantity
+        self.average_price = average_price
+        self.quantity_units = quantity_units
+        self.cost_units = cost_units
@@ -1,5 +1,40 @@
+import sys
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+
+EPOCH = datetime(1970, 1, 1)
+BUY = "buy"
+SELL = "sell"
+
+
+def to_epoch_micros(timestamp: str) -> int:
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is not None:
+        # Stored timestamps are naive local time, like datetime.now().
+        moment = moment.astimezone().replace(tzinfo=None)
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def from_epoch_micros(micros: int) -> str:
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def to_epoch_nanos(timestamp: str) -> int:
+    return to_epoch_micros(timestamp) * 1000
+
+
+def from_epoch_nanos(nanos: int) -> str:
+    return (EPOCH + timedelta(microseconds=nanos // 1000)).isoformat()
+
 
 class Trade:
+    # Slotted, so a trade costs no per-instance __dict__. The side is a bool
+    # and the timestamp integer epoch nanoseconds; the string forms are
+    # derived on demand for the API. sequence is the trade's position in its
+    # book's trade log, set by the trade store.
+    __slots__ = ("trade_id", "symbol", "is_buy", "price", "quantity", "timestamp_ns", "sequence")
+
     def __init__(
         self,
         trade_id: str,
@@ -7,14 +42,39 @@ class Trade:
         side: str,
         price: float,
         quantity: float,
-        timestamp: str,
+        timestamp: Union[str, int],
+        sequence: Optional[int] = None,
     ) -> None:
+        normalized_side = side.lower()
+        if normalized_side not in (BUY, SELL):
+            raise ValueError(f"Invalid trade side: {side}. Must be 'buy' or 'sell'")
+
         self.trade_id = trade_id
-        self.symbol = symbol
-        self.side = side
+        # One string per symbol however many trades reference it.
+        self.symbol = sys.intern(symbol)
+        self.is_buy = normalized_side == BUY
         self.price = price
         self.quantity = quantity
-        self.timestamp = timestamp
+        self.timestamp_ns = timestamp if isinstance(timestamp, int) else to_epoch_nanos(timestamp)
+        self.sequence = sequence
+
+    @property
+    def side(self) -> str:
+        return BUY if self.is_buy else SELL
+
+    @property
+    def timestamp(self) -> str:
+        return from_epoch_nanos(self.timestamp_ns)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.trade_id,
+            "symbol": self.symbol,
+            "side": self.side,
+            "price": self.price,
+            "quantity": self.quantity,
+            "timestamp": self.timestamp
+        }
 
     def __str__(self) -> str:
-        return f"Trade(trade_id={self.trade_id}, symbol={self.symbol}, side={self.side}, price={self.price}, quantity={self.quantity}, timestamp={self.timestamp})"
\ No newline at end of file
+        return f"Trade(trade_id={self.trade_id}, symbol={self.symbol}, side={self.side}, price={self.price}, quantity={self.quantity}, timestamp={self.timestamp})"
@@ -0,0 +1,60 @@
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+from src.models.trade import Trade, to_epoch_nanos
+from src.models.portfolio import Portfolio
+
+
+class PortfolioCheckpointService:
+    # Every `every` trades on a symbol, keeps that symbol's holding as of
+    # its latest trade. A checkpoint at position P is the holding after the
+    # first P trades of the symbol's timestamp-ordered index, so an as-of
+    # query only replays the trades after the nearest one.
+    def __init__(self, every: int = 1000):
+        if every <= 0:
+            raise ValueError(f"Checkpoint interval must be positive, got {every}")
+        self.every = every
+        # Epoch nanoseconds of each checkpoint's latest trade.
+        self._timestamps: Dict[str, List[int]] = {}
+        # (position, quantity, average_price); quantity is 0 once a sell
+        # closes the position, unlike the live portfolio which drops it.
+        self._checkpoints: Dict[str, List[Tuple[int, float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, trade: Trade, holding: Optional[Portfolio], position: int, last_timestamp_ns: int):
+        # position is the symbol's trade count including this trade, and
+        # last_timestamp_ns the latest of those trades, which is later than
+        # this one if it was backdated.
+        with self._lock:
+            timestamps = self._timestamps.setdefault(trade.symbol, [])
+            checkpoints = self._checkpoints.setdefault(trade.symbol, [])
+
+            if timestamps and trade.timestamp_ns < timestamps[-1]:
+                # A backdated trade sorts ahead of the later checkpoints and
+                # shifts every position after it.
+                keep = bisect_right(timestamps, trade.timestamp_ns)
+                del timestamps[keep:]
+                del checkpoints[keep:]
+
+            if position % self.every == 0:
+                quantity = holding.quantity if holding else 0.0
+                average_price = holding.average_price if holding else 0.0
+                timestamps.append(last_timestamp_ns)
+                checkpoints.append((position, quantity, average_price))
+
+    def replace(self, symbol: str, timestamps: List[int], checkpoints: List[Tuple[int, float, float]]):
+        # Sets the symbol's checkpoints, rebuilt from its whole history.
+        with self._lock:
+            self._timestamps[symbol] = timestamps
+            self._checkpoints[symbol] = checkpoints
+
+    def find(self, symbol: str, timestamp: str) -> Optional[Tuple[int, float, float]]:
+        # The latest checkpoint whose last trade is at or before timestamp.
+        timestamps = self._timestamps.get(symbol, [])
+        checkpoints = self._checkpoints.get(symbol, [])
+        index = min(bisect_right(timestamps, to_epoch_nanos(timestamp)), len(checkpoints)) - 1
+        return checkpoints[index] if index >= 0 else None
+
+    def get_checkpoint_count(self) -> int:
+        return sum(len(checkpoints) for checkpoints in self._checkpoints.values())
+
@@ -0,0 +1,331 @@
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.models.trade import Trade, to_epoch_micros, from_epoch_micros
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+BUY = 1
+SELL = 0
+
+
+class ColumnarTradeService:
+    """Array-backed drop-in for TradeService.
+
+    Trade fields live in contiguous typed arrays and Trade objects are only
+    built when a caller asks for them.
+    """
+
+    def __init__(self):
+        self.symbols: List[str] = []
+        self._symbol_ids: Dict[str, int] = {}
+
+        self.symbol_ids = array('I')
+        self.sides = array('b')
+        self.prices = array('d')
+        self.quantities = array('d')
+        self.timestamps = array('q')
+        self._trade_ids = bytearray()
+        self._trade_id_offsets = array('Q', [0])
+        # Encoded id -> row, for cursors. Rows from extend_from_columns are
+        # kept instead as a sorted id column with their rows, so a bulk
+        # import adds no per-row entries.
+        self._rows_by_id: Dict[bytes, int] = {}
+        self._imported_ids = None
+        self._imported_rows = None
+
+        # Row numbers in timestamp order for each symbol and (symbol, side).
+        self.rows_by_symbol: Dict[str, array] = {}
+        self.rows_by_symbol_and_side: Dict[Tuple[str, str], array] = {}
+        # Rows span several columns, so appends serialize on one lock. It also
+        # covers the numpy views in get_columns: an array cannot grow while a
+        # view of its buffer is alive.
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        # The id offsets are the last column written, so a row counted here
+        # is complete.
+        return len(self._trade_id_offsets) - 1
+
+    def __get_symbol_id(self, symbol: str) -> int:
+        if symbol not in self._symbol_ids:
+            self._symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return self._symbol_ids[symbol]
+
+    def __bisect(self, rows: array, timestamp: int, right: bool, low: int = 0, high: Optional[int] = None) -> int:
+        high = len(rows) if high is None else high
+        timestamps = self.timestamps
+        while low < high:
+            middle = (low + high) // 2
+            value = timestamps[rows[middle]]
+            if value < timestamp or (right and value == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def __insert_into_index(self, index: Dict, key, row: int):
+        if key not in index:
+            index[key] = array('I')
+        rows = index[key]
+
+        if not rows or self.timestamps[rows[-1]] <= self.timestamps[row]:
+            rows.append(row)
+        else:
+            rows.insert(self.__bisect(rows, self.timestamps[row], right=True), row)
+
+    def __index_bounds(self, symbol: str, side: Optional[str], start: Optional[str], end: Optional[str]):
+        if side is None:
+            rows = self.rows_by_symbol.get(symbol, array('I'))
+        else:
+            rows = self.rows_by_symbol_and_side.get((symbol, side.lower()), array('I'))
+        low = 0 if start is None else self.__bisect(rows, to_epoch_micros(start), right=False)
+        high = len(rows) if end is None else self.__bisect(rows, to_epoch_micros(end), right=True)
+        return rows, low, high
+
+    def __find_row(self, trade_id: bytes) -> Optional[int]:
+        row = self._rows_by_id.get(trade_id)
+        if row is None and self._imported_ids is not None:
+            position = int(np.searchsorted(self._imported_ids, trade_id))
+            if position < len(self._imported_ids) and self._imported_ids[position] == trade_id:
+                row = int(self._imported_rows[position])
+        return row
+
+    def __row_of(self, trade_id: str) -> int:
+        row = self.__find_row(trade_id.encode())
+        if row is None:
+            raise ValueError(f"Trade {trade_id} not found")
+        return row
+
+    def __build_trade(self, row: int) -> Trade:
+        trade_id = self._trade_ids[self._trade_id_offsets[row]:self._trade_id_offsets[row + 1]]
+        return Trade(
+            trade_id=trade_id.decode(),
+            symbol=self.symbols[self.symbol_ids[row]],
+            side="buy" if self.sides[row] == BUY else "sell",
+            price=self.prices[row],
+            quantity=self.quantities[row],
+            timestamp=self.timestamps[row] * 1000,
+            sequence=row
+        )
+
+    def has_trade(self, trade_id: str) -> bool:
+        return self.__find_row(trade_id.encode()) is not None
+
+    def find_trade_ids(self, trade_ids):
+        # Which of a column of encoded ids are already stored, as a mask.
+        stored = [] if self._imported_ids is None else [self._imported_ids]
+        if self._rows_by_id:
+            stored.append(np.array(list(self._rows_by_id), dtype="S"))
+        if not stored:
+            return np.zeros(len(trade_ids), dtype=bool)
+        return np.isin(trade_ids, np.concatenate(stored))
+
+    def add_trade(self, trade: Trade):
+        with self._lock:
+            row = len(self.prices)
+            self.symbol_ids.append(self.__get_symbol_id(trade.symbol))
+            self.sides.append(BUY if trade.is_buy else SELL)
+            self.prices.append(trade.price)
+            self.quantities.append(trade.quantity)
+            self.timestamps.append(trade.timestamp_ns // 1000)
+            trade_id = trade.trade_id.encode()
+            self._trade_ids += trade_id
+            self._trade_id_offsets.append(len(self._trade_ids))
+            self._rows_by_id[trade_id] = row
+
+            self.__insert_into_index(self.rows_by_symbol, trade.symbol, row)
+            self.__insert_into_index(self.rows_by_symbol_and_side, (trade.symbol, trade.side), row)
+
+    def get_trades(self) -> List[Trade]:
+        return [self.__build_trade(row) for row in range(len(self))]
+
+    def get_last_trade_timestamp(self, symbol: str) -> Optional[str]:
+        rows = self.rows_by_symbol.get(symbol)
+        return from_epoch_micros(self.timestamps[rows[-1]]) if rows else None
+
+    def get_last_trade_timestamp_ns(self, symbol: str) -> Optional[int]:
+        rows = self.rows_by_symbol.get(symbol)
+        return self.timestamps[rows[-1]] * 1000 if rows else None
+
+    def get_symbols(self) -> List[str]:
+        return list(self.rows_by_symbol)
+
+    def get_trade_count(self, symbol: str, until_ns: Optional[int] = None) -> int:
+        rows = self.rows_by_symbol.get(symbol, array('I'))
+        return len(rows) if until_ns is None else self.__bisect(rows, until_ns // 1000, right=True)
+
+    def get_trades_by_symbol_and_side(
+        self,
+        symbol: str,
+        side: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[Trade]:
+        rows, low, high = self.__index_bounds(symbol, side, start, end)
+        return [self.__build_trade(row) for row in rows[low:high]]
+
+    def __iter_in_insertion_order(
+        self, first_row: int, side: Optional[str], start: Optional[str], end: Optional[str]
+    ) -> Iterator[Trade]:
+        side_code = None if side is None else (BUY if side.lower() == "buy" else SELL)
+        start_micros = None if start is None else to_epoch_micros(start)
+        end_micros = None if end is None else to_epoch_micros(end)
+        # Filters run on the columns; only matching rows become Trade objects.
+        for row in range(first_row, len(self)):
+            if side_code is not None and self.sides[row] != side_code:
+                continue
+            if start_micros is not None and self.timestamps[row] < start_micros:
+                continue
+            if end_micros is not None and self.timestamps[row] > end_micros:
+                continue
+            yield self.__build_trade(row)
+
+    def iter_trades(
+        self,
+        symbol: Optional[str] = None,
+        side: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        after: Optional[str] = None,
+    ) -> Iterator[Trade]:
+        if symbol is None:
+            first_row = 0 if after is None else self.__row_of(after) + 1
+            return self.__iter_in_insertion_order(first_row, side, start, end)
+
+        rows, low, high = self.__index_bounds(symbol, side, start, end)
+        if after is not None:
+            cursor_row = self.__row_of(after)
+            cursor_timestamp = self.timestamps[cursor_row]
+            position = self.__bisect(rows, cursor_timestamp, right=False, low=low, high=high)
+            while position < high and self.timestamps[rows[position]] == cursor_timestamp:
+                position += 1
+                if rows[position - 1] == cursor_row:
+                    break
+            low = position
+
+        return (self.__build_trade(rows[position]) for position in range(low, high))
+
+    def iter_trades_from(self, symbol: str, position: int, end: Optional[str] = None) -> Iterator[Trade]:
+        rows, _, high = self.__index_bounds(symbol, None, None, end)
+        return (self.__build_trade(rows[index]) for index in range(position, high))
+
+    def get_columns(self, symbol: str):
+        if np is not None:
+            with self._lock:
+                return self.__gather_columns(symbol)
+
+        rows = self.rows_by_symbol.get(symbol, array('I'))
+        return (
+            [self.sides[row] == BUY for row in rows],
+            [self.prices[row] for row in rows],
+            [self.quantities[row] for row in rows],
+        )
+
+    def __gather_columns(self, symbol: str):
+        # The buffer views die with this frame, before the caller unlocks.
+        rows = self.rows_by_symbol.get(symbol, array('I'))
+        row_numbers = np.frombuffer(rows, dtype=rows.typecode)
+        return (
+            np.frombuffer(self.sides, dtype=self.sides.typecode)[row_numbers] == BUY,
+            np.frombuffer(self.prices, dtype=self.prices.typecode)[row_numbers],
+            np.frombuffer(self.quantities, dtype=self.quantities.typecode)[row_numbers],
+        )
+
+    def extend_from_journal(self, journal_service):
+        columns = journal_service.read_columns()
+        if columns is None:
+            for trade in journal_service.iter_trades():
+                self.add_trade(trade)
+            return
+        self.extend_from_columns(columns)
+
+    def extend_from_columns(self, columns: Dict):
+        # Trade columns as TradeJournalService.read_columns returns them,
+        # appended with one copy per column. Under the lock, as no numpy
+        # view of a column may be alive while it grows.
+        with self._lock:
+            first_row = len(self.prices)
+            symbols, symbol_positions = np.unique(columns["symbol"], return_inverse=True)
+            symbol_ids = np.array(
+                [self.__get_symbol_id(symbol.decode()) for symbol in symbols], dtype=self.symbol_ids.typecode
+            )[symbol_positions]
+            sides = (columns["side"] == 1).astype(self.sides.typecode)
+
+            self.symbol_ids.frombytes(symbol_ids.tobytes())
+            self.sides.frombytes(sides.tobytes())
+            self.prices.frombytes(columns["price"].astype(self.prices.typecode).tobytes())
+            self.quantities.frombytes(columns["quantity"].astype(self.quantities.typecode).tobytes())
+            self.timestamps.frombytes(columns["timestamp"].astype(self.timestamps.typecode).tobytes())
+
+            # The ids are null-padded to the column's width; the padding is
+            # masked off to pack them end to end.
+            trade_ids = np.ascontiguousarray(columns["trade_id"])
+            id_lengths = np.char.str_len(trade_ids)
+            width = trade_ids.dtype.itemsize
+            id_bytes = trade_ids.view(np.uint8).reshape(len(trade_ids), width)
+            id_ends = len(self._trade_ids) + np.cumsum(id_lengths, dtype=np.uint64)
+            self._trade_ids += id_bytes[np.arange(width) < id_lengths[:, None]].tobytes()
+            self._trade_id_offsets.frombytes(id_ends.astype(self._trade_id_offsets.typecode).tobytes())
+
+            rows = np.arange(first_row, len(self.prices), dtype=np.int64)
+            if self._imported_ids is not None:
+                trade_ids = np.concatenate((self._imported_ids, trade_ids))
+                rows = np.concatenate((self._imported_rows, rows))
+            order = np.argsort(trade_ids, kind="stable")
+            self._imported_ids = trade_ids[order]
+            self._imported_rows = rows[order]
+
+            # Build the per-symbol indexes with one stable sort per index instead
+            # of a bisect per row.
+            rows = np.arange(first_row, len(self.prices), dtype=np.int64)
+            timestamps = columns["timestamp"]
+            self.__extend_index(self.rows_by_symbol, rows, symbol_ids, timestamps, with_side=False)
+            self.__extend_index(
+                self.rows_by_symbol_and_side, rows, symbol_ids.astype(np.int64) * 2 + sides, timestamps, with_side=True
+            )
+
+    def export_columns(self) -> Dict:
+        # Every trade in log order, as trade columns. Only the ids are split
+        # out row by row.
+        with self._lock:
+            count = len(self)
+            offsets = self._trade_id_offsets.tolist()
+            trade_ids = bytes(self._trade_ids[:offsets[-1]])
+            symbols = np.array([symbol.encode() for symbol in self.symbols] or [b""], dtype="S")
+            columns = {
+                "symbol": symbols[np.frombuffer(self.symbol_ids, dtype=self.symbol_ids.typecode)],
+                "side": np.frombuffer(self.sides, dtype=self.sides.typecode).astype(np.uint8),
+                "price": np.frombuffer(self.prices, dtype=self.prices.typecode).copy(),
+                "quantity": np.frombuffer(self.quantities, dtype=self.quantities.typecode).copy(),
+                "timestamp": np.frombuffer(self.timestamps, dtype=self.timestamps.typecode).copy(),
+            }
+        columns["trade_id"] = np.array(
+            [trade_ids[start:end] for start, end in zip(offsets, offsets[1:count + 1])], dtype="S"
+        ) if count else np.empty(0, dtype="S1")
+        return columns
+
+    def __extend_index(self, index: Dict, rows, group_ids, timestamps, with_side: bool):
+        order = np.lexsort((timestamps, group_ids))
+        boundaries = np.flatnonzero(np.diff(group_ids[order])) + 1
+        for group in np.split(order, boundaries):
+            if len(group) == 0:
+                continue
+            new_rows = rows[group]
+            first_row = int(new_rows[0])
+            symbol = self.symbols[self.symbol_ids[first_row]]
+            key = (symbol, "buy" if self.sides[first_row] == BUY else "sell") if with_side else symbol
+
+            if key not in index:
+                index[key] = array('I')
+            index_rows = index[key]
+            if not index_rows or self.timestamps[index_rows[-1]] <= self.timestamps[first_row]:
+                index_rows.frombytes(new_rows.astype(index_rows.typecode).tobytes())
+            else:
+                for row in new_rows:
+                    self.__insert_into_index(index, key, int(row))
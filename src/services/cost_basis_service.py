@@ -0,0 +1,175 @@
+import heapq
+import threading
+from collections import deque
+from itertools import count
+from typing import Dict, Optional, Tuple
+from src.models.trade import Trade
+from src.services.pnl_kernel import CLOSE_EPSILON
+
+
+WAC = "wac"
+FIFO = "fifo"
+LIFO = "lifo"
+HIFO = "hifo"
+COST_BASIS_METHODS = (WAC, FIFO, LIFO, HIFO)
+
+
+def check_cost_basis(method: str) -> str:
+    normalized_method = method.lower()
+    if normalized_method not in COST_BASIS_METHODS:
+        raise ValueError(f"Invalid cost basis: {method}. Must be one of {', '.join(COST_BASIS_METHODS)}")
+    return normalized_method
+
+
+class WeightedAverageCostEngine:
+    # The same rules as PnLService, one symbol at a time.
+    def __init__(self):
+        self.quantity = 0.0
+        self.total_cost = 0.0
+        self.realized_pnl = 0.0
+
+    @property
+    def average_price(self) -> float:
+        return self.total_cost / self.quantity if self.quantity > 0 else 0.0
+
+    def apply_trade(self, trade: Trade):
+        if trade.is_buy:
+            self.total_cost += trade.price * trade.quantity
+            self.quantity += trade.quantity
+        elif self.quantity > 0:
+            current_avg_price = self.total_cost / self.quantity
+            self.realized_pnl += (trade.price - current_avg_price) * trade.quantity
+            self.quantity -= trade.quantity
+            self.total_cost = current_avg_price * self.quantity if self.quantity > 0 else 0.0
+
+
+class LotEngine:
+    # Buys open lots of [price, quantity]; sells close them in the order the
+    # subclass picks. A partly closed lot is shrunk in place, so a sell costs
+    # one step per lot it closes plus one for the lot it leaves open.
+    def __init__(self):
+        self.quantity = 0.0
+        self.total_cost = 0.0
+        self.realized_pnl = 0.0
+
+    @property
+    def average_price(self) -> float:
+        return self.total_cost / self.quantity if self.quantity > 0 else 0.0
+
+    def apply_trade(self, trade: Trade):
+        if trade.is_buy:
+            self._open(trade.price, trade.quantity)
+            self.total_cost += trade.price * trade.quantity
+            self.quantity += trade.quantity
+            return
+
+        remaining = trade.quantity
+        while remaining > 0 and self.lots:
+            lot = self._next_lot()
+            # A lot left with a rounding crumb counts as closed.
+            if lot[1] - remaining <= CLOSE_EPSILON * lot[1]:
+                closed = lot[1]
+                self._close_lot()
+            else:
+                closed = remaining
+                lot[1] -= closed
+            self.realized_pnl += (trade.price - lot[0]) * closed
+            self.total_cost -= lot[0] * closed
+            self.quantity -= closed
+            remaining -= closed
+        if not self.lots:
+            # Rounding can leave crumbs of quantity and cost behind once the
+            # last lot is closed.
+            self.quantity = 0.0
+            self.total_cost = 0.0
+
+    def _open(self, price: float, quantity: float):
+        raise NotImplementedError
+
+    def _next_lot(self):
+        raise NotImplementedError
+
+    def _close_lot(self):
+        raise NotImplementedError
+
+
+class FifoEngine(LotEngine):
+    def __init__(self):
+        super().__init__()
+        self.lots = deque()
+
+    def _open(self, price: float, quantity: float):
+        self.lots.append([price, quantity])
+
+    def _next_lot(self):
+        return self.lots[0]
+
+    def _close_lot(self):
+        self.lots.popleft()
+
+
+class LifoEngine(FifoEngine):
+    def _next_lot(self):
+        return self.lots[-1]
+
+    def _close_lot(self):
+        self.lots.pop()
+
+
+class HifoEngine(LotEngine):
+    # A min-heap on negated price; equal prices close in the order they
+    # were bought. The key never changes, so a lot can shrink in place.
+    def __init__(self):
+        super().__init__()
+        self.lots = []
+        self._order = count()
+
+    def _open(self, price: float, quantity: float):
+        heapq.heappush(self.lots, (-price, next(self._order), [price, quantity]))
+
+    def _next_lot(self):
+        return self.lots[0][2]
+
+    def _close_lot(self):
+        heapq.heappop(self.lots)
+
+
+ENGINES = {WAC: WeightedAverageCostEngine, FIFO: FifoEngine, LIFO: LifoEngine, HIFO: HifoEngine}
+
+
+class CostBasisService:
+    # Engines per (symbol, method), built on first use by replaying the
+    # symbol's trades in timestamp order and caught up with the trades added
+    # since on later reads. A backdated trade moves the engine's place in
+    # the history, so the engine is rebuilt. It is recognised by the trade
+    # at the engine's position no longer being the last one it replayed;
+    # a trade at that same timestamp lands after it and is caught up with.
+    def __init__(self, trade_service):
+        self.trade_service = trade_service
+        self._engines: Dict[Tuple[str, str], tuple] = {}
+        self._lock = threading.Lock()
+
+    def get_engine(self, symbol: str, method: str):
+        method = check_cost_basis(method)
+        with self._lock:
+            entry = self._engines.get((symbol, method))
+            if entry is None or (
+                entry[1] > 0 and next(self.trade_service.iter_trades_from(symbol, entry[1] - 1)).sequence != entry[2]
+            ):
+                entry = (ENGINES[method](), 0, None)
+
+            engine, position, last_sequence = entry
+            for trade in self.trade_service.iter_trades_from(symbol, position):
+                engine.apply_trade(trade)
+                position += 1
+                last_sequence = trade.sequence
+            self._engines[(symbol, method)] = (engine, position, last_sequence)
+            return engine
+
+    def replay_engine(self, symbol: str, method: str, end: Optional[str] = None):
+        # A throwaway engine over the symbol's trades up to end, for past
+        # points in time; it is not cached.
+        engine = ENGINES[check_cost_basis(method)]()
+        for trade in self.trade_service.iter_trades_from(symbol, 0, end):
+            engine.apply_trade(trade)
+        return engine
@@ -0,0 +1,175 @@
+import math
+from decimal import Decimal
+from typing import Optional, Sequence, Tuple
+from src.models.trade import Trade
+from src.models.portfolio import FixedPointHolding
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Below this a float times the scale is within a quarter unit of the exact
+# product, so rounding it recovers the integer; larger values go through
+# Decimal. A float, as comparing a float with an int is several times
+# slower.
+FLOAT_EXACT_LIMIT = 2.0 ** 50
+MAX_DECIMALS = 18
+# Scales a float64 holds exactly, so a column's units divide back as the
+# Python integers would.
+FLOAT_EXACT_SCALE = 2 ** 53
+
+
+def divide_rounded(numerator: int, denominator: int) -> int:
+    # Integer division rounded half to even; denominator must be positive.
+    quotient, remainder = divmod(numerator, denominator)
+    doubled = 2 * remainder
+    if doubled > denominator or (doubled == denominator and quotient & 1):
+        quotient += 1
+    return quotient
+
+
+class FixedPoint:
+    # Prices and quantities as integers counting 10**-price_decimals and
+    # 10**-quantity_decimals, and costs (price units times quantity units)
+    # at both scales combined. Python integers never overflow, so costs stay
+    # exact however large they grow. Floats only appear at the edges: a
+    # trade's price and quantity are converted once on the way in, and
+    # results once on the way out.
+    def __init__(self, price_decimals: int = 8, quantity_decimals: int = 8):
+        for decimals in (price_decimals, quantity_decimals):
+            if not 0 <= decimals <= MAX_DECIMALS:
+                raise ValueError(f"Decimals must be between 0 and {MAX_DECIMALS}, got {decimals}")
+        self.price_decimals = price_decimals
+        self.quantity_decimals = quantity_decimals
+        self.price_scale = 10 ** price_decimals
+        self.quantity_scale = 10 ** quantity_decimals
+        self.cost_scale = self.price_scale * self.quantity_scale
+        # Float copies for the conversions, which multiply floats.
+        self._price_factor = float(self.price_scale)
+        self._quantity_factor = float(self.quantity_scale)
+        self._last_trade = (None, 0, 0)
+
+    def __to_units(self, value: float, scale: int, decimals: int, kind: str, strict: bool) -> int:
+        # The slow path: values past FLOAT_EXACT_LIMIT, non-finite ones and
+        # errors.
+        if not math.isfinite(value):
+            raise ValueError(f"{kind} must be a finite number, got {value}")
+        scaled = value * scale
+        if abs(scaled) < FLOAT_EXACT_LIMIT:
+            units = round(scaled)
+            if not strict or units / scale == value:
+                return units
+        else:
+            exact = Decimal(repr(float(value))).scaleb(decimals)
+            units = int(exact.to_integral_value())
+            if not strict or units == exact:
+                return units
+        raise ValueError(f"{kind} {value} has more than {decimals} decimals")
+
+    def price_units(self, price: float, strict: bool = True) -> int:
+        # strict rejects a price with more decimals than the scale; market
+        # prices and computed values are rounded to it instead.
+        scaled = price * self._price_factor
+        if abs(scaled) < FLOAT_EXACT_LIMIT:
+            units = round(scaled)
+            # price is the float nearest a decimal with at most
+            # price_decimals places exactly when the units read back as it.
+            if units / self.price_scale == price or not strict:
+                return units
+        return self.__to_units(price, self.price_scale, self.price_decimals, "Price", strict)
+
+    def quantity_units(self, quantity: float, strict: bool = True) -> int:
+        scaled = quantity * self._quantity_factor
+        if abs(scaled) < FLOAT_EXACT_LIMIT:
+            units = round(scaled)
+            if units / self.quantity_scale == quantity or not strict:
+                return units
+        return self.__to_units(quantity, self.quantity_scale, self.quantity_decimals, "Quantity", strict)
+
+    def price_units_column(self, prices: Sequence[float]) -> Optional["np.ndarray"]:
+        # price_units for a whole column as int64, or None unless every
+        # value takes its fast path and converts exactly; callers then fall
+        # back to the scalar conversions, which raise for the bad value.
+        return self.__column_units(prices, self._price_factor, self.price_scale)
+
+    def quantity_units_column(self, quantities: Sequence[float]) -> Optional["np.ndarray"]:
+        return self.__column_units(quantities, self._quantity_factor, self.quantity_scale)
+
+    def __column_units(self, values, factor: float, scale: int) -> Optional["np.ndarray"]:
+        if np is None or scale > FLOAT_EXACT_SCALE:
+            return None
+        values = np.asarray(values, dtype=np.float64)
+        scaled = values * factor
+        # rint rounds half to even, like round.
+        units = np.rint(scaled)
+        if not ((np.abs(scaled) < FLOAT_EXACT_LIMIT) & (units / scale == values)).all():
+            return None
+        return units.astype(np.int64)
+
+    def trade_units(self, trade: Trade) -> Tuple[int, int]:
+        # A trade's price and quantity units, with the common case of both
+        # converting exactly inlined. The portfolio and the PnL state both
+        # apply every trade, so the last conversion is kept and the second
+        # lookup is an identity check.
+        last = self._last_trade
+        if last[0] is trade:
+            return last[1], last[2]
+        price, quantity = trade.price, trade.quantity
+        price_scaled = price * self._price_factor
+        quantity_scaled = quantity * self._quantity_factor
+        if abs(price_scaled) < FLOAT_EXACT_LIMIT and abs(quantity_scaled) < FLOAT_EXACT_LIMIT:
+            price_units = round(price_scaled)
+            quantity_units = round(quantity_scaled)
+            if price_units / self.price_scale != price or quantity_units / self.quantity_scale != quantity:
+                # Raises for the value with too many decimals.
+                price_units, quantity_units = self.price_units(price), self.quantity_units(quantity)
+        else:
+            price_units, quantity_units = self.price_units(price), self.quantity_units(quantity)
+        self._last_trade = (trade, price_units, quantity_units)
+        return price_units, quantity_units
+
+    def to_quantity(self, quantity_units: int) -> float:
+        return quantity_units / self.quantity_scale
+
+    def to_cost(self, cost_units: int) -> float:
+        return cost_units / self.cost_scale
+
+    def average_price(self, cost_units: int, quantity_units: int) -> float:
+        # One correctly rounded division rather than two.
+        return cost_units / (quantity_units * self.price_scale) if quantity_units > 0 else 0.0
+
+    def holding(self, symbol: str, quantity_units: int, cost_units: int) -> FixedPointHolding:
+        return FixedPointHolding(
+            symbol, quantity_units / self.quantity_scale,
+            cost_units / (quantity_units * self.price_scale) if quantity_units > 0 else 0.0,
+            quantity_units, cost_units
+        )
+
+    def cost_from_float(self, quantity_units: int, average_price: float) -> int:
+        # For holdings that only exist as floats, such as checkpoints: the
+        # nearest cost, not an exact one.
+        return round(average_price * quantity_units * self.price_scale)
+
+    def sold_cost(self, cost_units: int, quantity_units: int, sold_units: int) -> int:
+        # The share of the cost that leaves with a sell at average cost. It
+        # is rounded to a cost unit and subtracted from the cost, so what is
+        # realized and what stays always add up, and selling everything
+        # takes the cost to exactly zero.
+        if sold_units >= quantity_units:
+            return cost_units
+        quotient, remainder = divmod(cost_units * sold_units, quantity_units)
+        doubled = 2 * remainder
+        if doubled > quantity_units or (doubled == quantity_units and quotient & 1):
+            quotient += 1
+        return quotient
+
+    def round_cost(self, cost_units: int) -> float:
+        # A cost or PnL rounded to cents from the exact value, like
+        # round(value, 2) on a float but without the float's error.
+        if self.cost_scale >= 100:
+            cents = divide_rounded(cost_units, self.cost_scale // 100)
+        else:
+            cents = cost_units * (100 // self.cost_scale)
+        return cents / 100
@@ -0,0 +1,205 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterator, Optional
+from src.models.trade import Trade
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+MAGIC = b"LOCHJRN1"
+# The longest trade id and symbol a record holds, in UTF-8 bytes.
+TRADE_ID_BYTES = 32
+SYMBOL_BYTES = 16
+# trade_id, symbol, side (1 = buy, 0 = sell), price, quantity, epoch microseconds
+RECORD = struct.Struct(f"<{TRADE_ID_BYTES}s{SYMBOL_BYTES}sBddq")
+RECORD_DTYPE = np.dtype([
+    ("trade_id", f"S{TRADE_ID_BYTES}"),
+    ("symbol", f"S{SYMBOL_BYTES}"),
+    ("side", "u1"),
+    ("price", "<f8"),
+    ("quantity", "<f8"),
+    ("timestamp", "<i8"),
+]) if np is not None else None
+
+
+class TradeJournalService:
+    def __init__(self, path: str, fsync_every: int = 1000, fsync_interval: float = 1.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+        # Set while records wait for an fsync; the flusher thread then syncs
+        # them within fsync_interval even if no further append arrives.
+        self._unsynced = threading.Event()
+        self._closed = threading.Event()
+        self._flush_thread = None
+
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as journal:
+                journal.write(MAGIC)
+                journal.flush()
+                os.fsync(journal.fileno())
+
+        self.__check_header()
+        # A crash can leave a partially written record at the tail; drop it so
+        # new records stay aligned.
+        self.record_count = (os.path.getsize(path) - len(MAGIC)) // RECORD.size
+        self._file = open(path, "r+b")
+        self._file.truncate(len(MAGIC) + self.record_count * RECORD.size)
+        self._file.seek(0, os.SEEK_END)
+
+    def __check_header(self):
+        with open(self.path, "rb") as journal:
+            if journal.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a trade journal")
+
+    def encode(self, trade: Trade) -> bytes:
+        # The trade's record, for append. Encoding is the one step of an
+        # append that can reject a trade, so callers run it before they
+        # change any state.
+        trade_id = trade.trade_id.encode()
+        symbol = trade.symbol.encode()
+        if len(trade_id) > TRADE_ID_BYTES or len(symbol) > SYMBOL_BYTES:
+            raise ValueError(f"Trade {trade.trade_id} does not fit in a journal record")
+
+        return RECORD.pack(
+            trade_id,
+            symbol,
+            1 if trade.is_buy else 0,
+            trade.price,
+            trade.quantity,
+            trade.timestamp_ns // 1000
+        )
+
+    def __fsync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+        self._unsynced.clear()
+
+    def __flush_loop(self):
+        while self._unsynced.wait() and not self._closed.is_set():
+            with self._lock:
+                due = self._last_fsync + self.fsync_interval
+            if self._closed.wait(max(0.0, due - time.monotonic())):
+                return
+            with self._lock:
+                if self._pending and time.monotonic() >= self._last_fsync + self.fsync_interval:
+                    self.__fsync()
+
+    def __schedule_fsync(self):
+        # Under the lock. A thread left behind by a fork is not alive in the
+        # child, which starts its own.
+        self._unsynced.set()
+        if self._flush_thread is None or not self._flush_thread.is_alive():
+            self._flush_thread = threading.Thread(target=self.__flush_loop, name="journal-flush", daemon=True)
+            self._flush_thread.start()
+
+    def append(self, trade: Trade, record: Optional[bytes] = None) -> int:
+        # Returns the record count including this trade, read under the lock
+        # so concurrent writers each see their own position. record is the
+        # trade's encode(), if the caller has it.
+        if record is None:
+            record = self.encode(trade)
+        with self._lock:
+            # Flushed to the OS at once, so a process crash loses nothing;
+            # the fsync that survives a machine crash is batched.
+            self._file.write(record)
+            self._file.flush()
+            self.record_count += 1
+            self._pending += 1
+            if (
+                self._pending >= self.fsync_every
+                or time.monotonic() - self._last_fsync >= self.fsync_interval
+            ):
+                self.__fsync()
+            else:
+                self.__schedule_fsync()
+            return self.record_count
+
+    def encode_columns(self, columns: Dict) -> "np.ndarray":
+        # Trade columns (see read_columns) as a block of records, for
+        # append_columns.
+        records = np.empty(len(columns["price"]), dtype=RECORD_DTYPE)
+        for name in RECORD_DTYPE.names:
+            if RECORD_DTYPE[name].kind == "S" and len(records):
+                too_long = np.flatnonzero(np.char.str_len(columns[name]) > RECORD_DTYPE[name].itemsize)
+                if len(too_long):
+                    raise ValueError(f"Trade {columns['trade_id'][too_long[0]].decode()} does not fit in a journal record")
+            records[name] = columns[name]
+        return records
+
+    def append_columns(self, columns: Dict, records: Optional["np.ndarray"] = None) -> int:
+        # Written as one block. records is the columns' encode_columns(), if
+        # the caller has it.
+        if records is None:
+            records = self.encode_columns(columns)
+        with self._lock:
+            self._file.write(records.tobytes())
+            self.record_count += len(records)
+            self.__fsync()
+            return self.record_count
+
+    def flush(self):
+        with self._lock:
+            if self._pending:
+                self.__fsync()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self.__fsync()
+                self._file.close()
+            self._closed.set()
+            self._unsynced.set()
+
+    def iter_trades(self, start: int = 0) -> Iterator[Trade]:
+        self.flush()
+        end = len(MAGIC) + self.record_count * RECORD.size
+        offset = len(MAGIC) + start * RECORD.size
+        if offset >= end:
+            return
+
+        with open(self.path, "rb") as journal:
+            with mmap.mmap(journal.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                records = memoryview(mapped)[offset:end]
+                try:
+                    for trade_id, symbol, side, price, quantity, micros in RECORD.iter_unpack(records):
+                        yield Trade(
+                            trade_id=trade_id.rstrip(b"\0").decode(),
+                            symbol=symbol.rstrip(b"\0").decode(),
+                            side="buy" if side else "sell",
+                            price=price,
+                            quantity=quantity,
+                            timestamp=micros * 1000
+                        )
+                finally:
+                    records.release()
+
+    def read_columns(self, start: int = 0) -> Optional[Dict]:
+        if np is None:
+            return None
+
+        self.flush()
+        count = self.record_count - start
+        if count <= 0:
+            return {name: np.empty(0, dtype=RECORD_DTYPE[name]) for name in RECORD_DTYPE.names}
+
+        with open(self.path, "rb") as journal:
+            with mmap.mmap(journal.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                records = np.frombuffer(
+                    mapped, dtype=RECORD_DTYPE, count=count, offset=len(MAGIC) + start * RECORD.size
+                )
+                # Copy each field out so the map can be closed.
+                columns = {name: np.ascontiguousarray(records[name]) for name in RECORD_DTYPE.names}
+                del records
+        return columns
@@ -0,0 +1,40 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List
+from zlib import crc32
+
+
+class SymbolLockService:
+    # Each symbol maps to one of a fixed set of locks. Several stripes are
+    # always taken in stripe order, so batches and snapshots cannot deadlock
+    # with single-symbol writers.
+    def __init__(self, stripes: int = 64):
+        self.locks: List[threading.Lock] = [threading.Lock() for _ in range(stripes)]
+
+    def __stripe(self, symbol: str) -> int:
+        # crc32 rather than hash() so the mapping is stable across processes.
+        return crc32(symbol.encode()) % len(self.locks)
+
+    def lock_for(self, symbol: str) -> threading.Lock:
+        return self.locks[self.__stripe(symbol)]
+
+    @contextmanager
+    def lock_symbols(self, symbols: Iterable[str]):
+        stripes = sorted({self.__stripe(symbol) for symbol in symbols})
+        for stripe in stripes:
+            self.locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self.locks[stripe].release()
+
+    @contextmanager
+    def lock_all(self):
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
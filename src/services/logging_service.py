@@ -0,0 +1,32 @@
+import logging
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Optional, TextIO
+
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def configure_logging(level: str = "INFO", stream: Optional[TextIO] = None) -> QueueListener:
+    # Request threads only put records on a queue; a listener thread formats
+    # and writes them, so a slow terminal or log pipe never stalls a trade.
+    # The caller stops the returned listener at exit to flush what is queued.
+    log_queue = SimpleQueue()
+    handler = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    root.addHandler(QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+
+def restart_listener(listener: QueueListener) -> QueueListener:
+    # A forked worker inherits the queue and handlers but not the listener
+    # thread; without a new one its records would queue up unwritten.
+    restarted = QueueListener(listener.queue, *listener.handlers, respect_handler_level=listener.respect_handler_level)
+    restarted.start()
+    return restarted
@@ -0,0 +1,179 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Upper bounds in seconds, from 50 µs for a cached read to 10 s for a full
+# replay of a large book.
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+CALL_DURATION = "call_duration_seconds"
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# A collector returns (name, type, help, samples), samples being
+# (labels, value) pairs; it is called on every scrape.
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = ",".join(f'{key}="{escape_label(value)}"' for key, value in labels)
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsService:
+    # Latency histograms recorded on the request path, plus collectors that
+    # read counters other services already keep (trade counts, price cache
+    # statistics) when /metrics is scraped, so those cost nothing per trade.
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # name -> labels -> [count per bucket..., +Inf count, sum]
+        self._histograms: Dict[str, Dict[Tuple, list]] = {}
+        self._help: Dict[str, str] = {
+            CALL_DURATION: "Latency of instrumented manager and service calls"
+        }
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def __series(self, name: str, labels: Dict[str, str]) -> list:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            return values
+
+    def __record(self, values: list, seconds: float):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            values[index] += 1
+            values[-1] += seconds
+
+    def observe(self, name: str, seconds: float, **labels):
+        self.__record(self.__series(name, labels), seconds)
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def instrument(self, target, component: str, *method_names: str):
+        # Replaces the named methods on this one instance with timed
+        # wrappers, recorded as call_duration_seconds{component, call}.
+        # Calls that raise are timed too.
+        for method_name in method_names:
+            method = getattr(target, method_name)
+            setattr(target, method_name, self.__timed_method(method, component, method_name))
+
+    def __timed_method(self, method, component: str, call: str):
+        # The series is looked up once here rather than on every call.
+        values = self.__series(CALL_DURATION, {"component": component, "call": call})
+        record = self.__record
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def timed_coroutine(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    record(values, time.perf_counter() - started)
+            return timed_coroutine
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(values, time.perf_counter() - started)
+        return timed
+
+    def register_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def get_histogram(self, name: str, **labels) -> Optional[Dict]:
+        with self._lock:
+            values = self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+            if values is None:
+                return None
+            return {"count": sum(values[:-1]), "sum": values[-1], "buckets": list(values[:-1])}
+
+    def render(self) -> str:
+        # The Prometheus text exposition format, version 0.0.4.
+        with self._lock:
+            histograms = {
+                name: {labels: list(values) for labels, values in series.items()}
+                for name, series in self._histograms.items()
+            }
+
+        lines = []
+        bounds = [format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for name in sorted(histograms):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, values in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(bounds, values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(values[-1])}")
+                lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{format_labels(sorted(labels.items()))} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def trade_count_collector(trade_service) -> Collector:
+    def collect():
+        yield "trades_total", "counter", "Trades in the book per symbol", [
+            ({"symbol": symbol}, trade_service.get_trade_count(symbol))
+            for symbol in trade_service.get_symbols()
+        ]
+    return collect
+
+
+def price_cache_collector(price_service) -> Collector:
+    def collect():
+        stats = price_service.get_cache_stats()
+        yield "price_cache_lookups_total", "counter", "Price cache lookups by outcome", [
+            ({"result": "hit"}, stats["hits"]),
+            ({"result": "stale_hit"}, stats["stale_hits"]),
+            ({"result": "miss"}, stats["misses"]),
+            ({"result": "unknown"}, stats["unknown_hits"]),
+        ]
+        yield "price_cache_hit_ratio", "gauge", "Share of lookups served from the cache, stale or fresh", [
+            ({}, stats["hit_ratio"])
+        ]
+        yield "price_cache_refreshes_total", "counter", "Background refreshes of stale prices", [
+            ({}, stats["refreshes"])
+        ]
+        yield "price_cache_symbols", "gauge", "Symbols with a cached price", [({}, stats["cached_symbols"])]
+    return collect
@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Sequence, Tuple
+from src.services.pnl_kernel import replay_weighted_average_cost
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Below this many trades the pool costs more than it saves.
+PARALLEL_MIN_ROWS = 50_000
+# Chunks per worker, so one slow chunk does not leave the others idle.
+CHUNKS_PER_WORKER = 4
+
+
+def _views(buffer, group_count: int, row_count: int):
+    # Layout of the shared block: group offsets (int64, group_count + 1),
+    # current prices (float64, group_count), trade prices and quantities
+    # (float64, row_count each), then buy flags (uint8, row_count).
+    sizes = [(group_count + 1, 'q'), (group_count, 'd'), (row_count, 'd'), (row_count, 'd'), (row_count, 'B')]
+    views = []
+    offset = 0
+    for count, typecode in sizes:
+        width = array(typecode).itemsize
+        if np is not None:
+            view = np.ndarray((count,), dtype=typecode, buffer=buffer, offset=offset)
+        else:
+            view = memoryview(buffer)[offset:offset + count * width].cast(typecode)
+        views.append(view)
+        offset += count * width
+    if np is not None:
+        views[4] = views[4].view(bool)
+    return views
+
+
+def _block_size(group_count: int, row_count: int) -> int:
+    return max(1, 8 * (group_count + 1) + 8 * group_count + 17 * row_count)
+
+
+def _revalue(groups) -> Tuple[List[Tuple[float, float, float, float]], float, float]:
+    # groups yields (is_buy, prices, quantities, current_price) per group.
+    results = []
+    total_unrealized_pnl = 0.0
+    total_realized_pnl = 0.0
+    for is_buy, prices, quantities, current_price in groups:
+        quantity, total_cost, realized_pnl = replay_weighted_average_cost(is_buy, prices, quantities)
+        # Rounded per group, as PnLManager does per symbol, so the reduced
+        # totals match the serial summary.
+        average_price = total_cost / quantity if quantity > 0 else 0.0
+        unrealized_pnl = round((float(current_price) - average_price) * quantity, 2)
+        realized_pnl = round(float(realized_pnl), 2)
+        results.append((float(quantity), float(total_cost), realized_pnl, unrealized_pnl))
+        total_unrealized_pnl += unrealized_pnl
+        total_realized_pnl += realized_pnl
+    return results, total_unrealized_pnl, total_realized_pnl
+
+
+def _revalue_groups(buffer, group_count: int, row_count: int, first_group: int, last_group: int):
+    offsets, current_prices, prices, quantities, is_buy = _views(buffer, group_count, row_count)
+    bounds = [(int(offsets[group]), int(offsets[group + 1])) for group in range(first_group, last_group)]
+    return _revalue(
+        (is_buy[low:high], prices[low:high], quantities[low:high], current_prices[group])
+        for group, (low, high) in zip(range(first_group, last_group), bounds)
+    )
+
+
+def _revalue_chunk(block_name: str, group_count: int, row_count: int, first_group: int, last_group: int):
+    # Runs in a pool worker: attach to the parent's block and replay a
+    # contiguous range of groups. Only the small per-group results are
+    # pickled back.
+    block = SharedMemory(name=block_name)
+    try:
+        return (first_group,) + _revalue_groups(block.buf, group_count, row_count, first_group, last_group)
+    finally:
+        block.close()
+
+
+class ParallelPnLService:
+    # Replays many trade histories ("groups": a symbol, or an account's
+    # symbol) on a process pool. The columns are packed once into a shared
+    # memory block that workers read in place, instead of pickling Trade
+    # objects to every worker.
+    def __init__(self, workers: Optional[int] = None, min_rows: int = PARALLEL_MIN_ROWS):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.min_rows = min_rows
+        self._executor = None
+
+    def __get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # By the time the pool starts, the process runs the log listener,
+            # the price refresh thread and the web server's threads, and a
+            # fork would copy any lock one of them holds into the worker.
+            # Workers are forked instead from a single-threaded fork server,
+            # which imports only this module (not the application's main
+            # module), so starting them stays cheap. Without one, spawn.
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    def __pack(self, block: SharedMemory, columns: Sequence[Tuple], current_prices: Sequence[float], row_count: int):
+        offsets, prices_now, prices, quantities, is_buy = _views(block.buf, len(columns), row_count)
+        offsets[0] = 0
+        position = 0
+        for group, (group_is_buy, group_prices, group_quantities) in enumerate(columns):
+            end = position + len(group_prices)
+            if np is not None:
+                is_buy[position:end] = group_is_buy
+                prices[position:end] = group_prices
+                quantities[position:end] = group_quantities
+            else:
+                is_buy[position:end] = array('B', [1 if buy else 0 for buy in group_is_buy])
+                prices[position:end] = array('d', group_prices)
+                quantities[position:end] = array('d', group_quantities)
+            prices_now[group] = current_prices[group]
+            position = end
+            offsets[group + 1] = end
+
+    def __chunks(self, columns: Sequence[Tuple], row_count: int) -> List[Tuple[int, int]]:
+        # Contiguous group ranges of roughly equal trade counts.
+        target = max(1, row_count // (self.workers * CHUNKS_PER_WORKER))
+        chunks = []
+        first_group = 0
+        rows = 0
+        for group, group_columns in enumerate(columns):
+            rows += len(group_columns[1])
+            if rows >= target:
+                chunks.append((first_group, group + 1))
+                first_group = group + 1
+                rows = 0
+        if first_group < len(columns):
+            chunks.append((first_group, len(columns)))
+        return chunks
+
+    def revalue(
+        self, columns: Sequence[Tuple], current_prices: Sequence[float]
+    ) -> Tuple[List[Tuple[float, float, float, float]], float, float]:
+        # columns[i] is (is_buy, prices, quantities) for group i. Returns
+        # (quantity, total_cost, realized_pnl, unrealized_pnl) per group and
+        # the reduced unrealized and realized totals.
+        row_count = sum(len(group_columns[1]) for group_columns in columns)
+        if self.workers <= 1 or row_count < self.min_rows:
+            return _revalue(
+                (is_buy, prices, quantities, current_price)
+                for (is_buy, prices, quantities), current_price in zip(columns, current_prices)
+            )
+
+        block = SharedMemory(create=True, size=_block_size(len(columns), row_count))
+        try:
+            self.__pack(block, columns, current_prices, row_count)
+            executor = self.__get_executor()
+            futures = [
+                executor.submit(_revalue_chunk, block.name, len(columns), row_count, first_group, last_group)
+                for first_group, last_group in self.__chunks(columns, row_count)
+            ]
+            # Chunks are contiguous and submitted in order, so their results
+            # concatenate back into group order.
+            partials = [future.result() for future in futures]
+        finally:
+            block.close()
+            block.unlink()
+
+        results = []
+        total_unrealized_pnl = 0.0
+        total_realized_pnl = 0.0
+        for _, group_results, unrealized_pnl, realized_pnl in partials:
+            results.extend(group_results)
+            total_unrealized_pnl += unrealized_pnl
+            total_realized_pnl += realized_pnl
+        return results, total_unrealized_pnl, total_realized_pnl
+
+    def after_fork(self):
+        # A pool started before a fork belongs to the parent; a forked
+        # worker starts its own on first use.
+        self._executor = None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,201 @@
+import math
+from typing import Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Shorter histories are cheaper to replay in plain Python than to convert.
+VECTORIZE_THRESHOLD = 64
+CLOSE_EPSILON = 1e-12
+
+
+def replay_weighted_average_cost_scalar(
+    is_buy: Sequence[bool],
+    prices: Sequence[float],
+    quantities: Sequence[float],
+    quantity: float = 0.0,
+    total_cost: float = 0.0,
+    realized_pnl: float = 0.0,
+) -> Tuple[float, float, float]:
+    for buy, price, trade_quantity in zip(is_buy, prices, quantities):
+        if buy:
+            total_cost += price * trade_quantity
+            quantity += trade_quantity
+        elif quantity > 0:
+            current_avg_price = total_cost / quantity
+            realized_pnl += (price - current_avg_price) * trade_quantity
+            quantity -= trade_quantity
+            total_cost = current_avg_price * quantity if quantity > 0 else 0
+
+    return quantity, total_cost, realized_pnl
+
+
+def replay_weighted_average_cost(
+    is_buy: Sequence[bool],
+    prices: Sequence[float],
+    quantities: Sequence[float],
+    quantity: float = 0.0,
+    total_cost: float = 0.0,
+    realized_pnl: float = 0.0,
+) -> Tuple[float, float, float]:
+    if np is None or len(prices) < VECTORIZE_THRESHOLD:
+        return replay_weighted_average_cost_scalar(
+            is_buy, prices, quantities, quantity, total_cost, realized_pnl
+        )
+
+    is_buy = np.asarray(is_buy, dtype=bool)
+    prices = np.asarray(prices, dtype=np.float64)
+    quantities = np.asarray(quantities, dtype=np.float64)
+    sells = ~is_buy
+
+    signed = np.where(is_buy, quantities, -quantities)
+    quantity_after = quantity + np.cumsum(signed)
+    quantity_before = quantity_after - signed
+
+    # Sells from an empty position and oversells have special cases in the
+    # scalar replay, which is exact for them.
+    if np.any(quantity_before[sells] <= 0) or np.any(
+        quantity_after[sells] < -CLOSE_EPSILON * quantity_before[sells]
+    ):
+        return replay_weighted_average_cost_scalar(
+            is_buy.tolist(), prices.tolist(), quantities.tolist(), quantity, total_cost, realized_pnl
+        )
+
+    # A sell takes its units out at the current average price and leaves the
+    # average unchanged, so the cost of everything sold is the opening cost
+    # plus every buy minus the closing cost. Only the closing average price is
+    # needed: each buy pulls the average towards its own price, keeping a
+    # quantity_before / quantity_after share of the old average, so the
+    # closing average weights every buy by the shares kept after it.
+    kept_share = np.ones(len(prices))
+    np.divide(quantity_before, quantity_after, out=kept_share, where=is_buy)
+    kept_after = np.append(np.cumprod(kept_share[::-1])[::-1][1:], 1.0)
+
+    opening_avg_price = total_cost / quantity if quantity > 0 else 0.0
+    closing_avg_price = opening_avg_price * kept_after[0] * kept_share[0] + np.sum(
+        np.where(is_buy, (1.0 - kept_share) * prices, 0.0) * kept_after
+    )
+
+    closing_quantity = float(quantity_after[-1])
+    closing_cost = closing_avg_price * closing_quantity if closing_quantity > 0 else 0.0
+
+    sold_cost = total_cost + np.sum(prices[is_buy] * quantities[is_buy]) - closing_cost
+    realized_pnl += np.sum(prices[sells] * quantities[sells]) - sold_cost
+
+    return closing_quantity, float(closing_cost), float(realized_pnl)
+
+
+def first_rejected_sell(
+    is_buy: Sequence[bool], quantities: Sequence[float], quantity: float = 0.0
+) -> Optional[Tuple[int, float]]:
+    # The first sell the portfolio would reject, with the quantity held
+    # before it: a sell with nothing held, or of more than is held. Starts
+    # from the given quantity held.
+    if np is None or len(quantities) < VECTORIZE_THRESHOLD:
+        for position, (buy, trade_quantity) in enumerate(zip(is_buy, quantities)):
+            if buy:
+                quantity += trade_quantity
+            elif quantity == 0 or trade_quantity > quantity:
+                return position, quantity
+            else:
+                quantity -= trade_quantity
+        return None
+
+    is_buy = np.asarray(is_buy, dtype=bool)
+    quantities = np.asarray(quantities, dtype=np.float64)
+    # Running sums accumulate left to right, so each one is the float the
+    # scalar loop reaches, up to the first rejected sell.
+    held = np.cumsum(np.concatenate(([quantity], np.where(is_buy, quantities, -quantities))))[:-1]
+    rejected = np.flatnonzero(~is_buy & ((held == 0) | (quantities > held)))
+    if len(rejected) == 0:
+        return None
+    return int(rejected[0]), float(held[rejected[0]])
+
+
+def revalue_scenarios_scalar(
+    quantities: Sequence[float],
+    average_prices: Sequence[float],
+    values: Sequence[Sequence[float]],
+    base_prices: Optional[Sequence[float]] = None,
+    unchanged_pnl: float = 0.0,
+    realized_pnl: float = 0.0,
+    detail: bool = False,
+):
+    unrealized_pnl, total_pnl, by_symbol = [], [], []
+    for row in values:
+        if not isinstance(row, (list, tuple)) or len(row) != len(quantities):
+            raise ValueError(f"Every scenario needs {len(quantities)} values, one per symbol")
+        holdings_pnl = []
+        for position, value in enumerate(row):
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError("Scenarios must be a matrix of numbers, one row per scenario")
+            if not math.isfinite(value):
+                raise ValueError("Scenario values must be finite numbers")
+            price = base_prices[position] * (1.0 + value) if base_prices is not None else value
+            if price < 0:
+                raise ValueError("Scenario prices cannot be negative")
+            holdings_pnl.append((price - average_prices[position]) * quantities[position])
+        unrealized_pnl.append(round(sum(holdings_pnl) + unchanged_pnl, 2))
+        total_pnl.append(round(sum(holdings_pnl) + unchanged_pnl + realized_pnl, 2))
+        if detail:
+            by_symbol.append([round(value, 2) for value in holdings_pnl])
+    return unrealized_pnl, total_pnl, by_symbol if detail else None
+
+
+def revalue_scenarios(
+    quantities: Sequence[float],
+    average_prices: Sequence[float],
+    values: Sequence[Sequence[float]],
+    base_prices: Optional[Sequence[float]] = None,
+    unchanged_pnl: float = 0.0,
+    realized_pnl: float = 0.0,
+    detail: bool = False,
+):
+    # Unrealized and total PnL per scenario, and with detail the unrealized
+    # PnL per symbol too, rounded to cents like the PnL DTOs. values has one
+    # row per scenario and one column per symbol: prices, or with
+    # base_prices, shocks to them (base * (1 + shock)). unchanged_pnl is the
+    # unrealized PnL of the holdings no scenario moves.
+    if np is None:
+        return revalue_scenarios_scalar(
+            quantities, average_prices, values, base_prices, unchanged_pnl, realized_pnl, detail
+        )
+
+    try:
+        values = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("Scenarios must be a matrix of numbers, one row per scenario")
+    if values.ndim != 2 or values.shape[1] != len(quantities):
+        raise ValueError(f"Every scenario needs {len(quantities)} values, one per symbol")
+    if not np.isfinite(values).all():
+        raise ValueError("Scenario values must be finite numbers")
+    if (values < (-1.0 if base_prices is not None else 0.0)).any():
+        raise ValueError("Scenario prices cannot be negative")
+
+    quantities = np.asarray(quantities, dtype=np.float64)
+    average_prices = np.asarray(average_prices, dtype=np.float64)
+    # (price - average) * quantity, with price = base * (1 + shock), is
+    # shock * base * quantity plus the holding's PnL at the base price, so a
+    # shock matrix is weighted as it is, without building the price matrix.
+    if base_prices is not None:
+        base_prices = np.asarray(base_prices, dtype=np.float64)
+        weights = base_prices * quantities
+        base_pnl = (base_prices - average_prices) * quantities
+    else:
+        weights = quantities
+        base_pnl = -average_prices * quantities
+
+    by_symbol = None
+    if detail:
+        by_symbol = values * weights
+        by_symbol += base_pnl
+        unrealized_pnl = by_symbol.sum(axis=1) + unchanged_pnl
+        np.round(by_symbol, 2, out=by_symbol)
+    else:
+        unrealized_pnl = values @ weights + (base_pnl.sum() + unchanged_pnl)
+    return np.round(unrealized_pnl, 2), np.round(unrealized_pnl + realized_pnl, 2), by_symbol
@@ -0,0 +1,228 @@
+import threading
+from typing import Dict, List, Optional, Sequence
+from src.models.trade import Trade
+from src.models.portfolio import Portfolio
+from src.services.fixed_point import FixedPoint
+from src.services.pnl_kernel import replay_weighted_average_cost
+
+
+class PnLService:
+    # Set by FixedPointPnLService; None means float arithmetic.
+    fixed_point: Optional[FixedPoint] = None
+
+    def __init__(self):
+        self.realized_pnl = {}
+        # Bumped on every change; symbol_versions holds the version of each
+        # symbol's last change so readers can cache per symbol.
+        self.version = 0
+        self.symbol_versions: Dict[str, int] = {}
+        # Symbol state is guarded by the caller's per-symbol lock; the global
+        # version counter is shared across symbols and needs its own.
+        self._version_lock = threading.Lock()
+
+    def _touch(self, symbol: str):
+        with self._version_lock:
+            self.version += 1
+            self.symbol_versions[symbol] = self.version
+
+    def __apply_buy_trade(self, state: Dict, trade: Trade):
+        state["total_cost"] += trade.price * trade.quantity
+        state["quantity"] += trade.quantity
+
+    def __apply_sell_trade(self, state: Dict, trade: Trade):
+        if state["quantity"] <= 0:
+            return
+
+        current_avg_price = state["total_cost"] / state["quantity"]
+        state["realized_pnl"] += (trade.price - current_avg_price) * trade.quantity
+
+        state["quantity"] -= trade.quantity
+        if state["quantity"] > 0:
+            state["total_cost"] = current_avg_price * state["quantity"]
+        else:
+            state["total_cost"] = 0
+
+    def empty_copy(self) -> "PnLService":
+        # An empty service doing the same arithmetic, for scratch replays.
+        return PnLService()
+
+    def add_trade(self, trade: Trade):
+        if trade.symbol not in self.realized_pnl:
+            self.realized_pnl[trade.symbol] = {
+                "quantity": 0,
+                "total_cost": 0,
+                "realized_pnl": 0
+            }
+        state = self.realized_pnl[trade.symbol]
+
+        if trade.is_buy:
+            self.__apply_buy_trade(state, trade)
+        else:
+            self.__apply_sell_trade(state, trade)
+        self._touch(trade.symbol)
+
+    def clear(self):
+        for symbol in list(self.realized_pnl):
+            self._touch(symbol)
+        self.realized_pnl = {}
+
+    def load_state(self, state: Dict):
+        self.clear()
+        for symbol, data in state.items():
+            self.restore_symbol_state(symbol, data)
+
+    def restore_symbol_state(self, symbol: str, data: Dict):
+        # Takes an entry of get_state() or get_symbol_state().
+        self.set_symbol_state(symbol, data["quantity"], data["total_cost"], data["realized_pnl"])
+
+    def get_symbol_state(self, symbol: str) -> Optional[Dict]:
+        state = self.realized_pnl.get(symbol)
+        return dict(state) if state is not None else None
+
+    def replay_columns(self, symbol: str, is_buy: Sequence[bool], prices: Sequence[float], quantities: Sequence[float]):
+        # Replaces the symbol's state with that of its trade columns.
+        self.set_symbol_state(symbol, *replay_weighted_average_cost(is_buy, prices, quantities))
+
+    def extend_columns(self, symbol: str, is_buy: Sequence[bool], prices: Sequence[float], quantities: Sequence[float]):
+        # Applies trade columns on top of the symbol's state.
+        state = self.realized_pnl.get(symbol)
+        opening = () if state is None else (state["quantity"], state["total_cost"], state["realized_pnl"])
+        self.set_symbol_state(symbol, *replay_weighted_average_cost(is_buy, prices, quantities, *opening))
+
+    def get_holding(self, symbol: str) -> Optional[Portfolio]:
+        # The holding the symbol's state implies, which is the portfolio's
+        # holding as both follow weighted average cost.
+        state = self.realized_pnl.get(symbol)
+        if state is None or state["quantity"] <= 0:
+            return None
+        return Portfolio(symbol, state["quantity"], state["total_cost"] / state["quantity"])
+
+    def set_symbol_state(self, symbol: str, quantity: float, total_cost: float, realized_pnl: float):
+        self.realized_pnl[symbol] = {
+            "quantity": quantity,
+            "total_cost": total_cost,
+            "realized_pnl": realized_pnl
+        }
+        self._touch(symbol)
+
+    def get_symbol_version(self, symbol: str) -> int:
+        return self.symbol_versions.get(symbol, 0)
+
+    def has_symbol(self, symbol: str) -> bool:
+        return symbol in self.realized_pnl
+
+    def get_realized_pnl(self, symbol: str) -> float:
+        if symbol not in self.realized_pnl:
+            return 0.0
+        return self.realized_pnl[symbol]["realized_pnl"]
+
+    def get_state(self) -> Dict:
+        return self.realized_pnl
+
+
+class FixedPointPnLService(PnLService):
+    # The same weighted average cost rules in integer units (see
+    # FixedPoint): the cost a sell removes is rounded to a cost unit, and
+    # what it realizes is the exact remainder, so realized PnL and the cost
+    # still held always add up to what was paid.
+    def __init__(self, fixed_point: FixedPoint):
+        super().__init__()
+        self.fixed_point = fixed_point
+        # symbol -> [quantity, cost, realized PnL] in units
+        self.units: Dict[str, List[int]] = {}
+
+    def empty_copy(self) -> "FixedPointPnLService":
+        return FixedPointPnLService(self.fixed_point)
+
+    def __apply(self, state: List[int], is_buy: bool, price_units: int, quantity_units: int):
+        if is_buy:
+            state[0] += quantity_units
+            state[1] += price_units * quantity_units
+        elif state[0] > 0:
+            sold_cost = self.fixed_point.sold_cost(state[1], state[0], quantity_units)
+            state[2] += price_units * quantity_units - sold_cost
+            state[0] -= quantity_units
+            state[1] -= sold_cost
+
+    def add_trade(self, trade: Trade):
+        state = self.units.get(trade.symbol)
+        if state is None:
+            state = self.units[trade.symbol] = [0, 0, 0]
+        price_units, quantity_units = self.fixed_point.trade_units(trade)
+        # __apply, inlined as it runs on every trade.
+        if trade.is_buy:
+            state[0] += quantity_units
+            state[1] += price_units * quantity_units
+        elif state[0] > 0:
+            sold_cost = self.fixed_point.sold_cost(state[1], state[0], quantity_units)
+            state[2] += price_units * quantity_units - sold_cost
+            state[0] -= quantity_units
+            state[1] -= sold_cost
+        self._touch(trade.symbol)
+
+    def replay_columns(self, symbol: str, is_buy: Sequence[bool], prices: Sequence[float], quantities: Sequence[float]):
+        self.units[symbol] = [0, 0, 0]
+        self.extend_columns(symbol, is_buy, prices, quantities)
+
+    def extend_columns(self, symbol: str, is_buy: Sequence[bool], prices: Sequence[float], quantities: Sequence[float]):
+        fixed_point = self.fixed_point
+        state = self.units.setdefault(symbol, [0, 0, 0])
+        for buy, price, quantity in zip(is_buy, prices, quantities):
+            self.__apply(state, buy, fixed_point.price_units(float(price)), fixed_point.quantity_units(float(quantity)))
+        self._touch(symbol)
+
+    def clear(self):
+        for symbol in list(self.units):
+            self._touch(symbol)
+        self.units = {}
+
+    def set_symbol_state(self, symbol: str, quantity: float, total_cost: float, realized_pnl: float):
+        # From floats, so the nearest units rather than exact ones.
+        fixed_point = self.fixed_point
+        self.units[symbol] = [
+            fixed_point.quantity_units(quantity, strict=False),
+            round(total_cost * fixed_point.cost_scale),
+            round(realized_pnl * fixed_point.cost_scale)
+        ]
+        self._touch(symbol)
+
+    def restore_symbol_state(self, symbol: str, data: Dict):
+        if "units" in data:
+            self.units[symbol] = list(data["units"])
+            self._touch(symbol)
+        else:
+            super().restore_symbol_state(symbol, data)
+
+    def get_symbol_state(self, symbol: str) -> Optional[Dict]:
+        state = self.units.get(symbol)
+        if state is None:
+            return None
+        fixed_point = self.fixed_point
+        return {
+            "quantity": fixed_point.to_quantity(state[0]),
+            "total_cost": fixed_point.to_cost(state[1]),
+            "realized_pnl": fixed_point.to_cost(state[2]),
+            "units": list(state)
+        }
+
+    def get_state(self) -> Dict:
+        # A copy in float form with the units alongside, unlike the float
+        # service's live dict.
+        return {symbol: self.get_symbol_state(symbol) for symbol in list(self.units)}
+
+    def has_symbol(self, symbol: str) -> bool:
+        return symbol in self.units
+
+    def get_realized_pnl(self, symbol: str) -> float:
+        state = self.units.get(symbol)
+        return self.fixed_point.to_cost(state[2]) if state is not None else 0.0
+
+    def get_realized_pnl_units(self, symbol: str) -> int:
+        state = self.units.get(symbol)
+        return state[2] if state is not None else 0
+
+    def get_holding(self, symbol: str) -> Optional[Portfolio]:
+        state = self.units.get(symbol)
+        if state is None or state[0] <= 0:
+            return None
+        return self.fixed_point.holding(symbol, state[0], state[1])
@@ -1,32 +1,51 @@
-from typing import Dict
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
 from src.models.trade import Trade
+from src.models.portfolio import Portfolio, FixedPointHolding
+from src.services.fixed_point import FixedPoint
+from src.services.pnl_kernel import first_rejected_sell
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+logger = logging.getLogger(__name__)
+
+# Running quantities in units below this fit an int64.
+INT64_LIMIT = 2.0 ** 62
 
 
 class PortfolioService:
+    # Set by FixedPointPortfolioService; None means float arithmetic.
+    fixed_point: Optional[FixedPoint] = None
+
     def __init__(self):
-        self.portfolio = {}
+        self.portfolio: Dict[str, Portfolio] = {}
+
+    def empty_copy(self) -> "PortfolioService":
+        # An empty service doing the same arithmetic, for scratch replays.
+        return PortfolioService()
 
     def __add_buy_trade(self, trade: Trade):
-        if trade.symbol not in self.portfolio:
-            self.portfolio[trade.symbol] = {
-                "quantity": trade.quantity,
-                "average_price": trade.price
-            }
+        holding = self.portfolio.get(trade.symbol)
+        if holding is None:
+            self.portfolio[trade.symbol] = Portfolio(trade.symbol, trade.quantity, trade.price)
         else:
-            current_quantity = self.portfolio[trade.symbol]["quantity"]
-            current_avg_price = self.portfolio[trade.symbol]["average_price"]
-            
-            total_cost = (current_avg_price * current_quantity) + (trade.price * trade.quantity)
-            new_quantity = current_quantity + trade.quantity
+            total_cost = (holding.average_price * holding.quantity) + (trade.price * trade.quantity)
+            new_quantity = holding.quantity + trade.quantity
             
-            self.portfolio[trade.symbol]["quantity"] = new_quantity
-            self.portfolio[trade.symbol]["average_price"] = total_cost / new_quantity
+            # Holdings are replaced rather than mutated so a concurrent reader
+            # never sees the new quantity next to the old average price.
+            self.portfolio[trade.symbol] = Portfolio(trade.symbol, new_quantity, total_cost / new_quantity)
 
     def __add_sell_trade(self, trade: Trade):
-        if trade.symbol not in self.portfolio:
+        holding = self.portfolio.get(trade.symbol)
+        if holding is None:
             raise ValueError(f"Cannot sell {trade.symbol}: No holdings found in portfolio")
         
-        current_quantity = self.portfolio[trade.symbol]["quantity"]
+        current_quantity = holding.quantity
         
         if trade.quantity > current_quantity:
             raise ValueError(f"Cannot sell {trade.quantity} {trade.symbol}: Only {current_quantity} available")
@@ -36,22 +55,226 @@ class PortfolioService:
         if new_quantity == 0:
             del self.portfolio[trade.symbol]
         else:
-            self.portfolio[trade.symbol]["quantity"] = new_quantity
+            self.portfolio[trade.symbol] = Portfolio(trade.symbol, new_quantity, holding.average_price)
 
     def add_trade(self, trade: Trade):
-        print(f"Adding trade: {trade}")
-        
-        if trade.side.lower() == "buy":
+        logger.debug("Adding trade: %s", trade)
+        self.apply_trade(trade)
+
+    def apply_trade(self, trade: Trade):
+        if trade.is_buy:
             self.__add_buy_trade(trade)
-        elif trade.side.lower() == "sell":
-            self.__add_sell_trade(trade)
         else:
-            raise ValueError(f"Invalid trade side: {trade.side}. Must be 'buy' or 'sell'")
+            self.__add_sell_trade(trade)
+
+    def check_trades(self, trades: List[Trade]) -> List[Optional[str]]:
+        quantities = {}
+        errors = []
+        
+        for trade in trades:
+            if trade.symbol not in quantities:
+                holding = self.portfolio.get(trade.symbol)
+                quantities[trade.symbol] = holding.quantity if holding else 0
+            current_quantity = quantities[trade.symbol]
+            
+            if trade.is_buy:
+                quantities[trade.symbol] = current_quantity + trade.quantity
+                errors.append(None)
+            elif current_quantity == 0:
+                errors.append(f"Cannot sell {trade.symbol}: No holdings found in portfolio")
+            elif trade.quantity > current_quantity:
+                errors.append(f"Cannot sell {trade.quantity} {trade.symbol}: Only {current_quantity} available")
+            else:
+                quantities[trade.symbol] = current_quantity - trade.quantity
+                errors.append(None)
+        
+        return errors
 
-    def get_coin_data(self, symbol: str) -> Dict:
+    def check_columns(
+        self, symbol: str, is_buy: Sequence[bool], prices: Sequence[float], quantities: Sequence[float]
+    ) -> Optional[Tuple[int, str]]:
+        # The first of a symbol's trades, given as columns in timestamp order
+        # after its current holding, that check_trades would reject, and why.
+        holding = self.portfolio.get(symbol)
+        rejected = first_rejected_sell(is_buy, quantities, holding.quantity if holding else 0)
+        if rejected is None:
+            return None
+        position, current_quantity = rejected
+        if current_quantity == 0:
+            return position, f"Cannot sell {symbol}: No holdings found in portfolio"
+        return position, f"Cannot sell {quantities[position]} {symbol}: Only {current_quantity} available"
+
+    def get_coin_data(self, symbol: str) -> Portfolio:
         if symbol not in self.portfolio:
             raise ValueError(f"Coin {symbol} not found in portfolio")
         return self.portfolio[symbol]
-    
-    def get_holdings(self) -> Dict:
-        return self.portfolio
\ No newline at end of file
+
+    def get_holding(self, symbol: str) -> Optional[Portfolio]:
+        return self.portfolio.get(symbol)
+
+    def set_holding(self, symbol: str, holding: Optional[Portfolio]):
+        if holding is None:
+            self.portfolio.pop(symbol, None)
+        else:
+            self.portfolio[symbol] = holding
+
+    def get_holdings(self) -> Dict[str, Portfolio]:
+        # A shallow copy, so callers can iterate while other symbols trade.
+        return dict(self.portfolio)
+
+    def load_holdings(self, holdings: Dict):
+        # Takes the snapshot form: symbol -> {"quantity", "average_price"}.
+        self.portfolio = {
+            symbol: Portfolio(symbol, data["quantity"], data["average_price"])
+            for symbol, data in holdings.items()
+        }
+
+    def dump_holdings(self) -> Dict:
+        return {
+            symbol: {"quantity": holding.quantity, "average_price": holding.average_price}
+            for symbol, holding in self.portfolio.items()
+        }
+
+
+class FixedPointPortfolioService(PortfolioService):
+    # Holdings kept as integer quantity and cost units, so selling the whole
+    # position always closes it and no float error builds up in the cost of
+    # a long run of tiny-priced buys. A trade with more decimals than the
+    # scale is rejected rather than rounded.
+    def __init__(self, fixed_point: FixedPoint):
+        super().__init__()
+        self.fixed_point = fixed_point
+
+    def empty_copy(self) -> "FixedPointPortfolioService":
+        return FixedPointPortfolioService(self.fixed_point)
+
+    def apply_trade(self, trade: Trade):
+        fixed_point = self.fixed_point
+        price_units, quantity_units = fixed_point.trade_units(trade)
+        symbol = trade.symbol
+        holding = self.portfolio.get(symbol)
+
+        if trade.is_buy:
+            cost_units = price_units * quantity_units
+            if holding is not None:
+                quantity_units += holding.quantity_units
+                cost_units += holding.cost_units
+        else:
+            if holding is None:
+                raise ValueError(f"Cannot sell {symbol}: No holdings found in portfolio")
+            if quantity_units > holding.quantity_units:
+                raise ValueError(f"Cannot sell {trade.quantity} {symbol}: Only {holding.quantity} available")
+            if quantity_units == holding.quantity_units:
+                del self.portfolio[symbol]
+                return
+            cost_units = holding.cost_units - fixed_point.sold_cost(holding.cost_units, holding.quantity_units, quantity_units)
+            quantity_units = holding.quantity_units - quantity_units
+
+        # FixedPoint.holding, inlined as it runs on every trade.
+        self.portfolio[symbol] = FixedPointHolding(
+            symbol, quantity_units / fixed_point.quantity_scale,
+            cost_units / (quantity_units * fixed_point.price_scale), quantity_units, cost_units
+        )
+
+    def check_trades(self, trades: List[Trade]) -> List[Optional[str]]:
+        fixed_point = self.fixed_point
+        quantities = {}
+        errors = []
+
+        for trade in trades:
+            try:
+                _, quantity_units = fixed_point.trade_units(trade)
+            except ValueError as e:
+                errors.append(str(e))
+                continue
+            if trade.symbol not in quantities:
+                holding = self.portfolio.get(trade.symbol)
+                quantities[trade.symbol] = holding.quantity_units if holding else 0
+            current_units = quantities[trade.symbol]
+
+            if trade.is_buy:
+                quantities[trade.symbol] = current_units + quantity_units
+                errors.append(None)
+            elif current_units == 0:
+                errors.append(f"Cannot sell {trade.symbol}: No holdings found in portfolio")
+            elif quantity_units > current_units:
+                errors.append(
+                    f"Cannot sell {trade.quantity} {trade.symbol}: Only {fixed_point.to_quantity(current_units)} available"
+                )
+            else:
+                quantities[trade.symbol] = current_units - quantity_units
+                errors.append(None)
+
+        return errors
+
+    def check_columns(
+        self, symbol: str, is_buy: Sequence[bool], prices: Sequence[float], quantities: Sequence[float]
+    ) -> Optional[Tuple[int, str]]:
+        fixed_point = self.fixed_point
+        holding = self.portfolio.get(symbol)
+        current_units = holding.quantity_units if holding else 0
+
+        # Whole columns at once when every value converts exactly and the
+        # running quantity stays within int64; otherwise row by row, which
+        # also finds the value that does not convert.
+        price_units = fixed_point.price_units_column(prices)
+        quantity_units = fixed_point.quantity_units_column(quantities) if price_units is not None else None
+        if quantity_units is not None and current_units + float(quantity_units.sum(dtype=np.float64)) < INT64_LIMIT:
+            is_buy = np.asarray(is_buy, dtype=bool)
+            held = np.cumsum(np.concatenate(([current_units], np.where(is_buy, quantity_units, -quantity_units))))[:-1]
+            rejected = np.flatnonzero(~is_buy & ((held == 0) | (quantity_units > held)))
+            if len(rejected) == 0:
+                return None
+            position = int(rejected[0])
+            current_units = int(held[position])
+            if current_units == 0:
+                return position, f"Cannot sell {symbol}: No holdings found in portfolio"
+            return position, (
+                f"Cannot sell {quantities[position]} {symbol}: Only {fixed_point.to_quantity(current_units)} available"
+            )
+
+        for position, (buy, price, quantity) in enumerate(zip(is_buy, prices, quantities)):
+            try:
+                fixed_point.price_units(float(price))
+                quantity_units = fixed_point.quantity_units(float(quantity))
+            except ValueError as e:
+                return position, str(e)
+            if buy:
+                current_units += quantity_units
+            elif current_units == 0:
+                return position, f"Cannot sell {symbol}: No holdings found in portfolio"
+            elif quantity_units > current_units:
+                return position, f"Cannot sell {quantity} {symbol}: Only {fixed_point.to_quantity(current_units)} available"
+            else:
+                current_units -= quantity_units
+        return None
+
+    def __to_fixed_point(self, holding: Portfolio) -> FixedPointHolding:
+        if isinstance(holding, FixedPointHolding):
+            return holding
+        quantity_units = self.fixed_point.quantity_units(holding.quantity, strict=False)
+        return self.fixed_point.holding(
+            holding.symbol, quantity_units, self.fixed_point.cost_from_float(quantity_units, holding.average_price)
+        )
+
+    def set_holding(self, symbol: str, holding: Optional[Portfolio]):
+        super().set_holding(symbol, None if holding is None else self.__to_fixed_point(holding))
+
+    def load_holdings(self, holdings: Dict):
+        # Snapshots written in this mode carry the units; float-only ones,
+        # such as checkpoints, get the nearest cost.
+        self.portfolio = {}
+        for symbol, data in holdings.items():
+            if "quantity_units" in data:
+                self.portfolio[symbol] = self.fixed_point.holding(symbol, data["quantity_units"], data["cost_units"])
+            else:
+                self.set_holding(symbol, Portfolio(symbol, data["quantity"], data["average_price"]))
+
+    def dump_holdings(self) -> Dict:
+        return {
+            symbol: {
+                "quantity": holding.quantity, "average_price": holding.average_price,
+                "quantity_units": holding.quantity_units, "cost_units": holding.cost_units
+            }
+            for symbol, holding in self.portfolio.items()
+        }
@@ -1,14 +1,179 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.services.price_sources import PriceSource, StaticPriceSource
+
+
+logger = logging.getLogger(__name__)
+
+
 class PriceService:
-    def __init__(self):
-        self.prices = {
-            "BTC": 10000,
-            "ETH": 2000,
-            "XRP": 1,
-            "SOL": 100,
-            "DOGE": 0.1,
-            "SHIB": 0.0001,
-            "DOT": 10,
-        }
+    def __init__(
+        self,
+        source: Optional[PriceSource] = None,
+        ttl: float = 5.0,
+        ttl_by_symbol: Optional[Dict[str, float]] = None,
+        unknown_ttl: float = 1.0,
+    ):
+        self.source = source if source is not None else StaticPriceSource()
+        self.ttl = ttl
+        self.ttl_by_symbol = dict(ttl_by_symbol or {})
+        # symbol -> (price, fetched_at)
+        self.cache: Dict[str, tuple] = {}
+        # symbol -> when the source last left it out. For unknown_ttl
+        # seconds it is not asked for again, so a bad symbol in every
+        # request does not turn into a fetch per request.
+        self.unknown_ttl = unknown_ttl
+        self.unknown: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.unknown_hits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        # Bumped whenever a cached price changes value.
+        self.version = 0
+        self.symbol_versions: Dict[str, int] = {}
+        # Called with the symbols whose cached price changed value.
+        self._change_listeners: List[Callable[[List[str]], None]] = []
+
+        self._lock = threading.Lock()
+        self._refresh_pending = set()
+        self._refresh_wakeup = threading.Event()
+        self._refresh_thread = None
+
+    def __is_fresh(self, symbol: str, fetched_at: float, now: float) -> bool:
+        return now - fetched_at < self.ttl_by_symbol.get(symbol, self.ttl)
+
+    def __store(self, prices: Dict[str, float]):
+        fetched_at = time.monotonic()
+        changed = []
+        with self._lock:
+            for symbol, price in prices.items():
+                cached = self.cache.get(symbol)
+                if cached is None or cached[0] != price:
+                    self.version += 1
+                    self.symbol_versions[symbol] = self.version
+                    changed.append(symbol)
+                self.cache[symbol] = (price, fetched_at)
+        if changed:
+            for listener in self._change_listeners:
+                listener(changed)
+
+    def add_change_listener(self, listener: Callable[[List[str]], None]):
+        self._change_listeners.append(listener)
+
+    def __refresh_loop(self):
+        while True:
+            self._refresh_wakeup.wait()
+            with self._lock:
+                symbols = list(self._refresh_pending)
+                self._refresh_pending.clear()
+                self._refresh_wakeup.clear()
+            if not symbols:
+                continue
+            try:
+                self.__store(self.source.fetch_prices(symbols))
+                with self._lock:
+                    self.refreshes += 1
+            except Exception as e:
+                # Keep serving the stale prices; the next read retries.
+                logger.warning("Error refreshing prices for %s: %s", symbols, e)
+
+    def __schedule_refresh(self, symbols):
+        with self._lock:
+            self._refresh_pending.update(symbols)
+            if self._refresh_thread is None:
+                self._refresh_thread = threading.Thread(
+                    target=self.__refresh_loop, name="price-refresh", daemon=True
+                )
+                self._refresh_thread.start()
+        self._refresh_wakeup.set()
+
+    def after_fork(self):
+        # In a forked worker: the refresh thread stayed in the parent, and a
+        # lock it held at the fork would never be released.
+        self._lock = threading.Lock()
+        self._refresh_wakeup = threading.Event()
+        self._refresh_thread = None
+
+    def get_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        prices, missing = self.lookup_prices(symbols)
+        if missing:
+            prices.update(self.fetch_prices(missing))
+        return prices
+
+    def lookup_prices(self, symbols: Iterable[str]) -> Tuple[Dict[str, float], List[str]]:
+        # Fresh entries are served from the cache, stale ones are served as
+        # they are while a background thread refetches them, and missing ones
+        # are returned for the caller to fetch in a single call to the source.
+        # Never blocks on the source.
+        prices = {}
+        stale = []
+        missing = []
+        now = time.monotonic()
+
+        with self._lock:
+            for symbol in symbols:
+                cached = self.cache.get(symbol)
+                if cached is None:
+                    if now - self.unknown.get(symbol, -self.unknown_ttl) < self.unknown_ttl:
+                        self.unknown_hits += 1
+                    else:
+                        missing.append(symbol)
+                    continue
+                prices[symbol] = cached[0]
+                if self.__is_fresh(symbol, cached[1], now):
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    stale.append(symbol)
+            self.misses += len(missing)
+
+        if stale:
+            self.__schedule_refresh(stale)
+        return prices, missing
+
+    def fetch_prices(self, symbols: List[str]) -> Dict[str, float]:
+        fetched = self.source.fetch_prices(symbols)
+        self.__store(fetched)
+        now = time.monotonic()
+        with self._lock:
+            for symbol in symbols:
+                if symbol in fetched:
+                    self.unknown.pop(symbol, None)
+                else:
+                    self.unknown[symbol] = now
+        return fetched
 
     def get_price(self, symbol: str) -> float:
-        return self.prices[symbol]
\ No newline at end of file
+        return self.get_prices([symbol])[symbol]
+
+    def iter_price_history(self, symbol: str, start: str, end: str) -> Iterator[Tuple[int, float]]:
+        # Historical points are read straight from the source, not cached.
+        return self.source.iter_price_history(symbol, start, end)
+
+    def get_symbol_version(self, symbol: str) -> int:
+        return self.symbol_versions.get(symbol, 0)
+
+    def invalidate(self, symbol: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self.cache.clear()
+                self.unknown.clear()
+            else:
+                self.cache.pop(symbol, None)
+                self.unknown.pop(symbol, None)
+
+    def get_cache_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "unknown_hits": self.unknown_hits,
+                "refreshes": self.refreshes,
+                "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+                "cached_symbols": len(self.cache)
+            }
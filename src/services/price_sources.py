@@ -0,0 +1,82 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Tuple
+from src.models.trade import to_epoch_nanos
+
+
+DEFAULT_PRICES = {
+    "BTC": 10000,
+    "ETH": 2000,
+    "XRP": 1,
+    "SOL": 100,
+    "DOGE": 0.1,
+    "SHIB": 0.0001,
+    "DOT": 10,
+}
+
+
+class PriceSource(ABC):
+    @abstractmethod
+    def fetch_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        # Returns prices for the symbols the source knows; unknown ones are left out.
+        ...
+
+    def iter_price_history(self, symbol: str, start: str, end: str) -> Iterator[Tuple[int, float]]:
+        # (epoch nanoseconds, price) points in timestamp order: the last
+        # point at or before start, then every point up to end. Sources
+        # without history serve their current price for the whole range.
+        prices = self.fetch_prices([symbol])
+        if symbol in prices:
+            yield to_epoch_nanos(start), prices[symbol]
+
+
+class StaticPriceSource(PriceSource):
+    def __init__(self, prices: Dict[str, float] = None):
+        self.prices = dict(DEFAULT_PRICES if prices is None else prices)
+
+    def fetch_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        return {symbol: self.prices[symbol] for symbol in symbols if symbol in self.prices}
+
+
+class ReplayPriceSource(PriceSource):
+    def __init__(self, ticks: List[Dict[str, float]]):
+        if not ticks:
+            raise ValueError("ReplayPriceSource needs at least one tick")
+        self.ticks = ticks
+        self.position = 0
+        self.fetch_count = 0
+
+    def advance(self) -> bool:
+        if self.position + 1 >= len(self.ticks):
+            return False
+        self.position += 1
+        return True
+
+    def fetch_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        self.fetch_count += 1
+        tick = self.ticks[self.position]
+        return {symbol: tick[symbol] for symbol in symbols if symbol in tick}
+
+
+class HistoricalPriceSource(PriceSource):
+    def __init__(self, series: Dict[str, List[Tuple[str, float]]]):
+        # symbol -> [(timestamp, price), ...]; the latest point is the current
+        # price. Timestamps are kept as epoch nanoseconds, so points in other
+        # formats or time zones still sort and compare by time.
+        self.series = {
+            symbol: sorted((to_epoch_nanos(timestamp), price) for timestamp, price in points)
+            for symbol, points in series.items()
+        }
+        self.timestamps = {symbol: [point[0] for point in points] for symbol, points in self.series.items()}
+
+    def fetch_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        return {symbol: self.series[symbol][-1][1] for symbol in symbols if self.series.get(symbol)}
+
+    def iter_price_history(self, symbol: str, start: str, end: str) -> Iterator[Tuple[int, float]]:
+        points = self.series.get(symbol, [])
+        timestamps = self.timestamps.get(symbol, [])
+        end_ns = to_epoch_nanos(end)
+        position = max(0, bisect_right(timestamps, to_epoch_nanos(start)) - 1)
+        while position < len(points) and points[position][0] <= end_ns:
+            yield points[position]
+            position += 1
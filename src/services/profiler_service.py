@@ -0,0 +1,65 @@
+import itertools
+import os
+import sys
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional
+
+
+class ProfileSession:
+    # Samples one thread's stack every interval seconds from a helper
+    # thread. The sampled thread runs untouched between samples, so the cost
+    # is the helper's GIL time, not a hook on every call as with cProfile.
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.__sample, name="profiler", daemon=True)
+        self._thread.start()
+
+    def __sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+class SamplingProfiler:
+    # Profiles requests that ask for it and keeps the last few profiles in
+    # collapsed-stack form ("frame;frame;frame count" per line), which
+    # flamegraph.pl and speedscope read as they are.
+    def __init__(self, interval: float = 0.005, keep: int = 32):
+        self.interval = interval
+        self.keep = keep
+        self._profiles = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self) -> ProfileSession:
+        # Profiles the calling thread until stop().
+        return ProfileSession(threading.get_ident(), self.interval)
+
+    def stop(self, session: ProfileSession) -> str:
+        session.stop()
+        profile = "".join(f"{stack} {count}\n" for stack, count in session.stacks.most_common())
+        with self._lock:
+            profile_id = str(next(self._ids))
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get_profile(self, profile_id: str) -> Optional[str]:
+        with self._lock:
+            return self._profiles.get(profile_id)
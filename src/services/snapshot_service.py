@@ -0,0 +1,28 @@
+import json
+import os
+from typing import Dict, Optional
+
+
+class SnapshotService:
+    def __init__(self, path: str):
+        self.path = path
+
+    def save(self, journal_records: int, holdings: Dict, realized_pnl: Dict):
+        snapshot = {
+            "journal_records": journal_records,
+            "portfolio": holdings,
+            "realized_pnl": realized_pnl
+        }
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        # The rename is atomic, so a crash leaves either the old or the new snapshot.
+        os.replace(temporary_path, self.path)
+
+    def load(self) -> Optional[Dict]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as snapshot_file:
+            return json.load(snapshot_file)
@@ -0,0 +1,200 @@
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from src.services.journal_service import SYMBOL_BYTES, TRADE_ID_BYTES
+
+
+# Trade columns are the journal's form (TradeJournalService.read_columns):
+# trade_id and symbol, side 1 for a buy and 0 for a sell, price, quantity
+# and timestamp in epoch microseconds of the book's naive local time. Ids
+# and symbols are numpy bytes arrays, or lists of str from the list store.
+COLUMN_NAMES = ("trade_id", "symbol", "side", "price", "quantity", "timestamp")
+ARCHIVE_FORMATS = ("parquet", "arrow")
+ARCHIVE_MIMETYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+ARCHIVE_EXTENSIONS = {".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+# A side that is neither buy nor sell; check_trade_columns rejects it.
+UNKNOWN_SIDE = 2
+
+
+class ArchiveUnavailableError(RuntimeError):
+    def __init__(self):
+        super().__init__("Parquet and Arrow IPC files need pyarrow and numpy installed")
+
+
+def require_archive_support():
+    if pa is None or np is None:
+        raise ArchiveUnavailableError()
+
+
+def archive_format_of(path: str, archive_format: Optional[str] = None) -> str:
+    # The given format, or the one the file extension names.
+    if archive_format is None:
+        archive_format = ARCHIVE_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if archive_format is None:
+            raise ValueError(f"Cannot tell the format of {path}; use .parquet or .arrow, or name the format")
+    return check_archive_format(archive_format)
+
+
+def check_archive_format(archive_format: str) -> str:
+    archive_format = archive_format.lower()
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(ARCHIVE_FORMATS)}, got '{archive_format}'")
+    return archive_format
+
+
+def _strings(values):
+    if isinstance(values, np.ndarray):
+        return pa.array(values, pa.binary()).cast(pa.string())
+    return pa.array(values, pa.string())
+
+
+def _to_bytes(column) -> "np.ndarray":
+    # Any column readable as text, as a numpy bytes array.
+    values = column.cast(pa.string()).cast(pa.binary()).to_numpy(zero_copy_only=False)
+    return values.astype("S") if len(values) else np.empty(0, dtype="S1")
+
+
+def _to_floats(table, name: str) -> "np.ndarray":
+    column = table.column(name)
+    if not (pa.types.is_floating(column.type) or pa.types.is_integer(column.type)):
+        raise ValueError(f"Column {name} must be numeric, got {column.type}")
+    # Empty values read as NaN, which check_trade_columns rejects.
+    return column.cast(pa.float64()).to_numpy(zero_copy_only=False)
+
+
+def _table_columns(table) -> Dict:
+    missing = [name for name in COLUMN_NAMES if name not in table.column_names]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    for name in ("trade_id", "symbol", "side", "timestamp"):
+        if table.column(name).null_count:
+            raise ValueError(f"Column {name} has {table.column(name).null_count} empty values")
+
+    timestamps = table.column("timestamp")
+    if not pa.types.is_timestamp(timestamps.type) or timestamps.type.tz is not None:
+        # Stored timestamps are naive local time; a zone would need
+        # converting row by row.
+        raise ValueError(f"Column timestamp must hold timestamps without a time zone, got {timestamps.type}")
+
+    side = pc.utf8_lower(table.column("side").cast(pa.string()))
+    is_buy = pc.equal(side, "buy").to_numpy(zero_copy_only=False)
+    is_sell = pc.equal(side, "sell").to_numpy(zero_copy_only=False)
+    return {
+        "trade_id": _to_bytes(table.column("trade_id")),
+        # Symbols are upper case, as POST /trades stores them.
+        "symbol": _to_bytes(pc.utf8_upper(table.column("symbol").cast(pa.string()))),
+        "side": np.where(is_buy, 1, np.where(is_sell, 0, UNKNOWN_SIDE)).astype(np.uint8),
+        "price": _to_floats(table, "price"),
+        "quantity": _to_floats(table, "quantity"),
+        # The book keeps microseconds; finer units are truncated.
+        "timestamp": timestamps.cast(pa.timestamp("us"), safe=False).cast(pa.int64()).to_numpy(zero_copy_only=False),
+    }
+
+
+def read_trade_columns(source: Union[str, bytes], archive_format: str) -> Dict:
+    # source is a path or a whole file's bytes. Arrow IPC files are memory
+    # mapped, so numeric columns are read in place rather than copied.
+    require_archive_support()
+    try:
+        if archive_format == "parquet":
+            table = pq.read_table(pa.BufferReader(source) if isinstance(source, bytes) else source, memory_map=True)
+        else:
+            table = ipc.open_file(
+                pa.BufferReader(source) if isinstance(source, bytes) else pa.memory_map(source)
+            ).read_all()
+    except (pa.ArrowException, OSError) as e:
+        raise ValueError(f"Not a readable {archive_format} file: {e}")
+    return _table_columns(table)
+
+
+def write_trade_columns(columns: Dict, archive_format: str, sink: Optional[str] = None) -> Optional[bytes]:
+    # Writes to the path sink, or returns the file's bytes without one.
+    require_archive_support()
+    side_codes = pa.array(1 - np.asarray(columns["side"], dtype=np.int8), pa.int8())
+    table = pa.table({
+        "trade_id": _strings(columns["trade_id"]),
+        "symbol": _strings(columns["symbol"]).dictionary_encode(),
+        "side": pa.DictionaryArray.from_arrays(side_codes, pa.array(["buy", "sell"])),
+        "price": pa.array(columns["price"], pa.float64()),
+        "quantity": pa.array(columns["quantity"], pa.float64()),
+        "timestamp": pa.array(columns["timestamp"], pa.int64()).cast(pa.timestamp("us")),
+    })
+
+    output = pa.BufferOutputStream() if sink is None else sink
+    if archive_format == "parquet":
+        pq.write_table(table, output)
+    else:
+        with ipc.new_file(output, table.schema) as writer:
+            writer.write_table(table)
+    return output.getvalue().to_pybytes() if sink is None else None
+
+
+def check_trade_columns(columns: Dict) -> Dict[int, List[str]]:
+    # The checks POST /trades/batch makes on each row, run on whole columns,
+    # and that no trade id repeats. Ids and symbols must also fit in a
+    # journal record, with or without a journal, as they do on POST.
+    errors: Dict[int, List[str]] = {}
+
+    def reject(rows, message):
+        for row in np.flatnonzero(rows).tolist():
+            errors.setdefault(row, []).append(message(row))
+
+    prices, quantities, trade_ids = columns["price"], columns["quantity"], columns["trade_id"]
+    id_lengths = np.char.str_len(trade_ids)
+    reject(id_lengths == 0, lambda row: "Trade id must not be empty")
+    reject(
+        id_lengths > TRADE_ID_BYTES,
+        lambda row: f"Trade id {trade_ids[row].decode()} is longer than {TRADE_ID_BYTES} bytes"
+    )
+    # A repeated id is rejected on every row after its first.
+    _, first_rows, id_positions = np.unique(trade_ids, return_index=True, return_inverse=True)
+    first_row_of = first_rows[id_positions.reshape(-1)]
+    reject(
+        first_row_of != np.arange(len(trade_ids)),
+        lambda row: f"Trade id {trade_ids[row].decode()} repeats row {first_row_of[row]}"
+    )
+    symbol_lengths = np.char.str_len(columns["symbol"])
+    reject(symbol_lengths == 0, lambda row: "Symbol must not be empty")
+    reject(
+        symbol_lengths > SYMBOL_BYTES,
+        lambda row: f"Symbol {columns['symbol'][row].decode()} is longer than {SYMBOL_BYTES} bytes"
+    )
+    reject(columns["side"] == UNKNOWN_SIDE, lambda row: "Side must be 'buy' or 'sell'")
+    reject(~(np.isfinite(prices) & (prices > 0)), lambda row: f"Price must be greater than 0, got {prices[row]}")
+    reject(
+        ~(np.isfinite(quantities) & (quantities > 0)),
+        lambda row: f"Quantity must be greater than 0, got {quantities[row]}"
+    )
+    return errors
+
+
+def sort_trade_columns(columns: Dict) -> Tuple["np.ndarray", Dict]:
+    # The rows in timestamp order, and the permutation from the given rows.
+    # The sort is stable, so rows sharing a timestamp keep their order.
+    order = np.argsort(columns["timestamp"], kind="stable")
+    return order, {name: values[order] for name, values in columns.items()}
+
+
+def rows_by_symbol(symbols: "np.ndarray") -> Dict[str, "np.ndarray"]:
+    # Each symbol's row numbers, in row order.
+    names, symbol_positions = np.unique(symbols, return_inverse=True)
+    symbol_positions = symbol_positions.reshape(-1)
+    order = np.argsort(symbol_positions, kind="stable")
+    boundaries = np.cumsum(np.bincount(symbol_positions, minlength=len(names)))[:-1]
+    return {name.decode(): rows for name, rows in zip(names.tolist(), np.split(order, boundaries))}
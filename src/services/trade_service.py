@@ -1,22 +1,232 @@
-from src.models.trade import Trade
-from typing import List, Optional
+import threading
+from bisect import bisect_left, bisect_right
+from src.models.trade import Trade, BUY, SELL, to_epoch_nanos, from_epoch_nanos
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class TradeService:
     def __init__(self):
         self.trades = []
+        # Secondary indexes kept in timestamp order, each with a parallel list
+        # of epoch-nanosecond timestamps so range lookups can bisect without a
+        # key function.
+        self.trades_by_symbol: Dict[str, List[Trade]] = {}
+        self.trades_by_symbol_and_side: Dict[Tuple[str, str], List[Trade]] = {}
+        self._symbol_timestamps: Dict[str, List[int]] = {}
+        self._symbol_and_side_timestamps: Dict[Tuple[str, str], List[int]] = {}
+        self._positions_by_id: Dict[str, int] = {}
+        # The log and the id map are shared by every symbol, so writers on
+        # different symbols still serialize here, briefly.
+        self._lock = threading.Lock()
+
+    def __insert_into_index(self, index: Dict, timestamp_index: Dict, key, trade: Trade):
+        if key not in index:
+            index[key] = []
+            timestamp_index[key] = []
+        trades = index[key]
+        timestamps = timestamp_index[key]
+
+        if not timestamps or timestamps[-1] <= trade.timestamp_ns:
+            trades.append(trade)
+            timestamps.append(trade.timestamp_ns)
+        else:
+            position = bisect_right(timestamps, trade.timestamp_ns)
+            trades.insert(position, trade)
+            timestamps.insert(position, trade.timestamp_ns)
+
+    def __index_bounds(self, symbol: str, side: Optional[str], start: Optional[str], end: Optional[str]):
+        if side is None:
+            trades = self.trades_by_symbol.get(symbol, [])
+            timestamps = self._symbol_timestamps.get(symbol, [])
+        else:
+            trades = self.trades_by_symbol_and_side.get((symbol, side.lower()), [])
+            timestamps = self._symbol_and_side_timestamps.get((symbol, side.lower()), [])
+
+        low = 0 if start is None else bisect_left(timestamps, to_epoch_nanos(start))
+        high = len(timestamps) if end is None else bisect_right(timestamps, to_epoch_nanos(end))
+        return trades, timestamps, low, high
+
+    def __position_of(self, trade_id: str) -> int:
+        if trade_id not in self._positions_by_id:
+            raise ValueError(f"Trade {trade_id} not found")
+        return self._positions_by_id[trade_id]
+
+    def has_trade(self, trade_id: str) -> bool:
+        return trade_id in self._positions_by_id
+
+    def find_trade_ids(self, trade_ids):
+        # Which of a column of encoded ids are already stored, as a mask.
+        if not self._positions_by_id:
+            return np.zeros(len(trade_ids), dtype=bool)
+        return np.isin(np.char.decode(trade_ids), np.array(list(self._positions_by_id)))
 
     def add_trade(self, trade: Trade):
-        self.trades.append(trade)
+        with self._lock:
+            # The log position doubles as the trade's sequence number: a
+            # total order of arrival, which recovery reproduces exactly.
+            trade.sequence = len(self.trades)
+            self._positions_by_id[trade.trade_id] = trade.sequence
+            self.trades.append(trade)
+            self.__insert_into_index(
+                self.trades_by_symbol, self._symbol_timestamps, trade.symbol, trade
+            )
+            self.__insert_into_index(
+                self.trades_by_symbol_and_side, self._symbol_and_side_timestamps,
+                (trade.symbol, trade.side), trade
+            )
 
     def get_trades(self):
         return self.trades
 
-    def get_trades_by_symbol_and_side(self, symbol: str, side: Optional[str] = None) -> List[Trade]:
-        filtered_trades = []
-        
-        for trade in self.trades:
-            if trade.symbol == symbol:
-                if side is None or trade.side == side:
-                    filtered_trades.append(trade)
-        
-        return filtered_trades
+    def get_last_trade_timestamp(self, symbol: str) -> Optional[str]:
+        timestamp_ns = self.get_last_trade_timestamp_ns(symbol)
+        return from_epoch_nanos(timestamp_ns) if timestamp_ns is not None else None
+
+    def get_last_trade_timestamp_ns(self, symbol: str) -> Optional[int]:
+        timestamps = self._symbol_timestamps.get(symbol)
+        return timestamps[-1] if timestamps else None
+
+    def get_symbols(self) -> List[str]:
+        return list(self.trades_by_symbol)
+
+    def get_trade_count(self, symbol: str, until_ns: Optional[int] = None) -> int:
+        # With until_ns, the trades at or before it: where a trade stamped
+        # then would be inserted.
+        timestamps = self._symbol_timestamps.get(symbol, [])
+        return len(timestamps) if until_ns is None else bisect_right(timestamps, until_ns)
+
+    def get_trades_by_symbol_and_side(
+        self,
+        symbol: str,
+        side: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[Trade]:
+        trades, _, low, high = self.__index_bounds(symbol, side, start, end)
+        return trades[low:high]
+
+    def __iter_in_insertion_order(
+        self, position: int, side: Optional[str], start: Optional[str], end: Optional[str]
+    ) -> Iterator[Trade]:
+        is_buy = None if side is None else side == BUY
+        start_ns = None if start is None else to_epoch_nanos(start)
+        end_ns = None if end is None else to_epoch_nanos(end)
+        # By index, so a page deep into the log does not walk its prefix.
+        for index in range(position, len(self.trades)):
+            trade = self.trades[index]
+            if is_buy is not None and trade.is_buy != is_buy:
+                continue
+            if start_ns is not None and trade.timestamp_ns < start_ns:
+                continue
+            if end_ns is not None and trade.timestamp_ns > end_ns:
+                continue
+            yield trade
+
+    def iter_trades(
+        self,
+        symbol: Optional[str] = None,
+        side: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        after: Optional[str] = None,
+    ) -> Iterator[Trade]:
+        # The cursor is resolved before iteration starts so an unknown one
+        # fails here rather than halfway through a streamed response.
+        if symbol is None:
+            position = 0 if after is None else self.__position_of(after) + 1
+            side = side.lower() if side is not None else None
+            return self.__iter_in_insertion_order(position, side, start, end)
+
+        trades, timestamps, low, high = self.__index_bounds(symbol, side, start, end)
+        if after is not None:
+            cursor = self.trades[self.__position_of(after)]
+            position = bisect_left(timestamps, cursor.timestamp_ns, low, high)
+            while position < high and timestamps[position] == cursor.timestamp_ns:
+                position += 1
+                if trades[position - 1] is cursor:
+                    break
+            low = position
+
+        return (trades[position] for position in range(low, high))
+
+    def iter_trades_from(self, symbol: str, position: int, end: Optional[str] = None) -> Iterator[Trade]:
+        # The symbol's trades from a position in its timestamp order, up to end.
+        trades, _, _, high = self.__index_bounds(symbol, None, None, end)
+        return (trades[index] for index in range(position, high))
+
+    def get_columns(self, symbol: str) -> Tuple[List[bool], List[float], List[float]]:
+        trades = self.trades_by_symbol.get(symbol, [])
+        return (
+            [trade.is_buy for trade in trades],
+            [trade.price for trade in trades],
+            [trade.quantity for trade in trades],
+        )
+
+    def extend_from_journal(self, journal_service):
+        for trade in journal_service.iter_trades():
+            self.add_trade(trade)
+
+    def extend_from_columns(self, columns: Dict):
+        # Trade columns as TradeJournalService.read_columns returns them.
+        # This store keeps Trade objects, so each row becomes one, but the
+        # log, the id map and the indexes grow once per batch rather than
+        # trade by trade.
+        trade_ids = np.char.decode(columns["trade_id"]).tolist()
+        timestamps = columns["timestamp"].astype(np.int64) * 1000
+        with self._lock:
+            first = len(self.trades)
+            positions = range(first, first + len(trade_ids))
+            trades = list(map(
+                Trade, trade_ids, np.char.decode(columns["symbol"]).tolist(),
+                np.where(columns["side"] == 1, BUY, SELL).tolist(), columns["price"].tolist(),
+                columns["quantity"].tolist(), timestamps.tolist(), positions
+            ))
+            self.trades.extend(trades)
+            self._positions_by_id.update(zip(trade_ids, positions))
+
+            _, symbol_codes = np.unique(columns["symbol"], return_inverse=True)
+            self.__extend_index(
+                self.trades_by_symbol, self._symbol_timestamps, trades, timestamps, symbol_codes, with_side=False
+            )
+            self.__extend_index(
+                self.trades_by_symbol_and_side, self._symbol_and_side_timestamps, trades, timestamps,
+                symbol_codes.astype(np.int64) * 2 + (columns["side"] == 1), with_side=True
+            )
+
+    def __extend_index(
+        self, index: Dict, timestamp_index: Dict, trades: List[Trade], timestamps, group_codes, with_side: bool
+    ):
+        # One stable sort per index; each group is appended in one piece
+        # unless it starts before the key's latest trade.
+        order = np.lexsort((timestamps, group_codes))
+        boundaries = np.flatnonzero(np.diff(group_codes[order])) + 1
+        for group in np.split(order, boundaries):
+            if len(group) == 0:
+                continue
+            group_trades = [trades[position] for position in group.tolist()]
+            first_trade = group_trades[0]
+            key = (first_trade.symbol, first_trade.side) if with_side else first_trade.symbol
+            key_timestamps = timestamp_index.get(key)
+            if not key_timestamps or key_timestamps[-1] <= first_trade.timestamp_ns:
+                index.setdefault(key, []).extend(group_trades)
+                timestamp_index.setdefault(key, []).extend(timestamps[group].tolist())
+            else:
+                for trade in group_trades:
+                    self.__insert_into_index(index, timestamp_index, key, trade)
+
+    def export_columns(self) -> Dict[str, list]:
+        # Every trade in log order, as trade columns with str ids and symbols.
+        with self._lock:
+            trades = list(self.trades)
+        return {
+            "trade_id": [trade.trade_id for trade in trades],
+            "symbol": [trade.symbol for trade in trades],
+            "side": [1 if trade.is_buy else 0 for trade in trades],
+            "price": [trade.price for trade in trades],
+            "quantity": [trade.quantity for trade in trades],
+            "timestamp": [trade.timestamp_ns // 1000 for trade in trades],
+        }
@@ -4,39 +4,30 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from flask import Flask
-from src.services.portfolio_service import PortfolioService
-from src.services.price_service import PriceService
-from src.services.trade_service import TradeService
-from src.managers.trade_manager import TradeManager
-from src.managers.portfolio_manager import PortfolioManager
-from src.managers.pnl_manager import PnLManager
-from src.controllers.trade_controller import TradeController
-from src.controllers.portfolio_controller import PortfolioController
-from src.controllers.pnl_controller import PnLController
+from container import Container
+from main import create_app
+from src.services.profiler_service import SamplingProfiler
 
 
 @pytest.fixture
-def app():
-    app = Flask(__name__)
+def container():
+    # Configured like the server, with a short stream interval and frequent
+    # checkpoints, and without the environment's settings.
+    container = Container({
+        "PORTFOLIO_CHECKPOINT_EVERY": "2",
+        "ACCOUNT_SHARDS": "4",
+        "PNL_STREAM_INTERVAL": "0.02",
+        "PNL_WORKERS": "2",
+    })
+    container.profiler = SamplingProfiler(interval=0.001)
+    yield container
+    container.close()
+
+
+@pytest.fixture
+def app(container):
+    app = create_app(container)
     app.config['TESTING'] = True
-    
-    portfolio_service = PortfolioService()
-    price_service = PriceService()
-    trade_service = TradeService()
-    
-    trade_manager = TradeManager(trade_service, portfolio_service)
-    portfolio_manager = PortfolioManager(portfolio_service)
-    pnl_manager = PnLManager(portfolio_service, price_service, trade_service)
-    
-    trade_controller = TradeController(trade_manager)
-    portfolio_controller = PortfolioController(portfolio_manager)
-    pnl_controller = PnLController(pnl_manager)
-    
-    trade_controller.register_routes(app)
-    portfolio_controller.register_routes(app)
-    pnl_controller.register_routes(app)
-    
     return app
 
 
@@ -0,0 +1,167 @@
+import pytest
+import json
+
+from src.models.trade import Trade
+from src.services.price_service import PriceService
+from src.managers.account_manager import AccountManager
+
+
+def post_trade(client, path, trade):
+    return client.post(path, data=json.dumps(trade), content_type='application/json')
+
+
+class TestAccountEndpoints:
+    """Test cases for account-scoped endpoints"""
+
+    def test_accounts_are_isolated(self, client, sample_trades):
+        """Trades on one account do not show up on another or on the default book"""
+        for trade in sample_trades:
+            assert post_trade(client, '/accounts/alice/trades', trade).status_code == 201
+        post_trade(client, '/accounts/bob/trades', {"symbol": "ETH", "side": "buy", "price": 1000.0, "quantity": 1.0})
+
+        alice = json.loads(client.get('/accounts/alice/portfolio').data)
+        bob = json.loads(client.get('/accounts/bob/portfolio').data)
+        default = json.loads(client.get('/portfolio').data)
+
+        assert {holding['symbol'] for holding in alice['portfolio']} == {'BTC', 'ETH'}
+        assert bob['portfolio'] == [{"symbol": "ETH", "quantity": 1.0, "average_price": 1000.0}]
+        assert default['count'] == 0
+
+        trades = json.loads(client.get('/accounts/alice/trades').data)
+        assert trades['count'] == 4
+
+    def test_create_account_with_cost_basis(self, client, sample_trades):
+        """An account created with a cost basis uses it unless a request overrides it"""
+        response = client.post('/accounts', data=json.dumps({"account_id": "carol", "cost_basis": "LIFO"}),
+                               content_type='application/json')
+        assert response.status_code == 201
+        assert json.loads(response.data) == {"account_id": "carol", "cost_basis": "lifo"}
+
+        for trade in sample_trades:
+            post_trade(client, '/accounts/carol/trades', trade)
+
+        lifo = json.loads(client.get('/accounts/carol/pnl/BTC').data)
+        assert lifo['realized_pnl'] == round((55000.0 - 52000.0) * 0.02, 2)
+        fifo = json.loads(client.get('/accounts/carol/pnl/BTC?cost_basis=fifo').data)
+        assert fifo['realized_pnl'] == round((55000.0 - 50000.0) * 0.02, 2)
+
+        duplicate = client.post('/accounts', data=json.dumps({"account_id": "carol"}), content_type='application/json')
+        assert duplicate.status_code == 409
+        invalid = client.post('/accounts', data=json.dumps({"account_id": "dave", "cost_basis": "average"}),
+                              content_type='application/json')
+        assert invalid.status_code == 400
+
+    def test_account_pnl_matches_single_book(self, client, sample_trades):
+        """An account's PnL is computed exactly like the top-level book"""
+        for trade in sample_trades:
+            post_trade(client, '/accounts/alice/trades', trade)
+            post_trade(client, '/trades', trade)
+
+        account_pnl = json.loads(client.get('/accounts/alice/pnl').data)
+        book_pnl = json.loads(client.get('/pnl').data)
+        assert account_pnl == book_pnl
+
+        response = client.get('/accounts/alice/pnl/btc')
+        assert response.status_code == 200
+        assert json.loads(response.data)['symbol'] == 'BTC'
+
+        cached = client.get('/accounts/alice/pnl/BTC', headers={"If-None-Match": response.headers["ETag"]})
+        assert cached.status_code == 304
+
+    def test_account_batch_and_oversell(self, client):
+        """Batch ingestion and oversell checks work per account"""
+        response = client.post('/accounts/alice/trades/batch', data=json.dumps([
+            {"symbol": "BTC", "side": "buy", "price": 100.0, "quantity": 1.0},
+            {"symbol": "BTC", "side": "sell", "price": 110.0, "quantity": 0.5},
+        ]), content_type='application/json')
+        assert response.status_code == 201
+
+        response = post_trade(client, '/accounts/bob/trades', {"symbol": "BTC", "side": "sell", "price": 100.0, "quantity": 1.0})
+        assert response.status_code == 400
+        assert "No holdings found" in json.loads(response.data)['error']
+
+    def test_unknown_account_returns_404(self, client):
+        """Reads never create accounts"""
+        response = client.get('/accounts/nobody/pnl')
+
+        assert response.status_code == 404
+        assert "not found" in json.loads(response.data)['error']
+        assert json.loads(client.get('/accounts').data)['count'] == 0
+
+    def test_only_valid_trades_create_accounts(self, client):
+        """Failed ingests and other POST routes leave unknown accounts uncreated"""
+        response = client.post('/accounts/ghost/trades', data='not json', content_type='application/json')
+        assert response.status_code == 400
+        response = client.post('/accounts/ghost/trades/batch', data=json.dumps([{"symbol": "BTC"}]),
+                               content_type='application/json')
+        assert response.status_code == 400
+        response = client.post('/accounts/ghost/trades/import?format=arrow', data=b'not a file')
+        assert response.status_code in (400, 501)
+        response = client.post('/accounts/ghost/pnl/scenarios', data=json.dumps({"prices": [[1.0]]}),
+                               content_type='application/json')
+        assert response.status_code == 404
+        assert json.loads(client.get('/accounts').data)['count'] == 0
+
+        response = post_trade(client, '/accounts/ghost/trades', {"symbol": "BTC", "side": "buy", "price": 1.0, "quantity": 1.0})
+        assert response.status_code == 201
+        assert json.loads(client.get('/accounts').data)['accounts'] == ['ghost']
+
+    def test_aggregate_pnl(self, client):
+        """Aggregate PnL sums every account, or the requested ones"""
+        post_trade(client, '/accounts/alice/trades', {"symbol": "BTC", "side": "buy", "price": 9000.0, "quantity": 1.0})
+        post_trade(client, '/accounts/bob/trades', {"symbol": "ETH", "side": "buy", "price": 1500.0, "quantity": 2.0})
+        post_trade(client, '/accounts/carol/trades', {"symbol": "SOL", "side": "buy", "price": 50.0, "quantity": 10.0})
+
+        data = json.loads(client.get('/accounts/pnl').data)
+        assert data['count'] == 3
+        assert [account['account_id'] for account in data['accounts']] == ['alice', 'bob', 'carol']
+        assert data['total_unrealized_pnl'] == 1000.0 + 1000.0 + 500.0
+
+        data = json.loads(client.get('/accounts/pnl?accounts=alice,bob').data)
+        assert data['count'] == 2
+        assert data['total_pnl'] == 2000.0
+
+        assert client.get('/accounts/pnl?accounts=alice,nobody').status_code == 404
+
+    def test_aggregate_pnl_revalued_from_the_trade_logs(self, client):
+        client.post('/accounts', data=json.dumps({"account_id": "fifo", "cost_basis": "fifo"}), content_type='application/json')
+        for account_id in ('alice', 'fifo'):
+            post_trade(client, f'/accounts/{account_id}/trades', {"symbol": "BTC", "side": "buy", "price": 9000.0, "quantity": 1.0})
+            post_trade(client, f'/accounts/{account_id}/trades', {"symbol": "BTC", "side": "buy", "price": 9500.0, "quantity": 1.0})
+            post_trade(client, f'/accounts/{account_id}/trades', {"symbol": "BTC", "side": "sell", "price": 9800.0, "quantity": 1.0})
+
+        revalued = json.loads(client.get('/accounts/pnl?revalue=true').data)
+        assert revalued == json.loads(client.get('/accounts/pnl').data)
+        assert [account['total_realized_pnl'] for account in revalued['accounts']] == [550.0, 800.0]
+        assert json.loads(client.get('/accounts/alice/pnl?revalue=true').data)['total_realized_pnl'] == 550.0
+        assert client.get('/accounts/pnl?revalue=1').status_code == 400
+
+
+class TestAccountManager:
+
+    def test_accounts_stay_on_their_shard(self):
+        account_manager = AccountManager(PriceService(), shard_count=8)
+        for index in range(100):
+            account_manager.get_account(f"wallet_{index}", create=True)
+
+        for index in range(100):
+            account_id = f"wallet_{index}"
+            assert account_id in account_manager.shard_for(account_id).accounts
+        assert sum(len(shard.accounts) for shard in account_manager.shards) == 100
+        assert sum(1 for shard in account_manager.shards if shard.accounts) > 1
+
+    def test_aggregate_matches_serial_sum(self):
+        account_manager = AccountManager(PriceService(), shard_count=8)
+        for index in range(50):
+            account = account_manager.get_account(f"wallet_{index}", create=True)
+            account.trade_manager.add_trade(Trade(f"trade_{index}_0", "BTC", "buy", 9000.0 + index, 1.0, "2024-01-01T00:00:00"))
+            account.trade_manager.add_trade(Trade(f"trade_{index}_1", "BTC", "sell", 9500.0, 0.5, "2024-01-01T00:00:01"))
+
+        aggregate = account_manager.get_aggregate_pnl()
+        expected = [
+            account_manager.get_account(account_id).pnl_manager.get_pnl().total_pnl
+            for account_id in account_manager.get_account_ids()
+        ]
+
+        assert aggregate.count == 50
+        assert aggregate.total_pnl == pytest.approx(sum(expected))
@@ -0,0 +1,135 @@
+import os
+import pickle
+import threading
+
+import pytest
+
+from container import Container
+from main import create_app
+from src.models.trade import Trade
+from src.services.price_service import PriceService
+from src.services.price_sources import StaticPriceSource
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import FixedPointPnLService
+
+
+TRADES = [
+    Trade("t1", "BTC", "buy", 50000.0, 1.0, "2024-01-01T00:00:00"),
+    Trade("t2", "ETH", "buy", 3000.0, 2.0, "2024-01-01T00:00:01"),
+    Trade("t3", "BTC", "sell", 55000.0, 0.5, "2024-01-01T00:00:02"),
+]
+
+
+def journaled(tmp_path, **settings):
+    return Container({"TRADE_JOURNAL_PATH": str(tmp_path / "trades.journal"), "PNL_WORKERS": "1", **settings})
+
+
+class TestContainer:
+
+    def test_builds_only_what_is_used(self):
+        container = Container({})
+        container.trade_manager
+        assert container.is_built("trade_service")
+        for name in ("pnl_manager", "price_service", "metrics_service", "pnl_stream_manager", "log_listener"):
+            assert not container.is_built(name)
+
+    def test_settings_choose_the_components(self):
+        container = Container({"TRADE_STORE": "columnar", "ARITHMETIC": "fixed", "PRICE_DECIMALS": "2"})
+        assert isinstance(container.trade_service, ColumnarTradeService)
+        assert isinstance(container.pnl_service, FixedPointPnLService)
+        assert container.account_manager.fixed_point is container.fixed_point
+        assert container.fixed_point.price_decimals == 2
+        # Revaluations replay inline unless PNL_WORKERS asks for a pool.
+        assert container.parallel_pnl_service is None
+        assert Container({"PNL_WORKERS": "4"}).parallel_pnl_service.workers == 4
+
+    def test_assigned_components_are_used(self):
+        container = Container({})
+        container.price_service = PriceService(StaticPriceSource({"BTC": 1.0}), ttl=60)
+        assert container.pnl_manager.price_service is container.price_service
+
+    def test_load_recovers_the_book_and_warms_caches(self, tmp_path):
+        original = journaled(tmp_path)
+        original.trade_manager.add_trades(TRADES)
+        original.close()
+
+        container = journaled(tmp_path, COST_BASIS="fifo")
+        assert container.load() == len(TRADES)
+        assert set(container.price_service.cache) == {"BTC", "ETH"}
+        assert {symbol for symbol, _ in container.cost_basis_service._engines} == {"BTC", "ETH"}
+        container.close()
+
+    def test_create_app_serves_the_loaded_book(self, tmp_path):
+        original = journaled(tmp_path)
+        original.trade_manager.add_trades(TRADES)
+        original.close()
+
+        container = journaled(tmp_path)
+        client = create_app(container).test_client()
+        response = client.get('/portfolio')
+        assert response.status_code == 200
+        assert {holding["symbol"] for holding in response.get_json()["portfolio"]} == {"BTC", "ETH"}
+        container.close()
+
+    def test_read_only_refuses_the_routes_that_change_a_book(self):
+        container = Container({"READ_ONLY": "1", "PNL_WORKERS": "1"})
+        container.trade_manager.add_trades(TRADES)
+        client = create_app(container).test_client()
+        trade = {"symbol": "BTC", "side": "buy", "price": 1.0, "quantity": 1.0}
+
+        for path, body in (
+            ('/trades', trade), ('/trades/batch', [trade]), ('/trades/import?format=parquet', None),
+            ('/accounts', {"account_id": "alice"}), ('/accounts/alice/trades', trade),
+        ):
+            response = client.post(path, json=body)
+            assert response.status_code == 403, path
+        assert client.get('/trades').get_json()["count"] == len(TRADES)
+        assert client.get('/accounts').get_json()["count"] == 0
+        assert client.post('/pnl/scenarios', json={"shocks": {"BTC": 0.1}}).status_code != 403
+        container.close()
+
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+class TestAfterFork:
+
+    def test_worker_restarts_background_threads(self):
+        container = Container({"PRICE_CACHE_TTL": "0", "PNL_STREAM_INTERVAL": "0.01", "PNL_WORKERS": "1"})
+        app = create_app(container)
+        container.trade_manager.add_trades(TRADES)
+        # A stale read in the parent starts its refresh thread, which the
+        # child does not inherit.
+        container.price_service.get_prices(["BTC"])
+        container.price_service.lookup_prices(["BTC"])
+        assert container.price_service._refresh_thread is not None
+
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                container.after_fork()
+                refreshes = container.price_service.refreshes
+                container.price_service.lookup_prices(["BTC"])
+                subscription = container.pnl_stream_manager.subscribe()
+                subscription.next_update(timeout=1)
+                container.trade_manager.add_trade(Trade("t4", "BTC", "buy", 51000.0, 1.0, "2024-01-01T00:00:03"))
+                update = subscription.next_update(timeout=5)
+                for _ in range(100):
+                    if container.price_service.refreshes > refreshes:
+                        break
+                    threading.Event().wait(0.01)
+                result = {
+                    "refreshed": container.price_service.refreshes > refreshes,
+                    "streamed": update is not None and [pnl.symbol for pnl in update["pnl"]] == ["BTC"],
+                    "status": app.test_client().get('/pnl').status_code,
+                }
+                os.write(write, pickle.dumps(result))
+            finally:
+                os._exit(0)
+
+        os.close(write)
+        with os.fdopen(read, "rb") as pipe:
+            result = pickle.loads(pipe.read())
+        os.waitpid(pid, 0)
+        container.close()
+        assert result == {"refreshed": True, "streamed": True, "status": 200}
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import time
+
+import pytest
+from asgiref.wsgi import WsgiToAsgi
+from flask import Flask
+
+from src.models.trade import Trade
+from src.services.portfolio_service import PortfolioService
+from src.services.price_service import PriceService
+from src.services.price_sources import ReplayPriceSource, StaticPriceSource
+from src.services.trade_service import TradeService
+from src.services.pnl_service import PnLService
+from src.managers.trade_manager import TradeManager
+from src.managers.portfolio_manager import PortfolioManager
+from src.managers.pnl_manager import PnLManager
+from src.controllers.trade_controller import TradeController
+from src.controllers.portfolio_controller import PortfolioController
+from src.controllers.pnl_controller import PnLController
+from src.controllers.async_pnl_controller import AsyncPnLController
+from src.controllers.serialization import FastJSONProvider
+
+
+class SlowPriceSource(StaticPriceSource):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def fetch_prices(self, symbols):
+        time.sleep(self.delay)
+        return super().fetch_prices(symbols)
+
+
+def build_application(price_service=None):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config['TESTING'] = True
+
+    portfolio_service = PortfolioService()
+    price_service = price_service if price_service is not None else PriceService()
+    trade_service = TradeService()
+    pnl_service = PnLService()
+
+    pnl_manager = PnLManager(portfolio_service, price_service, trade_service, pnl_service)
+    TradeController(TradeManager(trade_service, portfolio_service, pnl_service)).register_routes(app)
+    PortfolioController(PortfolioManager(portfolio_service)).register_routes(app)
+    PnLController(pnl_manager).register_routes(app)
+
+    return app, AsyncPnLController(pnl_manager).mount(WsgiToAsgi(app))
+
+
+async def asgi_request(application, method, path, headers=(), body=b""):
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    response = {"body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {name.decode(): value.decode() for name, value in message["headers"]}
+        else:
+            response["body"] += message.get("body", b"")
+
+    await application(scope, receive, send)
+    return response
+
+
+def request(application, method, path, headers=(), body=b""):
+    return asyncio.run(asgi_request(application, method, path, headers, body))
+
+
+def post_trade(application, trade):
+    body = json.dumps(trade).encode()
+    headers = [("Content-Type", "application/json"), ("Content-Length", str(len(body)))]
+    return request(application, "POST", "/trades", headers, body)
+
+
+class TestAsyncPnLController:
+
+    def test_pnl_matches_sync_route(self, sample_trades):
+        app, application = build_application()
+        for trade in sample_trades:
+            assert post_trade(application, trade)["status"] == 201
+
+        response = request(application, "GET", "/pnl")
+        sync_response = app.test_client().get('/pnl')
+
+        assert response["status"] == 200
+        assert response["headers"]["content-type"] == "application/json"
+        assert response["body"] == sync_response.data
+        assert response["headers"]["etag"] == sync_response.headers["ETag"]
+
+    def test_symbol_pnl_and_etag(self, sample_trades):
+        _, application = build_application()
+        for trade in sample_trades:
+            post_trade(application, trade)
+
+        response = request(application, "GET", "/pnl/btc")
+        assert response["status"] == 200
+        assert json.loads(response["body"])["symbol"] == "BTC"
+
+        cached = request(application, "GET", "/pnl/BTC", [("If-None-Match", response["headers"]["etag"])])
+        assert cached["status"] == 304
+        assert cached["body"] == b""
+
+    def test_cost_basis_matches_sync_route(self, sample_trades):
+        app, application = build_application()
+        for trade in sample_trades:
+            post_trade(application, trade)
+
+        for path in ("/pnl?cost_basis=fifo", "/pnl/BTC?cost_basis=hifo"):
+            response = request(application, "GET", path)
+            assert response["status"] == 200
+            assert response["body"] == app.test_client().get(path).data
+        assert request(application, "GET", "/pnl?cost_basis=average")["status"] == 400
+
+    def test_revaluation_is_served_by_the_sync_route(self, sample_trades):
+        app, application = build_application()
+        for trade in sample_trades:
+            post_trade(application, trade)
+
+        response = request(application, "GET", "/pnl?revalue=true")
+        assert response["status"] == 200
+        assert "etag" not in response["headers"]
+        assert response["body"] == app.test_client().get('/pnl?revalue=true').data
+
+    def test_msgpack_matches_sync_route(self, sample_trades):
+        msgpack = pytest.importorskip("msgpack")
+        app, application = build_application()
+        for trade in sample_trades:
+            post_trade(application, trade)
+
+        headers = [("Accept", "application/msgpack")]
+        response = request(application, "GET", "/pnl", headers)
+        sync_response = app.test_client().get('/pnl', headers=dict(headers))
+
+        assert response["headers"]["content-type"] == "application/msgpack"
+        assert response["body"] == sync_response.data
+        assert response["headers"]["etag"] == sync_response.headers["ETag"]
+        plain = request(application, "GET", "/pnl")
+        assert msgpack.unpackb(response["body"]) == json.loads(plain["body"])
+        assert plain["headers"]["etag"] != response["headers"]["etag"]
+        assert request(application, "GET", "/pnl", [("If-None-Match", f'W/{plain["headers"]["etag"]}')])["status"] == 304
+
+    def test_unknown_symbol_returns_404(self):
+        _, application = build_application()
+
+        response = request(application, "GET", "/pnl/UNKNOWN")
+
+        assert response["status"] == 404
+        assert "error" in json.loads(response["body"])
+
+    def test_other_routes_fall_through_to_flask(self, sample_trades):
+        _, application = build_application()
+        post_trade(application, sample_trades[0])
+
+        response = request(application, "GET", "/portfolio")
+
+        assert response["status"] == 200
+        assert json.loads(response["body"])["count"] == 1
+
+    def test_slow_price_fetch_does_not_block_event_loop(self, sample_trades):
+        _, application = build_application(PriceService(source=SlowPriceSource(0.2)))
+        for trade in sample_trades:
+            post_trade(application, trade)
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            response = await asgi_request(application, "GET", "/pnl")
+            task.cancel()
+            return response, ticks
+
+        response, ticks = asyncio.run(run())
+
+        assert response["status"] == 200
+        assert ticks >= 5
+
+
+class TestPnLManagerAsync:
+
+    def test_async_calls_match_sync(self):
+        portfolio_service = PortfolioService()
+        trade_service = TradeService()
+        pnl_service = PnLService()
+        trade_manager = TradeManager(trade_service, portfolio_service, pnl_service)
+        pnl_manager = PnLManager(portfolio_service, PriceService(), trade_service, pnl_service)
+        for index, (side, price, quantity) in enumerate([("buy", 9000.0, 1.0), ("sell", 9500.0, 0.5)]):
+            trade_manager.add_trade(Trade(f"trade_{index}", "BTC", side, price, quantity, f"2024-01-01T00:00:0{index}"))
+
+        assert asyncio.run(pnl_manager.get_pnl_with_version_async()) == pnl_manager.get_pnl_with_version()
+        assert asyncio.run(pnl_manager.get_pnl_for_symbol_async("BTC")) == pnl_manager.get_pnl_for_symbol("BTC")
+        with pytest.raises(ValueError):
+            asyncio.run(pnl_manager.get_pnl_for_symbol_async("ETH"))
+
+    def test_concurrent_misses_share_one_fetch(self):
+        source = ReplayPriceSource([{"BTC": 10000.0}])
+        portfolio_service = PortfolioService()
+        trade_service = TradeService()
+        pnl_service = PnLService()
+        TradeManager(trade_service, portfolio_service, pnl_service).add_trade(
+            Trade("trade_0", "BTC", "buy", 9000.0, 1.0, "2024-01-01T00:00:00")
+        )
+        pnl_manager = PnLManager(portfolio_service, PriceService(source=source), trade_service, pnl_service)
+
+        async def run():
+            return await asyncio.gather(*(pnl_manager.get_pnl_async() for _ in range(20)))
+
+        summaries = asyncio.run(run())
+
+        assert source.fetch_count == 1
+        assert all(summary.total_pnl == 1000.0 for summary in summaries)
@@ -0,0 +1,96 @@
+import random
+
+from src.models.trade import Trade
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService
+from src.services.pnl_kernel import (
+    replay_weighted_average_cost,
+    replay_weighted_average_cost_scalar
+)
+
+
+def generate_trades(count, symbols=("BTC", "ETH", "SOL"), seed=7):
+    rng = random.Random(seed)
+    holdings = {symbol: 0.0 for symbol in symbols}
+    trades = []
+    for index in range(count):
+        symbol = rng.choice(symbols)
+        if holdings[symbol] > 0 and rng.random() < 0.4:
+            side = "sell"
+            quantity = holdings[symbol] if rng.random() < 0.1 else holdings[symbol] * rng.random()
+            holdings[symbol] -= quantity
+        else:
+            side = "buy"
+            quantity = rng.uniform(0.01, 5.0)
+            holdings[symbol] += quantity
+        trades.append(Trade(
+            trade_id=f"trade_{index}",
+            symbol=symbol,
+            side=side,
+            price=rng.uniform(10.0, 1000.0),
+            quantity=quantity,
+            timestamp=f"2024-01-01T00:00:00.{index + 1:06d}"
+        ))
+    return trades
+
+
+class TestColumnarTradeService:
+
+    def test_matches_list_backed_store(self):
+        trades = generate_trades(200)
+        list_store = TradeService()
+        columnar_store = ColumnarTradeService()
+        for trade in trades:
+            list_store.add_trade(trade)
+            columnar_store.add_trade(trade)
+
+        assert len(columnar_store) == len(trades)
+        assert columnar_store.get_symbols() == list_store.get_symbols()
+        assert [str(trade) for trade in columnar_store.get_trades()] == [str(trade) for trade in trades]
+
+        for symbol in list_store.get_symbols():
+            for side in (None, "buy", "sell"):
+                expected = list_store.get_trades_by_symbol_and_side(
+                    symbol, side, "2024-01-01T00:00:00.000050", "2024-01-01T00:00:00.000150"
+                )
+                actual = columnar_store.get_trades_by_symbol_and_side(
+                    symbol, side, "2024-01-01T00:00:00.000050", "2024-01-01T00:00:00.000150"
+                )
+                assert [trade.trade_id for trade in actual] == [trade.trade_id for trade in expected]
+
+    def test_vectorized_kernel_matches_incremental_state(self):
+        trades = generate_trades(20000)
+        columnar_store = ColumnarTradeService()
+        pnl_service = PnLService()
+        for trade in trades:
+            columnar_store.add_trade(trade)
+            pnl_service.add_trade(trade)
+
+        for symbol in columnar_store.get_symbols():
+            columns = columnar_store.get_columns(symbol)
+            quantity, _, realized_pnl = replay_weighted_average_cost(*columns)
+            _, _, scalar_realized_pnl = replay_weighted_average_cost_scalar(*columns)
+            expected = pnl_service.get_realized_pnl(symbol)
+            assert abs(realized_pnl - expected) <= 1e-6 * max(1.0, abs(expected))
+            assert abs(scalar_realized_pnl - expected) <= 1e-6 * max(1.0, abs(expected))
+            assert abs(quantity - pnl_service.get_state()[symbol]["quantity"]) < 1e-6
+
+    def test_iter_trades_matches_list_backed_store(self):
+        trades = generate_trades(300)
+        list_store = TradeService()
+        columnar_store = ColumnarTradeService()
+        for trade in trades:
+            list_store.add_trade(trade)
+            columnar_store.add_trade(trade)
+
+        for filters in (
+            {},
+            {"side": "sell", "start": "2024-01-01T00:00:00.000100"},
+            {"symbol": "BTC"},
+            {"symbol": "ETH", "side": "buy", "end": "2024-01-01T00:00:00.000200"},
+        ):
+            for after in (None, "trade_17", "trade_250"):
+                expected = [trade.trade_id for trade in list_store.iter_trades(after=after, **filters)]
+                actual = [trade.trade_id for trade in columnar_store.iter_trades(after=after, **filters)]
+                assert actual == expected
@@ -0,0 +1,173 @@
+import random
+
+import pytest
+
+from src.models.trade import Trade
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService
+from src.services.cost_basis_service import (
+    CostBasisService, FifoEngine, LifoEngine, HifoEngine, WeightedAverageCostEngine, check_cost_basis
+)
+
+
+def make_trade(index, side, price, quantity, symbol="BTC"):
+    return Trade(f"trade_{index}", symbol, side, price, quantity, f"2024-01-01T00:00:{index:02d}")
+
+
+LADDER = [
+    make_trade(1, "buy", 100.0, 1.0),
+    make_trade(2, "buy", 200.0, 1.0),
+    make_trade(3, "buy", 150.0, 1.0),
+    make_trade(4, "sell", 180.0, 1.5),
+]
+
+
+def replay(engine, trades):
+    for trade in trades:
+        engine.apply_trade(trade)
+    return engine
+
+
+def match_lots(trades, pick):
+    # Reference matcher: a plain list, searched and shifted on every sell.
+    lots, realized_pnl = [], 0.0
+    for trade in trades:
+        if trade.is_buy:
+            lots.append([trade.price, trade.quantity])
+            continue
+        remaining = trade.quantity
+        while remaining > 0 and lots:
+            index = pick(lots)
+            closed = min(lots[index][1], remaining)
+            realized_pnl += (trade.price - lots[index][0]) * closed
+            lots[index][1] -= closed
+            remaining -= closed
+            if lots[index][1] <= 0:
+                lots.pop(index)
+    return realized_pnl, sum(price * quantity for price, quantity in lots)
+
+
+class TestEngines:
+
+    @pytest.mark.parametrize("engine, realized_pnl, average_price", [
+        (FifoEngine, 70.0, 250.0 / 1.5),
+        (LifoEngine, 20.0, 200.0 / 1.5),
+        (HifoEngine, -5.0, 175.0 / 1.5),
+        (WeightedAverageCostEngine, 45.0, 150.0),
+    ])
+    def test_partial_lot_consumption(self, engine, realized_pnl, average_price):
+        result = replay(engine(), LADDER)
+
+        assert result.realized_pnl == pytest.approx(realized_pnl)
+        assert result.quantity == pytest.approx(1.5)
+        assert result.average_price == pytest.approx(average_price)
+
+    def test_weighted_average_matches_pnl_service(self):
+        trades = LADDER + [make_trade(5, "sell", 120.0, 1.5), make_trade(6, "buy", 90.0, 2.0)]
+        pnl_service = PnLService()
+        for trade in trades:
+            pnl_service.add_trade(trade)
+
+        engine = replay(WeightedAverageCostEngine(), trades)
+        state = pnl_service.get_state()["BTC"]
+        assert (engine.quantity, engine.total_cost, engine.realized_pnl) == \
+            (state["quantity"], state["total_cost"], state["realized_pnl"])
+
+    def test_hifo_breaks_price_ties_by_age(self):
+        engine = replay(HifoEngine(), [
+            make_trade(1, "buy", 100.0, 1.0),
+            make_trade(2, "buy", 100.0, 2.0),
+            make_trade(3, "sell", 100.0, 1.0),
+        ])
+
+        assert [lot[2] for lot in engine.lots] == [[100.0, 2.0]]
+
+    def test_closing_the_position_clears_rounding(self):
+        engine = replay(FifoEngine(), [
+            make_trade(1, "buy", 10.0, 0.1),
+            make_trade(2, "buy", 10.0, 0.2),
+            make_trade(3, "sell", 11.0, 0.3),
+        ])
+
+        assert (engine.quantity, engine.total_cost, len(engine.lots)) == (0.0, 0.0, 0)
+
+    @pytest.mark.parametrize("engine, pick", [
+        (FifoEngine, lambda lots: 0),
+        (LifoEngine, lambda lots: len(lots) - 1),
+        (HifoEngine, lambda lots: max(range(len(lots)), key=lambda index: lots[index][0])),
+    ])
+    def test_matches_reference_matching(self, engine, pick):
+        rng = random.Random(3)
+        trades, held = [], 0.0
+        for index in range(2000):
+            quantity = round(rng.uniform(0.1, 2.0), 2)
+            if held > 5 and rng.random() < 0.3:
+                quantity = min(round(held * rng.uniform(0.2, 0.9), 2), held)
+                trades.append(make_trade(index % 60, "sell", round(rng.uniform(50, 150), 2), quantity))
+                held -= quantity
+            else:
+                trades.append(make_trade(index % 60, "buy", round(rng.uniform(50, 150), 2), quantity))
+                held += quantity
+
+        realized_pnl, open_cost = match_lots(trades, pick)
+        result = replay(engine(), trades)
+        assert result.realized_pnl == pytest.approx(realized_pnl)
+        assert result.total_cost == pytest.approx(open_cost)
+
+    def test_check_cost_basis(self):
+        assert check_cost_basis("FIFO") == "fifo"
+        with pytest.raises(ValueError, match="Invalid cost basis: average"):
+            check_cost_basis("average")
+
+
+class TestCostBasisService:
+
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_engine_catches_up_with_new_trades(self, store):
+        trade_service = store()
+        cost_basis_service = CostBasisService(trade_service)
+        for trade in LADDER[:3]:
+            trade_service.add_trade(trade)
+
+        engine = cost_basis_service.get_engine("BTC", "fifo")
+        assert engine.quantity == 3.0
+
+        trade_service.add_trade(LADDER[3])
+        assert cost_basis_service.get_engine("BTC", "fifo") is engine
+        assert engine.realized_pnl == pytest.approx(70.0)
+
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_trade_at_the_same_timestamp_is_caught_up_with(self, store):
+        trade_service = store()
+        cost_basis_service = CostBasisService(trade_service)
+        for trade in LADDER[:3]:
+            trade_service.add_trade(trade)
+        engine = cost_basis_service.get_engine("BTC", "fifo")
+
+        last = LADDER[2]
+        trade_service.add_trade(Trade("same", "BTC", "buy", 400.0, 1.0, last.timestamp))
+        assert cost_basis_service.get_engine("BTC", "fifo") is engine
+        assert engine.quantity == 4.0
+
+    def test_backdated_trade_rebuilds_the_engine(self):
+        trade_service = TradeService()
+        cost_basis_service = CostBasisService(trade_service)
+        for trade in LADDER[1:]:
+            trade_service.add_trade(trade)
+        engine = cost_basis_service.get_engine("BTC", "fifo")
+
+        trade_service.add_trade(LADDER[0])
+        rebuilt = cost_basis_service.get_engine("BTC", "fifo")
+
+        assert rebuilt is not engine
+        assert rebuilt.realized_pnl == pytest.approx(70.0)
+
+    def test_replay_engine_stops_at_the_timestamp(self):
+        trade_service = TradeService()
+        for trade in LADDER:
+            trade_service.add_trade(trade)
+
+        engine = CostBasisService(trade_service).replay_engine("BTC", "hifo", "2024-01-01T00:00:02")
+        assert engine.quantity == 2.0
+        assert engine.average_price == 150.0
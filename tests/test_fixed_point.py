@@ -0,0 +1,190 @@
+import pytest
+
+from src.models.trade import Trade
+from src.models.portfolio import FixedPointHolding
+from src.services.fixed_point import FixedPoint, divide_rounded
+from src.services.portfolio_service import PortfolioService, FixedPointPortfolioService
+from src.services.pnl_service import PnLService, FixedPointPnLService
+from src.services.price_service import PriceService
+from src.services.price_sources import StaticPriceSource
+from src.services.trade_service import TradeService
+from src.services.journal_service import TradeJournalService
+from src.services.snapshot_service import SnapshotService
+from src.managers.trade_manager import TradeManager, TradeBatchError
+from src.managers.pnl_manager import PnLManager
+
+
+def make_trade(index, symbol, side, price, quantity):
+    return Trade(f"trade_{index}", symbol, side, price, quantity, f"2024-01-01T00:00:{index:02d}")
+
+
+def build_manager(fixed_point, **kwargs):
+    return TradeManager(
+        TradeService(), FixedPointPortfolioService(fixed_point), FixedPointPnLService(fixed_point), **kwargs
+    )
+
+
+class TestFixedPoint:
+
+    def test_units_round_trip(self):
+        fixed_point = FixedPoint(price_decimals=8, quantity_decimals=6)
+        assert fixed_point.price_units(0.00001234) == 1234
+        assert fixed_point.price_units(65000.12345678) == 6500012345678
+        assert fixed_point.quantity_units(0.1) == 100_000
+        assert fixed_point.quantity_units(123456789012.5) == 123456789012_500_000
+        assert fixed_point.to_quantity(100_000) == 0.1
+        assert fixed_point.average_price(3 * 10 ** 14, 3 * 10 ** 6) == 1.0
+
+    def test_rejects_extra_decimals_unless_rounding(self):
+        fixed_point = FixedPoint(price_decimals=2, quantity_decimals=2)
+        with pytest.raises(ValueError):
+            fixed_point.quantity_units(0.125)
+        # Past 2**50 units the conversion goes through Decimal.
+        assert fixed_point.price_units(50000000000000.25) == 5000000000000025
+        with pytest.raises(ValueError):
+            fixed_point.price_units(50000000000000.125)
+        with pytest.raises(ValueError):
+            fixed_point.price_units(float("nan"))
+        assert fixed_point.price_units(0.125, strict=False) == 12
+        with pytest.raises(ValueError):
+            FixedPoint(price_decimals=19)
+
+    def test_rounding_is_half_even(self):
+        assert [divide_rounded(value, 10) for value in (14, 15, 25, 26, -15)] == [1, 2, 2, 3, -2]
+        fixed_point = FixedPoint(price_decimals=2, quantity_decimals=1)
+        assert fixed_point.round_cost(12345) == 12.34
+        assert fixed_point.round_cost(12355) == 12.36
+        assert FixedPoint(0, 1).round_cost(7) == 0.7
+
+    def test_sold_cost_leaves_nothing_behind(self):
+        fixed_point = FixedPoint()
+        cost, quantity = 1000, 3
+        removed = [fixed_point.sold_cost(cost, quantity, 1)]
+        removed.append(fixed_point.sold_cost(cost - removed[0], quantity - 1, 1))
+        removed.append(fixed_point.sold_cost(cost - sum(removed), quantity - 2, 1))
+        assert removed == [333, 334, 333]
+        assert sum(removed) == cost
+
+
+class TestFixedPointServices:
+
+    def test_position_closes_exactly(self):
+        buys = [make_trade(index, "BTC", "buy", 100.0, 0.1) for index in range(10)]
+        sell = make_trade(10, "BTC", "sell", 110.0, 1.0)
+
+        # 0.1 added ten times is 0.9999999999999999 in floats, so selling
+        # 1.0 is an oversell.
+        float_service = PortfolioService()
+        for trade in buys:
+            float_service.add_trade(trade)
+        with pytest.raises(ValueError):
+            float_service.add_trade(sell)
+
+        fixed_point = FixedPoint()
+        portfolio_service = FixedPointPortfolioService(fixed_point)
+        pnl_service = FixedPointPnLService(fixed_point)
+        for trade in buys + [sell]:
+            portfolio_service.add_trade(trade)
+            pnl_service.add_trade(trade)
+
+        assert portfolio_service.get_holdings() == {}
+        assert pnl_service.get_realized_pnl("BTC") == 10.0
+        assert pnl_service.get_symbol_state("BTC")["units"] == [0, 0, 10 * fixed_point.cost_scale]
+
+    def test_tiny_prices_keep_exact_cost(self):
+        fixed_point = FixedPoint(price_decimals=10, quantity_decimals=0)
+        portfolio_service = FixedPointPortfolioService(fixed_point)
+        pnl_service = FixedPointPnLService(fixed_point)
+        trades = [make_trade(index, "SHIB", "buy", 0.0000123, 1_000_000.0) for index in range(30)]
+        trades.append(make_trade(30, "SHIB", "sell", 0.0000246, 10_000_000.0))
+        for trade in trades:
+            portfolio_service.add_trade(trade)
+            pnl_service.add_trade(trade)
+
+        holding = portfolio_service.get_holding("SHIB")
+        assert isinstance(holding, FixedPointHolding)
+        assert holding.quantity_units == 20_000_000
+        assert holding.cost_units == 123_000 * 20_000_000
+        assert holding.average_price == 0.0000123
+        assert pnl_service.get_realized_pnl_units("SHIB") == 123_000 * 10_000_000
+
+    def test_batch_check_reports_extra_decimals(self):
+        trade_manager = build_manager(FixedPoint(price_decimals=2, quantity_decimals=2))
+        with pytest.raises(TradeBatchError) as error:
+            trade_manager.add_trades([
+                make_trade(0, "BTC", "buy", 100.0, 1.0),
+                make_trade(1, "BTC", "buy", 100.001, 1.0),
+            ])
+        assert list(error.value.errors) == [1]
+        with pytest.raises(Exception):
+            trade_manager.add_trade(make_trade(2, "BTC", "buy", 100.0, 0.001))
+        assert trade_manager.portfolio_service.get_holdings() == {}
+
+    def test_backdated_trade_replays_in_units(self):
+        fixed_point = FixedPoint()
+        trade_manager = build_manager(fixed_point)
+        for index in (1, 2, 3):
+            trade_manager.add_trade(make_trade(index, "ETH", "buy", 1000.0 + index, 0.1))
+        trade_manager.add_trade(make_trade(4, "ETH", "sell", 1100.0, 0.2))
+        trade_manager.add_trade(make_trade(0, "ETH", "buy", 900.0, 0.1))
+
+        in_order = build_manager(fixed_point)
+        for index, price in ((0, 900.0), (1, 1001.0), (2, 1002.0), (3, 1003.0)):
+            in_order.add_trade(make_trade(index, "ETH", "buy", price, 0.1))
+        in_order.add_trade(make_trade(4, "ETH", "sell", 1100.0, 0.2))
+
+        holding = trade_manager.portfolio_service.get_holding("ETH")
+        expected = in_order.portfolio_service.get_holding("ETH")
+        assert isinstance(holding, FixedPointHolding)
+        assert (holding.quantity_units, holding.cost_units) == (expected.quantity_units, expected.cost_units)
+        assert trade_manager.pnl_service.get_state() == in_order.pnl_service.get_state()
+
+    def test_snapshot_recovery_keeps_units(self, tmp_path):
+        fixed_point = FixedPoint()
+
+        def build():
+            return build_manager(
+                fixed_point,
+                journal_service=TradeJournalService(str(tmp_path / "trades.journal")),
+                snapshot_service=SnapshotService(str(tmp_path / "trades.journal.snapshot")),
+                snapshot_every=2
+            )
+
+        original = build()
+        for index, (side, price, quantity) in enumerate([("buy", 0.3, 3.0), ("buy", 0.7, 1.0), ("sell", 0.5, 1.0)]):
+            original.add_trade(make_trade(index, "DOGE", side, price, quantity))
+        original.journal_service.close()
+
+        recovered = build()
+        assert recovered.recover() == 3
+        assert recovered.pnl_service.get_state() == original.pnl_service.get_state()
+        assert recovered.portfolio_service.dump_holdings() == original.portfolio_service.dump_holdings()
+
+
+class TestFixedPointPnL:
+
+    def build(self, fixed_point):
+        prices = {"A": 1.005, "B": 1.005, "C": 1.005}
+        if fixed_point is None:
+            portfolio_service, pnl_service = PortfolioService(), PnLService()
+        else:
+            portfolio_service, pnl_service = FixedPointPortfolioService(fixed_point), FixedPointPnLService(fixed_point)
+        trade_manager = TradeManager(TradeService(), portfolio_service, pnl_service)
+        for index, symbol in enumerate(prices):
+            trade_manager.add_trade(make_trade(index, symbol, "buy", 1.0, 1.0))
+        return PnLManager(portfolio_service, PriceService(StaticPriceSource(prices)), trade_manager.trade_service, pnl_service)
+
+    def test_totals_round_once_from_exact_values(self):
+        float_summary = self.build(None).get_pnl()
+        summary = self.build(FixedPoint()).get_pnl()
+
+        # Each row is half a cent, which rounds to even.
+        assert [pnl.unrealized_pnl for pnl in summary.pnl] == [0.0, 0.0, 0.0]
+        assert float_summary.total_unrealized_pnl == 0.0
+        assert summary.total_unrealized_pnl == 0.02
+        assert summary.total_pnl == 0.02
+
+    def test_lot_methods_use_the_trade_log(self):
+        pnl_manager = self.build(FixedPoint())
+        assert pnl_manager.get_pnl_for_symbol("A", "fifo").quantity == 1.0
+        assert pnl_manager.get_pnl_for_symbol("A").average_price == 1.0
@@ -0,0 +1,44 @@
+import json
+
+
+class TestMetricsEndpoints:
+
+    def test_metrics_report_requests_calls_and_trades(self, client, sample_trades):
+        for trade in sample_trades:
+            client.post('/trades', data=json.dumps(trade), content_type='application/json')
+        client.get('/pnl')
+
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        text = response.get_data(as_text=True)
+        assert 'http_request_duration_seconds_count{method="POST",route="/trades",status="201"} 4' in text
+        assert 'http_request_duration_seconds_count{method="GET",route="/pnl",status="200"} 1' in text
+        assert 'call_duration_seconds_count{call="add_trade",component="trade_manager"} 4' in text
+        assert 'trades_total{symbol="BTC"} 3' in text
+        assert 'trades_total{symbol="ETH"} 1' in text
+        assert 'price_cache_hit_ratio' in text
+
+    def test_unmatched_routes_share_one_label(self, client):
+        client.get('/no/such/route')
+
+        text = client.get('/metrics').get_data(as_text=True)
+        assert 'route="unmatched",status="404"' in text
+
+    def test_profile_is_opt_in_per_request(self, client):
+        assert 'X-Profile-Id' not in client.get('/pnl').headers
+
+        response = client.get('/pnl?profile=1')
+        assert response.status_code == 200
+        profile_id = response.headers['X-Profile-Id']
+
+        profile = client.get(f'/profiles/{profile_id}')
+        assert profile.status_code == 200
+        assert profile.mimetype == 'text/plain'
+
+    def test_unknown_profile_returns_404(self, client):
+        response = client.get('/profiles/missing')
+
+        assert response.status_code == 404
+        assert json.loads(response.data)['error'] == "Profile missing not found"
@@ -0,0 +1,139 @@
+import asyncio
+import io
+import logging
+import time
+
+import pytest
+
+from src.services.logging_service import configure_logging
+from src.services.metrics_service import CALL_DURATION, MetricsService, price_cache_collector, trade_count_collector
+from src.services.price_service import PriceService
+from src.services.price_sources import StaticPriceSource
+from src.services.profiler_service import SamplingProfiler
+from src.services.trade_service import TradeService
+from src.models.trade import Trade
+
+
+class Pricer:
+    def price(self, value):
+        return value * 2
+
+    def fail(self):
+        raise ValueError("no price")
+
+    async def price_async(self, value):
+        return value * 3
+
+
+class TestMetricsService:
+
+    def test_observations_land_in_their_buckets(self):
+        metrics_service = MetricsService(buckets=(0.001, 0.01))
+        for seconds in (0.0005, 0.001, 0.005, 0.5):
+            metrics_service.observe("latency_seconds", seconds, route="/pnl")
+
+        histogram = metrics_service.get_histogram("latency_seconds", route="/pnl")
+        assert histogram["buckets"] == [2, 1, 1]
+        assert histogram["count"] == 4
+        assert histogram["sum"] == pytest.approx(0.5065)
+        assert metrics_service.get_histogram("latency_seconds", route="/trades") is None
+
+    def test_render_is_prometheus_text(self):
+        metrics_service = MetricsService(buckets=(0.001, 0.01))
+        metrics_service.describe("latency_seconds", "Request latency")
+        metrics_service.observe("latency_seconds", 0.005, route='/a"b')
+        metrics_service.observe("latency_seconds", 0.05, route='/a"b')
+
+        lines = metrics_service.render().splitlines()
+        assert lines == [
+            "# HELP latency_seconds Request latency",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{route="/a\\"b",le="0.001"} 0',
+            'latency_seconds_bucket{route="/a\\"b",le="0.01"} 1',
+            'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 2',
+            'latency_seconds_sum{route="/a\\"b"} 0.055',
+            'latency_seconds_count{route="/a\\"b"} 2',
+        ]
+
+    def test_instrument_times_calls_including_failures(self):
+        metrics_service = MetricsService()
+        pricer = Pricer()
+        metrics_service.instrument(pricer, "pricer", "price", "fail", "price_async")
+
+        assert pricer.price(2) == 4
+        with pytest.raises(ValueError):
+            pricer.fail()
+        assert asyncio.run(pricer.price_async(2)) == 6
+
+        for call in ("price", "fail", "price_async"):
+            assert metrics_service.get_histogram(CALL_DURATION, component="pricer", call=call)["count"] == 1
+        # Only the one instance is instrumented.
+        Pricer().price(1)
+        assert metrics_service.get_histogram(CALL_DURATION, component="pricer", call="price")["count"] == 1
+
+    def test_collectors_read_trade_counts_and_cache_stats(self):
+        trade_service = TradeService()
+        trade_service.add_trade(Trade("trade_1", "BTC", "buy", 100.0, 1.0, "2024-01-01T00:00:00"))
+        trade_service.add_trade(Trade("trade_2", "BTC", "sell", 110.0, 1.0, "2024-01-01T00:00:01"))
+        trade_service.add_trade(Trade("trade_3", "ETH", "buy", 10.0, 1.0, "2024-01-01T00:00:02"))
+        price_service = PriceService(StaticPriceSource({"BTC": 100.0}), ttl=60)
+        price_service.get_price("BTC")
+        price_service.get_price("BTC")
+
+        metrics_service = MetricsService()
+        metrics_service.register_collector(trade_count_collector(trade_service))
+        metrics_service.register_collector(price_cache_collector(price_service))
+        text = metrics_service.render()
+
+        assert "# TYPE trades_total counter" in text
+        assert 'trades_total{symbol="BTC"} 2' in text
+        assert 'trades_total{symbol="ETH"} 1' in text
+        assert 'price_cache_lookups_total{result="hit"} 1' in text
+        assert 'price_cache_lookups_total{result="miss"} 1' in text
+        assert "price_cache_hit_ratio 0.5" in text
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestSamplingProfiler:
+
+    def test_profile_holds_collapsed_stacks(self):
+        profiler = SamplingProfiler(interval=0.001)
+        session = profiler.start()
+        spin(0.05)
+        profile_id = profiler.stop(session)
+
+        profile = profiler.get_profile(profile_id)
+        assert "test_metrics_service.py:spin" in profile
+        for line in profile.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+
+    def test_only_the_latest_profiles_are_kept(self):
+        profiler = SamplingProfiler(interval=0.001, keep=2)
+        profile_ids = [profiler.stop(profiler.start()) for _ in range(3)]
+
+        assert profiler.get_profile(profile_ids[0]) is None
+        assert profiler.get_profile(profile_ids[2]) is not None
+
+
+class TestLogging:
+
+    def test_records_are_written_by_the_listener(self):
+        stream = io.StringIO()
+        root = logging.getLogger()
+        handlers, level = list(root.handlers), root.level
+        listener = configure_logging("INFO", stream)
+        try:
+            logging.getLogger("src.test").info("Recovered %d trades", 3)
+            logging.getLogger("src.test").debug("Adding trade: %s", "skipped")
+        finally:
+            listener.stop()
+            root.handlers, root.level = handlers, level
+
+        assert "INFO src.test: Recovered 3 trades" in stream.getvalue()
+        assert "skipped" not in stream.getvalue()
@@ -0,0 +1,60 @@
+import sys
+
+import pytest
+
+from src.models.trade import Trade, to_epoch_nanos, from_epoch_nanos
+from src.models.portfolio import Portfolio
+
+
+class TestTrade:
+
+    def test_is_slotted(self):
+        trade = Trade("trade_1", "BTC", "buy", 100.0, 1.0, "2024-01-01T00:00:00")
+
+        assert not hasattr(trade, "__dict__")
+        with pytest.raises(AttributeError):
+            trade.note = "no per-instance attributes"
+
+    def test_side_is_normalized_once(self):
+        assert Trade("trade_1", "BTC", "BUY", 100.0, 1.0, "2024-01-01T00:00:00").is_buy is True
+        sell = Trade("trade_2", "BTC", "Sell", 100.0, 1.0, "2024-01-01T00:00:00")
+        assert sell.is_buy is False
+        assert sell.side == "sell"
+
+    def test_invalid_side_is_rejected(self):
+        with pytest.raises(ValueError, match="Invalid trade side: hold"):
+            Trade("trade_1", "BTC", "hold", 100.0, 1.0, "2024-01-01T00:00:00")
+
+    def test_timestamp_is_epoch_nanoseconds(self):
+        trade = Trade("trade_1", "BTC", "buy", 100.0, 1.0, "2024-01-01T00:00:00.000001")
+
+        assert trade.timestamp_ns == 1_704_067_200_000_001_000
+        assert trade.timestamp == "2024-01-01T00:00:00.000001"
+        assert Trade("trade_2", "BTC", "buy", 100.0, 1.0, trade.timestamp_ns).timestamp == trade.timestamp
+        assert from_epoch_nanos(to_epoch_nanos("2024-02-29T12:30:00")) == "2024-02-29T12:30:00"
+
+    def test_symbols_are_interned(self):
+        symbol = "".join(["B", "T", "C"])
+        assert symbol is not sys.intern("BTC")
+
+        assert Trade("trade_1", symbol, "buy", 100.0, 1.0, "2024-01-01T00:00:00").symbol is sys.intern("BTC")
+
+    def test_to_dict_keeps_the_api_shape(self):
+        trade = Trade("trade_1", "BTC", "buy", 100.0, 1.0, "2024-01-01T00:00:00")
+
+        assert trade.to_dict() == {
+            "id": "trade_1", "symbol": "BTC", "side": "buy",
+            "price": 100.0, "quantity": 1.0, "timestamp": "2024-01-01T00:00:00"
+        }
+
+
+class TestPortfolio:
+
+    def test_record(self):
+        holding = Portfolio("BTC", 2.0, 100.0)
+
+        assert not hasattr(holding, "__dict__")
+        assert holding.total_cost == 200.0
+        assert holding == Portfolio("BTC", 2.0, 100.0)
+        assert holding != Portfolio("BTC", 2.0, 101.0)
+        assert holding.to_dict() == {"symbol": "BTC", "quantity": 2.0, "average_price": 100.0}
@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import random
+
+import pytest
+
+from src.models.trade import Trade
+from src.services.portfolio_service import PortfolioService
+from src.services.price_service import PriceService
+from src.services.price_sources import DEFAULT_PRICES
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService
+from src.services.pnl_kernel import replay_weighted_average_cost_scalar
+from src.services.parallel_pnl_service import ParallelPnLService
+from src.managers.trade_manager import TradeManager
+from src.managers.pnl_manager import PnLManager
+from src.managers.account_manager import AccountManager
+
+
+def add_random_trades(trade_manager, count, seed, prefix="trade"):
+    rng = random.Random(seed)
+    holdings = dict.fromkeys(DEFAULT_PRICES, 0.0)
+    for index in range(count):
+        symbol = rng.choice(list(DEFAULT_PRICES))
+        if holdings[symbol] > 1 and rng.random() < 0.4:
+            side, quantity = "sell", round(holdings[symbol] * rng.uniform(0.1, 0.5), 4)
+            holdings[symbol] -= quantity
+        else:
+            side, quantity = "buy", round(rng.uniform(0.5, 5.0), 4)
+            holdings[symbol] += quantity
+        price = round(DEFAULT_PRICES[symbol] * rng.uniform(0.8, 1.2), 6)
+        trade_manager.add_trade(Trade(f"{prefix}_{index}", symbol, side, price, quantity, f"2024-01-01T00:00:00.{index + 1:06d}"))
+
+
+@pytest.fixture
+def pool():
+    parallel_pnl_service = ParallelPnLService(workers=2, min_rows=1)
+    yield parallel_pnl_service
+    parallel_pnl_service.close()
+
+
+class TestParallelPnLService:
+
+    def test_pool_matches_inline_replay(self, pool):
+        rng = random.Random(3)
+        columns = []
+        for _ in range(12):
+            size = rng.randint(0, 300)
+            columns.append((
+                [rng.random() < 0.7 for _ in range(size)],
+                [rng.uniform(1.0, 100.0) for _ in range(size)],
+                [rng.uniform(0.1, 2.0) for _ in range(size)],
+            ))
+        current_prices = [rng.uniform(1.0, 100.0) for _ in columns]
+
+        results, total_unrealized_pnl, total_realized_pnl = pool.revalue(columns, current_prices)
+        inline_results, inline_unrealized_pnl, inline_realized_pnl = ParallelPnLService(workers=1).revalue(columns, current_prices)
+
+        assert results == inline_results
+        assert total_unrealized_pnl == pytest.approx(inline_unrealized_pnl)
+        assert total_realized_pnl == pytest.approx(inline_realized_pnl)
+        for (quantity, total_cost, realized_pnl, _), group in zip(results, columns):
+            expected = replay_weighted_average_cost_scalar(*group)
+            assert quantity == pytest.approx(expected[0])
+            assert total_cost == pytest.approx(expected[1])
+            assert realized_pnl == pytest.approx(round(expected[2], 2), abs=0.011)
+
+    def test_empty_input(self, pool):
+        assert pool.revalue([], []) == ([], 0.0, 0.0)
+
+    @pytest.mark.skipif("forkserver" not in multiprocessing.get_all_start_methods(), reason="needs forkserver")
+    def test_workers_are_not_forked_from_the_caller(self, pool):
+        # The caller runs other threads; its workers come from the fork server.
+        pool.revalue([([True], [1.0], [1.0])], [2.0])
+        assert pool._executor._mp_context.get_start_method() == "forkserver"
+        assert pool._executor.submit(os.getppid).result() != os.getpid()
+
+
+class TestParallelRevaluation:
+
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_revalue_pnl_matches_incremental_pnl(self, store, pool):
+        portfolio_service = PortfolioService()
+        trade_service = store()
+        pnl_service = PnLService()
+        add_random_trades(TradeManager(trade_service, portfolio_service, pnl_service), 2000, seed=1)
+        pnl_manager = PnLManager(portfolio_service, PriceService(), trade_service, pnl_service, pool)
+
+        revalued = pnl_manager.revalue_pnl().to_dict()
+        expected = pnl_manager.get_pnl().to_dict()
+
+        assert revalued["count"] == expected["count"]
+        assert revalued["total_pnl"] == pytest.approx(expected["total_pnl"], abs=0.05)
+        for revalued_symbol, expected_symbol in zip(revalued["pnl"], expected["pnl"]):
+            assert revalued_symbol["symbol"] == expected_symbol["symbol"]
+            assert revalued_symbol["realized_pnl"] == pytest.approx(expected_symbol["realized_pnl"], abs=0.011)
+            assert revalued_symbol["unrealized_pnl"] == pytest.approx(expected_symbol["unrealized_pnl"], abs=0.011)
+
+    def test_revalue_aggregate_matches_incremental_aggregate(self, pool):
+        account_manager = AccountManager(PriceService(), shard_count=4, parallel_pnl_service=pool)
+        for index in range(20):
+            account = account_manager.get_account(f"wallet_{index}", create=True)
+            add_random_trades(account.trade_manager, 100, seed=index, prefix=f"wallet_{index}")
+
+        revalued = account_manager.revalue_aggregate_pnl()
+        expected = account_manager.get_aggregate_pnl()
+
+        assert [account.account_id for account in revalued.accounts] == [account.account_id for account in expected.accounts]
+        assert revalued.total_pnl == pytest.approx(expected.total_pnl, abs=0.5)
+        for revalued_account, expected_account in zip(revalued.accounts, expected.accounts):
+            assert revalued_account.total_pnl == pytest.approx(expected_account.total_pnl, abs=0.1)
@@ -1,4 +1,3 @@
-import pytest
 import json
 
 
@@ -190,4 +189,203 @@ class TestPnLEndpoints:
         assert eth_pnl['quantity'] == 2.5
         assert abs(eth_pnl['average_price'] - 2833.33) < 0.01
         assert abs(eth_pnl['realized_pnl'] - 83.33) < 0.01
-        assert abs(eth_pnl['unrealized_pnl'] - (-2083.33)) < 0.01
\ No newline at end of file
+        assert abs(eth_pnl['unrealized_pnl'] - (-2083.33)) < 0.01
+
+    def test_get_pnl_ignores_rejected_sell(self, client):
+        trades = [
+            {"symbol": "BTC", "side": "buy", "price": 45000.0, "quantity": 0.2},
+            {"symbol": "BTC", "side": "sell", "price": 50000.0, "quantity": 0.5},
+            {"symbol": "BTC", "side": "sell", "price": 50000.0, "quantity": 0.1}
+        ]
+        
+        for trade in trades:
+            client.post('/trades',
+                       data=json.dumps(trade),
+                       content_type='application/json')
+        
+        response = client.get('/pnl/BTC')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['quantity'] == 0.1
+        assert data['realized_pnl'] == 500.0
+        
+        trades_response = client.get('/trades')
+        assert json.loads(trades_response.data)['count'] == 2
+
+    def test_get_pnl_etag_and_not_modified(self, client):
+        trade_data = {"symbol": "BTC", "side": "buy", "price": 50000.0, "quantity": 0.1}
+        client.post('/trades',
+                   data=json.dumps(trade_data),
+                   content_type='application/json')
+        
+        response = client.get('/pnl')
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        
+        response = client.get('/pnl', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        
+        symbol_response = client.get('/pnl/BTC')
+        symbol_etag = symbol_response.headers['ETag']
+        assert client.get('/pnl/BTC', headers={'If-None-Match': symbol_etag}).status_code == 304
+        
+        client.post('/trades',
+                   data=json.dumps(trade_data),
+                   content_type='application/json')
+        
+        response = client.get('/pnl', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert json.loads(response.data)['pnl'][0]['quantity'] == 0.2
+        assert client.get('/pnl/BTC', headers={'If-None-Match': symbol_etag}).status_code == 200
+
+
+class TestPnLHistoryEndpoint:
+    """Test cases for the PnL history endpoint"""
+
+    def post_batch(self, client):
+        client.post('/trades/batch', data=json.dumps([
+            {"symbol": "BTC", "side": "buy", "price": 9000.0, "quantity": 1.0, "timestamp": "2024-01-01T00:30:00"},
+            {"symbol": "BTC", "side": "sell", "price": 9500.0, "quantity": 0.5, "timestamp": "2024-01-01T01:30:00"},
+            {"symbol": "ETH", "side": "buy", "price": 1500.0, "quantity": 2.0, "timestamp": "2024-01-01T02:00:00"},
+        ]), content_type='application/json')
+
+    def test_history_buckets(self, client):
+        """Each bucket reflects the trades up to its timestamp"""
+        self.post_batch(client)
+
+        response = client.get('/pnl/history?from=2024-01-01T00:00:00&to=2024-01-01T03:00:00&interval=1h')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+
+        assert data['count'] == 4
+        assert [point['timestamp'] for point in data['history']] == [
+            "2024-01-01T00:00:00", "2024-01-01T01:00:00", "2024-01-01T02:00:00", "2024-01-01T03:00:00"
+        ]
+        # The static price source marks BTC at 10000 and ETH at 2000 throughout.
+        assert data['history'][0]['total_pnl'] == 0.0
+        assert data['history'][1]['unrealized_pnl'] == 1000.0
+        assert data['history'][2]['realized_pnl'] == 250.0
+        assert data['history'][2]['unrealized_pnl'] == 500.0 + 1000.0
+        assert data['history'][3]['total_pnl'] == json.loads(client.get('/pnl').data)['total_pnl']
+
+    def test_history_for_symbol_and_ndjson(self, client):
+        """History can be limited to one symbol and streamed as NDJSON"""
+        self.post_batch(client)
+
+        response = client.get('/pnl/history?symbol=eth&from=2024-01-01T00:00:00&to=2024-01-01T03:00:00&interval=3600&format=ndjson')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        points = [json.loads(line) for line in response.data.decode().splitlines()]
+
+        assert [point['unrealized_pnl'] for point in points] == [0.0, 0.0, 1000.0, 1000.0]
+
+    def test_history_invalid_queries(self, client):
+        """Missing, malformed or oversized queries are rejected"""
+        assert client.get('/pnl/history?from=2024-01-01T00:00:00&to=2024-01-02T00:00:00').status_code == 400
+        assert client.get('/pnl/history?from=2024-01-01&to=2024-01-02&interval=5x').status_code == 400
+        assert client.get('/pnl/history?from=2024-01-02&to=2024-01-01&interval=1h').status_code == 400
+        assert client.get('/pnl/history?from=2024-01-01&to=2024-12-31&interval=1s').status_code == 400
+
+    def test_get_pnl_cost_basis(self, client):
+        trades = [
+            {"symbol": "BTC", "side": "buy", "price": 100.0, "quantity": 1.0, "timestamp": "2024-01-01T10:00:00"},
+            {"symbol": "BTC", "side": "buy", "price": 200.0, "quantity": 1.0, "timestamp": "2024-01-01T11:00:00"},
+            {"symbol": "BTC", "side": "buy", "price": 150.0, "quantity": 1.0, "timestamp": "2024-01-01T12:00:00"},
+            {"symbol": "BTC", "side": "sell", "price": 180.0, "quantity": 1.5, "timestamp": "2024-01-01T13:00:00"}
+        ]
+        client.post('/trades/batch', data=json.dumps(trades), content_type='application/json')
+
+        for cost_basis, realized_pnl, average_price in (("fifo", 70.0, 166.67), ("lifo", 20.0, 133.33),
+                                                        ("hifo", -5.0, 116.67), ("wac", 45.0, 150.0)):
+            data = json.loads(client.get(f'/pnl/BTC?cost_basis={cost_basis}').data)
+            assert data['realized_pnl'] == realized_pnl
+            assert round(data['average_price'], 2) == average_price
+            assert data['unrealized_pnl'] == round((10000.0 - data['average_price']) * 1.5, 2)
+
+            summary = json.loads(client.get(f'/pnl?cost_basis={cost_basis.upper()}').data)
+            assert summary['total_realized_pnl'] == realized_pnl
+
+        assert client.get('/pnl/BTC?cost_basis=fifo').headers['ETag'] != client.get('/pnl/BTC').headers['ETag']
+
+    def test_get_pnl_revalued_from_the_trade_log(self, client):
+        trades = [
+            {"symbol": "BTC", "side": "buy", "price": 40000.0, "quantity": 0.3, "timestamp": "2024-01-01T10:00:00"},
+            {"symbol": "BTC", "side": "buy", "price": 50000.0, "quantity": 0.2, "timestamp": "2024-01-01T11:00:00"},
+            {"symbol": "BTC", "side": "sell", "price": 55000.0, "quantity": 0.2, "timestamp": "2024-01-01T12:00:00"},
+            {"symbol": "ETH", "side": "buy", "price": 2500.0, "quantity": 2.0, "timestamp": "2024-01-01T13:00:00"},
+        ]
+        client.post('/trades/batch', data=json.dumps(trades), content_type='application/json')
+
+        response = client.get('/pnl?revalue=true')
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+        assert json.loads(response.data) == json.loads(client.get('/pnl').data)
+
+        summary = json.loads(client.get('/pnl?revalue=true&cost_basis=fifo').data)
+        assert summary['total_realized_pnl'] == json.loads(client.get('/pnl?cost_basis=fifo').data)['total_realized_pnl']
+        assert client.get('/pnl?revalue=yes').status_code == 400
+
+    def test_get_pnl_invalid_cost_basis(self, client):
+        response = client.get('/pnl?cost_basis=average')
+
+        assert response.status_code == 400
+        assert 'Invalid cost basis' in json.loads(response.data)['error']
+
+
+class TestPnLScenariosEndpoint:
+    """Test cases for the PnL scenarios endpoint"""
+
+    def post_trades(self, client):
+        client.post('/trades/batch', data=json.dumps([
+            {"symbol": "BTC", "side": "buy", "price": 9000.0, "quantity": 1.0, "timestamp": "2024-01-01T00:30:00"},
+            {"symbol": "ETH", "side": "buy", "price": 1500.0, "quantity": 2.0, "timestamp": "2024-01-01T01:00:00"},
+        ]), content_type='application/json')
+
+    def post_scenarios(self, client, body, query=''):
+        return client.post('/pnl/scenarios' + query, data=json.dumps(body), content_type='application/json')
+
+    def test_price_scenarios(self, client):
+        """Each row revalues the named holdings; the others keep their mark"""
+        self.post_trades(client)
+
+        response = self.post_scenarios(client, {"symbols": ["btc"], "prices": [[10000.0], [8000.0]]})
+        assert response.status_code == 200
+        data = json.loads(response.data)
+
+        assert data['symbols'] == ['BTC']
+        assert data['scenario_count'] == 2
+        assert data['current_unrealized_pnl'] == 2000.0
+        assert data['unrealized_pnl'] == [2000.0, 0.0]
+        assert data['total_pnl'] == [2000.0, 0.0]
+        assert data['symbol_unrealized_pnl'] is None
+
+    def test_shock_scenarios_with_detail(self, client):
+        """Shocks are relative to the current price; detail adds a row of symbol PnL per scenario"""
+        self.post_trades(client)
+
+        response = self.post_scenarios(client, {
+            "symbols": ["BTC", "ETH"], "shocks": [[0.0, 0.0], [-0.1, 0.5]], "detail": True
+        }, '?cost_basis=fifo')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+
+        assert data['unrealized_pnl'] == [2000.0, 3000.0]
+        assert data['symbol_unrealized_pnl'] == [[1000.0, 1000.0], [0.0, 3000.0]]
+
+    def test_invalid_scenarios(self, client):
+        """Malformed bodies are rejected"""
+        self.post_trades(client)
+
+        assert self.post_scenarios(client, [1, 2]).status_code == 400
+        assert self.post_scenarios(client, {"symbols": [], "prices": [[1.0]]}).status_code == 400
+        assert self.post_scenarios(client, {"symbols": ["BTC"]}).status_code == 400
+        assert self.post_scenarios(client, {"symbols": ["BTC"], "prices": [[1.0]], "shocks": [[0.1]]}).status_code == 400
+        assert self.post_scenarios(client, {"symbols": ["BTC"], "prices": []}).status_code == 400
+        assert self.post_scenarios(client, {"symbols": ["BTC", "ETH"], "prices": [[1.0]]}).status_code == 400
+        assert self.post_scenarios(client, {"symbols": ["BTC"], "prices": [[-1.0]]}).status_code == 400
+        assert self.post_scenarios(client, {"symbols": ["BTC"], "prices": [["x"]]}).status_code == 400
+        assert self.post_scenarios(client, {"symbols": ["BTC"], "prices": [[1.0]], "detail": "yes"}).status_code == 400
+        assert self.post_scenarios(client, {"symbols": ["BTC"], "prices": [[1.0]]}, '?cost_basis=lifo2').status_code == 400
+        assert client.get('/pnl/scenarios').status_code in (404, 405)
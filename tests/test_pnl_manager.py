@@ -0,0 +1,199 @@
+from datetime import timedelta
+
+import pytest
+
+from src.models.trade import Trade, to_epoch_nanos
+from src.services.portfolio_service import PortfolioService
+from src.services.price_service import PriceService
+from src.services.price_sources import HistoricalPriceSource, ReplayPriceSource
+from src.services.trade_service import TradeService
+from src.services.pnl_service import PnLService
+from src.managers.trade_manager import TradeManager
+from src.managers.pnl_manager import PnLManager
+
+
+class TestPnLManagerCache:
+
+    def test_price_tick_only_recomputes_unrealized_pnl(self):
+        source = ReplayPriceSource([{"BTC": 10000.0, "ETH": 2000.0}, {"BTC": 12000.0, "ETH": 2000.0}])
+        portfolio_service = PortfolioService()
+        price_service = PriceService(source=source, ttl=0)
+        trade_service = TradeService()
+        pnl_service = PnLService()
+        trade_manager = TradeManager(trade_service, portfolio_service, pnl_service)
+        pnl_manager = PnLManager(portfolio_service, price_service, trade_service, pnl_service)
+
+        for index, (symbol, side, price, quantity) in enumerate([
+            ("BTC", "buy", 9000.0, 1.0),
+            ("BTC", "sell", 9500.0, 0.5),
+            ("ETH", "buy", 1500.0, 2.0),
+        ]):
+            trade_manager.add_trade(Trade(f"trade_{index}", symbol, side, price, quantity, f"2024-01-01T00:00:0{index}"))
+
+        first, first_version = pnl_manager.get_pnl_with_version()
+        assert pnl_manager.get_pnl_with_version() == (first, first_version)
+
+        realized_calls = []
+        original = pnl_manager._calculate_realized_pnl_for_symbol
+        pnl_manager._calculate_realized_pnl_for_symbol = lambda symbol: realized_calls.append(symbol) or original(symbol)
+
+        source.advance()
+        price_service.invalidate("BTC")
+        second, second_version = pnl_manager.get_pnl_with_version()
+
+        assert second_version != first_version
+        assert realized_calls == []
+        btc = {item.symbol: item for item in second.pnl}["BTC"]
+        assert btc.current_price == 12000.0
+        assert btc.unrealized_pnl == 1500.0
+        assert btc.realized_pnl == 250.0
+
+        trade_manager.add_trade(Trade("trade_3", "ETH", "buy", 1800.0, 1.0, "2024-01-01T00:00:03"))
+        pnl_manager.get_pnl()
+        assert realized_calls == ["ETH"]
+
+
+class TestPnLHistory:
+
+    def test_history_matches_replay_at_each_bucket(self):
+        source = HistoricalPriceSource({
+            "BTC": [("2024-01-01T00:00:00", 10000.0), ("2024-01-01T00:10:00", 11000.0), ("2024-01-01T00:25:00", 9000.0)],
+            "ETH": [("2024-01-01T00:05:00", 2000.0), ("2024-01-01T00:20:00", 2500.0)],
+        })
+        portfolio_service = PortfolioService()
+        trade_service = TradeService()
+        pnl_service = PnLService()
+        trade_manager = TradeManager(trade_service, portfolio_service, pnl_service)
+        pnl_manager = PnLManager(portfolio_service, PriceService(source=source), trade_service, pnl_service)
+
+        trades = [
+            Trade("trade_0", "BTC", "buy", 9500.0, 1.0, "2024-01-01T00:01:00"),
+            Trade("trade_1", "ETH", "buy", 1900.0, 3.0, "2024-01-01T00:02:00"),
+            Trade("trade_2", "BTC", "buy", 10500.0, 1.0, "2024-01-01T00:12:00"),
+            Trade("trade_3", "BTC", "sell", 11000.0, 1.5, "2024-01-01T00:15:00"),
+            Trade("trade_4", "ETH", "sell", 2400.0, 1.0, "2024-01-01T00:21:00"),
+        ]
+        for trade in trades:
+            trade_manager.add_trade(trade)
+
+        history = list(pnl_manager.get_pnl_history(
+            None, "2024-01-01T00:00:00", "2024-01-01T00:30:00", timedelta(minutes=3)
+        ))
+        assert len(history) == 11
+
+        for point in history:
+            replayed = PnLService()
+            last_prices = {}
+            for trade in trades:
+                if trade.timestamp <= point.timestamp:
+                    replayed.add_trade(trade)
+                    last_prices[trade.symbol] = trade.price
+            unrealized = 0.0
+            for symbol, state in replayed.get_state().items():
+                if state["quantity"] > 0:
+                    marks = [price for timestamp_ns, price in source.series[symbol] if timestamp_ns <= to_epoch_nanos(point.timestamp)]
+                    mark = marks[-1] if marks else last_prices[symbol]
+                    unrealized += (mark - state["total_cost"] / state["quantity"]) * state["quantity"]
+            realized = sum(state["realized_pnl"] for state in replayed.get_state().values())
+
+            assert point.realized_pnl == round(realized, 2)
+            assert point.unrealized_pnl == pytest.approx(round(unrealized, 2), abs=0.01)
+
+    def test_price_points_compare_by_time_not_text(self):
+        # "2024-01-01 00:10:00" sorts before "2024-01-01T00:05:00" as text.
+        source = HistoricalPriceSource({"BTC": [("2024-01-01T00:00:00", 100.0), ("2024-01-01 00:10:00", 200.0)]})
+        portfolio_service = PortfolioService()
+        trade_service = TradeService()
+        pnl_service = PnLService()
+        trade_manager = TradeManager(trade_service, portfolio_service, pnl_service)
+        pnl_manager = PnLManager(portfolio_service, PriceService(source=source), trade_service, pnl_service)
+        trade_manager.add_trade(Trade("trade_0", "BTC", "buy", 100.0, 1.0, "2024-01-01T00:00:00"))
+
+        history = list(pnl_manager.get_pnl_history(
+            "BTC", "2024-01-01T00:00:00", "2024-01-01T00:10:00", timedelta(minutes=5)
+        ))
+        assert [point.unrealized_pnl for point in history] == [0.0, 0.0, 100.0]
+
+    def test_history_is_lazy_and_bounded(self):
+        portfolio_service = PortfolioService()
+        trade_service = TradeService()
+        pnl_service = PnLService()
+        pnl_manager = PnLManager(portfolio_service, PriceService(), trade_service, pnl_service)
+
+        points = pnl_manager.get_pnl_history(None, "2024-01-01T00:00:00", "2024-12-31T00:00:00", timedelta(seconds=1), max_buckets=10**9)
+        assert next(points).total_pnl == 0.0
+
+        with pytest.raises(ValueError):
+            pnl_manager.get_pnl_history(None, "2024-01-01T00:00:00", "2024-12-31T00:00:00", timedelta(seconds=1))
+
+
+class TestScenarioPnL:
+
+    def make_manager(self):
+        portfolio_service = PortfolioService()
+        trade_service = TradeService()
+        pnl_service = PnLService()
+        trade_manager = TradeManager(trade_service, portfolio_service, pnl_service)
+        pnl_manager = PnLManager(portfolio_service, PriceService(), trade_service, pnl_service)
+        trade_manager.add_trade(Trade("trade_1", "BTC", "buy", 9000.0, 2.0, "2024-01-01T00:00:00"))
+        trade_manager.add_trade(Trade("trade_2", "BTC", "sell", 9500.0, 1.0, "2024-01-01T00:01:00"))
+        trade_manager.add_trade(Trade("trade_3", "ETH", "buy", 1500.0, 4.0, "2024-01-01T00:02:00"))
+        return pnl_manager
+
+    def test_prices_and_shocks_agree(self):
+        pnl_manager = self.make_manager()
+        # Static marks: BTC 10000, ETH 2000. Holding 1 BTC at 9000, 4 ETH at 1500.
+        by_price = pnl_manager.get_scenario_pnl(["BTC"], [[10000.0], [8000.0], [12000.0]])
+        by_shock = pnl_manager.get_scenario_pnl(["BTC"], [[0.0], [-0.2], [0.2]], relative=True)
+
+        # ETH is not named, so it stays at its current 2000 unrealized.
+        assert list(by_price.unrealized_pnl) == [3000.0, 1000.0, 5000.0]
+        assert list(by_shock.unrealized_pnl) == list(by_price.unrealized_pnl)
+        assert by_price.total_realized_pnl == 500.0
+        assert list(by_price.total_pnl) == [3500.0, 1500.0, 5500.0]
+        assert by_price.current_unrealized_pnl == 3000.0
+        assert by_price.symbol_unrealized_pnl is None
+
+    def test_detail_and_unheld_symbols(self):
+        pnl_manager = self.make_manager()
+        result = pnl_manager.get_scenario_pnl(
+            ["ETH", "SOL", "BTC"], [[1000.0, 50.0, 9000.0], [2500.0, 80.0, 11000.0]], detail=True
+        )
+
+        assert result.scenario_count == 2
+        assert [list(row) for row in result.symbol_unrealized_pnl] == [[-2000.0, 0.0, 0.0], [4000.0, 0.0, 2000.0]]
+        assert list(result.unrealized_pnl) == [-2000.0, 6000.0]
+
+    def test_invalid_scenarios(self):
+        pnl_manager = self.make_manager()
+        with pytest.raises(ValueError):
+            pnl_manager.get_scenario_pnl(["BTC", "BTC"], [[1.0, 2.0]])
+        with pytest.raises(ValueError):
+            pnl_manager.get_scenario_pnl(["BTC", "ETH"], [[1.0, 2.0], [1.0]])
+        with pytest.raises(ValueError):
+            pnl_manager.get_scenario_pnl(["BTC"], [[-1.0]])
+        with pytest.raises(ValueError):
+            pnl_manager.get_scenario_pnl(["BTC"], [[-1.5]], relative=True)
+        with pytest.raises(ValueError):
+            pnl_manager.get_scenario_pnl(["BTC"], [[float("nan")]])
+
+    def test_kernel_matches_scalar_fallback(self):
+        import random
+        from src.services.pnl_kernel import revalue_scenarios, revalue_scenarios_scalar
+
+        rng = random.Random(7)
+        quantities = [rng.uniform(0.0, 10.0) for _ in range(20)]
+        average_prices = [rng.uniform(1.0, 100.0) for _ in range(20)]
+        base_prices = [rng.uniform(1.0, 100.0) for _ in range(20)]
+        shocks = [[rng.uniform(-0.5, 0.5) for _ in range(20)] for _ in range(30)]
+        prices = [[rng.uniform(1.0, 100.0) for _ in range(20)] for _ in range(30)]
+
+        for values, base in ((shocks, base_prices), (prices, None)):
+            for detail in (False, True):
+                vectorized = revalue_scenarios(quantities, average_prices, values, base, 12.5, 3.0, detail)
+                scalar = revalue_scenarios_scalar(quantities, average_prices, values, base, 12.5, 3.0, detail)
+                assert list(vectorized[0]) == pytest.approx(scalar[0], abs=0.011)
+                assert list(vectorized[1]) == pytest.approx(scalar[1], abs=0.011)
+                if detail:
+                    for row, scalar_row in zip(vectorized[2], scalar[2]):
+                        assert list(row) == pytest.approx(scalar_row, abs=0.011)
@@ -0,0 +1,43 @@
+import pytest
+
+from src.models.trade import Trade
+from src.services.pnl_service import PnLService
+
+
+def make_trade(index, symbol, side, price, quantity):
+    return Trade(
+        trade_id=f"trade_{index}",
+        symbol=symbol,
+        side=side,
+        price=price,
+        quantity=quantity,
+        timestamp=f"2024-01-01T00:00:{index:02d}"
+    )
+
+
+class TestPnLService:
+
+    def test_incremental_state_matches_replay(self):
+        trades = [
+            make_trade(0, "BTC", "buy", 40000.0, 0.3),
+            make_trade(1, "BTC", "buy", 50000.0, 0.2),
+            make_trade(2, "ETH", "buy", 2500.0, 2.0),
+            make_trade(3, "BTC", "sell", 55000.0, 0.2),
+            make_trade(4, "ETH", "sell", 3000.0, 2.0),
+            make_trade(5, "ETH", "buy", 3500.0, 1.0),
+        ]
+        pnl_service = PnLService()
+        for trade in trades:
+            pnl_service.add_trade(trade)
+
+        assert round(pnl_service.get_realized_pnl("BTC"), 2) == 2200.0
+        assert round(pnl_service.get_realized_pnl("ETH"), 2) == 1000.0
+        for symbol in ("BTC", "ETH"):
+            replayed = PnLService()
+            replayed.replay_columns(
+                symbol,
+                [trade.is_buy for trade in trades if trade.symbol == symbol],
+                [trade.price for trade in trades if trade.symbol == symbol],
+                [trade.quantity for trade in trades if trade.symbol == symbol]
+            )
+            assert replayed.get_symbol_state(symbol) == pytest.approx(pnl_service.get_symbol_state(symbol))
@@ -0,0 +1,166 @@
+import json
+
+import pytest
+
+from src.models.trade import Trade
+from src.services.portfolio_service import PortfolioService
+from src.services.price_service import PriceService
+from src.services.price_sources import StaticPriceSource
+from src.services.trade_service import TradeService
+from src.services.pnl_service import PnLService
+from src.managers.trade_manager import TradeManager
+from src.managers.pnl_manager import PnLManager
+from src.managers.pnl_stream_manager import PnLStreamManager
+
+
+class Book:
+    # interval=0 runs no background thread; the tests publish themselves.
+    def __init__(self):
+        self.source = StaticPriceSource({"BTC": 100.0, "ETH": 10.0})
+        self.price_service = PriceService(self.source, ttl=60)
+        self.trade_manager = TradeManager(TradeService(), PortfolioService(), PnLService())
+        self.pnl_manager = PnLManager(
+            self.trade_manager.portfolio_service, self.price_service,
+            self.trade_manager.trade_service, self.trade_manager.pnl_service
+        )
+        self.stream_manager = PnLStreamManager(self.pnl_manager, interval=0)
+        self.trade_manager.add_change_listener(self.stream_manager.mark_changed)
+        self.price_service.add_change_listener(self.stream_manager.mark_changed)
+        self.trade_count = 0
+
+    def trade(self, symbol, side, price, quantity):
+        self.trade_count += 1
+        self.trade_manager.add_trade(Trade(
+            f"trade_{self.trade_count}", symbol, side, price, quantity, f"2024-01-01T00:00:{self.trade_count:02d}"
+        ))
+
+    def reprice(self, symbol, price):
+        self.source.prices[symbol] = price
+        self.price_service.fetch_prices([symbol])
+
+
+@pytest.fixture
+def book():
+    book = Book()
+    book.trade("BTC", "buy", 90.0, 1.0)
+    book.trade("ETH", "buy", 8.0, 10.0)
+    return book
+
+
+class TestPnLStreamManager:
+
+    def test_first_update_is_the_whole_book(self, book):
+        subscription = book.stream_manager.subscribe()
+
+        update = subscription.next_update(0)
+        assert [pnl.symbol for pnl in update["pnl"]] == ["BTC", "ETH"]
+        assert update["removed"] == []
+        assert update["total_unrealized_pnl"] == 30.0
+        assert update["count"] == 2
+        assert subscription.next_update(0) is None
+
+    def test_burst_is_one_recomputation_per_symbol(self, book):
+        subscription = book.stream_manager.subscribe()
+        subscription.next_update(0)
+        # Fetching the snapshot's prices marked both symbols; nothing moved.
+        assert book.stream_manager.publish() == 0
+        recomputed = []
+        get_pnl_for_symbol = book.pnl_manager.get_pnl_for_symbol
+        book.pnl_manager.get_pnl_for_symbol = lambda symbol: recomputed.append(symbol) or get_pnl_for_symbol(symbol)
+
+        for price in (101.0, 102.0, 103.0):
+            book.reprice("BTC", price)
+        book.trade("BTC", "buy", 100.0, 1.0)
+        assert book.stream_manager.publish() == 1
+
+        assert recomputed == ["BTC"]
+        update = subscription.next_update(0)
+        assert [(pnl.symbol, pnl.quantity, pnl.current_price) for pnl in update["pnl"]] == [("BTC", 2.0, 103.0)]
+        assert update["total_unrealized_pnl"] == pytest.approx(16.0 + 20.0)
+
+    def test_unchanged_pnl_is_not_sent(self, book):
+        subscription = book.stream_manager.subscribe()
+        subscription.next_update(0)
+
+        book.stream_manager.mark_changed(["BTC"])
+        assert book.stream_manager.publish() == 0
+        assert subscription.next_update(0) is None
+
+    def test_sold_out_symbol_is_removed(self, book):
+        subscription = book.stream_manager.subscribe()
+        subscription.next_update(0)
+
+        book.trade("ETH", "sell", 12.0, 10.0)
+        book.stream_manager.publish()
+
+        update = subscription.next_update(0)
+        assert update["pnl"] == []
+        assert update["removed"] == ["ETH"]
+        assert update["count"] == 1
+
+    def test_slow_subscriber_gets_changes_merged(self, book):
+        subscription = book.stream_manager.subscribe()
+        subscription.next_update(0)
+
+        book.reprice("BTC", 110.0)
+        book.stream_manager.publish()
+        book.reprice("ETH", 11.0)
+        book.stream_manager.publish()
+        book.reprice("BTC", 120.0)
+        book.stream_manager.publish()
+
+        update = subscription.next_update(0)
+        assert {pnl.symbol: pnl.current_price for pnl in update["pnl"]} == {"BTC": 120.0, "ETH": 11.0}
+        assert subscription.next_update(0) is None
+
+    def test_symbol_filter(self, book):
+        subscription = book.stream_manager.subscribe({"ETH"})
+        assert [pnl.symbol for pnl in subscription.next_update(0)["pnl"]] == ["ETH"]
+
+        book.reprice("BTC", 110.0)
+        book.stream_manager.publish()
+        assert subscription.next_update(0) is None
+
+    def test_unsubscribed_streams_stop_tracking(self, book):
+        subscription = book.stream_manager.subscribe()
+        book.stream_manager.unsubscribe(subscription)
+
+        book.reprice("BTC", 110.0)
+        assert book.stream_manager.publish() == 0
+        assert book.stream_manager.get_subscription_count() == 0
+
+
+def read_event(events):
+    fields = {}
+    for line in next(events).decode().splitlines():
+        name, _, value = line.partition(": ")
+        fields[name] = value
+    return fields
+
+
+class TestPnLStreamEndpoint:
+
+    def test_stream_sends_snapshot_then_changes(self, client):
+        client.post('/trades', data=json.dumps({"symbol": "BTC", "side": "buy", "price": 9000.0, "quantity": 1.0}),
+                    content_type='application/json')
+
+        response = client.get('/pnl/stream', buffered=False)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        events = response.iter_encoded()
+        try:
+            snapshot = read_event(events)
+            assert snapshot["event"] == "snapshot"
+            assert snapshot["id"] == "1"
+            assert [pnl["symbol"] for pnl in json.loads(snapshot["data"])["pnl"]] == ["BTC"]
+
+            client.post('/trades', data=json.dumps({"symbol": "ETH", "side": "buy", "price": 1500.0, "quantity": 2.0}),
+                        content_type='application/json')
+            change = read_event(events)
+            assert change["event"] == "pnl"
+            data = json.loads(change["data"])
+            assert [pnl["symbol"] for pnl in data["pnl"]] == ["ETH"]
+            assert data["count"] == 2
+        finally:
+            response.close()
@@ -1,4 +1,3 @@
-import pytest
 import json
 
 
@@ -166,3 +165,55 @@ class TestPortfolioEndpoints:
         
         assert symbols['ETH']['quantity'] == 4.0
         assert symbols['ETH']['average_price'] == 2900.0
+
+    def test_get_portfolio_as_of(self, client):
+        """Test holdings as of a past timestamp, including a closed position"""
+        trades = [
+            {"symbol": "BTC", "side": "buy", "price": 50000.0, "quantity": 0.2, "timestamp": "2024-01-01T10:00:00"},
+            {"symbol": "ETH", "side": "buy", "price": 3000.0, "quantity": 1.0, "timestamp": "2024-01-01T11:00:00"},
+            {"symbol": "BTC", "side": "buy", "price": 54000.0, "quantity": 0.2, "timestamp": "2024-01-01T12:00:00"},
+            {"symbol": "BTC", "side": "sell", "price": 56000.0, "quantity": 0.4, "timestamp": "2024-01-01T13:00:00"}
+        ]
+        client.post('/trades/batch', data=json.dumps(trades), content_type='application/json')
+
+        response = client.get('/portfolio?as_of=2024-01-01T12:30:00')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['as_of'] == '2024-01-01T12:30:00'
+        symbols = {holding['symbol']: holding for holding in data['portfolio']}
+        assert symbols['BTC']['quantity'] == 0.4
+        assert symbols['BTC']['average_price'] == 52000.0
+        assert symbols['ETH']['quantity'] == 1.0
+
+        data = json.loads(client.get('/portfolio?as_of=2024-01-01T13:00:00').data)
+        assert [holding['symbol'] for holding in data['portfolio']] == ['ETH']
+
+        data = json.loads(client.get('/portfolio?as_of=2024-01-01T09:00:00').data)
+        assert data['count'] == 0
+
+    def test_get_portfolio_as_of_invalid(self, client):
+        """Test that a malformed as_of is rejected"""
+        response = client.get('/portfolio?as_of=yesterday')
+
+        assert response.status_code == 400
+        assert 'ISO timestamp' in json.loads(response.data)['error']
+
+    def test_get_portfolio_cost_basis(self, client):
+        """Test the average price of the open lots under each method"""
+        trades = [
+            {"symbol": "BTC", "side": "buy", "price": 100.0, "quantity": 1.0, "timestamp": "2024-01-01T10:00:00"},
+            {"symbol": "BTC", "side": "buy", "price": 200.0, "quantity": 1.0, "timestamp": "2024-01-01T11:00:00"},
+            {"symbol": "BTC", "side": "buy", "price": 150.0, "quantity": 1.0, "timestamp": "2024-01-01T12:00:00"},
+            {"symbol": "BTC", "side": "sell", "price": 180.0, "quantity": 1.5, "timestamp": "2024-01-01T13:00:00"}
+        ]
+        client.post('/trades/batch', data=json.dumps(trades), content_type='application/json')
+
+        data = json.loads(client.get('/portfolio?cost_basis=fifo').data)
+        assert data['portfolio'][0]['quantity'] == 1.5
+        assert round(data['portfolio'][0]['average_price'], 2) == 166.67
+
+        data = json.loads(client.get('/portfolio?cost_basis=hifo&as_of=2024-01-01T12:00:00').data)
+        assert data['portfolio'][0]['quantity'] == 3.0
+        assert data['portfolio'][0]['average_price'] == 150.0
+
+        assert client.get('/portfolio?cost_basis=average').status_code == 400
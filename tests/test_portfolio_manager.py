@@ -0,0 +1,137 @@
+import random
+
+import pytest
+
+from src.models.trade import Trade
+from src.models.portfolio import Portfolio
+from src.services.portfolio_service import PortfolioService
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService
+from src.services.checkpoint_service import PortfolioCheckpointService
+from src.services.journal_service import TradeJournalService
+from src.managers.trade_manager import TradeManager
+from src.managers.portfolio_manager import PortfolioManager
+
+
+def build_book(store, every, journal_service=None):
+    portfolio_service = PortfolioService()
+    trade_service = store()
+    checkpoint_service = PortfolioCheckpointService(every)
+    trade_manager = TradeManager(
+        trade_service, portfolio_service, PnLService(), journal_service=journal_service,
+        checkpoint_service=checkpoint_service
+    )
+    return trade_manager, PortfolioManager(portfolio_service, trade_service, checkpoint_service), checkpoint_service
+
+
+def random_trades(count, seed=5):
+    rng = random.Random(seed)
+    holdings = {"BTC": 0.0, "ETH": 0.0, "SOL": 0.0}
+    trades = []
+    for index in range(count):
+        symbol = rng.choice(list(holdings))
+        if holdings[symbol] > 0 and rng.random() < 0.4:
+            # Some sells close the position outright.
+            quantity = holdings[symbol] if rng.random() < 0.2 else round(holdings[symbol] * 0.5, 4)
+            side = "sell"
+            holdings[symbol] -= quantity
+        else:
+            quantity = round(rng.uniform(0.5, 5.0), 4)
+            side = "buy"
+            holdings[symbol] += quantity
+        # Pairs of trades share a timestamp.
+        trades.append(Trade(
+            f"trade_{index}", symbol, side, round(rng.uniform(10.0, 100.0), 2), quantity,
+            f"2024-01-01T00:{index // 120:02d}:{index // 2 % 60:02d}"
+        ))
+    return trades
+
+
+def replay_until(trades, timestamp):
+    portfolio_service = PortfolioService()
+    for trade in trades:
+        if trade.timestamp <= timestamp:
+            portfolio_service.apply_trade(trade)
+    return portfolio_service.get_holdings()
+
+
+class TestPortfolioAsOf:
+
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    @pytest.mark.parametrize("every", [1, 7, 1000])
+    def test_matches_replay_from_the_start(self, store, every):
+        trade_manager, portfolio_manager, checkpoint_service = build_book(store, every)
+        trades = random_trades(600)
+        trade_manager.add_trades(trades)
+
+        assert checkpoint_service.get_checkpoint_count() == sum(
+            trade_manager.trade_service.get_trade_count(symbol) // every for symbol in ("BTC", "ETH", "SOL")
+        )
+        for trade in trades[::13] + [trades[-1]]:
+            assert portfolio_manager.get_holdings_as_of(trade.timestamp) == replay_until(trades, trade.timestamp)
+        assert portfolio_manager.get_holdings_as_of("2023-12-31T00:00:00") == {}
+        assert portfolio_manager.get_holdings_as_of("2025-01-01T00:00:00") == trade_manager.portfolio_service.get_holdings()
+
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    @pytest.mark.parametrize("load", ["recover", "import"])
+    def test_loaded_book_has_the_live_checkpoints(self, tmp_path, store, load):
+        journal_path = str(tmp_path / "trades.journal")
+        trade_manager, _, live_checkpoints = build_book(store, 7, TradeJournalService(journal_path))
+        trades = random_trades(600)
+        trade_manager.add_trades(trades)
+        trade_manager.journal_service.close()
+
+        journal_service = TradeJournalService(journal_path)
+        if load == "recover":
+            loaded, portfolio_manager, checkpoint_service = build_book(store, 7, journal_service)
+            loaded.recover()
+        else:
+            loaded, portfolio_manager, checkpoint_service = build_book(store, 7)
+            loaded.import_columns(journal_service.read_columns())
+            journal_service.close()
+
+        assert checkpoint_service.get_checkpoint_count() == live_checkpoints.get_checkpoint_count()
+        for trade in trades:
+            expected = live_checkpoints.find(trade.symbol, trade.timestamp)
+            assert checkpoint_service.find(trade.symbol, trade.timestamp) == (
+                None if expected is None else pytest.approx(expected)
+            )
+        for trade in trades[::13]:
+            holdings = portfolio_manager.get_holdings_as_of(trade.timestamp)
+            expected = replay_until(trades, trade.timestamp)
+            assert set(holdings) == set(expected)
+            for symbol, holding in holdings.items():
+                assert (holding.quantity, holding.average_price) == pytest.approx(
+                    (expected[symbol].quantity, expected[symbol].average_price)
+                )
+        if load == "recover":
+            journal_service.close()
+
+    def test_closed_position_is_absent(self):
+        trade_manager, portfolio_manager, _ = build_book(TradeService, 1)
+        trade_manager.add_trade(Trade("1", "BTC", "buy", 100.0, 2.0, "2024-01-01T00:00:01"))
+        trade_manager.add_trade(Trade("2", "BTC", "sell", 120.0, 2.0, "2024-01-01T00:00:02"))
+        trade_manager.add_trade(Trade("3", "ETH", "buy", 10.0, 1.0, "2024-01-01T00:00:03"))
+
+        assert portfolio_manager.get_holdings_as_of("2024-01-01T00:00:01") == {"BTC": Portfolio("BTC", 2.0, 100.0)}
+        assert portfolio_manager.get_holdings_as_of("2024-01-01T00:00:02") == {}
+        assert list(portfolio_manager.get_holdings_as_of("2024-01-01T00:00:03")) == ["ETH"]
+
+    def test_backdated_trade_drops_later_checkpoints(self):
+        trade_manager, portfolio_manager, checkpoint_service = build_book(TradeService, 1)
+        for second in range(1, 6):
+            trade_manager.add_trade(Trade(str(second), "BTC", "buy", 100.0 * second, 1.0, f"2024-01-01T00:00:0{second}"))
+        trade_manager.add_trade(Trade("late", "BTC", "buy", 50.0, 1.0, "2024-01-01T00:00:02.500000"))
+
+        assert checkpoint_service.find("BTC", "2024-01-01T00:00:04") == (2, 2.0, 150.0)
+        assert checkpoint_service.find("BTC", "2024-01-01T00:00:05") == (6, 6.0, 1550.0 / 6)
+        assert portfolio_manager.get_holdings_as_of("2024-01-01T00:00:03") == {"BTC": Portfolio("BTC", 4.0, 162.5)}
+
+    def test_requires_trade_log(self):
+        with pytest.raises(ValueError, match="trade log"):
+            PortfolioManager(PortfolioService()).get_holdings_as_of("2024-01-01T00:00:00")
+
+    def test_rejects_non_positive_interval(self):
+        with pytest.raises(ValueError, match="positive"):
+            PortfolioCheckpointService(0)
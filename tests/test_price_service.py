@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from src.services.price_service import PriceService
+from src.services.price_sources import PriceSource, ReplayPriceSource
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class TestPriceService:
+
+    def test_batch_lookup_fetches_missing_symbols_once(self):
+        source = ReplayPriceSource([{"BTC": 100.0, "ETH": 10.0}])
+        price_service = PriceService(source=source, ttl=60)
+
+        assert price_service.get_prices(["BTC", "ETH", "DOGE"]) == {"BTC": 100.0, "ETH": 10.0}
+        assert source.fetch_count == 1
+        assert price_service.get_prices(["BTC", "ETH"]) == {"BTC": 100.0, "ETH": 10.0}
+        assert source.fetch_count == 1
+
+        stats = price_service.get_cache_stats()
+        assert stats["misses"] == 3
+        assert stats["hits"] == 2
+
+    def test_unknown_symbol_raises_key_error(self):
+        price_service = PriceService(source=ReplayPriceSource([{"BTC": 100.0}]))
+        with pytest.raises(KeyError):
+            price_service.get_price("DOGE")
+
+    def test_unknown_symbols_are_not_refetched_within_their_ttl(self):
+        source = ReplayPriceSource([{"BTC": 100.0}, {"BTC": 100.0, "DOGE": 0.1}])
+        price_service = PriceService(source=source, ttl=60, unknown_ttl=0.05)
+
+        assert price_service.get_prices(["BTC", "DOGE"]) == {"BTC": 100.0}
+        for _ in range(5):
+            with pytest.raises(KeyError):
+                price_service.get_price("DOGE")
+        assert source.fetch_count == 1
+        assert price_service.get_cache_stats()["unknown_hits"] == 5
+
+        source.advance()
+        time.sleep(0.06)
+        assert price_service.get_price("DOGE") == 0.1
+        assert source.fetch_count == 2
+
+    def test_price_source_must_implement_fetch_prices(self):
+        class Incomplete(PriceSource):
+            pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_stale_price_is_served_while_refreshing(self):
+        source = ReplayPriceSource([{"BTC": 100.0}, {"BTC": 105.0}])
+        price_service = PriceService(source=source, ttl=60, ttl_by_symbol={"BTC": 0})
+
+        assert price_service.get_price("BTC") == 100.0
+        source.advance()
+        assert price_service.get_price("BTC") == 100.0
+
+        wait_for(lambda: price_service.get_cache_stats()["refreshes"] == 1)
+        assert price_service.get_price("BTC") == 105.0
+        assert price_service.get_cache_stats()["stale_hits"] >= 1
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from src.models.trade import Trade
+from src.dtos.pnl_dto import (
+    AccountPnLDto, AggregatePnLDto, CombinedPnLDto, PnLHistoryPointDto, PnLSummaryDto, UnrealizedPnLDto
+)
+from src.controllers import serialization
+from src.controllers.serialization import dumps_json, negotiate_mimetype
+
+
+def sample_dtos():
+    combined = CombinedPnLDto("BTC", 0.13, 50666.67, 55000.0, 563.33, 100.0, 663.33)
+    account = AccountPnLDto("alice", 563.33, 100.0, 663.33, 1)
+    return [
+        UnrealizedPnLDto("BTC", 0.13, 50666.67, 55000.0, 563.33),
+        combined,
+        PnLSummaryDto([combined, combined], 1126.66, 200.0, 1326.66, 2),
+        account,
+        AggregatePnLDto([account], 563.33, 100.0, 663.33, 1),
+        PnLHistoryPointDto("2024-01-01T00:00:00", 1.0, 2.0, 3.0),
+    ]
+
+
+class TestSerialization:
+
+    @pytest.mark.parametrize("dto", sample_dtos(), ids=lambda dto: type(dto).__name__)
+    def test_dto_encodes_like_to_dict(self, dto):
+        # orjson writes dataclasses from their fields, so the fields must
+        # stay in step with to_dict.
+        assert dumps_json(dto) == dumps_json(dto.to_dict())
+        assert list(json.loads(dumps_json(dto))) == list(dto.to_dict())
+
+    def test_trade_encodes_with_id_key(self):
+        trade = Trade("trade_1", "BTC", "buy", 50000.0, 0.1, "2024-01-01T00:00:00")
+
+        assert json.loads(dumps_json([trade])) == [trade.to_dict()]
+        assert json.loads(dumps_json(trade))["id"] == "trade_1"
+
+    def test_stdlib_fallback_matches(self, monkeypatch):
+        body = {"trades": [Trade("trade_1", "BTC", "buy", 50000.0, 0.1, "2024-01-01T00:00:00")],
+                "pnl": sample_dtos()[2], "errors": {0: ["bad row"]}}
+        expected = json.loads(dumps_json(body))
+
+        monkeypatch.setattr(serialization, "orjson", None)
+        assert json.loads(dumps_json(body)) == expected
+
+    @pytest.mark.parametrize("accept, expected", [
+        ("", "application/json"),
+        ("*/*", "application/json"),
+        ("text/html", "application/json"),
+        ("application/json, application/msgpack;q=0.5", "application/json"),
+    ])
+    def test_negotiation_defaults_to_json(self, accept, expected):
+        assert negotiate_mimetype(accept) == expected
+
+
+class TestMessagePackResponses:
+
+    @pytest.fixture(autouse=True)
+    def msgpack(self):
+        return pytest.importorskip("msgpack")
+
+    def test_trades_and_pnl_as_msgpack(self, client, sample_trades, msgpack):
+        for trade in sample_trades:
+            client.post('/trades', data=json.dumps(trade), content_type='application/json')
+
+        for path in ('/trades', '/pnl', '/pnl/BTC', '/portfolio'):
+            response = client.get(path, headers={"Accept": "application/msgpack"})
+            assert response.status_code == 200
+            assert response.mimetype == "application/msgpack"
+            assert "Accept" in response.headers["Vary"]
+            assert msgpack.unpackb(response.data) == json.loads(client.get(path).data)
+
+    def test_pnl_cache_keeps_one_body_per_format(self, client, sample_trades, msgpack):
+        for trade in sample_trades:
+            client.post('/trades', data=json.dumps(trade), content_type='application/json')
+
+        packed = client.get('/pnl', headers={"Accept": "application/x-msgpack"})
+        plain = client.get('/pnl')
+        assert plain.mimetype == "application/json"
+        assert msgpack.unpackb(packed.data) == json.loads(plain.data)
+
+        # Different bytes, so different strong ETags; each revalidates only
+        # in its own format.
+        assert packed.headers["ETag"] != plain.headers["ETag"]
+        assert client.get('/pnl', headers={"If-None-Match": plain.headers["ETag"]}).status_code == 304
+        assert client.get('/pnl', headers={"If-None-Match": packed.headers["ETag"]}).status_code == 200
+        response = client.get('/pnl', headers={"Accept": "application/msgpack", "If-None-Match": packed.headers["ETag"]})
+        assert response.status_code == 304
+
+    def test_errors_follow_the_accept_header(self, client, msgpack):
+        response = client.get('/pnl/UNKNOWN', headers={"Accept": "application/msgpack"})
+
+        assert response.status_code == 404
+        assert "error" in msgpack.unpackb(response.data)
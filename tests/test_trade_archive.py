@@ -0,0 +1,275 @@
+import pytest
+
+from src.models.trade import Trade, to_epoch_micros
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.portfolio_service import PortfolioService, FixedPointPortfolioService
+from src.services.pnl_service import PnLService, FixedPointPnLService
+from src.services.fixed_point import FixedPoint
+from src.services.journal_service import TradeJournalService
+from src.services.snapshot_service import SnapshotService
+from src.services.pnl_kernel import first_rejected_sell
+from src.managers.trade_manager import TradeManager, TradeBatchError
+
+np = pytest.importorskip("numpy")
+
+
+# Out of timestamp order, as an exchange export might be.
+ROWS = [
+    ("f3", "BTC", "sell", 55000.0, 0.2, "2024-01-01T00:00:03"),
+    ("f0", "btc", "buy", 40000.0, 0.3, "2024-01-01T00:00:00"),
+    ("f1", "ETH", "buy", 2500.0, 2.0, "2024-01-01T00:00:01"),
+    ("f2", "BTC", "buy", 50000.0, 0.2, "2024-01-01T00:00:02"),
+    ("f4", "ETH", "sell", 3000.0, 0.5, "2024-01-01T00:00:04"),
+]
+
+
+def make_columns(rows):
+    # Trade columns in the journal's form.
+    return {
+        "trade_id": np.array([row[0].encode() for row in rows], dtype="S"),
+        "symbol": np.array([row[1].upper().encode() for row in rows], dtype="S"),
+        "side": np.array([1 if row[2] == "buy" else 0 for row in rows], dtype=np.uint8),
+        "price": np.array([row[3] for row in rows]),
+        "quantity": np.array([row[4] for row in rows]),
+        "timestamp": np.array([to_epoch_micros(row[5]) for row in rows], dtype=np.int64),
+    }
+
+
+def holdings(trade_manager):
+    return {
+        symbol: (float(holding.quantity), float(holding.average_price))
+        for symbol, holding in trade_manager.portfolio_service.get_holdings().items()
+    }
+
+
+class TestImportColumns:
+
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_import_matches_trade_by_trade(self, store):
+        imported = TradeManager(store(), PortfolioService(), PnLService())
+        assert imported.import_columns(make_columns(ROWS)) == len(ROWS)
+
+        expected = TradeManager(store(), PortfolioService(), PnLService())
+        for trade_id, symbol, side, price, quantity, timestamp in sorted(ROWS, key=lambda row: row[5]):
+            expected.add_trade(Trade(trade_id, symbol.upper(), side, price, quantity, timestamp))
+
+        assert holdings(imported) == pytest.approx(holdings(expected))
+        for symbol in ("BTC", "ETH"):
+            assert imported.pnl_service.get_realized_pnl(symbol) == pytest.approx(expected.pnl_service.get_realized_pnl(symbol))
+        assert [trade.trade_id for trade in imported.trade_service.iter_trades("BTC")] == ["f0", "f2", "f3"]
+
+    def test_import_continues_after_existing_trades(self):
+        trade_manager = TradeManager(TradeService(), PortfolioService(), PnLService())
+        trade_manager.add_trade(Trade("live", "BTC", "buy", 30000.0, 1.0, "2023-12-31T00:00:00"))
+        trade_manager.import_columns(make_columns(ROWS))
+
+        assert holdings(trade_manager)["BTC"][0] == pytest.approx(1.3)
+        assert trade_manager.trade_service.get_trade_count("BTC") == 4
+
+    def test_import_reports_row_errors(self):
+        trade_manager = TradeManager(TradeService(), PortfolioService(), PnLService())
+        trade_manager.add_trade(Trade("live", "ETH", "buy", 2000.0, 1.0, "2024-01-01T00:00:02"))
+
+        columns = make_columns(ROWS + [("f5", "SOL", "sell", 100.0, 1.0, "2024-01-01T00:00:05")])
+        columns["price"][3] = -1.0
+        with pytest.raises(TradeBatchError) as error:
+            trade_manager.import_columns(columns)
+        assert list(error.value.errors) == [3]
+
+        columns["price"][3] = 50000.0
+        with pytest.raises(TradeBatchError) as error:
+            trade_manager.import_columns(columns)
+        # Row 2 is older than the book's ETH trade and row 5 sells SOL,
+        # which is not held.
+        assert sorted(error.value.errors) == [2, 5]
+        assert "before the latest ETH trade" in error.value.errors[2][0]
+        assert error.value.errors[5] == ["Cannot sell SOL: No holdings found in portfolio"]
+        assert trade_manager.trade_service.get_trade_count("BTC") == 0
+        assert set(holdings(trade_manager)) == {"ETH"}
+
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_import_rejects_repeated_ids(self, store):
+        trade_manager = TradeManager(store(), PortfolioService(), PnLService())
+        rows = [("x", "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:00"), ("x", "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:01")]
+        with pytest.raises(TradeBatchError) as error:
+            trade_manager.import_columns(make_columns(rows))
+        assert error.value.errors == {1: ["Trade id x repeats row 0"]}
+
+        trade_manager.import_columns(make_columns(rows[:1]))
+        with pytest.raises(TradeBatchError) as error:
+            trade_manager.import_columns(make_columns([("x", "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:02")]))
+        assert error.value.errors == {0: ["Trade id x is already in the book"]}
+        assert trade_manager.trade_service.get_trade_count("BTC") == 1
+
+        trade_manager.add_trade(Trade("live", "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:03"))
+        with pytest.raises(TradeBatchError) as error:
+            trade_manager.import_columns(make_columns([
+                ("y", "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:04"), ("live", "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:05")
+            ]))
+        assert error.value.errors == {1: ["Trade id live is already in the book"]}
+
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_imported_ids_work_as_cursors(self, store):
+        trade_service = store()
+        trade_manager = TradeManager(trade_service, PortfolioService(), PnLService())
+        trade_manager.import_columns(make_columns(ROWS[1:3]))
+        trade_manager.import_columns(make_columns([ROWS[0]] + ROWS[3:]))
+
+        assert trade_service.has_trade("f4") and not trade_service.has_trade("f5")
+        assert [trade.trade_id for trade in trade_service.iter_trades(after="f1")] == ["f2", "f3", "f4"]
+        assert [trade.trade_id for trade in trade_service.iter_trades("BTC", after="f2")] == ["f3"]
+        assert trade_service.find_trade_ids(np.array([b"f0", b"f5", b"f4"])).tolist() == [True, False, True]
+
+    def test_fixed_point_column_check_matches_trade_by_trade(self):
+        portfolio_service = FixedPointPortfolioService(FixedPoint(price_decimals=2, quantity_decimals=1))
+        portfolio_service.apply_trade(Trade("f0", "DOGE", "buy", 0.3, 0.5, "2024-01-01T00:00:00"))
+        rng = np.random.default_rng(11)
+        for _ in range(50):
+            is_buy = rng.random(20) < 0.5
+            prices = np.round(rng.uniform(0.1, 1.0, 20), 2)
+            quantities = np.round(rng.uniform(0.1, 1.0, 20), 1)
+            trades = [
+                Trade(f"t{index}", "DOGE", "buy" if buy else "sell", float(price), float(quantity), 0)
+                for index, (buy, price, quantity) in enumerate(zip(is_buy, prices, quantities))
+            ]
+            errors = portfolio_service.check_trades(trades)
+            expected = next(((position, error) for position, error in enumerate(errors) if error), None)
+            assert portfolio_service.check_columns("DOGE", is_buy, prices, quantities) == expected
+
+    def test_first_rejected_sell_vectorized_matches_scalar(self):
+        rng = np.random.default_rng(7)
+        is_buy = (rng.random(500) < 0.55).tolist()
+        quantities = np.round(rng.uniform(0.1, 2.0, 500), 1).tolist()
+        for start in (0.0, 5.0, 50.0):
+            held, expected = start, None
+            for position, (buy, quantity) in enumerate(zip(is_buy, quantities)):
+                if buy:
+                    held += quantity
+                elif held == 0 or quantity > held:
+                    expected = (position, held)
+                    break
+                else:
+                    held -= quantity
+            assert first_rejected_sell(np.array(is_buy), np.array(quantities), start) == expected
+
+    def test_fixed_point_import_is_exact(self):
+        fixed_point = FixedPoint(price_decimals=2, quantity_decimals=1)
+        trade_manager = TradeManager(
+            TradeService(), FixedPointPortfolioService(fixed_point), FixedPointPnLService(fixed_point)
+        )
+        rows = [(f"f{index}", "DOGE", "buy", 0.3, 0.1, f"2024-01-01T00:00:0{index}") for index in range(3)]
+        rows.append(("f3", "DOGE", "sell", 0.5, 0.3, "2024-01-01T00:00:03"))
+        trade_manager.import_columns(make_columns(rows))
+        assert holdings(trade_manager) == {}
+        # (0.5 - 0.3) * 0.3 at a cost scale of 10**3.
+        assert trade_manager.pnl_service.get_realized_pnl_units("DOGE") == 60
+
+        with pytest.raises(TradeBatchError) as error:
+            trade_manager.import_columns(make_columns([("f4", "DOGE", "buy", 0.333, 1.0, "2024-01-01T00:00:04")]))
+        assert "more than 2 decimals" in error.value.errors[0][0]
+
+    def test_import_is_journaled(self, tmp_path):
+        def build():
+            return TradeManager(
+                ColumnarTradeService(), PortfolioService(), PnLService(),
+                journal_service=TradeJournalService(str(tmp_path / "trades.journal")),
+                snapshot_service=SnapshotService(str(tmp_path / "trades.journal.snapshot"))
+            )
+
+        original = build()
+        original.import_columns(make_columns(ROWS))
+        original.journal_service.close()
+        assert original.snapshot_service.load()["journal_records"] == len(ROWS)
+
+        recovered = build()
+        assert recovered.recover() == len(ROWS)
+        assert holdings(recovered) == holdings(original)
+        assert [trade.trade_id for trade in recovered.trade_service.get_trades()] == ["f0", "f1", "f2", "f3", "f4"]
+
+    def test_rows_too_long_for_the_journal_are_rejected_before_applying(self, tmp_path):
+        trade_manager = TradeManager(
+            TradeService(), PortfolioService(), PnLService(),
+            journal_service=TradeJournalService(str(tmp_path / "trades.journal"))
+        )
+        with pytest.raises(TradeBatchError) as error:
+            trade_manager.import_columns(make_columns([
+                ("ok", "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:00"),
+                ("x" * 40, "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:01"),
+                ("long", "ABCDEFGHIJKLMNOPQ", "buy", 1.0, 1.0, "2024-01-01T00:00:02"),
+            ]))
+        assert error.value.errors == {
+            1: [f"Trade id {'x' * 40} is longer than 32 bytes"],
+            2: ["Symbol ABCDEFGHIJKLMNOPQ is longer than 16 bytes"],
+        }
+        assert trade_manager.trade_service.get_trades() == []
+        assert trade_manager.journal_service.record_count == 0
+
+
+class TestArchiveFiles:
+
+    @pytest.fixture
+    def pyarrow(self):
+        return pytest.importorskip("pyarrow")
+
+    @pytest.mark.parametrize("archive_format", ["parquet", "arrow"])
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_export_and_import_round_trip(self, pyarrow, tmp_path, archive_format, store):
+        original = TradeManager(store(), PortfolioService(), PnLService())
+        original.import_columns(make_columns(ROWS))
+        path = str(tmp_path / f"trades.{archive_format}")
+        original.export_archive(archive_format, path)
+
+        for source in (path, open(path, "rb").read()):
+            copy = TradeManager(store(), PortfolioService(), PnLService())
+            assert copy.import_archive(source, archive_format) == len(ROWS)
+            assert [trade.to_dict() for trade in copy.trade_service.get_trades()] == \
+                [trade.to_dict() for trade in original.trade_service.get_trades()]
+            assert holdings(copy) == holdings(original)
+
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_reimported_export_is_rejected(self, pyarrow, store):
+        trade_manager = TradeManager(store(), PortfolioService(), PnLService())
+        trade_manager.import_columns(make_columns(ROWS))
+        with pytest.raises(TradeBatchError) as error:
+            trade_manager.import_archive(trade_manager.export_archive("arrow"), "arrow")
+        assert sorted(error.value.errors) == list(range(len(ROWS)))
+        assert all("is already in the book" in messages[0] for messages in error.value.errors.values())
+        assert len(trade_manager.trade_service.get_trades()) == len(ROWS)
+
+    def test_reads_what_other_tools_write(self, pyarrow, tmp_path):
+        import pyarrow.parquet as pq
+
+        table = pyarrow.table({
+            "trade_id": [101, 102],
+            "symbol": ["eth", "eth"],
+            "side": ["BUY", "Sell"],
+            "price": [2000, 2100.5],
+            "quantity": [1.5, 0.5],
+            "timestamp": pyarrow.array([1704067200000000000, 1704067260000000000], pyarrow.timestamp("ns")),
+            "fee": [0.1, 0.1],
+        })
+        path = str(tmp_path / "fills.parquet")
+        pq.write_table(table, path)
+
+        trade_manager = TradeManager(TradeService(), PortfolioService(), PnLService())
+        trade_manager.import_archive(path, "parquet")
+        trades = trade_manager.trade_service.get_trades()
+        assert [(trade.trade_id, trade.symbol, trade.side) for trade in trades] == [("101", "ETH", "buy"), ("102", "ETH", "sell")]
+        assert trades[0].timestamp == "2024-01-01T00:00:00"
+        assert holdings(trade_manager) == {"ETH": (1.0, 2000.0)}
+
+    def test_rejects_zoned_timestamps_and_missing_columns(self, pyarrow):
+        from src.services.trade_archive import read_trade_columns, write_trade_columns
+
+        data = write_trade_columns(make_columns(ROWS), "arrow")
+        table = pyarrow.ipc.open_file(pyarrow.BufferReader(data)).read_all()
+        zoned = table.set_column(5, "timestamp", table.column("timestamp").cast(pyarrow.timestamp("us", tz="UTC")))
+        for broken in (zoned, table.drop_columns(["side"])):
+            sink = pyarrow.BufferOutputStream()
+            with pyarrow.ipc.new_file(sink, broken.schema) as writer:
+                writer.write_table(broken)
+            with pytest.raises(ValueError):
+                read_trade_columns(sink.getvalue().to_pybytes(), "arrow")
+        with pytest.raises(ValueError):
+            read_trade_columns(b"not a file", "parquet")
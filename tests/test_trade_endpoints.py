@@ -1,5 +1,11 @@
+import importlib.util
 import pytest
 import json
+import threading
+
+from container import Container
+from main import create_app
+from src.controllers.trade_controller import next_trade_id
 
 
 class TestTradeEndpoints:
@@ -56,6 +62,38 @@ class TestTradeEndpoints:
         data = json.loads(response.data)
         assert 'error' in data
 
+    def test_add_trade_oversell(self, client):
+        trade_data = {
+            "symbol": "BTC",
+            "side": "sell",
+            "price": 50000.0,
+            "quantity": 0.1
+        }
+        
+        response = client.post('/trades',
+                             data=json.dumps(trade_data),
+                             content_type='application/json')
+        
+        assert response.status_code == 400
+        data = json.loads(response.data)
+        assert data['error'] == "Cannot sell BTC: No holdings found in portfolio"
+
+    def test_add_trade_symbol_too_long(self, client):
+        trade_data = {
+            "symbol": "ABCDEFGHIJKLMNOPQ",
+            "side": "buy",
+            "price": 50000.0,
+            "quantity": 0.1
+        }
+        
+        response = client.post('/trades',
+                             data=json.dumps(trade_data),
+                             content_type='application/json')
+        
+        assert response.status_code == 400
+        assert "at most 16 bytes" in json.loads(response.data)['error']['symbol'][0]
+        assert json.loads(client.get('/portfolio').data)['portfolio'] == []
+
     def test_add_trade_negative_price(self, client):
         trade_data = {
             "symbol": "BTC",
@@ -138,3 +176,259 @@ class TestTradeEndpoints:
         data = json.loads(response.data)
         assert len(data['trades']) == 3
         assert data['count'] == 3
+
+    def test_get_trades_filtered_by_symbol_and_side(self, client, sample_trades):
+        for trade in sample_trades:
+            client.post('/trades',
+                       data=json.dumps(trade),
+                       content_type='application/json')
+        
+        response = client.get('/trades?symbol=btc')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['count'] == 3
+        assert all(trade['symbol'] == 'BTC' for trade in data['trades'])
+        
+        response = client.get('/trades?symbol=BTC&side=sell')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['count'] == 1
+        assert data['trades'][0]['price'] == 55000.0
+        
+        response = client.get('/trades?side=sell')
+        assert response.status_code == 200
+        assert json.loads(response.data)['count'] == 1
+
+    def test_add_trades_batch_json(self, client):
+        trades = [
+            {"symbol": "BTC", "side": "sell", "price": 55000.0, "quantity": 0.05,
+             "timestamp": "2024-01-01T00:00:02"},
+            {"symbol": "btc", "side": "BUY", "price": 50000.0, "quantity": 0.1,
+             "timestamp": "2024-01-01T00:00:01"},
+            {"symbol": "ETH", "side": "buy", "price": 3000.0, "quantity": 1.0}
+        ]
+        
+        response = client.post('/trades/batch',
+                             data=json.dumps(trades),
+                             content_type='application/json')
+        
+        assert response.status_code == 201
+        data = json.loads(response.data)
+        assert data['count'] == 3
+        assert len(set(data['trade_ids'])) == 3
+        
+        response = client.get('/pnl/BTC')
+        data = json.loads(response.data)
+        assert data['quantity'] == 0.05
+        assert data['realized_pnl'] == 250.0
+
+    def test_trade_ids_are_unique_across_threads(self):
+        ids = []
+
+        def worker():
+            ids.extend(next_trade_id() for _ in range(5000))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(ids)) == len(ids) == 40000
+
+    def test_add_trades_batch_ndjson(self, client, sample_trades):
+        body = "\n".join(json.dumps(trade) for trade in sample_trades) + "\n"
+        
+        response = client.post('/trades/batch',
+                             data=body,
+                             content_type='application/x-ndjson')
+        
+        assert response.status_code == 201
+        assert json.loads(response.data)['count'] == len(sample_trades)
+        
+        response = client.get('/trades')
+        assert json.loads(response.data)['count'] == len(sample_trades)
+
+    def test_add_trades_batch_reports_row_errors(self, client):
+        body = "\n".join([
+            json.dumps({"symbol": "BTC", "side": "buy", "price": 50000.0, "quantity": 0.1}),
+            "not json",
+            json.dumps({"symbol": "BTC", "side": "hold", "price": 50000.0, "quantity": 0.1})
+        ])
+        
+        response = client.post('/trades/batch',
+                             data=body,
+                             content_type='application/x-ndjson')
+        
+        assert response.status_code == 400
+        errors = json.loads(response.data)['errors']
+        assert set(errors) == {'1', '2'}
+        assert 'side' in errors['2']
+
+    def test_add_trades_batch_is_all_or_nothing(self, client):
+        trades = [
+            {"symbol": "BTC", "side": "buy", "price": 50000.0, "quantity": 0.1},
+            {"symbol": "ETH", "side": "buy", "price": 3000.0, "quantity": 1.0},
+            {"symbol": "BTC", "side": "sell", "price": 55000.0, "quantity": 0.2}
+        ]
+        
+        response = client.post('/trades/batch',
+                             data=json.dumps(trades),
+                             content_type='application/json')
+        
+        assert response.status_code == 400
+        errors = json.loads(response.data)['errors']
+        assert list(errors) == ['2']
+        
+        response = client.get('/trades')
+        assert json.loads(response.data)['count'] == 0
+        response = client.get('/portfolio')
+        assert json.loads(response.data)['count'] == 0
+
+    def test_add_trades_batch_rejects_non_array(self, client):
+        response = client.post('/trades/batch',
+                             data=json.dumps({"symbol": "BTC"}),
+                             content_type='application/json')
+        
+        assert response.status_code == 400
+
+    def test_get_trades_cursor_pagination(self, client, sample_trades):
+        for trade in sample_trades:
+            client.post('/trades',
+                       data=json.dumps(trade),
+                       content_type='application/json')
+        
+        response = client.get('/trades?limit=3')
+        assert response.status_code == 200
+        first_page = json.loads(response.data)
+        assert first_page['count'] == 3
+        assert first_page['next_cursor'] == first_page['trades'][-1]['id']
+        
+        response = client.get(f"/trades?limit=3&after={first_page['next_cursor']}")
+        second_page = json.loads(response.data)
+        assert second_page['count'] == 1
+        assert second_page['next_cursor'] is None
+        assert second_page['trades'][0]['price'] == sample_trades[3]['price']
+        
+        response = client.get('/trades?symbol=BTC&limit=1')
+        cursor = json.loads(response.data)['next_cursor']
+        response = client.get(f'/trades?symbol=BTC&after={cursor}')
+        assert [trade['price'] for trade in json.loads(response.data)['trades']] == [52000.0, 55000.0]
+
+    def test_get_trades_invalid_query(self, client):
+        assert client.get('/trades?limit=0').status_code == 400
+        assert client.get('/trades?limit=abc').status_code == 400
+        assert client.get('/trades?format=xml').status_code == 400
+        assert client.get('/trades?after=unknown').status_code == 400
+        assert client.get('/trades?from=yesterday').status_code == 400
+
+    @pytest.mark.parametrize("store", ["list", "columnar"])
+    def test_get_trades_time_zone_aware_range(self, store):
+        container = Container({"TRADE_STORE": store, "PNL_WORKERS": "1"})
+        client = create_app(container).test_client()
+        trades = [
+            {"symbol": "BTC", "side": "buy", "price": 100.0, "quantity": 1.0, "timestamp": f"2024-01-0{day}T00:00:00+00:00"}
+            for day in (1, 2, 3)
+        ]
+        client.post('/trades/batch', data=json.dumps(trades), content_type='application/json')
+
+        for query in ({"from": "2024-01-02T00:00:00+00:00"}, {"symbol": "BTC", "from": "2024-01-02T00:00:00Z"}):
+            response = client.get('/trades', query_string=query)
+            assert response.status_code == 200
+            assert json.loads(response.data)['count'] == 2
+        response = client.get('/trades', query_string={"to": "2024-01-01T12:00:00+00:00"})
+        assert json.loads(response.data)['count'] == 1
+        container.close()
+
+    @pytest.mark.parametrize("store", ["list", "columnar"])
+    def test_get_trades_date_only_to_covers_the_whole_day(self, store):
+        container = Container({"TRADE_STORE": store, "PNL_WORKERS": "1"})
+        client = create_app(container).test_client()
+        trades = [
+            {"symbol": "BTC", "side": "buy", "price": 100.0, "quantity": 1.0, "timestamp": timestamp}
+            for timestamp in ("2024-12-31T00:00:00", "2024-12-31T18:30:00", "2024-12-31T23:59:59.999999", "2025-01-01T00:00:00")
+        ]
+        client.post('/trades/batch', data=json.dumps(trades), content_type='application/json')
+
+        for query in ({"to": "2024-12-31"}, {"symbol": "BTC", "from": "2024-12-31", "to": "2024-12-31"}):
+            response = client.get('/trades', query_string=query)
+            assert [trade['timestamp'] for trade in json.loads(response.data)['trades']] == \
+                [trade['timestamp'] for trade in trades[:3]]
+        response = client.get('/trades', query_string={"to": "2024-12-31T00:00:00"})
+        assert json.loads(response.data)['count'] == 1
+        container.close()
+
+    def test_get_trades_streamed_ndjson_and_csv(self, client, sample_trades):
+        for trade in sample_trades:
+            client.post('/trades',
+                       data=json.dumps(trade),
+                       content_type='application/json')
+        
+        response = client.get('/trades?format=ndjson&symbol=BTC&limit=2')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [line['price'] for line in lines] == [50000.0, 52000.0]
+        assert response.headers['X-Next-Cursor'] == lines[-1]['id']
+        
+        response = client.get('/trades?format=csv&side=buy')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        rows = response.get_data(as_text=True).splitlines()
+        assert rows[0] == 'id,symbol,side,price,quantity,timestamp'
+        assert len(rows) == 4
+
+    def test_get_trades_unpaged_json_is_streamed(self, client, sample_trades):
+        msgpack = pytest.importorskip("msgpack")
+        for trade in sample_trades:
+            client.post('/trades',
+                       data=json.dumps(trade),
+                       content_type='application/json')
+        
+        response = client.get('/trades?side=buy')
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'application/json'
+        data = json.loads(response.data)
+        assert data['count'] == 3
+        assert [trade['side'] for trade in data['trades']] == ['buy'] * 3
+        
+        response = client.get('/trades?side=buy', headers={'Accept': 'application/msgpack'})
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'application/msgpack'
+        assert msgpack.unpackb(response.data) == data
+
+    def test_export_and_import_archive(self, client, sample_trades):
+        pytest.importorskip("pyarrow")
+        for trade in sample_trades:
+            client.post('/trades', data=json.dumps(trade), content_type='application/json')
+
+        response = client.get('/trades/export?format=arrow')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/vnd.apache.arrow.file'
+
+        # Into an empty account, by Content-Type.
+        imported = client.post('/accounts/archive/trades/import', data=response.data,
+                               content_type='application/vnd.apache.arrow.file')
+        assert imported.status_code == 201
+        assert json.loads(imported.data)['count'] == 4
+        assert json.loads(client.get('/accounts/archive/portfolio').data) == \
+            json.loads(client.get('/portfolio').data)
+
+        # Again into the same book: every trade is older than its symbol's latest.
+        again = client.post('/trades/import?format=arrow', data=response.data)
+        assert again.status_code == 400
+        assert json.loads(again.data)['error'] == 'Import rejected'
+
+        assert client.post('/trades/import?format=parquet', data=b'not parquet').status_code == 400
+
+    def test_archive_formats_are_checked(self, client):
+        assert client.get('/trades/export?format=csv').status_code == 400
+        assert client.post('/trades/import', data=b'').status_code == 400
+
+    @pytest.mark.skipif(importlib.util.find_spec("pyarrow") is not None, reason="pyarrow is installed")
+    def test_archive_without_pyarrow(self, client):
+        response = client.get('/trades/export')
+        assert response.status_code == 501
+        assert 'pyarrow' in json.loads(response.data)['error']
@@ -0,0 +1,167 @@
+import os
+import time
+
+import pytest
+
+from src.models.trade import Trade
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.portfolio_service import PortfolioService
+from src.services.pnl_service import PnLService
+from src.services import journal_service as journal_module
+from src.services.journal_service import TradeJournalService
+from src.services.snapshot_service import SnapshotService
+from src.services.checkpoint_service import PortfolioCheckpointService
+from src.managers.trade_manager import TradeManager, TradeBatchError
+
+
+TRADES = [
+    ("BTC", "buy", 40000.0, 0.3),
+    ("ETH", "buy", 2500.0, 2.0),
+    ("BTC", "buy", 50000.0, 0.2),
+    ("BTC", "sell", 55000.0, 0.2),
+    ("ETH", "sell", 3000.0, 0.5),
+    ("BTC", "sell", 52000.0, 0.3),
+    ("ETH", "buy", 3500.0, 1.0),
+]
+
+
+def build_manager(tmp_path, snapshot_every=3):
+    return TradeManager(
+        TradeService(), PortfolioService(), PnLService(),
+        journal_service=TradeJournalService(str(tmp_path / "trades.journal"), fsync_every=2),
+        snapshot_service=SnapshotService(str(tmp_path / "trades.journal.snapshot")),
+        snapshot_every=snapshot_every
+    )
+
+
+def add_trades(trade_manager):
+    for index, (symbol, side, price, quantity) in enumerate(TRADES):
+        trade_manager.add_trade(Trade(
+            trade_id=f"trade_{index}",
+            symbol=symbol,
+            side=side,
+            price=price,
+            quantity=quantity,
+            timestamp=f"2024-01-01T00:00:0{index}.000001"
+        ))
+
+
+class TestTradeJournal:
+
+    def test_recover_from_snapshot_and_journal_tail(self, tmp_path):
+        original = build_manager(tmp_path)
+        add_trades(original)
+        original.journal_service.close()
+
+        snapshot = SnapshotService(str(tmp_path / "trades.journal.snapshot")).load()
+        assert snapshot["journal_records"] == 6
+
+        recovered = build_manager(tmp_path)
+        assert recovered.recover() == len(TRADES)
+
+        assert recovered.portfolio_service.get_holdings() == original.portfolio_service.get_holdings()
+        assert recovered.pnl_service.get_state() == original.pnl_service.get_state()
+        assert [str(trade) for trade in recovered.trade_service.get_trades()] == \
+            [str(trade) for trade in original.trade_service.get_trades()]
+
+    @pytest.mark.parametrize("checkpoint_every", [None, 2])
+    def test_recover_restores_snapshot_state_that_disagrees_with_the_journal(self, tmp_path, checkpoint_every):
+        original = build_manager(tmp_path)
+        add_trades(original)
+        original.journal_service.close()
+
+        snapshot_service = SnapshotService(str(tmp_path / "trades.journal.snapshot"))
+        snapshot = snapshot_service.load()
+        snapshot["realized_pnl"]["BTC"]["realized_pnl"] += 100.0
+        snapshot["portfolio"]["ETH"]["quantity"] = 5.0
+        snapshot_service.save(snapshot["journal_records"], snapshot["portfolio"], snapshot["realized_pnl"])
+
+        recovered = TradeManager(
+            TradeService(), PortfolioService(), PnLService(),
+            journal_service=TradeJournalService(str(tmp_path / "trades.journal")),
+            snapshot_service=snapshot_service,
+            checkpoint_service=PortfolioCheckpointService(checkpoint_every) if checkpoint_every else None
+        )
+        recovered.recover()
+
+        assert recovered.portfolio_service.get_holdings() == original.portfolio_service.get_holdings()
+        assert recovered.pnl_service.get_state() == original.pnl_service.get_state()
+
+    @pytest.mark.parametrize("snapshot_every", [3, 1000])
+    def test_recover_backdated_trade_in_tail(self, tmp_path, snapshot_every):
+        original = build_manager(tmp_path, snapshot_every=snapshot_every)
+        add_trades(original)
+        original.add_trade(Trade("trade_late", "BTC", "buy", 45000.0, 0.5, "2024-01-01T00:00:01.000001"))
+        original.journal_service.close()
+
+        recovered = build_manager(tmp_path)
+        recovered.recover()
+
+        assert recovered.portfolio_service.get_holdings() == original.portfolio_service.get_holdings()
+        assert recovered.pnl_service.get_state() == original.pnl_service.get_state()
+
+    def test_recover_without_snapshot_drops_partial_record(self, tmp_path):
+        original = build_manager(tmp_path, snapshot_every=1000)
+        add_trades(original)
+        original.journal_service.close()
+
+        with open(tmp_path / "trades.journal", "ab") as journal:
+            journal.write(b"partial")
+
+        recovered = build_manager(tmp_path)
+        assert recovered.recover() == len(TRADES)
+        assert recovered.portfolio_service.get_holdings() == original.portfolio_service.get_holdings()
+        assert recovered.pnl_service.get_state() == original.pnl_service.get_state()
+
+    def test_trade_too_long_for_a_record_leaves_the_book_unchanged(self, tmp_path):
+        trade_manager = build_manager(tmp_path)
+        with pytest.raises(ValueError, match="does not fit in a journal record"):
+            trade_manager.add_trade(Trade("trade_0", "ABCDEFGHIJKLMNOPQ", "buy", 1.0, 1.0, "2024-01-01T00:00:00"))
+        with pytest.raises(TradeBatchError) as rejected:
+            trade_manager.add_trades([
+                Trade("trade_1", "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:01"),
+                Trade("x" * 33, "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:02"),
+            ])
+
+        assert list(rejected.value.errors) == [1]
+        assert trade_manager.portfolio_service.get_holdings() == {}
+        assert trade_manager.pnl_service.get_state() == {}
+        assert trade_manager.trade_service.get_trades() == []
+        assert trade_manager.journal_service.record_count == 0
+
+    def test_columnar_store_bulk_recovery(self, tmp_path):
+        original = build_manager(tmp_path)
+        add_trades(original)
+        original.journal_service.close()
+
+        recovered = TradeManager(
+            ColumnarTradeService(), PortfolioService(), PnLService(),
+            journal_service=TradeJournalService(str(tmp_path / "trades.journal")),
+            snapshot_service=SnapshotService(str(tmp_path / "trades.journal.snapshot"))
+        )
+        recovered.recover()
+
+        assert recovered.portfolio_service.get_holdings() == original.portfolio_service.get_holdings()
+        assert [str(trade) for trade in recovered.trade_service.get_trades()] == \
+            [str(trade) for trade in original.trade_service.get_trades()]
+        for symbol in ("BTC", "ETH"):
+            for side in (None, "buy", "sell"):
+                assert [trade.trade_id for trade in recovered.trade_service.get_trades_by_symbol_and_side(symbol, side)] == \
+                    [trade.trade_id for trade in original.trade_service.get_trades_by_symbol_and_side(symbol, side)]
+
+    def test_append_is_flushed_and_synced_without_further_traffic(self, tmp_path, monkeypatch):
+        synced = []
+        monkeypatch.setattr(journal_module.os, "fsync", lambda fileno: synced.append(time.monotonic()))
+        journal = TradeJournalService(str(tmp_path / "trades.journal"), fsync_every=1000, fsync_interval=0.05)
+        journal.append(Trade("t1", "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:00"))
+        # Written through to the OS right away: a crashed process loses nothing.
+        assert os.path.getsize(tmp_path / "trades.journal") == len(journal_module.MAGIC) + journal_module.RECORD.size
+
+        synced.clear()
+        journal.append(Trade("t2", "BTC", "buy", 1.0, 1.0, "2024-01-01T00:00:01"))
+        deadline = time.monotonic() + 2
+        while not synced and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert synced
+        journal.close()
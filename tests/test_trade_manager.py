@@ -0,0 +1,149 @@
+import random
+import sys
+import threading
+
+import pytest
+
+from src.models.trade import Trade
+from src.models.portfolio import Portfolio
+from src.services.portfolio_service import PortfolioService
+from src.services.trade_service import TradeService
+from src.services.columnar_trade_service import ColumnarTradeService
+from src.services.pnl_service import PnLService
+from src.services.lock_service import SymbolLockService
+from src.managers.trade_manager import TradeManager
+
+
+def generate_trades(count, symbols, seed=7):
+    rng = random.Random(seed)
+    trades = []
+    for index in range(count):
+        side = "sell" if rng.random() < 0.4 else "buy"
+        trades.append(Trade(
+            trade_id=f"trade_{index}",
+            symbol=rng.choice(symbols),
+            side=side,
+            price=round(rng.uniform(1.0, 100.0), 2),
+            quantity=round(rng.uniform(0.1, 5.0), 2),
+            timestamp=f"2024-01-01T00:00:{index // 1_000_000:02d}.{index % 1_000_000 + 1:06d}"
+        ))
+    return trades
+
+
+@pytest.fixture
+def fast_switching():
+    # Switch threads as often as possible to shake out interleavings.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+class TestSymbolLockService:
+    def test_symbol_always_maps_to_same_lock(self):
+        lock_service = SymbolLockService(stripes=8)
+
+        assert lock_service.lock_for("BTC") is lock_service.lock_for("BTC")
+
+    def test_lock_symbols_releases_every_stripe(self):
+        lock_service = SymbolLockService(stripes=8)
+
+        with lock_service.lock_symbols(["BTC", "ETH", "BTC"]):
+            assert lock_service.lock_for("BTC").locked()
+            assert lock_service.lock_for("ETH").locked()
+
+        assert not any(lock.locked() for lock in lock_service.locks)
+
+
+class TestConcurrentIngest:
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_holdings_match_serial_replay(self, store, fast_switching):
+        trades = generate_trades(4000, ["BTC", "ETH", "SOL", "XRP", "DOT"])
+        manager = TradeManager(store(), PortfolioService(), PnLService(), lock_service=SymbolLockService(stripes=4))
+        thread_count = 8
+
+        def worker(chunk):
+            for trade in chunk:
+                try:
+                    manager.add_trade(trade)
+                except Exception:
+                    # Interleaving can put a sell ahead of the buys it needs.
+                    pass
+
+        # Every thread gets trades on every symbol, so writers contend.
+        threads = [
+            threading.Thread(target=worker, args=(trades[offset::thread_count],))
+            for offset in range(thread_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        logged = manager.trade_service.get_trades()
+        assert len({trade.trade_id for trade in logged}) == len(logged)
+
+        # Threads interleave, so trades arrive backdated; the live state
+        # follows timestamp order regardless.
+        portfolio_service = PortfolioService()
+        pnl_service = PnLService()
+        for symbol in {trade.symbol for trade in logged}:
+            for trade in manager.trade_service.get_trades_by_symbol_and_side(symbol):
+                portfolio_service.apply_trade(trade)
+                pnl_service.add_trade(trade)
+
+        holdings = manager.portfolio_service.get_holdings()
+        expected = portfolio_service.get_holdings()
+        assert holdings.keys() == expected.keys()
+        for symbol, holding in expected.items():
+            assert holdings[symbol].quantity == pytest.approx(holding.quantity)
+            assert holdings[symbol].average_price == pytest.approx(holding.average_price)
+        for symbol in pnl_service.get_state():
+            assert manager.pnl_service.get_realized_pnl(symbol) == pytest.approx(pnl_service.get_realized_pnl(symbol))
+
+
+def make_trade(trade_id, side, price, quantity, second, symbol="BTC"):
+    return Trade(trade_id, symbol, side, price, quantity, f"2024-01-01T00:00:{second:02d}")
+
+
+class TestBackdatedTrades:
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_live_state_follows_timestamp_order(self, store):
+        manager = TradeManager(store(), PortfolioService(), PnLService())
+        manager.add_trade(make_trade("trade_1", "buy", 100.0, 2.0, 1))
+        manager.add_trade(make_trade("trade_2", "sell", 150.0, 1.0, 3))
+        # Lands between the two: the sell now closes against a 150 average.
+        manager.add_trade(make_trade("trade_3", "buy", 200.0, 2.0, 2))
+
+        assert [trade.trade_id for trade in manager.trade_service.get_trades_by_symbol_and_side("BTC")] == \
+            ["trade_1", "trade_3", "trade_2"]
+        assert manager.portfolio_service.get_holding("BTC") == Portfolio("BTC", 3.0, 150.0)
+        assert manager.pnl_service.get_realized_pnl("BTC") == pytest.approx(0.0)
+
+    def test_sell_must_be_covered_at_its_timestamp(self):
+        manager = TradeManager(TradeService(), PortfolioService(), PnLService())
+        manager.add_trade(make_trade("trade_1", "buy", 100.0, 1.0, 2))
+        with pytest.raises(Exception, match="Cannot sell BTC: No holdings found"):
+            manager.add_trade(make_trade("trade_2", "sell", 100.0, 1.0, 1))
+
+        assert [trade.trade_id for trade in manager.trade_service.get_trades()] == ["trade_1"]
+        assert manager.portfolio_service.get_holding("BTC") == Portfolio("BTC", 1.0, 100.0)
+
+    def test_stamped_trade_is_never_backdated(self):
+        manager = TradeManager(TradeService(), PortfolioService(), PnLService())
+        future = make_trade("trade_1", "buy", 100.0, 1.0, 0)
+        future.timestamp_ns = 4_102_444_800_000_000_000  # 2100-01-01
+        manager.add_trade(future)
+        manager.add_trade(make_trade("trade_2", "sell", 120.0, 1.0, 0), stamp=True)
+
+        assert [trade.trade_id for trade in manager.trade_service.get_trades_by_symbol_and_side("BTC")] == \
+            ["trade_1", "trade_2"]
+        assert manager.pnl_service.get_realized_pnl("BTC") == pytest.approx(20.0)
+
+    @pytest.mark.parametrize("store", [TradeService, ColumnarTradeService])
+    def test_sequence_is_the_log_position(self, store):
+        trade_service = store()
+        for index, second in enumerate([3, 1, 2]):
+            trade_service.add_trade(make_trade(f"trade_{index}", "buy", 100.0, 1.0, second))
+
+        assert [trade.sequence for trade in trade_service.get_trades_by_symbol_and_side("BTC")] == [1, 2, 0]
@@ -0,0 +1,41 @@
+from src.models.trade import Trade
+from src.services.trade_service import TradeService
+
+
+def make_trade(index, symbol, side, timestamp):
+    return Trade(
+        trade_id=f"trade_{index}",
+        symbol=symbol,
+        side=side,
+        price=100.0,
+        quantity=1.0,
+        timestamp=timestamp
+    )
+
+
+class TestTradeService:
+
+    def test_index_keeps_timestamp_order_for_backdated_trades(self):
+        trade_service = TradeService()
+        trade_service.add_trade(make_trade(0, "BTC", "buy", "2024-01-01T00:00:00"))
+        trade_service.add_trade(make_trade(1, "BTC", "sell", "2024-01-03T00:00:00"))
+        trade_service.add_trade(make_trade(2, "ETH", "buy", "2024-01-02T00:00:00"))
+        trade_service.add_trade(make_trade(3, "BTC", "buy", "2024-01-02T00:00:00"))
+
+        btc_trades = trade_service.get_trades_by_symbol_and_side("BTC")
+        assert [trade.trade_id for trade in btc_trades] == ["trade_0", "trade_3", "trade_1"]
+
+        btc_buys = trade_service.get_trades_by_symbol_and_side("BTC", "buy")
+        assert [trade.trade_id for trade in btc_buys] == ["trade_0", "trade_3"]
+
+        assert trade_service.get_trades_by_symbol_and_side("DOGE") == []
+
+    def test_time_range_slice(self):
+        trade_service = TradeService()
+        for day in range(1, 6):
+            trade_service.add_trade(make_trade(day, "BTC", "buy", f"2024-01-0{day}T00:00:00"))
+
+        trades = trade_service.get_trades_by_symbol_and_side(
+            "BTC", start="2024-01-02", end="2024-01-04T00:00:00"
+        )
+        assert [trade.trade_id for trade in trades] == ["trade_2", "trade_3", "trade_4"]